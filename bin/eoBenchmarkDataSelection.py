@@ -0,0 +1,139 @@
+#! /usr/bin/env python
+
+import argparse
+import time
+
+import numpy as np
+
+from lsst.eotask_gen3.eoDataSelection import (EoDataSelection, eoSelectAnyBias, eoSelectBiasBias,
+                                              eoSelectDarkDark, eoSelectFlatFlat, eoSelectAnySuperFlat,
+                                              eoSelectSuperFlatLow, eoSelectSuperFlatHigh,
+                                              eoSelectFe55Flat)
+
+SELECTION_FUNCTIONS = dict(anyBias=eoSelectAnyBias, biasBias=eoSelectBiasBias, darkDark=eoSelectDarkDark,
+                           flatFlat=eoSelectFlatFlat, anySuperFlat=eoSelectAnySuperFlat,
+                           superFlatLow=eoSelectSuperFlatLow, superFlatHigh=eoSelectSuperFlatHigh,
+                           fe55Flat=eoSelectFe55Flat)
+
+# (observation_type, observation_reason, exposure_time) of a typical run
+EXPOSURE_KINDS = [('bias', 'bias', 0.), ('bias', 'flat', 0.), ('flat', 'flat', 2.), ('flat', 'flat', 20.),
+                  ('dark', 'dark', 30.), ('flat', 'sflat', 1.), ('flat', 'sflat', 60.),
+                  ('fe55_flat', 'fe55', 20.)]
+
+
+class SyntheticRecord:
+    """ Exposure dimension record """
+    def __init__(self, expId, observationType, observationReason, exposureTime):
+        self.id = expId
+        self.observation_type = observationType
+        self.observation_reason = observationReason
+        self.exposure_time = exposureTime
+
+
+class SyntheticDataId(dict):
+    """ Data ID, with or without the exposure record """
+    def __init__(self, record, detector, expanded):
+        super().__init__(instrument="LSSTCam", exposure=record.id, detector=detector)
+        self.record = record
+        self.expanded = expanded
+
+    def hasRecords(self):
+        return self.expanded
+
+    @property
+    def records(self):
+        return dict(exposure=self.record)
+
+
+class SyntheticRef:
+    def __init__(self, dataId):
+        self.dataId = dataId
+
+
+class SyntheticRegistry:
+    """ Registry with a fixed latency per query """
+    def __init__(self, records, latency):
+        self.records = {record.id: record for record in records}
+        self.latency = latency
+        self.nQuery = 0
+
+    def expandDataId(self, dataId):
+        self.nQuery += 1
+        time.sleep(self.latency)
+        return SyntheticDataId(self.records[dataId['exposure']], dataId['detector'], True)
+
+    def queryDimensionRecords(self, element, where, instrument):
+        self.nQuery += 1
+        time.sleep(self.latency)
+        expIds = [int(token) for token in where[where.index("(") + 1:where.index(")")].split(",")]
+        return [self.records[expId] for expId in expIds]
+
+
+def makeRefs(nRefs, nDetector, expanded, seed):
+    """ Build refs for nRefs/nDetector exposures of random kinds """
+    rng = np.random.default_rng(seed)
+    nExposure = max(nRefs//nDetector, 1)
+    kinds = rng.integers(len(EXPOSURE_KINDS), size=nExposure)
+    records = [SyntheticRecord(3000000 + iExp, *EXPOSURE_KINDS[kind]) for iExp, kind in enumerate(kinds)]
+    refs = [SyntheticRef(SyntheticDataId(record, detector, expanded)) for record in records
+            for detector in range(nDetector)]
+    return refs, records
+
+
+def timeCall(func, nRepeat):
+    """ Return the median time of nRepeat calls and the last result """
+    times = []
+    for _ in range(nRepeat):
+        tStart = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - tStart)
+    return np.median(times), result
+
+
+def main():
+
+    # argument parser
+    parser = argparse.ArgumentParser(prog='eoBenchmarkDataSelection.py',
+                                     description="Compare the per-ref selection functions and the "
+                                     "vectorized column selections on synthetic refs")
+    parser.add_argument('-n', '--nRefs', type=int, default=10000, help='Number of refs')
+    parser.add_argument('--nDetector', type=int, default=1, help='Number of refs for each exposure')
+    parser.add_argument('-s', '--selection', type=str, default='flatFlat', choices=list(SELECTION_FUNCTIONS),
+                        help='Data selection')
+    parser.add_argument('--nRepeat', type=int, default=5, help='Number of repetitions')
+    parser.add_argument('--latency', type=float, default=2.e-4,
+                        help='Latency of each registry query, in seconds')
+    parser.add_argument('--seed', type=int, default=1234, help='Random number seed')
+
+    # unpack options
+    args = parser.parse_args()
+
+    selectionFunction = SELECTION_FUNCTIONS[args.selection]
+    selection = EoDataSelection.getSelection(args.selection)
+
+    refs, _ = makeRefs(args.nRefs, args.nDetector, True, args.seed)
+    tFunc, funcSelected = timeCall(lambda: [ref for ref in refs if selectionFunction(ref)], args.nRepeat)
+    tColumn, columnSelected = timeCall(lambda: selection.selectData(refs), args.nRepeat)
+    assert columnSelected == funcSelected
+    print("%s, %i refs of %i exposures, %i selected" % (args.selection, len(refs),
+                                                        len(refs)//args.nDetector, len(columnSelected)))
+    print("Expanded dataIds:   per-ref functions %8.2f ms, column selection %8.2f ms, speedup %.1fx" % (
+        1e3*tFunc, 1e3*tColumn, tFunc/tColumn))
+
+    # Without the records in the dataIds, the per-ref functions need each
+    # dataId to be expanded first
+    refs, records = makeRefs(args.nRefs, args.nDetector, False, args.seed)
+    registry = SyntheticRegistry(records, args.latency)
+    tFunc, funcSelected = timeCall(lambda: [ref for ref in refs if selectionFunction(
+        SyntheticRef(registry.expandDataId(ref.dataId)))], 1)
+    nFuncQuery = registry.nQuery
+    registry.nQuery = 0
+    tColumn, columnSelected = timeCall(lambda: selection.selectData(refs, registry), 1)
+    assert [ref.dataId for ref in columnSelected] == [ref.dataId for ref in funcSelected]
+    print("Unexpanded dataIds: per-ref functions %8.2f ms (%i queries), column selection %8.2f ms "
+          "(%i queries), speedup %.1fx" % (1e3*tFunc, nFuncQuery, 1e3*tColumn, registry.nQuery,
+                                           tFunc/tColumn))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#! /usr/bin/env python
+
+import argparse
+import time
+
+import numpy as np
+
+import lsst.pipe.base as pipeBase
+
+from lsst.eotask_gen3 import EoDetExpCalibTask, EoGainStabilityData
+
+AMP_NAMES = ['C%02i' % i for i in range(16)]
+
+
+class SyntheticExposure:
+    """ Exposure, only the pixel array """
+    def __init__(self, array):
+        self.array = array
+
+
+class SyntheticHandle:
+    """ Exposure handle with a fixed read latency """
+    def __init__(self, seed, shape, latency):
+        self.dataId = dict(exposure=seed, detector=94)
+        self.seed = seed
+        self.shape = shape
+        self.latency = latency
+
+    def get(self, parameters=None, component=None):
+        time.sleep(self.latency)
+        rng = np.random.default_rng(self.seed)
+        return SyntheticExposure(rng.normal(1000. + self.seed, 5., size=self.shape))
+
+
+class SyntheticIsr:
+    """ ISR with a fixed latency """
+    def __init__(self, latency):
+        self.latency = latency
+
+    def run(self, rawExposure, **kwargs):
+        time.sleep(self.latency)
+        return pipeBase.Struct(exposure=SyntheticExposure(rawExposure.array - 1000.))
+
+
+class SyntheticCamera:
+    def get(self, detId):
+        return detId
+
+
+class DetExpMeanTask(EoDetExpCalibTask):
+    """ Writes the mean of each exposure """
+
+    def makeOutputData(self, nExposure, **kwargs):
+        return EoGainStabilityData(amps=AMP_NAMES, nExposure=nExposure)
+
+    def analyzeDetExpData(self, calibExp, outputData, iExp):
+        outputData.detExp['detExp'].flux[iExp] = np.mean(calibExp.array)
+
+
+def timeRun(numExpThreads, inputExps, isrLatency, nRepeat):
+    """ Return the median time of nRepeat runs of the task and the output
+    of the last one """
+    config = DetExpMeanTask.ConfigClass()
+    config.numExpThreads = numExpThreads
+    task = DetExpMeanTask(config=config)
+    task.isr = SyntheticIsr(isrLatency)
+    times = []
+    for _ in range(nRepeat):
+        tStart = time.perf_counter()
+        outputData = task.run(inputExps, camera=SyntheticCamera()).outputData
+        times.append(time.perf_counter() - tStart)
+    return np.median(times), outputData
+
+
+def main():
+
+    # argument parser
+    parser = argparse.ArgumentParser(prog='eoBenchmarkDetExp.py',
+                                     description="Time EoDetExpCalibTask with different numbers of exposure "
+                                     "threads, on synthetic exposures with fixed read and ISR latencies")
+    parser.add_argument('-n', '--nExposure', type=int, default=16, help='Number of exposures')
+    parser.add_argument('-t', '--numExpThreads', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Numbers of exposure threads to compare')
+    parser.add_argument('--readLatency', type=float, default=0.05,
+                        help='Latency of reading one exposure, in seconds')
+    parser.add_argument('--isrLatency', type=float, default=0.05,
+                        help='Latency of ISR-processing one exposure, in seconds')
+    parser.add_argument('--nx', type=int, default=500, help='Number of columns of the exposures')
+    parser.add_argument('--ny', type=int, default=500, help='Number of rows of the exposures')
+    parser.add_argument('--nRepeat', type=int, default=3, help='Number of repetitions')
+
+    # unpack options
+    args = parser.parse_args()
+
+    inputExps = [SyntheticHandle(iExp, (args.ny, args.nx), args.readLatency)
+                 for iExp in range(args.nExposure)]
+    print("%i exposures of %i x %i, read latency %.3f s, ISR latency %.3f s" % (
+        args.nExposure, args.ny, args.nx, args.readLatency, args.isrLatency))
+    serialTime, serialOutput = timeRun(1, inputExps, args.isrLatency, args.nRepeat)
+    for numExpThreads in args.numExpThreads:
+        runTime, outputData = timeRun(numExpThreads, inputExps, args.isrLatency, args.nRepeat)
+        assert outputData == serialOutput
+        print("numExpThreads=%-3i %8.3f s, speedup %.1fx" % (numExpThreads, runTime, serialTime/runTime))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#! /usr/bin/env python
+
+import argparse
+import time
+
+import numpy as np
+
+import lsst.geom as lsstGeom
+import lsst.afw.image as afwImage
+from lsst.afw.cameraGeom import AmplifierIsolator
+from lsst.ip.isr import IsrTask
+
+from lsst.eotask_gen3.eoFastIsr import EoFastIsrTask
+
+
+def makeIsrConfig(configClass, doDark, fitType):
+    """ Build the reduced ISR configuration used by the EO tasks """
+    config = configClass()
+    config.expectWcs = False
+    config.doSaturation = True
+    config.doSetBadRegions = False
+    config.doAssembleCcd = False
+    config.doBias = True
+    config.doLinearize = False
+    config.doDefect = False
+    config.doNanMasking = False
+    config.doWidenSaturationTrails = False
+    config.doDark = doDark
+    config.doFlat = False
+    config.doFringe = False
+    config.doInterpolate = False
+    config.doWrite = False
+    if hasattr(config.overscan, 'fitType'):
+        config.overscan.fitType = fitType
+    else:
+        config.overscanFitType = fitType
+    return config
+
+
+def makeSyntheticInputs(detector, darkTime, seed):
+    """ Build a synthetic raw, bias and dark for a detector """
+    rng = np.random.default_rng(seed)
+    bbox = lsstGeom.Box2I()
+    for amp in detector.getAmplifiers():
+        bbox.include(amp.getRawBBox())
+
+    visitInfo = afwImage.VisitInfo(exposureTime=darkTime, darkTime=darkTime)
+    raw = afwImage.ExposureI(bbox)
+    raw.setDetector(detector)
+    raw.getInfo().setVisitInfo(visitInfo)
+    darkVisitInfo = afwImage.VisitInfo(exposureTime=1., darkTime=1.)
+    bias = afwImage.ExposureF(bbox)
+    bias.setDetector(detector)
+    dark = afwImage.ExposureF(bbox)
+    dark.setDetector(detector)
+    dark.getInfo().setVisitInfo(darkVisitInfo)
+
+    xy0 = bbox.getMin()
+    for amp in detector.getAmplifiers():
+        rawBBox = amp.getRawBBox()
+        ampSlice = (slice(rawBBox.getMinY() - xy0.getY(), rawBBox.getMaxY() + 1 - xy0.getY()),
+                    slice(rawBBox.getMinX() - xy0.getX(), rawBBox.getMaxX() + 1 - xy0.getX()))
+        shape = raw.image.array[ampSlice].shape
+        rowLevel = 20000. + 5.*np.sin(np.arange(shape[0])/50.)[:, np.newaxis]
+        raw.image.array[ampSlice] = (rowLevel + rng.normal(0., 6., shape)).astype(np.int32)
+        bias.image.array[ampSlice] = rng.normal(0., 1., shape)
+        dark.image.array[ampSlice] = rng.exponential(0.002, shape)
+        dataBBox = amp.getRawDataBBox()
+        dataSlice = (slice(dataBBox.getMinY() - xy0.getY(), dataBBox.getMaxY() + 1 - xy0.getY()),
+                     slice(dataBBox.getMinX() - xy0.getX(), dataBBox.getMaxX() + 1 - xy0.getX()))
+        raw.image.array[dataSlice] += rng.poisson(1000., raw.image.array[dataSlice].shape).astype(np.int32)
+    bias.variance.array[:, :] = 1.
+    dark.variance.array[:, :] = 0.002
+    return raw, bias, dark
+
+
+def timeIsr(task, ampInputs, doDark, nRepeat):
+    """ Run ISR on each amp, return the per-amp latencies and the outputs """
+    latencies = []
+    outputs = []
+    for ampRaw, ampBias, ampDark in ampInputs:
+        kwargs = dict(bias=ampBias)
+        if doDark:
+            kwargs['dark'] = ampDark
+        for _ in range(nRepeat):
+            ampExp = ampRaw.clone()
+            tStart = time.perf_counter()
+            calibExp = task.run(ampExp, **kwargs).exposure
+            latencies.append(time.perf_counter() - tStart)
+        outputs.append(calibExp)
+    return np.array(latencies), outputs
+
+
+def main():
+
+    # argument parser
+    parser = argparse.ArgumentParser(prog='eoBenchmarkIsr.py',
+                                     description="Compare the per-amp latency of IsrTask and EoFastIsrTask "
+                                     "on synthetic LSSTCam data (needs obs_lsst)")
+    parser.add_argument('-d', '--detector', type=int, default=0, help='LSSTCam detector number')
+    parser.add_argument('-n', '--nRepeat', type=int, default=5, help='Number of repetitions per amp')
+    parser.add_argument('--fitType', type=str, default='MEDIAN_PER_ROW', help='Overscan fit type')
+    parser.add_argument('--doDark', action='store_true', default=False, help='Also do dark subtraction')
+    parser.add_argument('--darkTime', type=float, default=30., help='Dark time of the raw, in seconds')
+    parser.add_argument('--seed', type=int, default=1234, help='Random number seed')
+
+    # unpack options
+    args = parser.parse_args()
+
+    from lsst.obs.lsst import LsstCam
+    detector = LsstCam.getCamera()[args.detector]
+    raw, bias, dark = makeSyntheticInputs(detector, args.darkTime, args.seed)
+    ampInputs = [(AmplifierIsolator.apply(raw, amp), AmplifierIsolator.apply(bias, amp),
+                  AmplifierIsolator.apply(dark, amp)) for amp in detector.getAmplifiers()]
+
+    results = {}
+    for taskClass in (IsrTask, EoFastIsrTask):
+        config = makeIsrConfig(taskClass.ConfigClass, args.doDark, args.fitType)
+        task = taskClass(config=config)
+        results[taskClass.__name__] = timeIsr(task, ampInputs, args.doDark, args.nRepeat)
+
+    print("%s, %i amps, %i repetitions, fitType=%s, doDark=%s" % (
+        detector.getName(), len(ampInputs), args.nRepeat, args.fitType, args.doDark))
+    for name, (latencies, _) in results.items():
+        print("%-16s per-amp latency: median %8.2f ms, mean %8.2f ms, max %8.2f ms" % (
+            name, 1e3*np.median(latencies), 1e3*np.mean(latencies), 1e3*np.max(latencies)))
+    speedup = np.median(results['IsrTask'][0])/np.median(results['EoFastIsrTask'][0])
+    print("Speedup: %.1fx" % speedup)
+
+    maxDiff = dict(image=0., variance=0.)
+    nMaskDiff = 0
+    for refExp, fastExp in zip(results['IsrTask'][1], results['EoFastIsrTask'][1]):
+        for plane in maxDiff:
+            diff = getattr(refExp, plane).array - getattr(fastExp, plane).array
+            maxDiff[plane] = max(maxDiff[plane], np.max(np.abs(diff)))
+        nMaskDiff += np.count_nonzero(refExp.mask.array != fastExp.mask.array)
+    print("Max abs difference: image %.3g ADU, variance %.3g ADU^2, %i mask pixels differ" % (
+        maxDiff['image'], maxDiff['variance'], nMaskDiff))
+
+
+if __name__ == '__main__':
+    main()
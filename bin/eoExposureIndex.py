@@ -0,0 +1,71 @@
+#! /usr/bin/env python
+
+import os
+import argparse
+
+from lsst.daf.butler import Butler
+from lsst.eotask_gen3.eoExposureIndex import EoExposureIndex
+
+
+def buildIndices(repo, collections, indexDir, datasetType='raw', instrument='LSSTCam', force=False):
+    """ Build, or rebuild if they are out of date, the index of each
+    collection """
+
+    butler = Butler(repo)
+    for collection in collections:
+        path = EoExposureIndex.path(indexDir, collection)
+        mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        index = EoExposureIndex.load(indexDir, collection, butler.registry, datasetType=datasetType,
+                                     rebuild=force, instrument=instrument)
+        status = "up to date" if mtime is not None and os.stat(path).st_mtime_ns == mtime else "built"
+        print("%s: %i exposures, %s (%s)" % (collection, len(index), status, path))
+
+
+def showIndices(indexDir, repo=None, instrument='LSSTCam'):
+    """ Print the content of the indices, and if they are up to date """
+
+    registry = Butler(repo).registry if repo else None
+    for fileName in sorted(os.listdir(indexDir)):
+        if not fileName.endswith('.sqlite'):
+            continue
+        index = EoExposureIndex.read(os.path.join(indexDir, fileName))
+        info = index.info
+        status = "" if registry is None else \
+            (", up to date" if index.isValid(registry, instrument=instrument) else ", out of date")
+        print("%s: %i exposures of %s, built %s%s" % (info.get('collection'), len(index),
+                                                      info.get('datasetType'), info.get('created'), status))
+        for (obsType, obsReason), count in sorted(index.summary().items(), key=str):
+            print("    %-12s %-18s %6i" % (obsType, obsReason, count))
+
+
+def main():
+
+    # argument parser
+    parser = argparse.ArgumentParser(prog='eoExposureIndex.py',
+                                     description="Build the exposure metadata indices of collections, "
+                                     "used by the EO tasks with config.exposureIndexDir")
+    parser.add_argument('collections', nargs='*', help='Collections to index')
+    parser.add_argument('-b', '--butler', type=str, help='Butler Repo')
+    parser.add_argument('-o', '--output', type=str, required=True, help='Index directory')
+    parser.add_argument('--datasetType', type=str, default='raw',
+                        help='Only index the exposures with datasets of this type')
+    parser.add_argument('--instrument', type=str, default='LSSTCam', help='Instrument')
+    parser.add_argument('--force', action='store_true', default=False,
+                        help='Rebuild the indices even if they are up to date')
+    parser.add_argument('--show', action='store_true', default=False,
+                        help='Print the content of the indices, and if they are up to date if '
+                        'a butler is given')
+
+    # unpack options
+    args = parser.parse_args()
+
+    if args.show:
+        showIndices(args.output, args.butler, args.instrument)
+        return
+    if not args.butler or not args.collections:
+        parser.error("A butler and collections are needed to build the indices")
+    buildIndices(args.butler, args.collections, args.output, args.datasetType, args.instrument, args.force)
+
+
+if __name__ == '__main__':
+    main()
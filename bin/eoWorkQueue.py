@@ -0,0 +1,130 @@
+#! /usr/bin/env python
+
+import argparse
+import multiprocessing
+import shlex
+
+from lsst.eotask_gen3.eoWorkQueue import EoWorkQueue, JOB_STATES
+
+output_run_template = '{base}/analysis/{run}/det{detector:03d}'
+
+pipe_template = 'pipetask run -b {repo} -i {inputs} --output-run {output_run} -p {pipeline}#{subset} -d "instrument = \'LSSTCam\' and detector = {detector}{where}" --no-versions --register-dataset-types'  # noqa
+
+inputs_templates = {
+    'protocalRunNoPd': '{base}/raw/{run},LSSTCam/calib/unbounded',
+    'protocalRunPd': '{base}/analysis/{run}/det{detector:03d},{base}/raw/{run},{base}/photodiode/{run},LSSTCam/calib/unbounded',  # noqa
+}
+
+
+def parse_detectors(detectors):
+    """ Parse a list of detector numbers and ranges, e.g. 0-8 94 """
+    detIds = []
+    for token in detectors:
+        first, _, last = token.partition('-')
+        detIds += list(range(int(first), int(last or first) + 1))
+    return detIds
+
+
+def submit(queue, args):
+    """ Submit one job per detector and task subset, each subset depends
+    on the previous one for the same detector """
+    where = " and (%s)" % args.where if args.where else ""
+    nSubmitted = 0
+    for detector in parse_detectors(args.detectors):
+        previous = None
+        for subset in args.subsets:
+            kwargs = dict(repo=args.repo, base=args.base, run=args.run, pipeline=args.pipeline,
+                          subset=subset, detector=detector, where=where)
+            inputsTemplate = inputs_templates.get(subset, inputs_templates['protocalRunNoPd'])
+            kwargs['inputs'] = inputsTemplate.format(**kwargs)
+            kwargs['output_run'] = output_run_template.format(**kwargs)
+            command = shlex.split(pipe_template.format(**kwargs))
+            if previous is not None:
+                command.append('--extend-run')
+            # Retries extend the output run of the failed attempt, and
+            # skip the quanta it completed
+            retryArgs = ([] if previous is not None else ['--extend-run']) + \
+                ['--skip-existing-in', kwargs['output_run']]
+            jobId = "det%03d.%s" % (detector, subset)
+            nSubmitted += queue.submit(jobId, command, dependsOn=[previous] if previous else [],
+                                       maxAttempts=args.max_attempts, retryArgs=retryArgs,
+                                       meta=dict(detector=detector, subset=subset, run=args.run))
+            previous = jobId
+    print("Submitted %i job(s) to %s" % (nSubmitted, queue.queueDir))
+
+
+def run_worker(queueDir, args):
+    EoWorkQueue(queueDir).runWorker(pollInterval=args.poll, heartbeat=args.heartbeat,
+                                    staleTimeout=args.stale_timeout, log=print)
+
+
+def work(queue, args):
+    """ Run workers on this node until all the jobs are done or failed """
+    workers = [multiprocessing.Process(target=run_worker, args=(queue.queueDir, args))
+               for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def status(queue, args):
+    """ Print the number of jobs in each state and the failed jobs """
+    summary = queue.summary()
+    print(", ".join("%s %i" % (state, summary['counts'][state]) for state in JOB_STATES))
+    print("%i retries, successful attempts: total %.1f s, median %.1f s, max %.1f s" % (
+        summary['nRetries'], summary['duration']['total'], summary['duration']['median'],
+        summary['duration']['max']))
+    for jobId in queue.listJobs("failed"):
+        job = queue.readJob("failed", jobId)
+        if job is None:
+            continue
+        lastAttempt = job['attempts'][-1] if job['attempts'] else {}
+        print("  %s: %s, %i attempt(s), last log %s" % (jobId, job.get('status'), len(job['attempts']),
+                                                        lastAttempt.get('log')))
+
+
+def retry(queue, args):
+    """ Put the failed jobs back in the queue """
+    print("Requeued %i job(s)" % len(queue.retryFailed()))
+
+
+def main():
+
+    # argument parser
+    parser = argparse.ArgumentParser(prog='eoWorkQueue.py',
+                                     description="Run the per-detector EO pipelines with workers on "
+                                     "several nodes sharing a queue directory")
+    parser.add_argument('-q', '--queue', type=str, required=True, help='Shared queue directory')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    submitParser = subparsers.add_parser('submit', help='Add one job per detector and task subset')
+    submitParser.add_argument('--run', type=str, required=True, help='Run number')
+    submitParser.add_argument('--repo', type=str, default='bot_data', help='Path to butler repo')
+    submitParser.add_argument('--base', type=str, default='u/echarles', help='Output base path')
+    submitParser.add_argument('--pipeline', type=str, default='eoPipe.yaml', help='Pipeline file')
+    submitParser.add_argument('--subsets', nargs='+', default=['protocalRunNoPd', 'protocalRunPd'],
+                              help='Task subsets, run in that order for each detector')
+    submitParser.add_argument('--detectors', nargs='+', default=['0-188'], help='Detectors, e.g. 0-8 94')
+    submitParser.add_argument('--where', type=str, default='', help='Extra data selection')
+    submitParser.add_argument('--max-attempts', type=int, default=3, help='Number of tries of each job')
+
+    workParser = subparsers.add_parser('work', help='Run workers on this node')
+    workParser.add_argument('-n', '--workers', type=int, default=1, help='Number of worker processes')
+    workParser.add_argument('--poll', type=float, default=5., help='Polling interval, in seconds')
+    workParser.add_argument('--heartbeat', type=float, default=10., help='Heartbeat interval, in seconds')
+    workParser.add_argument('--stale-timeout', type=float, default=300.,
+                            help='Requeue the claims without heartbeat for that long, in seconds')
+
+    subparsers.add_parser('status', help='Print the state of the queue')
+    subparsers.add_parser('retry', help='Requeue the failed jobs')
+
+    # unpack options
+    args = parser.parse_args()
+
+    queue = EoWorkQueue(args.queue)
+    dict(submit=submit, work=work, status=status, retry=retry)[args.command](queue, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,7 @@ from .eoOverscanData import *
 from .eoPersistenceData import *
 from .eoPtcData import *
 from .eoReadNoiseData import *
+from .eoRunSummaryData import *
 from .eoTearingData import *
 from .eoTestData import *
 
@@ -25,6 +26,8 @@ from .eoTestData import *
 from .eoDataSelection import *
 
 # Base classes for tasks
+from .eoAmpCalibCache import *
+from .eoFastIsr import *
 from .eoCalibBase import *
 
 # Combine tasks
@@ -46,6 +49,15 @@ from .eoPtc import *
 from .eoReadNoise import *
 from .eoTearing import *
 
+# Fused analysis task
+from .eoFused import *
+
+# Raft-level wrapper task
+from .eoRaft import *
+
+# Camera-wide summary task
+from .eoRunSummary import *
+
 # static html reports
 from .eoPlotTask import *
 from .eoReportUtils import *
@@ -0,0 +1,132 @@
+""" Cache of per-amplifier calibration products
+
+The detector-level bias and dark frames are cut into per-amplifier
+images once per detector, and the same per-amplifier images are handed
+out to every task that asks for them, instead of each task re-slicing
+its own copy of the full frames.
+"""
+
+import threading
+
+from collections import OrderedDict
+
+__all__ = ["EoAmpCalibCache", "AMP_CALIB_CACHE", "calibNBytes"]
+
+
+def calibNBytes(calib):
+    """ Return the number of bytes of pixel data in a calibration product
+
+    Parameters
+    ----------
+    calib : `lsst.afw.image.Exposure` or `object`
+        The calibration product
+
+    Returns
+    -------
+    nBytes : `int`
+        Bytes used by the image, mask and variance planes, or 0
+        for objects without pixel data (defects, gains, ...)
+    """
+    try:
+        maskedImage = calib.getMaskedImage()
+    except AttributeError:
+        return 0
+    return sum(plane.array.nbytes for plane in (maskedImage.image, maskedImage.mask, maskedImage.variance)
+               if plane is not None)
+
+
+class EoAmpCalibCache:
+    """ Least-recently-used cache of per-amplifier calibration products
+
+    Entries are keyed on the dataset ID of the detector-level calibration
+    and the amplifier name, so that different tasks processing the same
+    detector share the same per-amplifier images.
+
+    Parameters
+    ----------
+    maxBytes : `int`
+        Bound on the total size of the cached pixel data.  The least
+        recently used entries are evicted to keep the cache under this size.
+        0 disables the cache.
+
+    Notes
+    -----
+    The cached images are shared, users must not modify them.
+    """
+
+    def __init__(self, maxBytes=0):
+        """ C'tor,  Fills class parameters """
+        self._maxBytes = maxBytes
+        self._entries = OrderedDict()
+        self._nBytes = 0
+        self._lock = threading.RLock()
+        self.nHits = 0
+        self.nMisses = 0
+        self.nEvictions = 0
+
+    @property
+    def maxBytes(self):
+        """ Return the bound on the size of the cache """
+        return self._maxBytes
+
+    @property
+    def nBytes(self):
+        """ Return the size of the pixel data currently cached """
+        return self._nBytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def resize(self, maxBytes):
+        """ Change the bound on the size of the cache, evicting entries
+        as needed """
+        with self._lock:
+            self._maxBytes = maxBytes
+            self._evict()
+
+    def clear(self):
+        """ Remove all the entries """
+        with self._lock:
+            self._entries.clear()
+            self._nBytes = 0
+
+    def get(self, key, factory):
+        """ Return the cached value for key, building it if needed
+
+        Parameters
+        ----------
+        key : `tuple`
+            The cache key, (calibration dataset ID, amplifier name)
+        factory : `Callable`
+            Called without arguments to build the value on a miss
+
+        Returns
+        -------
+        value : `object`
+            The cached, or newly built, value
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.nHits += 1
+                return self._entries[key][0]
+            self.nMisses += 1
+        value = factory()
+        nBytes = calibNBytes(value)
+        if self._maxBytes <= 0 or nBytes > self._maxBytes:
+            return value
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, nBytes)
+                self._nBytes += nBytes
+                self._evict()
+        return value
+
+    def _evict(self):
+        while self._entries and self._nBytes > self._maxBytes:
+            _, (_, nBytes) = self._entries.popitem(last=False)
+            self._nBytes -= nBytes
+            self.nEvictions += 1
+
+
+AMP_CALIB_CACHE = EoAmpCalibCache()
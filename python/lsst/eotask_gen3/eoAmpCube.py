@@ -0,0 +1,153 @@
+""" Per-amp image cubes, for analyzers that reduce all the exposures of an
+amp at once
+
+A cube is a nExposure x ny x nx array, float32 unless the task works in
+float64, that holds the ISR-processed
+images of one amp.  It lives in memory if it fits in its budget, and is
+otherwise memory-mapped to an anonymous temporary file.
+"""
+
+import tempfile
+
+import numpy as np
+
+__all__ = ["EoAmpCube", "makeAmpCube", "cubeMedian", "cubeClippedStats"]
+
+
+# Conversion from inter-quartile range to standard deviation for a
+# gaussian, same value as used by lsst.afw.math
+IQ_TO_STDEV = 0.741301109252802
+
+
+def makeAmpCube(nExposure, shape, maxBytes, cubeDir=None, dtype=np.float32):
+    """ Allocate a cube for one amp
+
+    Parameters
+    ----------
+    nExposure : `int`
+        Number of exposures
+    shape : `tuple` [`int`]
+        Shape of the amp images
+    maxBytes : `int`
+        Bound on the size of an in-memory cube, larger cubes are
+        memory-mapped
+    cubeDir : `str`, optional
+        Directory for the memory-mapped files, default is the system
+        temporary directory
+    dtype : `numpy.dtype`
+        Type of the cube elements
+
+    Returns
+    -------
+    cube : `numpy.ndarray` or `numpy.memmap`
+        The uninitialized cube
+    """
+    cubeShape = (nExposure, ) + tuple(shape)
+    nBytes = np.dtype(dtype).itemsize*int(np.prod(cubeShape))
+    if nBytes <= maxBytes:
+        return np.empty(cubeShape, dtype=dtype)
+    with tempfile.TemporaryFile(dir=cubeDir) as fout:
+        return np.memmap(fout, dtype=dtype, mode='w+', shape=cubeShape)
+
+
+class EoAmpCube:
+    """ Lazily allocated cube for one amp
+
+    The cube is allocated when the first image is added, so that the
+    image shape does not need to be known in advance.
+
+    Parameters
+    ----------
+    nExposure : `int`
+        Number of exposures
+    maxBytes : `int`
+        Bound on the size of an in-memory cube, see `makeAmpCube`
+    cubeDir : `str`, optional
+        Directory for the memory-mapped files
+    dtype : `numpy.dtype`
+        Type of the cube elements
+    """
+
+    def __init__(self, nExposure, maxBytes, cubeDir=None, dtype=np.float32):
+        """ C'tor,  Fills class parameters """
+        self._nExposure = nExposure
+        self._maxBytes = maxBytes
+        self._cubeDir = cubeDir
+        self._dtype = dtype
+        self._array = None
+
+    @property
+    def array(self):
+        """ Return the cube, `None` if no image was added """
+        return self._array
+
+    def fill(self, iExp, image):
+        """ Copy the image of one exposure into the cube
+
+        Parameters
+        ----------
+        iExp : `int`
+            Index for the exposure
+        image : `numpy.ndarray`
+            The amp image
+        """
+        if self._array is None:
+            self._array = makeAmpCube(self._nExposure, image.shape, self._maxBytes, self._cubeDir,
+                                      dtype=self._dtype)
+        self._array[iExp] = image
+
+
+def cubeMedian(cube):
+    """ Return the median of each image of a cube, ignoring NaNs
+
+    Parameters
+    ----------
+    cube : `numpy.ndarray`
+        The nExposure x ny x nx cube
+
+    Returns
+    -------
+    median : `numpy.ndarray`
+        The nExposure median values
+    """
+    return np.nanmedian(cube.reshape(len(cube), -1), axis=1)
+
+
+def cubeClippedStats(cube, nSigma=3., nIter=3):
+    """ Return the sigma-clipped mean and standard deviation of each image
+    of a cube, ignoring NaNs
+
+    This follows `lsst.afw.math` MEANCLIP and STDEVCLIP: the first
+    iteration clips around the median, with a width estimated from the
+    inter-quartile range, the following ones around the clipped mean, with
+    a width estimated from the clipped standard deviation.
+
+    Parameters
+    ----------
+    cube : `numpy.ndarray`
+        The nExposure x ny x nx cube
+    nSigma : `float`
+        Number of standard deviations to clip at
+    nIter : `int`
+        Number of clipping iterations
+
+    Returns
+    -------
+    mean : `numpy.ndarray`
+        The nExposure clipped means
+    stdev : `numpy.ndarray`
+        The nExposure clipped standard deviations
+    """
+    values = cube.reshape(len(cube), -1)
+    quartile1, center, quartile3 = np.nanpercentile(values, [25., 50., 75.], axis=1)
+    hwidth = nSigma*IQ_TO_STDEV*(quartile3 - quartile1)
+    zero = np.zeros((), dtype=values.dtype)
+    for _ in range(nIter):
+        keep = np.abs(values - center[:, np.newaxis]) <= hwidth[:, np.newaxis]
+        nKeep = keep.sum(axis=1)
+        mean = np.where(keep, values, zero).sum(axis=1, dtype=np.float64)/nKeep
+        resid = np.where(keep, values - mean[:, np.newaxis], zero)
+        variance = np.square(resid, dtype=np.float64).sum(axis=1)/(nKeep - 1)
+        center = mean
+        hwidth = nSigma*np.sqrt(variance)
+    return mean, np.sqrt(variance)
@@ -0,0 +1,167 @@
+""" Reprocessing a subset of the amplifiers of a detector
+
+With `config.ampSubset` set, the amp loops only process the listed amps,
+the other amps are left at their default values in the output.  The
+per-amp results, i.e., the 'ampExp_<amp>' table and row `iamp` of the
+'amps' table (see `lsst.eotask_gen3.mapOverAmps`), can then be patched
+into an existing output of the same task for the same inputs, either in
+memory with `mergeAmpResults` or directly in the FITS file with
+`patchAmpResultsFits`, which only rewrites the affected HDUs.
+"""
+
+from astropy.io import fits
+
+from .eoCalibTable import EoCalibTableHandle
+
+__all__ = ["getAmpIndices", "mergeAmpResults", "patchAmpResultsFits"]
+
+
+# Name of the per-amp, per-exposure tables
+AMP_EXP_TABLE_NAME = "ampExp_%s"
+
+# Name of the per-amp, per-run table, with one row for each amp
+AMP_RUN_TABLE_NAME = "amps"
+
+
+def getAmpIndices(ampSubset, amps):
+    """ Return the indices of the amplifiers listed in ampSubset
+
+    Parameters
+    ----------
+    ampSubset : `list` [`str`]
+        Names of the amplifiers, empty for all of them
+    amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+        The amplifiers of the detector
+
+    Returns
+    -------
+    ampIndices : `list` [`int`]
+        The indices of the listed amplifiers, sorted
+
+    Raises
+    ------
+    ValueError : ampSubset contains unknown amplifier names
+    """
+    ampNames = [amp.getName() for amp in amps]
+    if not ampSubset:
+        return list(range(len(ampNames)))
+    unknown = sorted(set(ampSubset) - set(ampNames))
+    if unknown:
+        raise ValueError("Unknown amplifiers %s in ampSubset, should be in %s" % (unknown, ampNames))
+    return [iamp for iamp, ampName in enumerate(ampNames) if ampName in ampSubset]
+
+
+def getAmpRows(ampSubset, amps):
+    """ Return the (table name, rows) of the per-amp results of the
+    amplifiers listed in ampSubset """
+    ampRows = []
+    for iamp in getAmpIndices(ampSubset, amps):
+        ampRows.append((AMP_EXP_TABLE_NAME % amps[iamp].getName(), slice(None)))
+        ampRows.append((AMP_RUN_TABLE_NAME, iamp))
+    return ampRows
+
+
+def copyRows(target, source, rows, tableName):
+    """ Copy rows of all the columns of source into target, in place
+
+    Raises
+    ------
+    ValueError : The tables do not have the same columns and length
+    """
+    targetNames = list(target.columns.names if isinstance(target, fits.FITS_rec) else target.colnames)
+    if sorted(targetNames) != sorted(source.colnames) or len(target) != len(source):
+        raise ValueError("Table %s does not match the patch, it has columns %s and %i rows, "
+                         "not %s and %i rows" % (tableName, targetNames, len(target),
+                                                 source.colnames, len(source)))
+    for colName in source.colnames:
+        target[colName][rows] = source[colName][rows]
+
+
+def checkSchema(schemaName, patch):
+    """ Check that the patch has the same schema as the patched output """
+    if schemaName != patch.schema.fullName():
+        raise ValueError("Can not patch an output with schema %s using one with schema %s" %
+                         (schemaName, patch.schema.fullName()))
+
+
+def mergeAmpResults(calib, patch, amps, ampSubset):
+    """ Patch the per-amp results of some amplifiers into an existing
+    output, in place
+
+    Parameters
+    ----------
+    calib : `lsst.eotask_gen3.EoCalib`
+        The existing output, for all the amplifiers
+    patch : `lsst.eotask_gen3.EoCalib`
+        The output of the same task, run for the same inputs with
+        `config.ampSubset` set
+    amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+        The amplifiers of the detector
+    ampSubset : `list` [`str`]
+        Names of the amplifiers to patch
+
+    Returns
+    -------
+    tableNames : `list` [`str`]
+        Names of the tables that were patched
+
+    Raises
+    ------
+    ValueError : The patch does not have the same schema or table
+        shapes as calib
+    """
+    checkSchema(calib.schema.fullName(), patch)
+    tables = {EoCalibTableHandle.findTableMeta(table, 'name'): table for table in calib.tables}
+    patchTables = {EoCalibTableHandle.findTableMeta(table, 'name'): table for table in patch.tables}
+    tableNames = []
+    for tableName, rows in getAmpRows(ampSubset, amps):
+        if tableName not in tables:
+            continue
+        copyRows(tables[tableName], patchTables[tableName], rows, tableName)
+        if tableName not in tableNames:
+            tableNames.append(tableName)
+    return tableNames
+
+
+def patchAmpResultsFits(fileName, patch, amps, ampSubset):
+    """ Patch the per-amp results of some amplifiers into an existing
+    output FITS file, in place
+
+    Only the HDUs of the patched tables are loaded and rewritten, the file
+    is rewritten in full only if their size changes, which does not
+    happen for tables of the same schema and shape.
+
+    Parameters
+    ----------
+    fileName : `str`
+        The existing output file, as written by `EoCalib.writeFits`
+    patch : `lsst.eotask_gen3.EoCalib`
+        The output of the same task, run for the same inputs with
+        `config.ampSubset` set
+    amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+        The amplifiers of the detector
+    ampSubset : `list` [`str`]
+        Names of the amplifiers to patch
+
+    Returns
+    -------
+    tableNames : `list` [`str`]
+        Names of the tables that were patched
+
+    Raises
+    ------
+    ValueError : The patch does not have the same schema or table
+        shapes as the file
+    """
+    patchTables = {EoCalibTableHandle.findTableMeta(table, 'name'): table for table in patch.tables}
+    tableNames = []
+    with fits.open(fileName, mode='update') as hdus:
+        checkSchema(hdus[1].header.get('CALIBSCH'), patch)
+        hduIndices = {hdu.header.get('NAME'): idx for idx, hdu in enumerate(hdus) if idx > 0}
+        for tableName, rows in getAmpRows(ampSubset, amps):
+            if tableName not in hduIndices:
+                continue
+            copyRows(hdus[hduIndices[tableName]].data, patchTables[tableName], rows, tableName)
+            if tableName not in tableNames:
+                tableNames.append(tableName)
+    return tableNames
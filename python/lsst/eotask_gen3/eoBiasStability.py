@@ -3,8 +3,11 @@ import numpy as np
 import lsst.afw.math as afwMath
 import lsst.pipe.base.connectionTypes as cT
 
+from .eoAmpCube import cubeClippedStats
 from .eoCalibBase import EoAmpExpCalibTaskConfig, EoAmpExpCalibTaskConnections, EoAmpExpCalibTask
 from .eoBiasStabilityData import EoBiasStabilityData
+from .eoNumerics import workingMedian
+from .eoQuickLook import sampleArray
 
 __all__ = ["EoBiasStabilityTask", "EoBiasStabilityTaskConfig"]
 
@@ -86,10 +89,51 @@ class EoBiasStabilityTask(EoAmpExpCalibTask):
         imaging region.
         """
         outTable = outputData.ampExp["ampExp_%s" % amp.getName()]
-        stats = afwMath.makeStatistics(calibExp.image, afwMath.MEANCLIP | afwMath.STDEVCLIP, self.statCtrl)
+        if self.quickLook is None:
+            image = calibExp.image
+            rows = calibExp.image.array
+        else:
+            image = self.quickLook.sample(calibExp.image.array).flatten()
+            rows = self.quickLook.sampleRows(calibExp.image.array)
+        stats = afwMath.makeStatistics(image, afwMath.MEANCLIP | afwMath.STDEVCLIP, self.statCtrl)
         outTable.mean[iExp] = stats.getValue(afwMath.MEANCLIP)
         outTable.stdev[iExp] = stats.getValue(afwMath.STDEVCLIP)
-        outTable.rowMedian[iExp] = np.median(calibExp.image.array, axis=0)
+        outTable.rowMedian[iExp] = workingMedian(rows, self.workingDtype, axis=0)
+
+    def analyzeAmpCube(self, cube, outputData, iamp, amp):
+        """Analyze data from a single amp for all the exposures
+
+        See base class for argument description
+
+        Same as `analyzeAmpExpData`, for all the exposures at once.
+        """
+        outTable = outputData.ampExp["ampExp_%s" % amp.getName()]
+        mean, stdev = cubeClippedStats(sampleArray(self.quickLook, cube), self.statCtrl.getNumSigmaClip(),
+                                       self.statCtrl.getNumIter())
+        outTable.mean[:] = mean
+        outTable.stdev[:] = stdev
+        # One exposure at a time, to only copy one image
+        rowCube = cube if self.quickLook is None else self.quickLook.sampleRows(cube)
+        outTable.rowMedian[:] = np.array([workingMedian(image, self.workingDtype, axis=0)
+                                          for image in rowCube])
+
+    def getQuickLookErrors(self, outputData, amps):
+        """Return the statistical errors on the metrics in quick-look mode
+
+        See base class for argument description
+
+        The errors on the clipped mean and standard deviation of each
+        exposure are the gaussian errors for the number of pixels
+        analyzed.
+        """
+        errors = dict(mean=[], stdev=[])
+        for amp in amps:
+            rawBBox = amp.getRawBBox()
+            nPix = self.quickLook.sampledFraction((rawBBox.getHeight(), rawBBox.getWidth()))*rawBBox.getArea()
+            stdev = np.asarray(outputData.ampExp["ampExp_%s" % amp.getName()].stdev, dtype=float)
+            errors['mean'].append(stdev/np.sqrt(nPix))
+            errors['stdev'].append(stdev/np.sqrt(2.*max(nPix - 1., 1.)))
+        return errors
 
     def analyzeDetExpData(self, calibExp, outputData, iExp):
         """Analyze data from the CCD for a single exposure
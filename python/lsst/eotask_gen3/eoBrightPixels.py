@@ -9,6 +9,7 @@ from lsst.ip.isr import Defects
 
 from .eoCalibBase import EoDetRunCalibTaskConfig, EoDetRunCalibTaskConnections, EoDetRunCalibTask
 from .eoBrightPixelsData import EoBrightPixelsData
+from .eoQuickLook import getColumnBoxes, countEstimate
 
 __all__ = ["EoBrightPixelTask", "EoBrightPixelTaskConfig"]
 
@@ -91,11 +92,21 @@ class EoBrightPixelTask(EoDetRunCalibTask):
         outputData = self.makeOutputData(nAmp=nAmp, camera=camera, detector=det)
         outputTable = outputData.amps['amps']
         fpMap = {}
+        errors = dict(nBrightPixel=[], nBrightColumn=[])
         for iamp, amp in enumerate(amps):
-            nBrightPixel, nBrightColumn, fpSet = self.findBrightPixels(stackedCalExp, amp, 1.)
-            fpMap[amp] = fpSet
+            nBrightPixel, nBrightColumn, footprints = self.findBrightPixels(stackedCalExp, amp, 1.)
+            fpMap[amp] = footprints
+            if self.quickLook is not None:
+                # Scale the counts in the sampled columns to the full amp
+                columnFraction = self.quickLook.columnFraction(amp.getBBox())
+                nBrightPixel, nBrightPixelError = countEstimate(nBrightPixel, columnFraction)
+                nBrightColumn, nBrightColumnError = countEstimate(nBrightColumn, columnFraction)
+                errors['nBrightPixel'].append(nBrightPixelError)
+                errors['nBrightColumn'].append(nBrightColumnError)
             outputTable.nBrightPixel[iamp] = nBrightPixel
             outputTable.nBrightColumn[iamp] = nBrightColumn
+        if self.quickLook is not None:
+            self.quickLook.record(self, outputData, columnFraction, errors=errors)
         fpCcd = self.mergeFootprints(fpMap)
         defects = Defects(defectList=fpCcd)
         return pipeBase.Struct(outputData=outputData, defects=defects)
@@ -135,8 +146,10 @@ class EoBrightPixelTask(EoDetRunCalibTask):
             The number of bright pixels
         nBrightCols : `int`
             The number of bright columns
-        fpSet : `lsst.afw.detection.FootprintSet`
+        footprints : `list` [`lsst.afw.detection.Footprint`]
             The footprints of the bad pixels
+
+        In quick-look mode, only the sampled bands of columns are searched.
         """
         try:
             exptime = stackedCalExp.getMetadata().toDict()['EXPTIME']
@@ -144,13 +157,15 @@ class EoBrightPixelTask(EoDetRunCalibTask):
             self.log.warn("Warning no EXPTIME: using 1.")
             exptime = 1.
         threshold = afwDetect.Threshold(self.config.ethresh * exptime)
-        fpSet = afwDetect.FootprintSet(stackedCalExp[amp.getBBox()].image, threshold)
+        footprints = []
+        for bbox in getColumnBoxes(self.quickLook, amp.getBBox()):
+            footprints += afwDetect.FootprintSet(stackedCalExp[bbox].image, threshold).getFootprints()
         #
         # Organize bright pixels by column.
         #
         # FIXME, vectorize this
         columns = dict()
-        for footprint in fpSet.getFootprints():
+        for footprint in footprints:
             for span in footprint.getSpans():
                 y = span.getY()
                 for x in range(span.getX0(), span.getX1()+1):
@@ -171,7 +186,7 @@ class EoBrightPixelTask(EoDetRunCalibTask):
             else:
                 brightPixs.extend([(x - x0, y - y0) for y in columns[x]])
 
-        return len(brightPixs), len(brightCols), fpSet
+        return len(brightPixs), len(brightCols), footprints
 
     @staticmethod
     def badColumn(columnIndices, threshold):
@@ -202,8 +217,8 @@ class EoBrightPixelTask(EoDetRunCalibTask):
     @staticmethod
     def mergeFootprints(fpMap):
         outList = []
-        for amp, fpSet in fpMap.items():
-            for fp in fpSet.getFootprints():
+        for amp, footprints in fpMap.items():
+            for fp in footprints:
                 detBBox = fp.getBBox()
                 # if amp.getFlipX():
                 #     minX = amp.getRawBBox().getX1() - bbox.getMaxX()
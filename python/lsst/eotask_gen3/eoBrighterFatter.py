@@ -2,13 +2,14 @@ import numpy as np
 from scipy import stats
 
 import lsst.pex.config as pexConfig
+import lsst.afw.image as afwImage
 import lsst.afw.math as afwMath
-import lsst.geom as lsstGeom
 
 import lsst.pipe.base.connectionTypes as cT
 
 from .eoCalibBase import EoAmpPairCalibTaskConfig, EoAmpPairCalibTaskConnections, EoAmpPairCalibTask
 from .eoBrighterFatterData import EoBrighterFatterData
+from .eoNumerics import asWorkingArray, workingStd, makeWorkingImage
 
 __all__ = ["EoBrighterFatterTask", "EoBrighterFatterTaskConfig"]
 
@@ -141,19 +142,17 @@ class EoBrighterFatterTask(EoAmpPairCalibTask):
         parameter. Additionally, if there is a dark image, subtract.
         """
 
-        # Clone so that we don't modify the input image.
-        localExp = calibExp.clone()
-
         # The border that we wish to crop.
         border = self.config.nPixBorder
 
         # Crop the image within a border region.
         # bbox = amp.getRawDataBBox()
         # bbox.grow(-border)
-        bbox = localExp.getDetector().getAmplifiers()[0].getRawDataBBox()
+        bbox = calibExp.getDetector().getAmplifiers()[0].getRawDataBBox()
         bbox.grow(-border)
 
-        localExp = localExp[bbox]
+        # This is a view, crossCorrelate does not modify the input images
+        localExp = calibExp[bbox]
 
         # Calculate the median of the image.
         median = afwMath.makeStatistics(localExp.image, afwMath.MEDIAN, self.statCtrl).getValue()
@@ -189,50 +188,50 @@ class EoBrighterFatterTask(EoAmpPairCalibTask):
         mask = maskedimage1.getMask()
         INTRP = mask.getPlaneBitMask("INTRP")
         sctrl.setAndMask(INTRP)
+        maxLag = self.config.maxLag
 
-        # Diff the images.
-        diff = maskedimage1.clone()
-        diff.image.array -= maskedimage2.image.array
+        # Diff the images, in the working precision
+        diff = asWorkingArray(maskedimage1.image.array, self.workingDtype, copy=True)
+        diff -= maskedimage2.image.array
 
         # Subtract background.
-        nx = diff.getWidth()//self.config.backgroundBinSize
-        ny = diff.getHeight()//self.config.backgroundBinSize
+        diffImage = afwImage.ImageF(diff.astype(np.float32, copy=False), deep=False)
+        nx = diffImage.getWidth()//self.config.backgroundBinSize
+        ny = diffImage.getHeight()//self.config.backgroundBinSize
         bctrl = afwMath.BackgroundControl(nx, ny, self.statCtrl, afwMath.MEDIAN)  # pylint: disable=no-member
-        bkgd = afwMath.makeBackground(diff.image, bctrl)  # pylint: disable=no-member
+        bkgd = afwMath.makeBackground(diffImage, bctrl)  # pylint: disable=no-member
         bgImg = bkgd.getImageF(afwMath.Interpolate.CUBIC_SPLINE,
                                afwMath.REDUCE_INTERP_ORDER)  # pylint: disable=no-member
 
-        diff.image.array -= bgImg.array
-
-        # Measure the correlations
-        x0, y0 = diff.getXY0()
-        width, height = diff.getDimensions()
-        bbox_extent = lsstGeom.Extent2I(width - self.config.maxLag, height - self.config.maxLag)
-
-        bbox = lsstGeom.Box2I(lsstGeom.Point2I(x0, y0), bbox_extent)
-        dim0 = diff[bbox].clone()
-        dim0.image.array -= afwMath.makeStatistics(dim0.image, afwMath.MEDIAN, sctrl).getValue()
-
-        xcorr = np.zeros((self.config.maxLag + 1, self.config.maxLag + 1), dtype=np.float64)
-        xcorr_err = np.zeros((self.config.maxLag + 1, self.config.maxLag + 1), dtype=np.float64)
-
-        for xlag in range(self.config.maxLag + 1):
-            for ylag in range(self.config.maxLag + 1):
-                bbox_lag = lsstGeom.Box2I(lsstGeom.Point2I(x0 + xlag, y0 + ylag),
-                                          bbox_extent)
-                dim_xy = diff[bbox_lag].clone()
-                dim_xy.image.array -= afwMath.makeStatistics(dim_xy.image,
-                                                             afwMath.MEDIAN, self.statCtrl).getValue()
-                dim_xy.image.array *= dim0.image.array
-                xcorr[xlag, ylag] = afwMath.makeStatistics(dim_xy.image,
-                                                           afwMath.MEDIAN, self.statCtrl).getValue()
-                dim_xy_array = dim_xy.getImage().getArray().flatten()/xcorr[0][0]
-                N = len(dim_xy_array.flatten())
+        diff -= bgImg.array
+
+        # Measure the correlations, the lagged images are copied in turn
+        # to a single buffer rather than cloned
+        height, width = diff.shape
+        height -= maxLag
+        width -= maxLag
+        lagged = np.empty((height, width), dtype=diff.dtype)
+        laggedImage = makeWorkingImage(lagged)
+
+        np.copyto(lagged, diff[:height, :width])
+        dim0 = lagged - afwMath.makeStatistics(laggedImage, afwMath.MEDIAN, sctrl).getValue()
+
+        xcorr = np.zeros((maxLag + 1, maxLag + 1), dtype=np.float64)
+        xcorr_err = np.zeros((maxLag + 1, maxLag + 1), dtype=np.float64)
+
+        for xlag in range(maxLag + 1):
+            for ylag in range(maxLag + 1):
+                np.copyto(lagged, diff[ylag:ylag + height, xlag:xlag + width])
+                lagged -= afwMath.makeStatistics(laggedImage, afwMath.MEDIAN, self.statCtrl).getValue()
+                lagged *= dim0
+                xcorr[xlag, ylag] = afwMath.makeStatistics(laggedImage, afwMath.MEDIAN,
+                                                           self.statCtrl).getValue()
+                N = lagged.size
                 if xlag != 0 or ylag != 0:
                     f = (1+xcorr[xlag, ylag]/xcorr[0][0]) / \
                         (1-xcorr[xlag, ylag]/xcorr[0][0])
                     xcorr_err[xlag, ylag] = (
-                        np.std(dim_xy_array)/np.sqrt(N))*np.sqrt(f)
+                        workingStd(lagged, lagged.dtype)/np.abs(xcorr[0][0])/np.sqrt(N))*np.sqrt(f)
                 else:
                     xcorr_err[xlag, ylag] = 0
         return xcorr, xcorr_err
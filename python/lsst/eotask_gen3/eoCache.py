@@ -0,0 +1,241 @@
+""" Local content-addressed caches for EO tasks
+
+Entries are keyed by a hash of everything that went into computing
+them (dataset IDs, configuration, ...), so that a cache directory can
+be safely shared between tasks and between runs of the same pipeline.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+__all__ = ["EoDiskCache", "hashKey", "hashConfig", "getDatasetId"]
+
+
+# Fraction of the budget the cache is brought down to when it goes over,
+# so that the directory is only rescanned once every few puts
+EVICT_TARGET_FRACTION = 0.9
+
+# Configuration fields of the EO tasks that only change how a task runs,
+# not its results, they are left out of the configuration hashes
+EXECUTION_CONFIG_FIELDS = ('numThreads', 'numExpThreads', 'ampBackend', 'ampCalibCacheSize', 'isrCacheDir',
+                           'isrCacheSize', 'checkpointDir', 'memoDir', 'ampCubeSize', 'ampCubeDir',
+                           'memoryBudget', 'doStageTiming', 'pipelineDepth')
+
+
+def hashKey(*parts):
+    """ Return a hex digest that identifies a set of inputs
+
+    Parameters
+    ----------
+    parts : `str`
+        The inputs, converted to `str`
+
+    Returns
+    -------
+    key : `str`
+        The sha256 hex digest
+    """
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(str(part).encode())
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+def dropConfigFields(configDict, names):
+    """ Return a copy of a configuration `dict`, without the fields with
+    the given names, at any level """
+    return {name: dropConfigFields(value, names) if isinstance(value, dict) else value
+            for name, value in configDict.items() if name not in names}
+
+
+def hashConfig(config, exclude=EXECUTION_CONFIG_FIELDS):
+    """ Return a hex digest of a frozen `lsst.pex.config.Config`
+
+    Parameters
+    ----------
+    config : `lsst.pex.config.Config`
+        The configuration
+    exclude : `tuple` [`str`]
+        Names of the fields left out, at any level of the configuration,
+        by default those that do not change the results
+
+    Returns
+    -------
+    key : `str`
+        The sha256 hex digest of the sorted configuration values
+    """
+    return hashKey(json.dumps(dropConfigFields(config.toDict(), exclude), sort_keys=True, default=str))
+
+
+def getDatasetId(handle):
+    """ Return a string that identifies a dataset
+
+    Parameters
+    ----------
+    handle : `lsst.daf.butler.DeferredDatasetHandle`
+        The dataset, a `lsst.daf.butler.DatasetRef` also works
+
+    Returns
+    -------
+    datasetId : `str` or `None`
+        The dataset ID, or `None` if it can not be determined
+    """
+    ref = getattr(handle, 'ref', handle)
+    datasetId = getattr(ref, 'id', None)
+    if datasetId is None:
+        return None
+    return str(datasetId)
+
+
+class EoDiskCache:
+    """ Least-recently-used on-disk store of numpy arrays
+
+    Each entry is a set of named arrays plus a small `dict` of metadata,
+    written as a single uncompressed '.npz' file named after its key.
+    Files are written to a temporary name and then renamed, so that
+    several processes can share the same directory.  The modification
+    time of a file is updated when it is read, and is used to evict the
+    least recently used entries when the total size goes over budget.
+    The size is tracked as entries are written, and the directory is only
+    scanned when it goes over budget, to bring it back below a fraction
+    `EVICT_TARGET_FRACTION` of the budget.
+
+    Parameters
+    ----------
+    cacheDir : `str`
+        The cache directory, created if needed
+    maxBytes : `int`
+        Bound on the total size of the files in the cache
+    """
+
+    META_KEY = "__meta__"
+
+    def __init__(self, cacheDir, maxBytes):
+        """ C'tor,  Fills class parameters """
+        self._cacheDir = cacheDir
+        self._maxBytes = maxBytes
+        self._lock = threading.Lock()
+        os.makedirs(cacheDir, exist_ok=True)
+        self._nBytes = sum(os.path.getsize(path) for path in self._listFiles())
+        self.nHits = 0
+        self.nMisses = 0
+        self.nEvictions = 0
+        self.nScans = 0
+
+    @property
+    def cacheDir(self):
+        """ Return the cache directory """
+        return self._cacheDir
+
+    @property
+    def maxBytes(self):
+        """ Return the bound on the size of the cache """
+        return self._maxBytes
+
+    @property
+    def nBytes(self):
+        """ Return the size of the cache, as seen by this process """
+        return self._nBytes
+
+    def path(self, key):
+        """ Return the path to the file for an entry """
+        return os.path.join(self._cacheDir, key[:2], "%s.npz" % key)
+
+    def has(self, key):
+        """ Return True if an entry is in the cache """
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        """ Read an entry
+
+        Parameters
+        ----------
+        key : `str`
+            The entry key
+
+        Returns
+        -------
+        arrays : `dict` [`str`, `numpy.ndarray`] or `None`
+            The arrays, `None` if the entry is not in the cache
+        meta : `dict` or `None`
+            The metadata
+        """
+        path = self.path(key)
+        try:
+            with np.load(path, allow_pickle=False) as npzFile:
+                arrays = {name: npzFile[name] for name in npzFile.files}
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.nMisses += 1
+            return None, None
+        with self._lock:
+            self.nHits += 1
+        meta = json.loads(str(arrays.pop(self.META_KEY)))
+        return arrays, meta
+
+    def put(self, key, arrays, meta=None):
+        """ Write an entry
+
+        Parameters
+        ----------
+        key : `str`
+            The entry key
+        arrays : `dict` [`str`, `numpy.ndarray`]
+            The arrays
+        meta : `dict`, optional
+            Metadata, must be json serializable
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        toWrite = dict(arrays)
+        toWrite[self.META_KEY] = np.array(json.dumps(meta if meta is not None else {}))
+        fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fout:
+                np.savez(fout, **toWrite)
+            os.replace(tmpPath, path)
+        except BaseException:
+            if os.path.exists(tmpPath):
+                os.unlink(tmpPath)
+            raise
+        with self._lock:
+            self._nBytes += os.path.getsize(path)
+            if self._nBytes > self._maxBytes:
+                self._evict()
+
+    def _listFiles(self):
+        for dirPath, _, fileNames in os.walk(self._cacheDir):
+            for fileName in fileNames:
+                if fileName.endswith(".npz"):
+                    yield os.path.join(dirPath, fileName)
+
+    def _evict(self):
+        """ Remove the least recently used files until under the eviction
+        target """
+        self.nScans += 1
+        entries = []
+        for path in self._listFiles():
+            try:
+                stat = os.stat(path)
+            except OSError:  # pragma: no cover
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        self._nBytes = sum(entry[1] for entry in entries)
+        targetBytes = EVICT_TARGET_FRACTION*self._maxBytes
+        for _, size, path in entries:
+            if self._nBytes <= targetBytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:  # pragma: no cover
+                continue
+            self._nBytes -= size
+            self.nEvictions += 1
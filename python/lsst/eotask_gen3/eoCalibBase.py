@@ -3,6 +3,8 @@
 Provides six bases classes for different iteration scenarios:
 
     1. EoAmpExpCalibTask : loops over amps, then over exposures
+                           (or over exposures, then amps, see
+                           `EoAmpExpCalibTaskConfig.iterationOrder`)
     2. EoAmpPairCalibTask : loops over amps, then over exposure pairs
     3. EoDetExpCalibTask : loops over exposures (analyzes entire detector)
     4. EoDetRunCalibTask : analyzes run-level data (stacked image or table)
@@ -12,6 +14,10 @@ Provides six bases classes for different iteration scenarios:
 """
 
 import copy
+import multiprocessing
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
 
 import lsst.pex.config as pexConfig
 import lsst.pipe.base as pipeBase
@@ -19,7 +25,22 @@ import lsst.pipe.base.connectionTypes as cT
 from lsst.ip.isr import IsrTask, AssembleCcdTask, Defects
 from lsst.afw.cameraGeom import AmplifierIsolator
 
+from .eoAmpCalibCache import AMP_CALIB_CACHE
+from .eoAmpMerge import getAmpIndices
+from .eoAmpCube import EoAmpCube
+from .eoCache import getDatasetId
+from .eoCheckpoint import EoCheckpoint
 from .eoDataSelection import EoDataSelection
+from .eoExposureIndex import EoExposureIndex
+from .eoIsrCache import EoIsrCache
+from .eoMemo import runQuantumMemoized
+from .eoMemory import EoMemoryPlan
+from .eoNumerics import PRECISION_CHOICES, getWorkingDtype
+from .eoPipeline import EoPipeline
+from .eoPreScan import EoPreScan
+from .eoQuickLook import QUICK_LOOK_MODES, EoQuickLook
+from .eoSharedCalib import EoSharedCalib
+from .eoStageTimer import EoStageTimer, timeStage
 
 __all__ = ['EoAmpExpCalibTaskConnections', 'EoAmpExpCalibTaskConfig', 'EoAmpExpCalibTask',
            'EoAmpPairCalibTaskConnections', 'EoAmpPairCalibTaskConfig', 'EoAmpPairCalibTask',
@@ -28,7 +49,8 @@ __all__ = ['EoAmpExpCalibTaskConnections', 'EoAmpExpCalibTaskConfig', 'EoAmpExpC
            'EoRunCalibTaskConnections', 'EoRunCalibTaskConfig', 'EoRunCalibTask',
            'CAMERA_CONNECT', 'BIAS_CONNECT', 'DARK_CONNECT', 'DEFECTS_CONNECT', 'GAINS_CONNECT',
            'INPUT_RAW_AMPS_CONNECT', 'OUTPUT_IMAGE_CONNECT', 'ISR_CONFIG', 'ASSEMBLE_CCD_CONFIG',
-           'OUTPUT_DEFECTS_CONNECT', 'runIsrOnAmp', 'runIsrOnExp']
+           'OUTPUT_DEFECTS_CONNECT', 'runIsrOnAmp', 'runIsrOnExp', 'mapOverAmps',
+           'runOverAmps', 'getDetector', 'getCalibKeys', 'getCalibAmp']
 
 
 CAMERA_CONNECT = cT.PrerequisiteInput(
@@ -140,6 +162,191 @@ ASSEMBLE_CCD_CONFIG = pexConfig.ConfigurableField(
     doc="Used to run a reduced version of ISR approrpiate for EO analyses",
 )
 
+NUM_THREADS_CONFIG = pexConfig.Field(
+    "Number of threads (or processes, see ampBackend) used to process amplifiers in parallel",
+    int,
+    default=1,
+)
+
+NUM_EXP_THREADS_CONFIG = pexConfig.Field(
+    "Number of threads used to process full exposures in parallel",
+    int,
+    default=1,
+)
+
+AMP_BACKEND_CONFIG = pexConfig.ChoiceField(
+    "How to run the amplifiers in parallel when numThreads > 1",
+    str,
+    {"thread": "Use a pool of threads",
+     "process": "Use a pool of forked processes, sharing the output tables in shared memory"},
+    default="thread",
+)
+
+AMP_CALIB_CACHE_CONFIG = pexConfig.Field(
+    "Bound on the size of the per-amp calibration cache shared between tasks, in MB (0 disables it). "
+    "The cache is process-wide and outlives each quantum, so the slices stay resident until evicted",
+    float,
+    default=0.,
+)
+
+ISR_CACHE_DIR_CONFIG = pexConfig.Field(
+    "Directory for the on-disk cache of ISR-processed amps, shared between tasks and runs "
+    "(empty disables it)",
+    str,
+    default="",
+)
+
+ISR_CACHE_SIZE_CONFIG = pexConfig.Field(
+    "Bound on the size of the on-disk cache of ISR-processed amps, in MB",
+    float,
+    default=10240.,
+)
+
+CHECKPOINT_DIR_CONFIG = pexConfig.Field(
+    "Directory where the results of each finished amp are saved, so that an interrupted quantum "
+    "can resume where it stopped (empty disables it)",
+    str,
+    default="",
+)
+
+MEMO_DIR_CONFIG = pexConfig.Field(
+    "Directory of a local store of the outputs of each quantum, keyed on the task, its configuration "
+    "and its inputs, the outputs are reused when the same quantum is run again (empty disables it)",
+    str,
+    default="",
+)
+
+EXPOSURE_INDEX_DIR_CONFIG = pexConfig.Field(
+    "Directory of the exposure metadata indices built by eoExposureIndex.py, consulted for the exposure "
+    "records the dataIds do not have (empty disables it)",
+    str,
+    default="",
+)
+
+USE_AMP_CUBE_CONFIG = pexConfig.Field(
+    "Analyze all the exposures of each amp at once with analyzeAmpCube, for tasks that implement it",
+    bool,
+    default=False,
+)
+
+AMP_CUBE_SIZE_CONFIG = pexConfig.Field(
+    "Bound on the total size of the in-memory per-amp image cubes, in MB, "
+    "larger cubes are memory-mapped to temporary files",
+    float,
+    default=4096.,
+)
+
+AMP_CUBE_DIR_CONFIG = pexConfig.Field(
+    "Directory for the memory-mapped per-amp image cubes (empty means the system temporary directory)",
+    str,
+    default="",
+)
+
+STAGE_TIMING_CONFIG = pexConfig.Field(
+    "Time each processing stage and count the bytes read, the summary is stored in the output metadata",
+    bool,
+    default=True,
+)
+
+PRECISION_CONFIG = pexConfig.ChoiceField(
+    "Working precision of the analysis, sums are accumulated in float64 in both cases",
+    str,
+    default="float32",
+    allowed=PRECISION_CHOICES,
+)
+
+QUICK_LOOK_CONFIG = pexConfig.Field(
+    "Quick-look mode: analyze a subsample of the pixels and exposures, and record error estimates",
+    bool,
+    default=False,
+)
+
+QUICK_LOOK_FRACTION_CONFIG = pexConfig.Field(
+    "Fraction of the pixels of each amp analyzed in quick-look mode",
+    float,
+    default=0.1,
+)
+
+QUICK_LOOK_MODE_CONFIG = pexConfig.ChoiceField(
+    "How the pixels are sampled in quick-look mode",
+    str,
+    default="strided",
+    allowed=QUICK_LOOK_MODES,
+)
+
+QUICK_LOOK_EXPOSURES_CONFIG = pexConfig.Field(
+    "Maximum number of exposures (or exposure pairs) analyzed in quick-look mode, 0 for all",
+    int,
+    default=5,
+)
+
+MEMORY_BUDGET_CONFIG = pexConfig.Field(
+    "Memory budget for one quantum, in MB, used to limit the number of amps processed at once and "
+    "to decide which arrays are memory-mapped to temporary files (0 means no limit)",
+    float,
+    default=0.,
+)
+
+PIPELINE_DEPTH_CONFIG = pexConfig.Field(
+    "Number of exposures read ahead by a reader thread, with ISR in a separate stage, so that I/O and "
+    "compute overlap (0 runs the read, ISR and analysis of each exposure in sequence)",
+    int,
+    default=0,
+)
+
+AMP_SUBSET_CONFIG = pexConfig.ListField(
+    "Names of the amplifiers to process, all of them if empty.  The other amps are left at their "
+    "default values, see `lsst.eotask_gen3.eoAmpMerge` to patch the results into an existing output",
+    str,
+    default=[],
+)
+
+PRE_SCAN_CONFIG = pexConfig.Field(
+    "Drop the unusable exposures (or pairs) found by a cheap pre-scan of the headers, the photodiode "
+    "data and a few rows of each amp, before the full reads, see `lsst.eotask_gen3.eoPreScan`",
+    bool,
+    default=False,
+)
+
+PRE_SCAN_ROWS_CONFIG = pexConfig.Field(
+    "Number of rows read in the middle of the data region of each amp by the pre-scan",
+    int,
+    default=4,
+)
+
+PRE_SCAN_MAX_SATURATED_CONFIG = pexConfig.Field(
+    "Maximum fraction of saturated pixels in any amp in the pre-scan",
+    float,
+    default=0.9,
+)
+
+PRE_SCAN_MAX_SHUTTER_DEV_CONFIG = pexConfig.Field(
+    "Maximum fractional difference between the shutter open time and the exposure time of flats in "
+    "the pre-scan",
+    float,
+    default=0.1,
+)
+
+PRE_SCAN_MAX_PD_FRAC_DEV_CONFIG = pexConfig.Field(
+    "Maximum fractional difference between the photodiode integrals of the exposures of a pair in the "
+    "pre-scan",
+    float,
+    default=0.05,
+)
+
+# Calibrations that go into the ISR of each amp, see extractAmpCalibs
+CALIB_NAMES = ('bias', 'dark', 'defects', 'linearity', 'gain')
+
+ITERATION_ORDER_CHOICES = {
+    "ampMajor": "Loop over amps, then over exposures, reading one amp at a time",
+    "expMajor": "Loop over exposures, then over amps, reading each exposure once",
+}
+
+PAIR_ITERATION_ORDER_CHOICES = {
+    "ampMajor": "Loop over amps, then over exposure pairs, reading one amp at a time",
+    "pairMajor": "Loop over exposure pairs, then over amps, reading both exposures of each pair once",
+}
+
 
 def runIsrOnAmp(task, ampExposure, **kwargs):
     return task.isr.run(ampExposure, **kwargs).exposure
@@ -157,10 +364,243 @@ def copyConfig(config):
     return copy.deepcopy(config)
 
 
+def getDetector(inputExp, camera=None):
+    """Get the detector for an input exposure without reading its pixels
+
+    Parameters
+    ----------
+    inputExp : `lsst.daf.butler.DeferredDatasetHandle`
+        Handle used to retrieve the exposure
+    camera : `lsst.afw.cameraGeom.Camera`, optional
+        The camera object, used to look up the detector from the dataId
+
+    Returns
+    -------
+    det : `lsst.afw.cameraGeom.Detector`
+        The detector
+
+    Notes
+    -----
+    If the detector can not be found in the camera, only the 'detector'
+    component of the exposure is read.
+    """
+    if camera is not None:
+        det = camera.get(inputExp.dataId['detector'])
+        if det is not None:
+            return det
+    return inputExp.get(component='detector')
+
+
 def extractAmpImage(detImage, amp):
     return AmplifierIsolator.apply(detImage, amp)
 
 
+def extractCachedAmpImage(detImage, amp, calibKey=None):
+    if calibKey is None:
+        return extractAmpImage(detImage, amp)
+    return AMP_CALIB_CACHE.get((calibKey, amp.getName()), partial(extractAmpImage, detImage, amp))
+
+
+def getCalibKeys(inputRefs):
+    """Get the keys used to cache the per-amp calibrations
+
+    Parameters
+    ----------
+    inputRefs : `~lsst.pipe.base.connections.InputQuantizedConnection`
+        Input data refs
+
+    Returns
+    -------
+    calibKeys : `dict` [`str`, `str`]
+        The dataset IDs of the detector-level calibrations, keyed by
+        connection name
+    """
+    calibKeys = {}
+    for name in CALIB_NAMES:
+        ref = getattr(inputRefs, name, None)
+        if ref is not None and not isinstance(ref, list):
+            calibKeys[name] = str(ref.id)
+    return calibKeys
+
+
+def getIsrCacheKey(task, inputExp, amp, calibKeys=None, **kwargs):
+    """Get the key for one amp of one exposure in the ISR cache of a task
+
+    Returns `None` if the raw or any of the calibrations used can not
+    be identified by a dataset ID, in which case the amp should not be cached.
+    """
+    rawId = getDatasetId(inputExp)
+    if rawId is None:
+        return None
+    calibKeys = calibKeys if calibKeys is not None else {}
+    for name in CALIB_NAMES:
+        if kwargs.get(name) is not None and name not in calibKeys:
+            return None
+    return task.isrCache.makeKey(rawId, amp.getName(), calibKeys)
+
+
+def readAmp(task, inputExp, iamp, amps, rawExp=None, timer=None, **kwargs):
+    """Read one amp of an exposure, from the ISR cache of the task if
+    possible
+
+    See `getCalibAmp` for the parameters.
+
+    Returns
+    -------
+    ampRead : `lsst.pipe.base.Struct`
+        The ISR-processed amp 'calibExp' if it was in the cache, `None`
+        otherwise, the raw amp 'ampExp' if it was not, and the ISR cache
+        'key', `None` if the amp should not be cached
+    """
+    isrCache = getattr(task, 'isrCache', None)
+    key = None
+    if isrCache is not None and kwargs.get('detector') is not None:
+        key = getIsrCacheKey(task, inputExp, amps[iamp], **kwargs)
+    if key is not None:
+        with timeStage(timer, 'isrCacheGet'):
+            calibExp = isrCache.get(key, kwargs['detector'], amps[iamp])
+        if calibExp is not None:
+            return pipeBase.Struct(calibExp=calibExp, ampExp=None, key=key)
+    if rawExp is not None:
+        with timeStage(timer, 'extract'):
+            ampExp = extractAmpImage(rawExp, amps[iamp])
+    else:
+        with timeStage(timer, 'read'):
+            ampExp = inputExp.get(parameters={"amp": iamp})
+        if timer is not None:
+            timer.count('read', ampExp)
+    return pipeBase.Struct(calibExp=None, ampExp=ampExp, key=key)
+
+
+def calibrateAmp(task, ampRead, ampCalibs, timer=None):
+    """Run ISR on an amp returned by `readAmp`, unless it came from the
+    ISR cache, and add it to the cache"""
+    if ampRead.calibExp is not None:
+        return ampRead.calibExp
+    with timeStage(timer, 'isr'):
+        calibExp = runIsrOnAmp(task, ampRead.ampExp, **ampCalibs)
+    if ampRead.key is not None:
+        with timeStage(timer, 'isrCachePut'):
+            task.isrCache.put(ampRead.key, calibExp)
+    return calibExp
+
+
+def getCalibAmp(task, inputExp, iamp, amps, ampCalibs, rawExp=None, timer=None, **kwargs):
+    """Read one amp of an exposure and run ISR on it
+
+    If the task has an ISR cache, the amp is taken from the cache when
+    possible, and added to it otherwise.
+
+    Parameters
+    ----------
+    task : `lsst.pipe.base.PipelineTask`
+        The task, used for its `isr` sub-task and `isrCache`
+    inputExp : `lsst.daf.butler.DeferredDatasetHandle`
+        Used to retrieve the exposure
+    iamp : `int`
+        Index for the amplifier
+    amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+        The amplifiers of the detector
+    ampCalibs : `dict`
+        The per-amp calibrations, from `extractAmpCalibs`
+    rawExp : `lsst.afw.image.Exposure`, optional
+        The full raw exposure, if it has already been read
+    timer : `lsst.eotask_gen3.eoStageTimer.EoStageTimer`, optional
+        Used to time the reading, ISR and caching stages
+
+    Keywords
+    --------
+    detector : `lsst.afw.cameraGeom.Detector`
+        The detector, needed to rebuild cached amps
+    calibKeys : `dict` [`str`, `str`]
+        Dataset IDs of the calibrations, see `getCalibKeys`
+
+    Returns
+    -------
+    calibExp : `lsst.afw.image.ExposureF`
+        The ISR-processed amp exposure
+    """
+    ampRead = readAmp(task, inputExp, iamp, amps, rawExp=rawExp, timer=timer, **kwargs)
+    return calibrateAmp(task, ampRead, ampCalibs, timer=timer)
+
+
+def iterPipelined(task, items, read, isr, timer=None, log=None):
+    """Yield the index and isr(read(item)) for each item, in order
+
+    If `task.config.pipelineDepth` is set, the reads are issued ahead of
+    time by a reader thread and isr runs in a worker thread, see
+    `lsst.eotask_gen3.eoPipeline.EoPipeline`.  Otherwise the stages run in
+    sequence in the calling thread.
+
+    Parameters
+    ----------
+    task : `lsst.pipe.base.PipelineTask`
+        The task, used for `config.pipelineDepth` and logging
+    items : `list`
+        The items, e.g., the input exposure handles
+    read : `Callable`
+        Called as read(item)
+    isr : `Callable`
+        Called as isr(readResult)
+    timer : `lsst.eotask_gen3.eoStageTimer.EoStageTimer`, optional
+        The stall times of the pipeline are added to it
+    log : `Callable`, optional
+        Used to report the queue depths and stall times, default is
+        `task.log.debug`
+
+    Yields
+    ------
+    index : `int`
+        The index of the item
+    result :
+        The value returned by isr for the item
+    """
+    depth = getattr(task.config, 'pipelineDepth', 0)
+    if depth <= 0:
+        for idx, item in enumerate(items):
+            yield idx, isr(read(item))
+        return
+    pipeline = EoPipeline(read, isr, depth=depth)
+    yield from pipeline.iterate(items)
+    (log if log is not None else task.log.debug)(pipeline.record(timer))
+
+
+def isAmpCached(task, inputExp, amp, **kwargs):
+    """Check if one amp of one exposure is in the ISR cache of a task"""
+    isrCache = getattr(task, 'isrCache', None)
+    if isrCache is None or kwargs.get('detector') is None:
+        return False
+    key = getIsrCacheKey(task, inputExp, amp, **kwargs)
+    return key is not None and isrCache.has(key)
+
+
+def reloadAmp(task, checkpoint, amps, iamp, outputs):
+    """Reload the results for one amp from a checkpoint
+
+    Parameters
+    ----------
+    task : `lsst.pipe.base.PipelineTask`
+        The task, used for logging
+    checkpoint : `lsst.eotask_gen3.eoCheckpoint.EoCheckpoint` or `None`
+        The checkpoint
+    amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+        The amplifiers of the detector
+    iamp : `int`
+        Index for the amplifier
+    outputs : `dict` [`str`, `lsst.eotask_gen3.EoCalib`]
+        The output data containers, filled in place
+
+    Returns
+    -------
+    reloaded : `bool`
+        True if the amp was found in the checkpoint
+    """
+    if checkpoint is None or not checkpoint.load(amps[iamp].getName(), iamp, outputs):
+        return False
+    task.log.info("Reloaded results for amp %s from %s" % (amps[iamp].getName(), checkpoint.quantumDir))
+    return True
+
+
 def extractAmpDefects(detDefects, amp):
     return Defects()
     # return detDefects.getAmpDefects(amp)
@@ -174,7 +614,14 @@ def extractAmpGain(detGain, amp):
     return detGain[amp]
 
 
-def extractAmpCalibs(amp, **kwargs):
+def extractAmpCalibs(amp, calibKeys=None, **kwargs):
+    """Extract the calibrations for one amp from the detector-level ones
+
+    If calibKeys gives the dataset IDs of the bias and dark frames the
+    per-amp images are taken from `AMP_CALIB_CACHE`, so that they are
+    only cut out once per detector for all the tasks.
+    """
+    calibKeys = calibKeys if calibKeys is not None else {}
     detBias = kwargs.get('bias', None)
     detDark = kwargs.get('dark', None)
     detDefects = kwargs.get('defects', None)
@@ -182,9 +629,9 @@ def extractAmpCalibs(amp, **kwargs):
     detGain = kwargs.get('gain', None)
     ampCalibDict = {}
     if detBias is not None:
-        ampCalibDict['bias'] = extractAmpImage(detBias, amp)
+        ampCalibDict['bias'] = extractCachedAmpImage(detBias, amp, calibKeys.get('bias'))
     if detDark is not None:
-        ampCalibDict['dark'] = extractAmpImage(detDark, amp)
+        ampCalibDict['dark'] = extractCachedAmpImage(detDark, amp, calibKeys.get('dark'))
     if detDefects is not None:
         ampCalibDict['defects'] = extractAmpDefects(detDefects, amp)
     if detNlc is not None:
@@ -194,6 +641,168 @@ def extractAmpCalibs(amp, **kwargs):
     return ampCalibDict
 
 
+def mapOverAmps(func, nAmps, numThreads=1, backend="thread", ampIndices=None):
+    """Call func(iamp) for each amplifier and return the results in order.
+
+    Parameters
+    ----------
+    func : `Callable`
+        Function taking the amplifier index as its only argument
+    nAmps : `int`
+        Number of amplifiers
+    numThreads : `int`
+        If greater than 1, the calls are distributed to a pool with
+        this many threads (or processes)
+    backend : `str`
+        Either "thread" or "process"
+    ampIndices : `list` [`int`], optional
+        Indices of the amplifiers to process, default is all of them
+
+    Returns
+    -------
+    results : `list`
+        The return values of func, sorted by amplifier index, `None` for
+        the amplifiers that are not processed
+
+    Notes
+    -----
+    When running in parallel, func must only write to the output
+    associated to its own amplifier, i.e., the 'ampExp_<amp>' table and
+    row `iamp` of the 'amps' table.
+    """
+    if ampIndices is None:
+        ampIndices = list(range(nAmps))
+    results = [None]*nAmps
+    if numThreads <= 1 or len(ampIndices) <= 1:
+        ampResults = [func(iamp) for iamp in ampIndices]
+    elif backend == "process":
+        ampResults = mapOverAmpsInProcesses(func, ampIndices, numThreads)
+    else:
+        with ThreadPoolExecutor(max_workers=min(numThreads, len(ampIndices))) as pool:
+            ampResults = list(pool.map(func, ampIndices))
+    for iamp, result in zip(ampIndices, ampResults):
+        results[iamp] = result
+    return results
+
+
+_FORKED_FUNC = {}
+
+
+def _callForkedFunc(iamp):
+    return _FORKED_FUNC['func'](iamp)
+
+
+def mapOverAmpsInProcesses(func, ampIndices, numProcesses):
+    """Call func(iamp) for some amplifiers in a pool of forked processes
+
+    The function, and everything it refers to (the task, the dataset
+    handles, the detector-level calibrations), is inherited by the workers
+    when they are forked, so none of it needs to be picklable.  Only the
+    amplifier index is sent to the workers, and only the return values
+    of func are sent back.
+
+    Parameters
+    ----------
+    func : `Callable`
+        Function taking the amplifier index as its only argument
+    ampIndices : `list` [`int`]
+        Indices of the amplifiers to process
+    numProcesses : `int`
+        Number of worker processes
+
+    Returns
+    -------
+    results : `list`
+        The return values of func, in the order of ampIndices
+    """
+    _FORKED_FUNC['func'] = func
+    try:
+        with ProcessPoolExecutor(max_workers=min(numProcesses, len(ampIndices)),
+                                 mp_context=multiprocessing.get_context("fork")) as pool:
+            return list(pool.map(_callForkedFunc, ampIndices))
+    finally:
+        _FORKED_FUNC.clear()
+
+
+def runOverAmps(func, outputData, nAmps, config, numThreads=None, ampIndices=None):
+    """Call func(iamp, outputData=outputData) for each amplifier using the
+    parallelization options in config
+
+    Parameters
+    ----------
+    func : `Callable`
+        Function taking the amplifier index and the output data
+    outputData : `lsst.eotask_gen3.EoCalib`
+        The output data container
+    nAmps : `int`
+        Number of amplifiers
+    config : `lsst.pex.config.Config`
+        Used to get `numThreads` and `ampBackend`
+    numThreads : `int`, optional
+        Overrides `config.numThreads`, e.g., to fit in a memory budget
+    ampIndices : `list` [`int`], optional
+        Indices of the amplifiers to process, default is all of them
+
+    Returns
+    -------
+    results : `list`
+        The values returned by func, for each amplifier, `None` for the
+        amplifiers that are not processed
+
+    Notes
+    -----
+    For the "process" backend the workers are given a copy of outputData
+    that lives in shared memory, the results are copied back into
+    outputData once all the amplifiers are done.  Anything else that func
+    changes (e.g., attributes of the task) is lost when the workers exit.
+    """
+    if numThreads is None:
+        numThreads = config.numThreads
+    nProcessed = nAmps if ampIndices is None else len(ampIndices)
+    if config.ampBackend == "process" and numThreads > 1 and nProcessed > 1:
+        with EoSharedCalib(outputData) as sharedData:
+            return mapOverAmps(partial(func, outputData=sharedData.calib), nAmps, numThreads, "process",
+                               ampIndices)
+    return mapOverAmps(partial(func, outputData=outputData), nAmps, numThreads, ampIndices=ampIndices)
+
+
+def logAmpSubset(task, amps):
+    """Log the amplifiers processed when `config.ampSubset` is set"""
+    if task.config.ampSubset:
+        task.log.info("Processing only amps %s of %i" %
+                      ([amps[iamp].getName() for iamp in getAmpIndices(task.config.ampSubset, amps)],
+                       len(amps)))
+
+
+def selectQuickLookInputs(quickLook, inputs, pdName, kwargs):
+    """Select the exposures (or pairs) analyzed in quick-look mode
+
+    Parameters
+    ----------
+    quickLook : `lsst.eotask_gen3.eoQuickLook.EoQuickLook`
+        Gives the exposures to analyze
+    inputs : `list`
+        The input exposures (or pairs)
+    pdName : `str`
+        Name of the keyword with the matching photodiode data
+    kwargs : `dict`
+        The keywords passed to run
+
+    Returns
+    -------
+    inputs : `list`
+        The selected exposures (or pairs)
+    kwargs : `dict`
+        The keywords, with the matching photodiode data
+    """
+    indices = quickLook.selectExposureIndices(len(inputs))
+    pdData = kwargs.get(pdName)
+    if pdData is not None and len(pdData) == len(inputs):
+        kwargs = dict(kwargs)
+        kwargs[pdName] = [pdData[idx] for idx in indices]
+    return [inputs[idx] for idx in indices], kwargs
+
+
 def arrangeFlatsByExpId(exposureList, exposureIdList):
     """Arrange exposures by exposure ID.
     There is no guarantee that this will properly group exposures, but
@@ -259,6 +868,40 @@ class EoAmpExpCalibTaskConfig(pipeBase.PipelineTaskConfig,
     isr = copyConfig(ISR_CONFIG)
     dataSelection = pexConfig.ChoiceField("Data sub-selection rules", str,
                                           EoDataSelection.choiceDict(), default="any")
+    iterationOrder = pexConfig.ChoiceField("Order of the loops over amplifiers and exposures", str,
+                                           ITERATION_ORDER_CHOICES, default="ampMajor")
+    numThreads = copyConfig(NUM_THREADS_CONFIG)
+    ampBackend = copyConfig(AMP_BACKEND_CONFIG)
+    ampCalibCacheSize = copyConfig(AMP_CALIB_CACHE_CONFIG)
+    isrCacheDir = copyConfig(ISR_CACHE_DIR_CONFIG)
+    isrCacheSize = copyConfig(ISR_CACHE_SIZE_CONFIG)
+    checkpointDir = copyConfig(CHECKPOINT_DIR_CONFIG)
+    memoDir = copyConfig(MEMO_DIR_CONFIG)
+    useAmpCube = copyConfig(USE_AMP_CUBE_CONFIG)
+    ampCubeSize = copyConfig(AMP_CUBE_SIZE_CONFIG)
+    ampCubeDir = copyConfig(AMP_CUBE_DIR_CONFIG)
+    memoryBudget = copyConfig(MEMORY_BUDGET_CONFIG)
+    doStageTiming = copyConfig(STAGE_TIMING_CONFIG)
+    precision = copyConfig(PRECISION_CONFIG)
+    quickLook = copyConfig(QUICK_LOOK_CONFIG)
+    quickLookFraction = copyConfig(QUICK_LOOK_FRACTION_CONFIG)
+    quickLookMode = copyConfig(QUICK_LOOK_MODE_CONFIG)
+    quickLookExposures = copyConfig(QUICK_LOOK_EXPOSURES_CONFIG)
+    ampSubset = copyConfig(AMP_SUBSET_CONFIG)
+    pipelineDepth = copyConfig(PIPELINE_DEPTH_CONFIG)
+    doPreScan = copyConfig(PRE_SCAN_CONFIG)
+    preScanRows = copyConfig(PRE_SCAN_ROWS_CONFIG)
+    preScanMaxSaturated = copyConfig(PRE_SCAN_MAX_SATURATED_CONFIG)
+    preScanMaxShutterDev = copyConfig(PRE_SCAN_MAX_SHUTTER_DEV_CONFIG)
+    preScanMaxPdFracDev = copyConfig(PRE_SCAN_MAX_PD_FRAC_DEV_CONFIG)
+    exposureIndexDir = copyConfig(EXPOSURE_INDEX_DIR_CONFIG)
+
+    def validate(self):
+        super().validate()
+        if self.ampBackend == "process" and self.iterationOrder == "expMajor":
+            raise ValueError("ampBackend='process' is only supported with iterationOrder='ampMajor'")
+        if self.checkpointDir and self.iterationOrder == "expMajor":
+            raise ValueError("checkpointDir is only supported with iterationOrder='ampMajor'")
 
 
 class EoAmpExpCalibTask(pipeBase.PipelineTask):
@@ -271,6 +914,21 @@ class EoAmpExpCalibTask(pipeBase.PipelineTask):
         3. analyzeAmpRunData (optional, called for each amp after exposures)
         4. analyzeDetRunData (optional, called once after all amps)
 
+    Sub-classes can also implement analyzeAmpCube, which is given the
+    images of all the exposures of an amp stacked in a single array.
+    If they do, and `config.useAmpCube` is set, it is called for each amp
+    instead of analyzeAmpExpData.
+
+    If `config.iterationOrder` is "expMajor" the loops are inverted:
+    each raw exposure is read once and all of its amps are processed
+    before moving to the next exposure.  In that case analyzeAmpRunData
+    is called for each amp only after all the exposures have been analyzed.
+
+    If `config.doPreScan` is set, the unusable exposures are dropped
+    before the loops, see `lsst.eotask_gen3.eoPreScan`.
+
+    If `config.ampSubset` is set, only the listed amps are processed, see
+    `lsst.eotask_gen3.eoAmpMerge`.
     """
     ConfigClass = EoAmpExpCalibTaskConfig
     _DefaultName = "DoNotUse"
@@ -280,6 +938,10 @@ class EoAmpExpCalibTask(pipeBase.PipelineTask):
         super().__init__(**kwargs)
         self.makeSubtask("isr")
         self._dataSelection = EoDataSelection.getSelection(self.config.dataSelection)
+        self.isrCache = EoIsrCache.fromConfig(self.config)
+        self.quickLook = EoQuickLook.fromConfig(self.config)
+        self.preScan = EoPreScan.fromConfig(self.config)
+        self.exposureIndex = EoExposureIndex.fromConfig(self.config)
 
     @property
     def dataSelection(self):
@@ -289,6 +951,60 @@ class EoAmpExpCalibTask(pipeBase.PipelineTask):
     def getDataQuery(self):
         return self._dataSelection.queryString
 
+    @property
+    def workingDtype(self):
+        """ The dtype of the working arrays, see `config.precision` """
+        return getWorkingDtype(self.config)
+
+    def usesAmpCube(self):
+        """ Return True if the amps are analyzed with analyzeAmpCube """
+        return self.config.useAmpCube and \
+            type(self).analyzeAmpCube is not EoAmpExpCalibTask.analyzeAmpCube
+
+    def makeMemoryPlan(self, amps, nExposure):
+        """ Plan the amp loops to fit in `config.memoryBudget`
+
+        Parameters
+        ----------
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        nExposure : `int`
+            Number of exposures
+
+        Returns
+        -------
+        memoryPlan : `lsst.eotask_gen3.eoMemory.EoMemoryPlan`
+            The plan
+        """
+        return EoMemoryPlan.forAmpLoops(self.config, amps, nExposure, nCubes=int(self.usesAmpCube()),
+                                        expMajor=self.config.iterationOrder == "expMajor")
+
+    def makeAmpCube(self, nExposure, nConcurrent=1, memoryPlan=None):
+        """ Make the cube used to collect the images of one amp
+
+        Parameters
+        ----------
+        nExposure : `int`
+            Number of exposures
+        nConcurrent : `int`
+            Number of cubes alive at the same time, used to split
+            the memory available for cubes between them
+        memoryPlan : `lsst.eotask_gen3.eoMemory.EoMemoryPlan`, optional
+            Gives the memory available for cubes, default is
+            `config.ampCubeSize`
+
+        Returns
+        -------
+        cube : `lsst.eotask_gen3.eoAmpCube.EoAmpCube`
+            The (not yet allocated) cube
+        """
+        if memoryPlan is not None:
+            totalBytes = memoryPlan.ampCubeBytes
+        else:
+            totalBytes = self.config.ampCubeSize*1024**2
+        maxBytes = int(totalBytes/max(nConcurrent, 1))
+        return EoAmpCube(nExposure, maxBytes, self.config.ampCubeDir or None, dtype=self.workingDtype)
+
     def runQuantum(self, butlerQC, inputRefs, outputRefs):
         """ Here we filter the input data selection
 
@@ -303,15 +1019,46 @@ class EoAmpExpCalibTask(pipeBase.PipelineTask):
         ouptutRefs : `~lsst.pipe.base.connections.OutputQuantizedConnection`
             Output data refs to persist.
         """
-        inputRefs.inputExps = self.dataSelection.selectData(inputRefs.inputExps)
+        self.selectInputRefs(inputRefs, getattr(butlerQC, 'registry', None))
+        runQuantumMemoized(self, butlerQC, inputRefs, outputRefs,
+                           lambda: self.runWithInputs(inputRefs, butlerQC.get(inputRefs)))
+
+    def selectInputRefs(self, inputRefs, registry=None):
+        """ Apply the data selection to the input refs, in place
+
+        Parameters
+        ----------
+        inputRefs : `~lsst.pipe.base.connections.InputQuantizedConnection`
+            Input data refs for one detector
+        registry : `lsst.daf.butler.Registry`, optional
+            Used to fetch the exposure records missing from the dataIds
+            and from `self.exposureIndex`
+        """
+        inputRefs.inputExps = self.dataSelection.selectData(inputRefs.inputExps, registry, self.exposureIndex)
         if hasattr(inputRefs, 'photodiodeData'):
-            inputRefs.photodiodeData = self.dataSelection.selectData(inputRefs.photodiodeData)
+            inputRefs.photodiodeData = self.dataSelection.selectData(inputRefs.photodiodeData, registry,
+                                                                     self.exposureIndex)
             if len(inputRefs.inputExps) != len(inputRefs.photodiodeData):
                 raise ValueError("Number of exposures (%i) != number of photodiode data (%i)"
                                  % (len(inputRefs.inputExps), len(inputRefs.photodiodeData)))
-        inputs = butlerQC.get(inputRefs)
-        outputs = self.run(**inputs)
-        butlerQC.put(outputs, outputRefs)
+
+    def runWithInputs(self, inputRefs, inputs):
+        """ Call run with the inputs read for one detector
+
+        Parameters
+        ----------
+        inputRefs : `~lsst.pipe.base.connections.InputQuantizedConnection`
+            The selected input data refs
+        inputs : `dict`
+            The inputs, as returned by butlerQC.get(inputRefs)
+
+        Returns
+        -------
+        outputs : `lsst.pipe.base.Struct`
+            The outputs of run
+        """
+        inputs['calibKeys'] = getCalibKeys(inputRefs)
+        return self.run(**inputs)
 
     def run(self, inputExps, **kwargs):  # pylint: disable=arguments-differ
         """ Run method
@@ -330,6 +1077,9 @@ class EoAmpExpCalibTask(pipeBase.PipelineTask):
         defects : `lsst.ip.isr.Defects`
             The defect set
         gains : ??
+        calibKeys : `dict` [`str`, `str`], optional
+            Dataset IDs of the calibrations, used to share the per-amp
+            calibrations between tasks, see `getCalibKeys`
 
         Returns
         -------
@@ -337,24 +1087,339 @@ class EoAmpExpCalibTask(pipeBase.PipelineTask):
             Output data in formatted tables
         """
         camera = kwargs['camera']
-        numExps = len(inputExps)
-        if numExps < 1:
+        if len(inputExps) < 1:
             raise RuntimeError("No valid input data")
+        det = getDetector(inputExps[0], camera)
+        preScanSummary = None
+        if self.preScan is not None:
+            inputExps, kwargs, preScanSummary = self.preScan.selectExposures(self, inputExps,
+                                                                             det.getAmplifiers(), kwargs)
+            if not inputExps:
+                raise RuntimeError("No valid input data after the pre-scan")
+        numExps = len(inputExps)
+        if self.quickLook is not None:
+            inputExps, kwargs = selectQuickLookInputs(self.quickLook, inputExps, 'photodiodeData', kwargs)
+
+        outputData = self.prepareOutputData(inputExps, det, **kwargs)
+        if preScanSummary is not None:
+            self.preScan.record(outputData, preScanSummary)
+
+        checkpoint = EoCheckpoint.fromTask(self, inputExps, kwargs.get('calibKeys'))
+        memoryPlan = self.makeMemoryPlan(det.getAmplifiers(), len(inputExps))
+        self.log.info("Memory plan: %s" % memoryPlan)
+        timer = EoStageTimer() if self.config.doStageTiming else None
+        self.runAmpLoops(inputExps, outputData, det.getAmplifiers(), detector=det, checkpoint=checkpoint,
+                         memoryPlan=memoryPlan, timer=timer, **kwargs)
+        with timeStage(timer, 'detRun'):
+            self.analyzeDetRunData(outputData)
+        if self.quickLook is not None:
+            self.recordQuickLook(outputData, det.getAmplifiers(), numExps)
+        if self.isrCache is not None:
+            self.log.info(self.isrCache.summary())
+        if timer is not None:
+            timer.record(self, [outputData])
+        self.log.info(memoryPlan.report())
+        if checkpoint is not None:
+            checkpoint.remove()
+        return pipeBase.Struct(outputData=outputData)
+
+    def prepareOutputData(self, inputExps, det, **kwargs):
+        """ Build the output data container
+
+        Sub-classes can override this to fill the parts of the output
+        that do not depend on the amplifier data, e.g., photodiode data.
+
+        Parameters
+        ----------
+        inputExps : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+            Used to retrieve the exposures
+        det : `lsst.afw.cameraGeom.Detector`
+            The detector
+
+        Keywords are the same as for `run`
+
+        Returns
+        -------
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+        """
+        amps = det.getAmplifiers()
+        return self.makeOutputData(amps=amps, nAmps=len(amps), nExposure=len(inputExps),
+                                   camera=kwargs.get('camera'), detector=det)
+
+    def recordQuickLook(self, outputData, amps, nExposure):
+        """ Store the quick-look summary in the output data
+
+        Parameters
+        ----------
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        nExposure : `int`
+            Number of input exposures, before the quick-look selection
+        """
+        rawBBox = amps[0].getRawBBox()
+        pixelFraction = self.quickLook.sampledFraction((rawBBox.getHeight(), rawBBox.getWidth()))
+        self.quickLook.record(self, outputData, pixelFraction, nExposure,
+                              self.getQuickLookErrors(outputData, amps))
 
-        det = inputExps[0].get().getDetector()
-        nAmps = len(det.getAmplifiers())
-        outputData = self.makeOutputData(amps=det.getAmplifiers(), nAmps=nAmps, nExposure=len(inputExps),
-                                         camera=camera, detector=det)
+    def getQuickLookErrors(self, outputData, amps):
+        """ Return the statistical errors on the metrics in quick-look mode
 
-        for iamp, amp in enumerate(det.getAmplifiers()):
-            ampCalibs = extractAmpCalibs(amp, **kwargs)
+        Sub-classes should override this to estimate the errors from the
+        analyzed subsample.
+
+        Parameters
+        ----------
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+
+        Returns
+        -------
+        errors : `dict` [`str`, `list` [`float`]]
+            The errors on each metric, by amp
+        """
+        return {}
+
+    def runAmpLoops(self, inputExps, outputData, amps, memoryPlan=None, timer=None, **kwargs):
+        """ Run the loops over amps and exposures
+
+        This uses `config.iterationOrder` to pick the loop order, and
+        the memory plan to decide how many amps to process at once.
+
+        Parameters
+        ----------
+        inputExps : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+            Used to retrieve the exposures
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        memoryPlan : `lsst.eotask_gen3.eoMemory.EoMemoryPlan`, optional
+            The memory plan, default is from `makeMemoryPlan`
+        timer : `lsst.eotask_gen3.eoStageTimer.EoStageTimer`, optional
+            Used to time the processing stages
+
+        Keywords are used to extract the per-amp calibrations
+        """
+        AMP_CALIB_CACHE.resize(int(self.config.ampCalibCacheSize*1024**2))
+        if memoryPlan is None:
+            memoryPlan = self.makeMemoryPlan(amps, len(inputExps))
+        logAmpSubset(self, amps)
+        if self.config.iterationOrder == "expMajor":
+            self.loopExpMajor(inputExps, outputData, amps, memoryPlan=memoryPlan, timer=timer, **kwargs)
+        else:
+            self.loopAmpMajor(inputExps, outputData, amps, memoryPlan=memoryPlan, timer=timer, **kwargs)
+
+    def loopAmpMajor(self, inputExps, outputData, amps, memoryPlan, timer=None, **kwargs):
+        """ Loop over amps, then over exposures
+
+        Each exposure is read once per amp, using the 'amp' read parameter
+
+        See `runAmpLoops` for parameters.
+        """
+        ampTimers = runOverAmps(partial(self.processAmp, amps=amps, inputExps=inputExps,
+                                        memoryPlan=memoryPlan, doTiming=timer is not None, **kwargs),
+                                outputData, len(amps), self.config, memoryPlan.numThreads,
+                                getAmpIndices(self.config.ampSubset, amps))
+        if timer is not None:
+            for ampTimer in ampTimers:
+                timer.merge(ampTimer)
+
+    def processAmp(self, iamp, amps, inputExps, outputData, checkpoint=None, memoryPlan=None, doTiming=False,
+                   **kwargs):
+        """ Process all the exposures for one amp
+
+        This reads, calibrates and analyzes the amp for each exposure
+        then calls analyzeAmpRunData for the amp.
+
+        Parameters
+        ----------
+        iamp : `int`
+            Index for the amplifier
+        checkpoint : `lsst.eotask_gen3.eoCheckpoint.EoCheckpoint`, optional
+            Used to reload the results of the amp if it was already
+            processed, and to save them otherwise
+        memoryPlan : `lsst.eotask_gen3.eoMemory.EoMemoryPlan`, optional
+            Used to size the amp cube
+        doTiming : `bool`
+            If True, time the processing stages of this amp
+
+        See `runAmpLoops` for the other parameters.
+
+        Returns
+        -------
+        timer : `lsst.eotask_gen3.eoStageTimer.EoStageTimer` or `None`
+            The timings for this amp, returned rather than shared so
+            that they also work for forked workers
+        """
+        if reloadAmp(self, checkpoint, amps, iamp, dict(outputData=outputData)):
+            return None
+        timer = EoStageTimer() if doTiming else None
+        ampCalibs = extractAmpCalibs(amps[iamp], **kwargs)
+        cube = None
+        if self.usesAmpCube():
+            numThreads = memoryPlan.numThreads if memoryPlan is not None else self.config.numThreads
+            cube = self.makeAmpCube(len(inputExps), numThreads, memoryPlan)
+        calibExps = iterPipelined(self, inputExps,
+                                  lambda inputExp: readAmp(self, inputExp, iamp, amps, timer=timer, **kwargs),
+                                  lambda ampRead: calibrateAmp(self, ampRead, ampCalibs, timer=timer),
+                                  timer=timer)
+        for iExp, calibExp in calibExps:
+            amp2 = self.analyzeCalibAmp(calibExp, outputData, iamp, iExp, cube=cube, timer=timer)
+        if cube is not None:
+            with timeStage(timer, 'analyze'):
+                self.analyzeAmpCube(cube.array, outputData, iamp, amp2)
+        with timeStage(timer, 'ampRun'):
+            self.analyzeAmpRunData(outputData, iamp, amp2)
+        if checkpoint is not None:
+            checkpoint.save(amps[iamp].getName(), iamp, dict(outputData=outputData))
+        return timer
+
+    def loopExpMajor(self, inputExps, outputData, amps, memoryPlan, timer=None, **kwargs):
+        """ Loop over exposures, then over amps
+
+        Each exposure is read only once, and all the amps are extracted
+        from it and analyzed before moving on to the next exposure.
+
+        The per-amp calibrations are extracted once up front and kept for
+        the whole loop.  analyzeAmpRunData is called for each amp after
+        all the exposures have been analyzed.
+
+        See `runAmpLoops` for parameters.
+        """
+        nAmps = len(amps)
+        numThreads = memoryPlan.numThreads
+        ampIndices = getAmpIndices(self.config.ampSubset, amps)
+        ampCalibsList = mapOverAmps(lambda iamp: extractAmpCalibs(amps[iamp], **kwargs), nAmps, numThreads,
+                                    ampIndices=ampIndices)
+        calibAmps = [None]*nAmps
+        cubes = None
+        if self.usesAmpCube():
+            cubes = [self.makeAmpCube(len(inputExps), len(ampIndices), memoryPlan) for _ in amps]
+
+        def readExp(inputExp):
+            if all(isAmpCached(self, inputExp, amps[iamp], **kwargs) for iamp in ampIndices):
+                return inputExp, None
+            with timeStage(timer, 'read'):
+                rawExp = inputExp.get()
+            if timer is not None:
+                timer.count('read', rawExp)
+            return inputExp, rawExp
+
+        def calibrateExp(expRead):
+            inputExp, rawExp = expRead
+            return mapOverAmps(lambda iamp: getCalibAmp(self, inputExp, iamp, amps, ampCalibsList[iamp],
+                                                        rawExp=rawExp, timer=timer, **kwargs),
+                               nAmps, numThreads, ampIndices=ampIndices)
+
+        if self.config.pipelineDepth > 0:
+            # ISR for all the amps of an exposure in the ISR stage, then
+            # the analysis of all the amps
+            for iExp, calibExps in iterPipelined(self, inputExps, readExp, calibrateExp, timer=timer,
+                                                 log=self.log.info):
+                calibAmps = mapOverAmps(
+                    lambda iamp: self.analyzeCalibAmp(calibExps[iamp], outputData, iamp, iExp,
+                                                      cube=cubes[iamp] if cubes is not None else None,
+                                                      timer=timer),
+                    nAmps, numThreads, ampIndices=ampIndices)
+                del calibExps
+        else:
             for iExp, inputExp in enumerate(inputExps):
-                calibExp = runIsrOnAmp(self, inputExp.get(parameters={"amp": iamp}), **ampCalibs)
-                amp2 = calibExp.getDetector().getAmplifiers()[0]
+                _, rawExp = readExp(inputExp)
+                calibAmps = mapOverAmps(partial(self.processAmpExp, inputExp=inputExp, rawExp=rawExp,
+                                                amps=amps, ampCalibsList=ampCalibsList, outputData=outputData,
+                                                iExp=iExp, cubes=cubes, timer=timer, **kwargs),
+                                        nAmps, numThreads, ampIndices=ampIndices)
+                del rawExp
+
+        def analyzeAmpCube(iamp):
+            with timeStage(timer, 'analyze'):
+                self.analyzeAmpCube(cubes[iamp].array, outputData, iamp, calibAmps[iamp])
+
+        def analyzeAmpRunData(iamp):
+            with timeStage(timer, 'ampRun'):
+                self.analyzeAmpRunData(outputData, iamp, calibAmps[iamp])
+
+        if cubes is not None:
+            mapOverAmps(analyzeAmpCube, nAmps, numThreads, ampIndices=ampIndices)
+        mapOverAmps(analyzeAmpRunData, nAmps, numThreads, ampIndices=ampIndices)
+
+    def processAmpExp(self, iamp, inputExp, rawExp, amps, ampCalibsList, outputData, iExp,
+                      cubes=None, timer=None, **kwargs):
+        """ Process one amp of an exposure that has already been read
+
+        Parameters
+        ----------
+        iamp : `int`
+            Index for the amplifier
+        inputExp : `lsst.daf.butler.DeferredDatasetHandle`
+            Used to retrieve the exposure
+        rawExp : `lsst.afw.image.Exposure` or `None`
+            The full raw exposure, `None` if all the amps are in the
+            ISR cache
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        ampCalibsList : `list` [`dict`]
+            The per-amp calibrations, from `extractAmpCalibs`
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+        iExp : `int`
+            Index for the exposure
+        cubes : `list` [`lsst.eotask_gen3.eoAmpCube.EoAmpCube`], optional
+            The per-amp cubes, if given the amp image is added to its
+            cube rather than passed to analyzeAmpExpData
+        timer : `lsst.eotask_gen3.eoStageTimer.EoStageTimer`, optional
+            Used to time the processing stages
+
+        Keywords are passed to `getCalibAmp`
+
+        Returns
+        -------
+        amp : `lsst.afw.cameraGeom.Amplifier`
+            The amplifier, as attached to the calibrated amp exposure
+        """
+        calibExp = getCalibAmp(self, inputExp, iamp, amps, ampCalibsList[iamp], rawExp=rawExp, timer=timer,
+                               **kwargs)
+        return self.analyzeCalibAmp(calibExp, outputData, iamp, iExp,
+                                    cube=cubes[iamp] if cubes is not None else None, timer=timer)
+
+    def analyzeCalibAmp(self, calibExp, outputData, iamp, iExp, cube=None, timer=None):
+        """ Analyze one ISR-processed amp of an exposure, or add it to the
+        cube of the amp
+
+        Parameters
+        ----------
+        calibExp : `lsst.afw.image.ExposureF`
+            The ISR-processed amp exposure
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+        iamp : `int`
+            Index for the amplifier
+        iExp : `int`
+            Index for the exposure
+        cube : `lsst.eotask_gen3.eoAmpCube.EoAmpCube`, optional
+            The cube of the amp, if given the image is added to it rather
+            than passed to analyzeAmpExpData
+        timer : `lsst.eotask_gen3.eoStageTimer.EoStageTimer`, optional
+            Used to time the processing stages
+
+        Returns
+        -------
+        amp : `lsst.afw.cameraGeom.Amplifier`
+            The amplifier, as attached to the calibrated amp exposure
+        """
+        amp2 = calibExp.getDetector().getAmplifiers()[0]
+        if cube is not None:
+            with timeStage(timer, 'cubeFill'):
+                cube.fill(iExp, calibExp.image.array)
+        else:
+            with timeStage(timer, 'analyze'):
                 self.analyzeAmpExpData(calibExp, outputData, iamp, amp2, iExp)
-            self.analyzeAmpRunData(outputData, iamp, amp2)
-        self.analyzeDetRunData(outputData)
-        return pipeBase.Struct(outputData=outputData)
+        return amp2
 
     def makeOutputData(self, **kwargs):
         raise NotImplementedError
@@ -362,6 +1427,9 @@ class EoAmpExpCalibTask(pipeBase.PipelineTask):
     def analyzeAmpExpData(self, calibExp, outputData, iamp, amp, iExp):
         """ Analyze calibrated exposure for one amp
 
+        If `config.numThreads` > 1 this can be called for several amps at
+        once, so it should only write to the table for this amp.
+
         Parameter
         ---------
         calibExp : `lsst.afw.image.ExposureF`
@@ -376,17 +1444,40 @@ class EoAmpExpCalibTask(pipeBase.PipelineTask):
             Index for the exposure
         """
 
+    def analyzeAmpCube(self, cube, outputData, iamp, amp):
+        """ Analyze the calibrated images of all the exposures for one amp
+
+        Optional replacement for analyzeAmpExpData, for analyses that can
+        be done with vectorized numpy calls over all the exposures.
+        Same threading constraints as analyzeAmpExpData.
+
+        Parameter
+        ---------
+        cube : `numpy.ndarray`
+            The nExposure x ny x nx float32 array of calibrated images,
+            possibly a `numpy.memmap`
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+        iamp : `int`
+            Index for the amplifier
+        amp : `lsst.afw.geom.AmplifierGeometry`
+            The amplifier
+        """
+
     def analyzeAmpRunData(self, outputData, iamp, amp):
         """ Aggregate data from all exposures for one amp
 
+        If `config.numThreads` > 1 this can be called for several amps at
+        once, so it should only write to row `iamp` of the per-amp tables.
+
         Parameter
         ---------
         outputData : `lsst.eotask_gen3.EoCalib`
             The output data container
         iamp : `int`
             Index for the amplifier
-        iExp : `int`
-            Index for the exposure
+        amp : `lsst.afw.geom.AmplifierGeometry`
+            The amplifier
         """
 
     def analyzeDetRunData(self, outputData):
@@ -418,6 +1509,37 @@ class EoAmpPairCalibTaskConfig(pipeBase.PipelineTaskConfig,
     isr = copyConfig(ISR_CONFIG)
     dataSelection = pexConfig.ChoiceField("Data sub-selection rules", str,
                                           EoDataSelection.choiceDict(), default="any")
+    iterationOrder = pexConfig.ChoiceField("Order of the loops over amplifiers and exposure pairs", str,
+                                           PAIR_ITERATION_ORDER_CHOICES, default="ampMajor")
+    numThreads = copyConfig(NUM_THREADS_CONFIG)
+    ampBackend = copyConfig(AMP_BACKEND_CONFIG)
+    ampCalibCacheSize = copyConfig(AMP_CALIB_CACHE_CONFIG)
+    isrCacheDir = copyConfig(ISR_CACHE_DIR_CONFIG)
+    isrCacheSize = copyConfig(ISR_CACHE_SIZE_CONFIG)
+    checkpointDir = copyConfig(CHECKPOINT_DIR_CONFIG)
+    memoDir = copyConfig(MEMO_DIR_CONFIG)
+    memoryBudget = copyConfig(MEMORY_BUDGET_CONFIG)
+    doStageTiming = copyConfig(STAGE_TIMING_CONFIG)
+    precision = copyConfig(PRECISION_CONFIG)
+    quickLook = copyConfig(QUICK_LOOK_CONFIG)
+    quickLookFraction = copyConfig(QUICK_LOOK_FRACTION_CONFIG)
+    quickLookMode = copyConfig(QUICK_LOOK_MODE_CONFIG)
+    quickLookExposures = copyConfig(QUICK_LOOK_EXPOSURES_CONFIG)
+    ampSubset = copyConfig(AMP_SUBSET_CONFIG)
+    pipelineDepth = copyConfig(PIPELINE_DEPTH_CONFIG)
+    doPreScan = copyConfig(PRE_SCAN_CONFIG)
+    preScanRows = copyConfig(PRE_SCAN_ROWS_CONFIG)
+    preScanMaxSaturated = copyConfig(PRE_SCAN_MAX_SATURATED_CONFIG)
+    preScanMaxShutterDev = copyConfig(PRE_SCAN_MAX_SHUTTER_DEV_CONFIG)
+    preScanMaxPdFracDev = copyConfig(PRE_SCAN_MAX_PD_FRAC_DEV_CONFIG)
+    exposureIndexDir = copyConfig(EXPOSURE_INDEX_DIR_CONFIG)
+
+    def validate(self):
+        super().validate()
+        if self.ampBackend == "process" and self.iterationOrder == "pairMajor":
+            raise ValueError("ampBackend='process' is only supported with iterationOrder='ampMajor'")
+        if self.checkpointDir and self.iterationOrder == "pairMajor":
+            raise ValueError("checkpointDir is only supported with iterationOrder='ampMajor'")
 
 
 class EoAmpPairCalibTask(pipeBase.PipelineTask):
@@ -430,6 +1552,15 @@ class EoAmpPairCalibTask(pipeBase.PipelineTask):
         3. analyzeAmpRunData (optional, called for each amp after pair)
         4. analyzeDetRunData (optional, called once after all amps)
 
+    If `config.iterationOrder` is "pairMajor" the loops are inverted:
+    both exposures of each pair are read once, all the amps are
+    ISR-processed and analyzed before moving to the next pair.  In that
+    case analyzeAmpRunData is called for each amp only after all the
+    pairs have been analyzed.
+
+    If `config.doPreScan` is set, the pairs with an unusable exposure, or
+    with mismatched photodiode data, are dropped before the loops, see
+    `lsst.eotask_gen3.eoPreScan`.
     """
     ConfigClass = EoAmpPairCalibTaskConfig
     _DefaultName = "DoNotUse"
@@ -439,6 +1570,10 @@ class EoAmpPairCalibTask(pipeBase.PipelineTask):
         super().__init__(**kwargs)
         self.makeSubtask("isr")
         self._dataSelection = EoDataSelection.getSelection(self.config.dataSelection)
+        self.isrCache = EoIsrCache.fromConfig(self.config)
+        self.quickLook = EoQuickLook.fromConfig(self.config)
+        self.preScan = EoPreScan.fromConfig(self.config)
+        self.exposureIndex = EoExposureIndex.fromConfig(self.config)
 
     @property
     def dataSelection(self):
@@ -448,6 +1583,11 @@ class EoAmpPairCalibTask(pipeBase.PipelineTask):
     def getDataQuery(self):
         return self._dataSelection.queryString
 
+    @property
+    def workingDtype(self):
+        """ The dtype of the working arrays, see `config.precision` """
+        return getWorkingDtype(self.config)
+
     def runQuantum(self, butlerQC, inputRefs, outputRefs):
         """Ensure that the input and output dimensions are passed along.
 
@@ -463,11 +1603,43 @@ class EoAmpPairCalibTask(pipeBase.PipelineTask):
         ouptutRefs : `~lsst.pipe.base.connections.OutputQuantizedConnection`
             Output data refs to persist.
         """
-        inputRefs.inputExps = self.dataSelection.selectData(inputRefs.inputExps)
+        self.selectInputRefs(inputRefs, getattr(butlerQC, 'registry', None))
+        runQuantumMemoized(self, butlerQC, inputRefs, outputRefs,
+                           lambda: self.runWithInputs(inputRefs, butlerQC.get(inputRefs)))
+
+    def selectInputRefs(self, inputRefs, registry=None):
+        """ Apply the data selection to the input refs, in place
+
+        Parameters
+        ----------
+        inputRefs : `~lsst.pipe.base.connections.InputQuantizedConnection`
+            Input data refs for one detector
+        registry : `lsst.daf.butler.Registry`, optional
+            Used to fetch the exposure records missing from the dataIds
+            and from `self.exposureIndex`
+        """
+        inputRefs.inputExps = self.dataSelection.selectData(inputRefs.inputExps, registry, self.exposureIndex)
         if hasattr(inputRefs, 'photodiodeData'):
-            inputRefs.photodiodeData = self.dataSelection.selectData(inputRefs.photodiodeData)
+            inputRefs.photodiodeData = self.dataSelection.selectData(inputRefs.photodiodeData, registry,
+                                                                     self.exposureIndex)
 
-        inputs = butlerQC.get(inputRefs)
+    def runWithInputs(self, inputRefs, inputs):
+        """ Sort the exposures into pairs and call run with the inputs read
+        for one detector
+
+        Parameters
+        ----------
+        inputRefs : `~lsst.pipe.base.connections.InputQuantizedConnection`
+            The selected input data refs
+        inputs : `dict`
+            The inputs, as returned by butlerQC.get(inputRefs)
+
+        Returns
+        -------
+        outputs : `lsst.pipe.base.Struct`
+            The outputs of run
+        """
+        inputs['calibKeys'] = getCalibKeys(inputRefs)
 
         inputExps = inputs.pop('inputExps')
         expIds = [expId.dataId['exposure'] for expId in inputExps]
@@ -484,8 +1656,7 @@ class EoAmpPairCalibTask(pipeBase.PipelineTask):
         if pdPairs is not None:
             inputs['photodiodePairs'] = pdPairs
 
-        outputs = self.run(**inputs)
-        butlerQC.put(outputs, outputRefs)
+        return self.run(**inputs)
 
     def run(self, inputPairs, **kwargs):  # pylint: disable=arguments-differ
         """ Run method
@@ -504,6 +1675,9 @@ class EoAmpPairCalibTask(pipeBase.PipelineTask):
         defects : `lsst.ip.isr.Defects`
             The defect set
         gains : ??
+        calibKeys : `dict` [`str`, `str`], optional
+            Dataset IDs of the calibrations, used to share the per-amp
+            calibrations between tasks, see `getCalibKeys`
 
         Returns
         -------
@@ -511,30 +1685,276 @@ class EoAmpPairCalibTask(pipeBase.PipelineTask):
             Output data in formatted tables
         """
         camera = kwargs['camera']
-        nPair = len(inputPairs)
-        if nPair < 1:
+        if len(inputPairs) < 1:
             raise RuntimeError("No valid input data")
+        det = getDetector(inputPairs[0][0][0], camera)
+        amps = det.getAmplifiers()
+        preScanSummary = None
+        if self.preScan is not None:
+            inputPairs, kwargs, preScanSummary = self.preScan.selectPairs(self, inputPairs, amps, kwargs)
+            if not inputPairs:
+                raise RuntimeError("No valid input data after the pre-scan")
+        nInputPair = len(inputPairs)
+        if self.quickLook is not None:
+            inputPairs, kwargs = selectQuickLookInputs(self.quickLook, inputPairs, 'photodiodePairs', kwargs)
+        nPair = len(inputPairs)
+
+        outputData = self.prepareOutputData(inputPairs, det, **kwargs)
+        if preScanSummary is not None:
+            self.preScan.record(outputData, preScanSummary)
+        pairHandles = [handle for inputPair in inputPairs for handle, _ in inputPair]
+        checkpoint = EoCheckpoint.fromTask(self, pairHandles, kwargs.get('calibKeys'))
+        memoryPlan = self.makeMemoryPlan(amps, nPair)
+        self.log.info("Memory plan: %s" % memoryPlan)
+        timer = EoStageTimer() if self.config.doStageTiming else None
+        self.runAmpLoops(inputPairs, outputData, amps, detector=det, checkpoint=checkpoint,
+                         memoryPlan=memoryPlan, timer=timer, **kwargs)
+        with timeStage(timer, 'detRun'):
+            self.analyzeDetRunData(outputData)
+        if self.quickLook is not None:
+            self.recordQuickLook(outputData, amps, nInputPair)
+        if self.isrCache is not None:
+            self.log.info(self.isrCache.summary())
+        if timer is not None:
+            timer.record(self, [outputData])
+        self.log.info(memoryPlan.report())
+        if checkpoint is not None:
+            checkpoint.remove()
+        return pipeBase.Struct(outputData=outputData)
 
-        det = inputPairs[0][0][0].get().getDetector()
+    def prepareOutputData(self, inputPairs, det, **kwargs):
+        """ Build the output data container
 
+        Sub-classes can override this to fill the parts of the output
+        that do not depend on the amplifier data, e.g., photodiode data.
+
+        Parameters
+        ----------
+        inputPairs : `list` [`tuple` [`lsst.daf.Butler.DeferedDatasetRef`] ]
+            Used to retrieve the exposures
+        det : `lsst.afw.cameraGeom.Detector`
+            The detector
+
+        Keywords are the same as for `run`
+
+        Returns
+        -------
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+        """
         amps = det.getAmplifiers()
-        outputData = self.makeOutputData(amps=amps, nAmps=len(amps), nPair=len(inputPairs),
-                                         camera=camera, detector=det)
-        for iamp, amp in enumerate(amps):
-
-            ampCalibs = extractAmpCalibs(amp, **kwargs)
-            for iPair, inputPair in enumerate(inputPairs):
-                if len(inputPair) != 2:
-                    self.log.warn("Length of pair %i = %i" % (iPair, len(inputPair)))
-                    continue
-                calibExp1 = runIsrOnAmp(self, inputPair[0][0].get(parameters={"amp": iamp}), **ampCalibs)
-                calibExp2 = runIsrOnAmp(self, inputPair[1][0].get(parameters={"amp": iamp}), **ampCalibs)
-                amp2 = calibExp1.getDetector().getAmplifiers()[0]
+        return self.makeOutputData(amps=amps, nAmps=len(amps), nPair=len(inputPairs),
+                                   camera=kwargs.get('camera'), detector=det)
+
+    def recordQuickLook(self, outputData, amps, nExposure):
+        """ Store the quick-look summary in the output data
+
+        Parameters
+        ----------
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        nExposure : `int`
+            Number of input exposure pairs, before the quick-look selection
+        """
+        rawBBox = amps[0].getRawBBox()
+        pixelFraction = self.quickLook.sampledFraction((rawBBox.getHeight(), rawBBox.getWidth()))
+        self.quickLook.record(self, outputData, pixelFraction, nExposure,
+                              self.getQuickLookErrors(outputData, amps))
 
+    def getQuickLookErrors(self, outputData, amps):
+        """ Return the statistical errors on the metrics in quick-look mode
+
+        Sub-classes should override this to estimate the errors from the
+        analyzed subsample.
+
+        Parameters
+        ----------
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+
+        Returns
+        -------
+        errors : `dict` [`str`, `list` [`float`]]
+            The errors on each metric, by amp
+        """
+        return {}
+
+    def makeMemoryPlan(self, amps, nPair):
+        """ Plan the amp loops to fit in `config.memoryBudget`
+
+        Parameters
+        ----------
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        nPair : `int`
+            Number of exposure pairs
+
+        Returns
+        -------
+        memoryPlan : `lsst.eotask_gen3.eoMemory.EoMemoryPlan`
+            The plan
+        """
+        # With pairMajor, the ISR-processed copies of all the amps of both
+        # exposures of a pair are made before any of them is analyzed
+        pairMajor = self.config.iterationOrder == "pairMajor"
+        return EoMemoryPlan.forAmpLoops(self.config, amps, 2*nPair, nHeld=2, expMajor=pairMajor,
+                                        holdCalibrated=pairMajor)
+
+    def runAmpLoops(self, inputPairs, outputData, amps, memoryPlan=None, timer=None, **kwargs):
+        """ Run the loops over amps and exposure pairs
+
+        This uses `config.iterationOrder` to pick the loop order, and
+        the memory plan to decide how many amps to process at once.
+
+        Parameters
+        ----------
+        inputPairs : `list` [`tuple` [`lsst.daf.Butler.DeferedDatasetRef`] ]
+            Used to retrieve the exposures
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        memoryPlan : `lsst.eotask_gen3.eoMemory.EoMemoryPlan`, optional
+            The memory plan, default is built from `config.memoryBudget`
+        timer : `lsst.eotask_gen3.eoStageTimer.EoStageTimer`, optional
+            Used to time the processing stages
+
+        Keywords are used to extract the per-amp calibrations
+        """
+        AMP_CALIB_CACHE.resize(int(self.config.ampCalibCacheSize*1024**2))
+        if memoryPlan is None:
+            memoryPlan = self.makeMemoryPlan(amps, len(inputPairs))
+        logAmpSubset(self, amps)
+        if self.config.iterationOrder == "pairMajor":
+            self.loopPairMajor(inputPairs, outputData, amps, memoryPlan=memoryPlan, timer=timer, **kwargs)
+            return
+        ampTimers = runOverAmps(partial(self.processAmp, amps=amps, inputPairs=inputPairs,
+                                        doTiming=timer is not None, **kwargs),
+                                outputData, len(amps), self.config, memoryPlan.numThreads,
+                                getAmpIndices(self.config.ampSubset, amps))
+        if timer is not None:
+            for ampTimer in ampTimers:
+                timer.merge(ampTimer)
+
+    def processAmp(self, iamp, amps, inputPairs, outputData, checkpoint=None, doTiming=False, **kwargs):
+        """ Process all the exposure pairs for one amp
+
+        This reads, calibrates and analyzes the amp for each pair
+        then calls analyzeAmpRunData for the amp.
+
+        Parameters
+        ----------
+        iamp : `int`
+            Index for the amplifier
+        checkpoint : `lsst.eotask_gen3.eoCheckpoint.EoCheckpoint`, optional
+            Used to reload the results of the amp if it was already
+            processed, and to save them otherwise
+        doTiming : `bool`
+            If True, time the processing stages of this amp
+
+        See `runAmpLoops` for the other parameters.
+
+        Returns
+        -------
+        timer : `lsst.eotask_gen3.eoStageTimer.EoStageTimer` or `None`
+            The timings for this amp
+        """
+        if reloadAmp(self, checkpoint, amps, iamp, dict(outputData=outputData)):
+            return None
+        timer = EoStageTimer() if doTiming else None
+        ampCalibs = extractAmpCalibs(amps[iamp], **kwargs)
+
+        def readPair(inputPair):
+            if len(inputPair) != 2:
+                return None
+            return [readAmp(self, inputExp[0], iamp, amps, timer=timer, **kwargs) for inputExp in inputPair]
+
+        def calibratePair(pairRead):
+            if pairRead is None:
+                return None
+            return [calibrateAmp(self, ampRead, ampCalibs, timer=timer) for ampRead in pairRead]
+
+        for iPair, calibPair in iterPipelined(self, inputPairs, readPair, calibratePair, timer=timer):
+            if calibPair is None:
+                self.log.warn("Length of pair %i = %i" % (iPair, len(inputPairs[iPair])))
+                continue
+            calibExp1, calibExp2 = calibPair
+            amp2 = calibExp1.getDetector().getAmplifiers()[0]
+
+            with timeStage(timer, 'analyze'):
                 self.analyzeAmpPairData(calibExp1, calibExp2, outputData, amp2, iPair)
+        with timeStage(timer, 'ampRun'):
             self.analyzeAmpRunData(outputData, iamp, amp2)
-        self.analyzeDetRunData(outputData)
-        return pipeBase.Struct(outputData=outputData)
+        if checkpoint is not None:
+            checkpoint.save(amps[iamp].getName(), iamp, dict(outputData=outputData))
+        return timer
+
+    def loopPairMajor(self, inputPairs, outputData, amps, memoryPlan, timer=None, **kwargs):
+        """ Loop over exposure pairs, then over amps
+
+        Both exposures of each pair are read only once, all the amps are
+        extracted from them, ISR-processed and analyzed before moving on
+        to the next pair.
+
+        The per-amp calibrations are extracted once up front and kept for
+        the whole loop.  analyzeAmpRunData is called for each amp after
+        all the pairs have been analyzed.
+
+        See `runAmpLoops` for parameters.
+        """
+        nAmps = len(amps)
+        numThreads = memoryPlan.numThreads
+        ampIndices = getAmpIndices(self.config.ampSubset, amps)
+        ampCalibsList = mapOverAmps(lambda iamp: extractAmpCalibs(amps[iamp], **kwargs), nAmps, numThreads,
+                                    ampIndices=ampIndices)
+        calibAmps = [None]*nAmps
+
+        def readExp(inputExp):
+            if all(isAmpCached(self, inputExp, amps[iamp], **kwargs) for iamp in ampIndices):
+                return None
+            with timeStage(timer, 'read'):
+                rawExp = inputExp.get()
+            if timer is not None:
+                timer.count('read', rawExp)
+            return rawExp
+
+        def readPair(inputPair):
+            if len(inputPair) != 2:
+                return None
+            return [(inputExp, readExp(inputExp)) for inputExp, _ in inputPair]
+
+        def calibratePair(pairRead):
+            if pairRead is None:
+                return None
+            return mapOverAmps(lambda iamp: [getCalibAmp(self, inputExp, iamp, amps, ampCalibsList[iamp],
+                                                         rawExp=rawExp, timer=timer, **kwargs)
+                                             for inputExp, rawExp in pairRead],
+                               nAmps, numThreads, ampIndices=ampIndices)
+
+        def analyzeAmpPair(iamp, calibPair, iPair):
+            calibExp1, calibExp2 = calibPair
+            amp2 = calibExp1.getDetector().getAmplifiers()[0]
+            with timeStage(timer, 'analyze'):
+                self.analyzeAmpPairData(calibExp1, calibExp2, outputData, amp2, iPair)
+            return amp2
+
+        for iPair, calibPairs in iterPipelined(self, inputPairs, readPair, calibratePair, timer=timer,
+                                               log=self.log.info):
+            if calibPairs is None:
+                self.log.warn("Length of pair %i = %i" % (iPair, len(inputPairs[iPair])))
+                continue
+            calibAmps = mapOverAmps(lambda iamp: analyzeAmpPair(iamp, calibPairs[iamp], iPair),
+                                    nAmps, numThreads, ampIndices=ampIndices)
+
+        def analyzeAmpRunData(iamp):
+            with timeStage(timer, 'ampRun'):
+                self.analyzeAmpRunData(outputData, iamp, calibAmps[iamp])
+
+        mapOverAmps(analyzeAmpRunData, nAmps, numThreads, ampIndices=ampIndices)
 
     def makeOutputData(self, **kwargs):
         raise NotImplementedError
@@ -542,6 +1962,9 @@ class EoAmpPairCalibTask(pipeBase.PipelineTask):
     def analyzeAmpPairData(self, calibExp1, calibExp2, outputData, amp, iPair):
         """ Analyze calibrated exposure pair for one amp
 
+        If `config.numThreads` > 1 this can be called for several amps at
+        once, so it should only write to the table for this amp.
+
         Parameter
         ---------
         calibExp1 : `lsst.afw.image.ExposureF`
@@ -556,13 +1979,18 @@ class EoAmpPairCalibTask(pipeBase.PipelineTask):
             Index for the exposure
         """
 
-    def analyzeAmpRunData(self, outputData, amp):
+    def analyzeAmpRunData(self, outputData, iamp, amp):
         """ Aggregate data from all exposures pairs for one amp
 
+        If `config.numThreads` > 1 this can be called for several amps at
+        once, so it should only write to row `iamp` of the per-amp tables.
+
         Parameter
         ---------
         outputData : `lsst.eotask_gen3.EoCalib`
             The output data container
+        iamp : `int`
+            Index for the amplifier
         amp : `lsst.afw.geom.AmplifierGeometry`
             The amplifier
         """
@@ -578,9 +2006,13 @@ class EoAmpPairCalibTask(pipeBase.PipelineTask):
 
 
 class EoDetExpCalibTaskConnections(pipeBase.PipelineTaskConnections,
-                                   dimensions=("instrument", "detector", "exposure")):
+                                   dimensions=("instrument", "detector")):
     """ Class snippet with connections needed to read raw data
-    and perform mininal Isr """
+    and perform mininal Isr
+
+    A quantum gets all the exposures of a detector, as the output only
+    has the detector dimensions and analyzeDetRunData combines them.
+    """
     camera = copyConnect(CAMERA_CONNECT)
     bias = copyConnect(BIAS_CONNECT)
     defects = copyConnect(DEFECTS_CONNECT)
@@ -593,6 +2025,8 @@ class EoDetExpCalibTaskConfig(pipeBase.PipelineTaskConfig,
                               pipelineConnections=EoDetExpCalibTaskConnections):
     """ Class snippet to use connections for stacked-calibrated exposure """
     isr = copyConfig(ISR_CONFIG)
+    numExpThreads = copyConfig(NUM_EXP_THREADS_CONFIG)
+    memoDir = copyConfig(MEMO_DIR_CONFIG)
 
 
 class EoDetExpCalibTask(pipeBase.PipelineTask):
@@ -601,9 +2035,12 @@ class EoDetExpCalibTask(pipeBase.PipelineTask):
     Implements three methods that can be overridden in sub-classes:
 
         1. makeOutputData (required, called once)
-        2. analyzeAmpRunData (optional, called for each amp)
-        3. analyzeDetRunData (optional, called once after all amps)
+        2. analyzeDetExpData (optional, called for each exposure)
+        3. analyzeDetRunData (optional, called once after all exposures)
 
+    If `config.numExpThreads` > 1 the exposures are read, ISR-processed
+    and analyzed by a pool of threads, analyzeDetRunData is called once
+    all of them are done.
     """
 
     ConfigClass = EoDetExpCalibTaskConfig
@@ -614,6 +2051,15 @@ class EoDetExpCalibTask(pipeBase.PipelineTask):
         super().__init__(**kwargs)
         self.makeSubtask("isr")
 
+    def runQuantum(self, butlerQC, inputRefs, outputRefs):
+        """ Run Quantum method
+
+        The outputs are reused if the same quantum was already run with
+        `config.memoDir` set, see `lsst.eotask_gen3.eoMemo`
+        """
+        runQuantumMemoized(self, butlerQC, inputRefs, outputRefs,
+                           lambda: self.run(**butlerQC.get(inputRefs)))
+
     def run(self, inputExps, **kwargs):  # pylint: disable=arguments-differ
         """ Run method
 
@@ -633,21 +2079,48 @@ class EoDetExpCalibTask(pipeBase.PipelineTask):
             Output data in formatted tables
         """
         camera = kwargs['camera']
-        # det = camera.get(inputExps[0].dataId['detector'])
-        det = inputExps[0].get().getDetector()
+        det = getDetector(inputExps[0], camera)
         outputData = self.makeOutputData(nExposure=len(inputExps), detector=det, camera=camera)
-        for iExp, inputExp in enumerate(inputExps):
-            calibExp = runIsrOnExp(self, inputExp.get(), **kwargs)
-            self.analyzeDetExpData(calibExp, outputData, iExp)
+        numThreads = min(self.config.numExpThreads, len(inputExps))
+        if numThreads <= 1:
+            for iExp, inputExp in enumerate(inputExps):
+                self.processExp(iExp, inputExp, outputData, **kwargs)
+        else:
+            with ThreadPoolExecutor(max_workers=numThreads) as pool:
+                futures = [pool.submit(self.processExp, iExp, inputExp, outputData, **kwargs)
+                           for iExp, inputExp in enumerate(inputExps)]
+            # Raise the first error, if any, once all the workers are done
+            for future in futures:
+                future.result()
         self.analyzeDetRunData(outputData)
         return pipeBase.Struct(outputData=outputData)
 
+    def processExp(self, iExp, inputExp, outputData, **kwargs):
+        """ Read, ISR-process and analyze one exposure
+
+        Parameters
+        ----------
+        iExp : `int`
+            Index for the exposure
+        inputExp : `lsst.daf.butler.DeferredDatasetHandle`
+            Handle for the input exposure
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+        """
+        calibExp = runIsrOnExp(self, inputExp.get(), **kwargs)
+        self.analyzeDetExpData(calibExp, outputData, iExp)
+
     def makeOutputData(self, **kwargs):
         raise NotImplementedError
 
     def analyzeDetExpData(self, calibExp, outputData, iExp):
         """ Analyze data from one ccd
 
+        If `config.numExpThreads` > 1 this can be called for several
+        exposures at once, so it must only write to row `iExp` of the
+        per-exposure tables of outputData, which are preallocated by
+        makeOutputData.
+
         Parameter
         ---------
         calibExp : `lsst.afw.image.ExposureF`
@@ -677,6 +2150,11 @@ class EoDetRunCalibTaskConfig(pipeBase.PipelineTaskConfig,
                               pipelineConnections=EoDetRunCalibTaskConnections):
     """ Class snippet to use connections for stacked-calibrated exposure """
 
+    quickLook = copyConfig(QUICK_LOOK_CONFIG)
+    quickLookFraction = copyConfig(QUICK_LOOK_FRACTION_CONFIG)
+    quickLookMode = copyConfig(QUICK_LOOK_MODE_CONFIG)
+    memoDir = copyConfig(MEMO_DIR_CONFIG)
+
 
 class EoDetRunCalibTask(pipeBase.PipelineTask):
     """ Class snippet for tasks that analyze a stacked image
@@ -691,6 +2169,20 @@ class EoDetRunCalibTask(pipeBase.PipelineTask):
     ConfigClass = EoDetRunCalibTaskConfig
     _DefaultName = "DoNotUse"
 
+    def __init__(self, **kwargs):
+        """ C'tor """
+        super().__init__(**kwargs)
+        self.quickLook = EoQuickLook.fromConfig(self.config)
+
+    def runQuantum(self, butlerQC, inputRefs, outputRefs):
+        """ Run Quantum method
+
+        The outputs are reused if the same quantum was already run with
+        `config.memoDir` set, see `lsst.eotask_gen3.eoMemo`
+        """
+        runQuantumMemoized(self, butlerQC, inputRefs, outputRefs,
+                           lambda: self.run(**butlerQC.get(inputRefs)))
+
     def makeOutputData(self, **kwargs):
         raise NotImplementedError
 
@@ -713,6 +2205,7 @@ class EoRunCalibTaskConnections(pipeBase.PipelineTaskConnections,
 class EoRunCalibTaskConfig(pipeBase.PipelineTaskConfig,
                            pipelineConnections=EoRunCalibTaskConnections):
     """ Class snippet to use connections for stacked-calibrated exposure """
+    memoDir = copyConfig(MEMO_DIR_CONFIG)
 
 
 class EoRunCalibTask(pipeBase.PipelineTask):
@@ -728,6 +2221,15 @@ class EoRunCalibTask(pipeBase.PipelineTask):
     ConfigClass = EoRunCalibTaskConfig
     _DefaultName = "DoNotUse"
 
+    def runQuantum(self, butlerQC, inputRefs, outputRefs):
+        """ Run Quantum method
+
+        The outputs are reused if the same quantum was already run with
+        `config.memoDir` set, see `lsst.eotask_gen3.eoMemo`
+        """
+        runQuantumMemoized(self, butlerQC, inputRefs, outputRefs,
+                           lambda: self.run(**butlerQC.get(inputRefs)))
+
     def run(self, **kwargs):  # pylint: disable=arguments-differ
         """ Run method
 
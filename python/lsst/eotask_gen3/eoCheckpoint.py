@@ -0,0 +1,142 @@
+""" Checkpoints of the per-amp results of a detector quantum
+
+When a task that loops over amps is interrupted, the amps that were
+finished can be reloaded from the checkpoint instead of recomputed.
+Checkpoints are keyed on the task class, its configuration and the
+dataset IDs of all its inputs, so that they are never reused for a
+different quantum or a different configuration.  The settings that only
+change how the task runs (number of threads, caches, ...) are left out
+of the key, so a job can be resumed with different ones.
+"""
+
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from lsst.utils.introspection import get_full_type_name
+
+from .eoCache import EoDiskCache, hashKey, hashConfig, getDatasetId
+from .eoCalibTable import EoCalibTableHandle
+
+__all__ = ["EoCheckpoint"]
+
+
+class EoCheckpoint:
+    """ On-disk checkpoint of the per-amp output tables of one quantum
+
+    For each finished amp, the 'ampExp_<amp>' table and row `iamp` of the
+    'amps' table are saved, i.e., the parts of the output that the amp
+    loops are allowed to write (see `mapOverAmps`).
+
+    Parameters
+    ----------
+    checkpointDir : `str`
+        The top-level checkpoint directory
+    key : `str`
+        The key identifying the quantum, used as sub-directory name
+    """
+
+    SEP = ":"
+
+    def __init__(self, checkpointDir, key):
+        """ C'tor,  Fills class parameters """
+        self._quantumDir = os.path.join(checkpointDir, key)
+        self._diskCache = EoDiskCache(self._quantumDir, sys.maxsize)
+
+    @classmethod
+    def fromTask(cls, task, inputHandles, calibKeys=None):
+        """ Build the checkpoint for a task and a set of inputs
+
+        Parameters
+        ----------
+        task : `lsst.pipe.base.PipelineTask`
+            The task, used for its class and `config`
+        inputHandles : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+            The input datasets, other than the calibrations
+        calibKeys : `dict` [`str`, `str`], optional
+            Dataset IDs of the calibrations, see `getCalibKeys`
+
+        Returns
+        -------
+        checkpoint : `EoCheckpoint` or `None`
+            The checkpoint, `None` if `config.checkpointDir` is not set
+            or if the inputs can not all be identified by a dataset ID
+        """
+        if not task.config.checkpointDir:
+            return None
+        inputIds = [getDatasetId(handle) for handle in inputHandles]
+        if None in inputIds:
+            task.log.warn("Not all inputs have a dataset ID, checkpointing is disabled")
+            return None
+        calibKeys = calibKeys if calibKeys is not None else {}
+        calibParts = ["%s=%s" % (name, calibId) for name, calibId in sorted(calibKeys.items())]
+        key = hashKey(get_full_type_name(task), hashConfig(task.config), *sorted(inputIds), *calibParts)
+        return cls(task.config.checkpointDir, key)
+
+    @property
+    def quantumDir(self):
+        """ Return the directory with the checkpoints of this quantum """
+        return self._quantumDir
+
+    def save(self, ampName, iamp, outputs):
+        """ Save the results for one amp
+
+        Parameters
+        ----------
+        ampName : `str`
+            The amplifier name
+        iamp : `int`
+            Index for the amplifier
+        outputs : `dict` [`str`, `lsst.eotask_gen3.EoCalib`]
+            The output data containers, keyed by a name unique to each
+        """
+        arrays = {}
+        for outputName, calib in outputs.items():
+            for table in calib.tables:
+                tableName = EoCalibTableHandle.findTableMeta(table, 'name')
+                if tableName == "ampExp_%s" % ampName:
+                    for col in table.itercols():
+                        arrays[self.SEP.join([outputName, tableName, col.name])] = np.asarray(col)
+                elif tableName == "amps":
+                    for col in table.itercols():
+                        arrays[self.SEP.join([outputName, tableName, col.name])] = np.asarray(col)[iamp]
+        self._diskCache.put(hashKey(ampName), arrays, dict(amp=ampName, iamp=iamp))
+
+    def load(self, ampName, iamp, outputs):
+        """ Reload the results for one amp, if they were saved
+
+        Parameters
+        ----------
+        ampName : `str`
+            The amplifier name
+        iamp : `int`
+            Index for the amplifier
+        outputs : `dict` [`str`, `lsst.eotask_gen3.EoCalib`]
+            The output data containers, filled in place
+
+        Returns
+        -------
+        loaded : `bool`
+            True if the results were found and loaded
+        """
+        arrays, meta = self._diskCache.get(hashKey(ampName))
+        if arrays is None or meta.get('amp') != ampName or meta.get('iamp') != iamp:
+            return False
+        tables = {}
+        for outputName, calib in outputs.items():
+            for table in calib.tables:
+                tables[(outputName, EoCalibTableHandle.findTableMeta(table, 'name'))] = table
+        for arrayName, array in arrays.items():
+            outputName, tableName, colName = arrayName.split(self.SEP)
+            column = tables[(outputName, tableName)][colName]
+            if tableName == "amps":
+                column[iamp] = array
+            else:
+                column[:] = array
+        return True
+
+    def remove(self):
+        """ Remove the checkpoints of this quantum """
+        shutil.rmtree(self._quantumDir, ignore_errors=True)
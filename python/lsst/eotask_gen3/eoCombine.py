@@ -9,9 +9,13 @@ from lsst.ip.isr import IsrTask, AssembleCcdTask
 
 from .eoCalibBase import CAMERA_CONNECT, BIAS_CONNECT, DARK_CONNECT, DEFECTS_PREREQ_CONNECT,\
     INPUT_RAW_AMPS_CONNECT, OUTPUT_IMAGE_CONNECT,\
-    copyConnect, runIsrOnAmp, extractAmpCalibs
+    MEMORY_BUDGET_CONFIG, AMP_CUBE_DIR_CONFIG, STAGE_TIMING_CONFIG, \
+    copyConnect, copyConfig, runIsrOnAmp, extractAmpCalibs, getDetector
 
+from .eoAmpCube import makeAmpCube
 from .eoDataSelection import EoDataSelection
+from .eoMemory import EoMemoryPlan
+from .eoStageTimer import EoStageTimer, timeStage
 
 
 class EoCombineCalibTaskConnections(pipeBase.PipelineTaskConnections,
@@ -81,6 +85,10 @@ class EoCombineCalibTaskConfig(pipeBase.PipelineTaskConfig,
         default="any"
     )
 
+    memoryBudget = copyConfig(MEMORY_BUDGET_CONFIG)
+    ampCubeDir = copyConfig(AMP_CUBE_DIR_CONFIG)
+    doStageTiming = copyConfig(STAGE_TIMING_CONFIG)
+
 
 class EoCombineCalibTask(pipeBase.PipelineTask):
     """ Class snippet for tasks that loop over amps, then over exposures
@@ -117,7 +125,8 @@ class EoCombineCalibTask(pipeBase.PipelineTask):
         ouptutRefs : `~lsst.pipe.base.connections.OutputQuantizedConnection`
             Output data refs to persist.
         """
-        inputRefs.inputExps = self.dataSelection.selectData(inputRefs.inputExps)
+        inputRefs.inputExps = self.dataSelection.selectData(inputRefs.inputExps,
+                                                            getattr(butlerQC, 'registry', None))
         inputs = butlerQC.get(inputRefs)
         outputs = self.run(**inputs)
         butlerQC.put(outputs, outputRefs)
@@ -145,8 +154,6 @@ class EoCombineCalibTask(pipeBase.PipelineTask):
         combined : `ExpsoureF`
             Stacked and assembled output
         """
-        # camera = kwargs['camera']
-        # det = camera.get(inputExps[0].dataId['detector'])
         ampDict = OrderedDict()
 
         stats = afwMath.StatisticsControl(self.config.clip, self.config.nIter,
@@ -156,28 +163,122 @@ class EoCombineCalibTask(pipeBase.PipelineTask):
             raise RuntimeError("No valid input data")
         if numExps < self.config.maxVisitsToCalcErrorFromInputVariance:
             stats.setCalcErrorFromInputVariance(True)
-        det = inputExps[0].get().getDetector()
+        det = getDetector(inputExps[0], kwargs.get('camera'))
+        memoryPlan = EoMemoryPlan.forStack(self.config, det.getAmplifiers(), numExps)
+        self.log.info("Memory plan: %s" % memoryPlan)
+        timer = EoStageTimer() if self.config.doStageTiming else None
 
         # for iamp, (amp, amp2) in enumerate(zip(det.getAmplifiers(),
         #     det2.getAmplifiers())):
         for iamp, amp in enumerate(det.getAmplifiers()):
-            toStack = []
             ampCalibs = extractAmpCalibs(amp, **kwargs)
-            for inputExp in inputExps:
-                calibExp = runIsrOnAmp(self, inputExp.get(parameters={"amp": iamp}), **ampCalibs)
-                toStack.append(calibExp.getMaskedImage())
             combined = afwImage.MaskedImageF(amp.getRawBBox())
             combinedExp = afwImage.makeExposure(combined)  # pylint: disable=no-member
             combineType = afwMath.stringToStatisticsProperty(self.config.combine)  # pylint: disable=no-member
-            afwMath.statisticsStack(combined, toStack, combineType, stats)  # pylint: disable=no-member
+            if memoryPlan.spill:
+                self.stackInChunks(combined, inputExps, iamp, ampCalibs, combineType, stats,
+                                   memoryPlan.chunkRows, timer)
+            else:
+                toStack = []
+                for inputExp in inputExps:
+                    calibExp = self.readCalibAmp(inputExp, iamp, ampCalibs, timer)
+                    toStack.append(calibExp.getMaskedImage())
+                with timeStage(timer, 'stack'):
+                    # pylint: disable=no-member
+                    afwMath.statisticsStack(combined, toStack, combineType, stats)
             combinedExp.setDetector(det)
             ampDict[amp.getName()] = combinedExp
-        outputImage = self.assembleCcd.assembleCcd(ampDict)  # pylint: disable=no-member
+        with timeStage(timer, 'assemble'):
+            outputImage = self.assembleCcd.assembleCcd(ampDict)  # pylint: disable=no-member
         # FIXME, this should be a method provided by ip_isr or cp_pipe
         # self.combineHeaders(inputExps, outputImage,
         #     calibType=self.config.calibrationType)
+        if timer is not None:
+            timer.record(self)
+        self.log.info(memoryPlan.report())
         return pipeBase.Struct(outputImage=outputImage)
 
+    def readCalibAmp(self, inputExp, iamp, ampCalibs, timer=None):
+        """ Read one amp of an exposure and run ISR on it
+
+        Parameters
+        ----------
+        inputExp : 'lsst.daf.butler.DeferredDatasetRef'
+            Used to retrieve the exposure
+        iamp : `int`
+            Index for the amplifier
+        ampCalibs : `dict`
+            The per-amp calibrations, from `extractAmpCalibs`
+        timer : `lsst.eotask_gen3.eoStageTimer.EoStageTimer`, optional
+            Used to time the reading and ISR stages
+
+        Returns
+        -------
+        calibExp : `lsst.afw.image.ExposureF`
+            The ISR-processed amp exposure
+        """
+        with timeStage(timer, 'read'):
+            ampExp = inputExp.get(parameters={"amp": iamp})
+        if timer is not None:
+            timer.count('read', ampExp)
+        with timeStage(timer, 'isr'):
+            return runIsrOnAmp(self, ampExp, **ampCalibs)
+
+    def stackInChunks(self, combined, inputExps, iamp, ampCalibs, combineType, stats, chunkRows,
+                      timer=None):
+        """ Stack one amp a few rows at a time
+
+        The ISR-processed images of the amp are written to memory-mapped
+        temporary files, and stacked in blocks of rows, so that only
+        one block of all the exposures needs to be in memory at once.
+        Since the stacking is done pixel by pixel this gives the same
+        result as stacking the full images.
+
+        Parameters
+        ----------
+        combined : `lsst.afw.image.MaskedImageF`
+            The output stacked image, filled in place
+        inputExps : `list` ['lsst.daf.butler.DeferredDatasetRef']
+            Used to retrieve the exposures
+        iamp : `int`
+            Index for the amplifier
+        ampCalibs : `dict`
+            The per-amp calibrations, from `extractAmpCalibs`
+        combineType : `lsst.afw.math.Property`
+            The statistic used to combine the images
+        stats : `lsst.afw.math.StatisticsControl`
+            Controls the combination
+        chunkRows : `int`
+            Number of rows stacked at once
+        timer : `lsst.eotask_gen3.eoStageTimer.EoStageTimer`, optional
+            Used to time the processing stages
+        """
+        nExp = len(inputExps)
+        shape = combined.image.array.shape
+        cubeDir = self.config.ampCubeDir or None
+        images = makeAmpCube(nExp, shape, 0, cubeDir)
+        masks = makeAmpCube(nExp, shape, 0, cubeDir, dtype=combined.mask.array.dtype)
+        variances = makeAmpCube(nExp, shape, 0, cubeDir)
+        for iExp, inputExp in enumerate(inputExps):
+            calibExp = self.readCalibAmp(inputExp, iamp, ampCalibs, timer)
+            calibImage = calibExp.getMaskedImage()
+            images[iExp] = calibImage.image.array
+            masks[iExp] = calibImage.mask.array
+            variances[iExp] = calibImage.variance.array
+            del calibExp, calibImage
+        for row0 in range(0, shape[0], chunkRows):
+            rows = slice(row0, min(row0 + chunkRows, shape[0]))
+            toStack = [afwImage.MaskedImageF(afwImage.ImageF(images[iExp, rows], deep=False),
+                                             afwImage.Mask(masks[iExp, rows], deep=False),
+                                             afwImage.ImageF(variances[iExp, rows], deep=False))
+                       for iExp in range(nExp)]
+            chunk = afwImage.MaskedImageF(toStack[0].getDimensions())
+            with timeStage(timer, 'stack'):
+                afwMath.statisticsStack(chunk, toStack, combineType, stats)  # pylint: disable=no-member
+            combined.image.array[rows] = chunk.image.array
+            combined.mask.array[rows] = chunk.mask.array
+            combined.variance.array[rows] = chunk.variance.array
+
 
 class EoCombineBiasTaskConnections(EoCombineCalibTaskConnections):
     """ Specialization for combining bias frames """
@@ -71,6 +71,13 @@ class EoCtiTask(EoDetRunCalibTask):
         outputData = self.makeOutputData(amps=ampNames, nAmp=nAmp, detector=det, camera=camera)
         for iamp, amp in enumerate(amps):
             self.analyzeAmpRunData(stackedCalExp, outputData, iamp, amp, **kwargs)
+        if self.quickLook is not None:
+            # The estimators already give the errors for the sampled pixels
+            outputTable = outputData.amps['amps']
+            pixelFraction = self.quickLook.columnFraction(amps[0].getRawDataBBox())
+            self.quickLook.record(self, outputData, pixelFraction,
+                                  errors=dict(ctiSerial=outputTable.ctiSerialError,
+                                              ctiParallel=outputTable.ctiParalleError))
         return pipeBase.Struct(outputData=outputData)
 
     def makeOutputData(self, amps, nAmp, **kwargs):
@@ -101,9 +108,14 @@ class EoCtiTask(EoDetRunCalibTask):
 
         This esimates the charge transfer inefficiency for the amplifier
         by looking at the overscan regions from the stacked flat exposures
+
+        In quick-look mode, only the sampled columns (rows) of the last
+        rows (columns) and of the overscans are used.
         """
-        ctiSerialEstim = estimateCti(detExposure, amp, 's', self.config.overscans, self.statCtrl)
-        ctiParallelEstim = estimateCti(detExposure, amp, 'p', self.config.overscans, self.statCtrl)
+        ctiSerialEstim = estimateCti(detExposure, amp, 's', self.config.overscans, self.statCtrl,
+                                     self.quickLook)
+        ctiParallelEstim = estimateCti(detExposure, amp, 'p', self.config.overscans, self.statCtrl,
+                                       self.quickLook)
 
         outputTable = outputData.amps['amps']
 
@@ -3,6 +3,7 @@
 
 import numpy as np
 
+import lsst.afw.image as afwImage
 import lsst.afw.math as afwMath
 import lsst.geom as lsstGeom
 
@@ -139,10 +140,12 @@ class Estimator:
 class SubImage:
     """Functor to produce sub-images depending on scan direction."""
 
-    def __init__(self, calibExp, amp, overscans, direction):
+    def __init__(self, calibExp, amp, overscans, direction, quickLook=None):
         self.imaging = amp.getBBox()
         self.image = calibExp
         self.amp = amp
+        self.quickLook = quickLook
+        self.direction = direction
         if direction == 'p':
             self._bbox = self._parallelBox
             llc = lsstGeom.Point2I(amp.getRawParallelOverscanBBox().getMinX(),
@@ -180,7 +183,15 @@ class SubImage:
         if end is None:
             end = start
         my_exp = self.image.Factory(self.image, self._bbox(start, end))
-        return my_exp
+        if self.quickLook is None:
+            return my_exp
+        # Only keep the sampled pixels along the row or column
+        array = my_exp.image.array
+        if self.direction == 'p':
+            array = array[:, self.quickLook.selectIndices(array.shape[1], self.quickLook.pixelFraction)]
+        else:
+            array = array[self.quickLook.selectIndices(array.shape[0], self.quickLook.pixelFraction), :]
+        return afwImage.ExposureF(afwImage.MaskedImageF(afwImage.ImageF(np.ascontiguousarray(array))))
 
     def _parallelBox(self, start, end):
         llc = lsstGeom.PointI(self.amp.getRawDataBBox().getMinX(), start)
@@ -193,9 +204,9 @@ class SubImage:
         return lsstGeom.BoxI(llc, urc)
 
 
-def estimateCti(calibExp, amp, direction, overscans, statCtrl):
+def estimateCti(calibExp, amp, direction, overscans, statCtrl, quickLook=None):
     nFrames = 10  # alibExp.meta['nFrames']
-    subimage = SubImage(calibExp, amp, overscans, direction)
+    subimage = SubImage(calibExp, amp, overscans, direction, quickLook)
     lastpix = subimage.lastpix
 
     # find signal in last image vector (i.e., row or column)
@@ -6,6 +6,7 @@ import lsst.pipe.base.connectionTypes as cT
 from .eoCalibBase import (EoDetRunCalibTaskConfig, EoDetRunCalibTaskConnections, EoDetRunCalibTask,
                           extractAmpImage)
 from .eoDarkCurrentData import EoDarkCurrentData
+from .eoQuickLook import sampleArray, quantileError
 
 __all__ = ["EoDarkCurrentTask", "EoDarkCurrentTaskConfig"]
 
@@ -60,9 +61,13 @@ class EoDarkCurrentTask(EoDetRunCalibTask):
         amps = det.getAmplifiers()
         nAmp = len(amps)
         outputData = self.makeOutputData(nAmp=nAmp, detector=det, camera=camera)
+        errors = None if self.quickLook is None else dict(darkCurrentMedian=[], darkCurrent95=[])
         for iAmp, amp in enumerate(amps):
             ampExposure = extractAmpImage(stackedCalExp, amp)
-            self.analyzeAmpRunData(ampExposure, outputData, iAmp, amp)
+            self.analyzeAmpRunData(ampExposure, outputData, iAmp, amp, errors=errors)
+        if self.quickLook is not None:
+            pixelFraction = self.quickLook.sampledFraction(ampExposure.image.array.shape)
+            self.quickLook.record(self, outputData, pixelFraction, errors=errors)
         return pipeBase.Struct(outputData=outputData)
 
     def makeOutputData(self, nAmp, **kwargs):  # pylint: disable=arguments-differ,no-self-use
@@ -82,13 +87,16 @@ class EoDarkCurrentTask(EoDetRunCalibTask):
         """
         return EoDarkCurrentData(nAmp=nAmp, **kwargs)
 
-    def analyzeAmpRunData(self, ampExposure, outputData, iAmp, amp, **kwargs):
+    def analyzeAmpRunData(self, ampExposure, outputData, iAmp, amp, errors=None, **kwargs):
         """Analyze data from a single amplifier for the run.
 
         See base class for argument description
 
         This just extract the median and 95% quantile of the signal per pixel
         from the stacked dark exposure
+
+        In quick-look mode, only the sampled pixels are used, and the
+        errors on the quantiles are added to errors.
         """
 
         try:
@@ -99,6 +107,10 @@ class EoDarkCurrentTask(EoDetRunCalibTask):
             except KeyError:
                 exptime = 1.
 
-        q50, q95 = np.quantile(ampExposure.image.array, [0.50, 0.95])
+        pixels = sampleArray(self.quickLook, ampExposure.image.array)
+        q50, q95 = np.quantile(pixels, [0.50, 0.95])
         outputData.amps['amps'].darkCurrentMedian[iAmp] = q50/exptime
         outputData.amps['amps'].darkCurrent95[iAmp] = q95/exptime
+        if errors is not None:
+            errors['darkCurrentMedian'].append(quantileError(pixels, 0.50)/exptime)
+            errors['darkCurrent95'].append(quantileError(pixels, 0.95)/exptime)
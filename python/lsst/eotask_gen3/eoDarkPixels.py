@@ -10,6 +10,7 @@ from lsst.ip.isr import Defects
 
 from .eoCalibBase import EoDetRunCalibTaskConfig, EoDetRunCalibTaskConnections, EoDetRunCalibTask
 from .eoDarkPixelsData import EoDarkPixelsData
+from .eoQuickLook import getColumnBoxes, countEstimate
 
 __all__ = ["EoDarkPixelTask", "EoDarkPixelTaskConfig"]
 
@@ -95,11 +96,21 @@ class EoDarkPixelTask(EoDetRunCalibTask):
         outputData = self.makeOutputData(nAmp=nAmp, detector=det, camera=camera)
         outputTable = outputData.amps['amps']
         fpMap = {}
+        errors = dict(nDarkPixel=[], nDarkColumn=[])
         for iamp, amp in enumerate(amps):
-            nDarkPixel, nDarkColumn, fpSet = self.findDarkPixels(stackedCalExp, amp, 1.)
-            fpMap[amp] = fpSet
+            nDarkPixel, nDarkColumn, footprints = self.findDarkPixels(stackedCalExp, amp, 1.)
+            fpMap[amp] = footprints
+            if self.quickLook is not None:
+                # Scale the counts in the sampled columns to the full amp
+                columnFraction = self.quickLook.columnFraction(amp.getBBox())
+                nDarkPixel, nDarkPixelError = countEstimate(nDarkPixel, columnFraction)
+                nDarkColumn, nDarkColumnError = countEstimate(nDarkColumn, columnFraction)
+                errors['nDarkPixel'].append(nDarkPixelError)
+                errors['nDarkColumn'].append(nDarkColumnError)
             outputTable.nDarkPixel[iamp] = nDarkPixel
             outputTable.nDarkColumn[iamp] = nDarkColumn
+        if self.quickLook is not None:
+            self.quickLook.record(self, outputData, columnFraction, errors=errors)
         fpCcd = self.mergeFootprints(fpMap)
         defects = Defects(defectList=fpCcd)
         return pipeBase.Struct(outputData=outputData, defects=defects)
@@ -139,8 +150,10 @@ class EoDarkPixelTask(EoDetRunCalibTask):
             The number of dark pixels
         nDarkCols : `int`
             The number of dark columns
-        fpSet : `lsst.afw.detection.FootprintSet`
+        footprints : `list` [`lsst.afw.detection.Footprint`]
             The footprints of the bad pixels
+
+        In quick-look mode, only the sampled bands of columns are searched.
         """
         try:
             exptime = stackedCalExp.getMetadata().toDict()['EXPTIME']
@@ -148,19 +161,25 @@ class EoDarkPixelTask(EoDetRunCalibTask):
             self.log.warn("Warning no EXPTIME: using 1.")
             exptime = 1.
 
-        ampImage = stackedCalExp[amp.getBBox()].image
-        median = afwMath.makeStatistics(ampImage, afwMath.MEDIAN, self.statCtrl).getValue()
+        bboxes = getColumnBoxes(self.quickLook, amp.getBBox())
+        if self.quickLook is None:
+            ampImage = stackedCalExp[amp.getBBox()].image
+            median = afwMath.makeStatistics(ampImage, afwMath.MEDIAN, self.statCtrl).getValue()
+        else:
+            median = np.nanmedian(np.hstack([stackedCalExp[bbox].image.array for bbox in bboxes]))
         threshold = afwDetect.Threshold((1. - self.config.thresh)*median*exptime)
-        invImage = ampImage.clone()
-        invImage *= -1.
-        invImage += median
-        fpSet = afwDetect.FootprintSet(invImage, threshold)
+        footprints = []
+        for bbox in bboxes:
+            invImage = stackedCalExp[bbox].image.clone()
+            invImage *= -1.
+            invImage += median
+            footprints += afwDetect.FootprintSet(invImage, threshold).getFootprints()
         #
         # Organize dark pixels by column.
         #
         # FIXME, vectorize this
         columns = dict()
-        for footprint in fpSet.getFootprints():
+        for footprint in footprints:
             for span in footprint.getSpans():
                 y = span.getY()
                 for x in range(span.getX0(), span.getX1()+1):
@@ -181,7 +200,7 @@ class EoDarkPixelTask(EoDetRunCalibTask):
             else:
                 darkPixs.extend([(x - x0, y - y0) for y in columns[x]])
 
-        return len(darkPixs), len(darkCols), fpSet
+        return len(darkPixs), len(darkCols), footprints
 
     @staticmethod
     def badColumn(columnIndices, threshold):
@@ -213,8 +232,8 @@ class EoDarkPixelTask(EoDetRunCalibTask):
     @staticmethod
     def mergeFootprints(fpMap):
         outList = []
-        for amp, fpSet in fpMap.items():
-            for fp in fpSet.getFootprints():
+        for amp, footprints in fpMap.items():
+            for fp in footprints:
                 detBBox = fp.getBBox()
                 # if amp.getFlipX():
                 #    minX = amp.getRawBBox().getX1() - bbox.getMaxX()
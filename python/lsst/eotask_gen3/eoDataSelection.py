@@ -1,9 +1,26 @@
 """ Data selections for EO Tasks
+
+A selection is either a set of cuts on the columns of the exposure
+dimension records (observation_type, observation_reason and a range of
+exposure_time), evaluated with numpy on all the input refs at once, or,
+for backwards compatibility, a function called on each input ref.
+
+For column selections the exposure records are collected once per
+exposure: from the dataIds when they are expanded, then from an
+`EoExposureIndex` if one is given, or else with a single registry query
+for all the missing exposures.
 """
 
 from collections import OrderedDict
+from operator import attrgetter
+
+import numpy as np
+
+__all__ = ["EoDataSelection", "makeExposureTable"]
 
-__all__ = ["EoDataSelection"]
+
+# Columns of the exposure records used by the column selections
+EXPOSURE_COLUMNS = ("observation_type", "observation_reason", "exposure_time")
 
 
 class EoDataSelection:
@@ -11,16 +28,37 @@ class EoDataSelection:
 
     Parameters
     ----------
+    doc : `str`
+        Description of the selection
     queryString : `str`
         The string used in the 'pipetask' -d query
-    selectionFunction : `function(expandedDataRef) -> bool`
-        A function that returns True for data to be used
+    selectionFunction : `function(expandedDataRef) -> bool`, optional
+        A function that returns True for data to be used, only used if
+        no column cut is given
+    observationType : `str`, optional
+        Required exposure.observation_type
+    observationReason : `str`, optional
+        Required exposure.observation_reason
+    exposureTimeRange : `tuple` [`float`], optional
+        Minimum (included) and maximum (excluded) exposure.exposure_time,
+        either can be `None`
+    includeMinExposureTime : `bool`
+        If False, the minimum exposure time is excluded
     """
     _selectionDict = OrderedDict()
 
-    def __init__(self, doc, queryString, selectionFunction):
+    def __init__(self, doc, queryString, selectionFunction=None, observationType=None,
+                 observationReason=None, exposureTimeRange=None, includeMinExposureTime=True):
         self._doc = doc
         self._queryString = queryString
+        self._columnCuts = OrderedDict()
+        if observationType is not None:
+            self._columnCuts['observation_type'] = observationType
+        if observationReason is not None:
+            self._columnCuts['observation_reason'] = observationReason
+        if exposureTimeRange is not None and exposureTimeRange != (None, None):
+            self._columnCuts['exposure_time'] = tuple(exposureTimeRange) + (includeMinExposureTime,)
+        self._isColumnSelection = selectionFunction is None
         self._selectionFunction = selectionFunction
 
     @property
@@ -31,14 +69,87 @@ class EoDataSelection:
     def queryString(self):
         return self._queryString
 
+    @property
+    def columnCuts(self):
+        """ The cuts on the exposure record columns, empty for function
+        selections and for selecting everything """
+        return self._columnCuts
+
     @property
     def selectionFunction(self):
+        """ A function that returns True for data to be used
+
+        For column selections, this evaluates the cuts on a single ref,
+        `selectData` or `selectMask` are much faster on many refs.
+        """
+        if self._isColumnSelection:
+            return lambda dataRef: bool(self.selectMask([dataRef])[0])
         return self._selectionFunction
 
-    def selectData(self, dataRefs):
-        """Select and return only those dataRefs passing the
-        selectionFunction"""
-        return [aDataRef for aDataRef in dataRefs if self._selectionFunction(aDataRef)]
+    def evaluate(self, table):
+        """ Evaluate the column cuts
+
+        Parameters
+        ----------
+        table : `dict` [`str`, `numpy.ndarray`]
+            The columns of the exposure records, one row per ref, see
+            `makeExposureTable`
+
+        Returns
+        -------
+        mask : `numpy.ndarray` [`bool`]
+            True for the refs passing the cuts
+        """
+        mask = np.ones(len(table['exposure']), dtype=bool)
+        for column, cut in self._columnCuts.items():
+            if column == 'exposure_time':
+                minTime, maxTime, includeMin = cut
+                if minTime is not None:
+                    mask &= (table[column] >= minTime) if includeMin else (table[column] > minTime)
+                if maxTime is not None:
+                    mask &= table[column] < maxTime
+            else:
+                mask &= table[column] == cut
+        return mask
+
+    def selectMask(self, dataRefs, registry=None, exposureIndex=None, exposureRecords=None):
+        """ Return True for the dataRefs passing the selection
+
+        Parameters
+        ----------
+        dataRefs : `list` [`lsst.daf.butler.DatasetRef`]
+            The refs, or deferred dataset handles
+        registry : `lsst.daf.butler.Registry`, optional
+            Used to fetch the exposure records the dataIds do not have,
+            in a single query
+        exposureIndex : `EoExposureIndex`, optional
+            Consulted for the exposure records the dataIds do not have,
+            before the registry
+        exposureRecords : `tuple`, optional
+            The records of the refs, as returned by
+            `collectExposureRecords`, used instead of collecting them if
+            they have all the columns of the cuts
+
+        Returns
+        -------
+        mask : `numpy.ndarray` [`bool`]
+            True for the selected refs
+        """
+        if not self._isColumnSelection:
+            return np.array([bool(self._selectionFunction(aDataRef)) for aDataRef in dataRefs], dtype=bool)
+        if not self._columnCuts:
+            return np.ones(len(dataRefs), dtype=bool)
+        # The cuts are evaluated once per exposure, then mapped to the refs
+        if exposureRecords is not None and all(column in exposureRecords[0] for column in self._columnCuts):
+            table, rows = exposureRecords
+        else:
+            table, rows = collectExposureRecords(dataRefs, registry, list(self._columnCuts), exposureIndex)
+        return self.evaluate(table)[rows]
+
+    def selectData(self, dataRefs, registry=None, exposureIndex=None):
+        """Select and return only those dataRefs passing the selection,
+        see `selectMask`"""
+        return [dataRefs[idx] for idx in np.flatnonzero(self.selectMask(dataRefs, registry, exposureIndex))]
 
     @classmethod
     def getSelection(cls, key):
@@ -48,11 +159,39 @@ class EoDataSelection:
     def addSelection(cls, key, doc, queryString, selectionFunction):
         cls._selectionDict[key] = cls(doc, queryString, selectionFunction)
 
+    @classmethod
+    def addColumnSelection(cls, key, doc, observationType=None, observationReason=None,
+                           minExposureTime=None, maxExposureTime=None, includeMinExposureTime=True):
+        """ Add a selection defined by cuts on the exposure record
+        columns, the query string is built from the cuts """
+        cls._selectionDict[key] = cls(doc, makeQueryString(observationType, observationReason,
+                                                           minExposureTime, maxExposureTime,
+                                                           includeMinExposureTime),
+                                      observationType=observationType, observationReason=observationReason,
+                                      exposureTimeRange=(minExposureTime, maxExposureTime),
+                                      includeMinExposureTime=includeMinExposureTime)
+
     @classmethod
     def choiceDict(cls):
         return {key: val.doc for key, val in cls._selectionDict.items()}
 
 
+def makeQueryString(observationType=None, observationReason=None, minExposureTime=None,
+                    maxExposureTime=None, includeMinExposureTime=True):
+    """ Return the 'pipetask' -d query matching column cuts """
+    terms = []
+    if observationType is not None:
+        terms.append("exposure.observation_type = '%s'" % observationType)
+    if observationReason is not None:
+        terms.append("exposure.observation_reason = '%s'" % observationReason)
+    if minExposureTime is not None:
+        terms.append("exposure.exposure_time %s %r" % (">=" if includeMinExposureTime else ">",
+                                                       float(minExposureTime)))
+    if maxExposureTime is not None:
+        terms.append("exposure.exposure_time < %r" % float(maxExposureTime))
+    return " AND ".join(terms)
+
+
 def getRef(refOrDeferred):
     try:
         return refOrDeferred.datasetRef
@@ -60,6 +199,116 @@ def getRef(refOrDeferred):
         return refOrDeferred
 
 
+def getDataId(dataRef):
+    """ Return the dataId of a ref or of a deferred dataset handle """
+    return getattr(dataRef, 'datasetRef', dataRef).dataId
+
+
+def getExposureRecord(dataId):
+    """ Return the exposure record of a dataId, `None` if it is not
+    expanded """
+    hasRecords = getattr(dataId, 'hasRecords', None)
+    if hasRecords is not None and not hasRecords():
+        return None
+    try:
+        return dataId.records["exposure"]
+    except (AttributeError, KeyError):
+        return None
+
+
+def fetchExposureRecords(registry, instrument, expIds):
+    """ Query the exposure records of several exposures at once
+
+    Returns
+    -------
+    records : `dict` [`int`, `lsst.daf.butler.DimensionRecord`]
+        The records, by exposure ID
+    """
+    where = "exposure IN (%s)" % ", ".join("%i" % expId for expId in sorted(expIds))
+    records = registry.queryDimensionRecords("exposure", where=where, instrument=instrument)
+    return {record.id: record for record in records}
+
+
+def collectExposureRecords(dataRefs, registry=None, columns=EXPOSURE_COLUMNS, exposureIndex=None):
+    """ Collect the exposure records of refs into columns, with one row
+    per exposure
+
+    See `makeExposureTable` for the parameters.
+
+    Returns
+    -------
+    table : `dict` [`str`, `numpy.ndarray`]
+        The 'exposure' ID and the requested columns, one row per
+        exposure, sorted by exposure ID
+    rows : `numpy.ndarray` [`int`]
+        The row of each ref in the table
+    """
+    dataIds = [getDataId(aDataRef) for aDataRef in dataRefs]
+    expIds = np.array([dataId['exposure'] for dataId in dataIds], dtype=np.int64)
+    uniqueIds, firstIndex, rows = np.unique(expIds, return_index=True, return_inverse=True)
+    records = [getExposureRecord(dataIds[idx]) for idx in firstIndex]
+    missing = [iRow for iRow, record in enumerate(records) if record is None]
+    if missing and exposureIndex is not None:
+        for iRow in missing:
+            records[iRow] = exposureIndex.getRecord(dataIds[firstIndex[iRow]]['instrument'], uniqueIds[iRow])
+        missing = [iRow for iRow in missing if records[iRow] is None]
+    if missing and registry is not None:
+        byInstrument = {}
+        for iRow in missing:
+            byInstrument.setdefault(dataIds[firstIndex[iRow]]['instrument'], []).append(iRow)
+        for instrument, instRows in byInstrument.items():
+            fetched = fetchExposureRecords(registry, instrument, [uniqueIds[iRow] for iRow in instRows])
+            for iRow in instRows:
+                records[iRow] = fetched.get(uniqueIds[iRow])
+        missing = [iRow for iRow in missing if records[iRow] is None]
+    if missing:
+        raise ValueError("No exposure record for exposure(s) %s, the dataIds are not expanded and %s" %
+                         (uniqueIds[missing].tolist(), "they are not in the registry"
+                          if registry is not None else "no registry was given"))
+    table = dict(exposure=uniqueIds)
+    if columns:
+        columnValues = zip(*map(attrgetter(*columns), records)) if len(columns) > 1 else \
+            [list(map(attrgetter(columns[0]), records))]
+        for column, values in zip(columns, columnValues):
+            table[column] = np.array(values)
+    return table, rows.reshape(-1)
+
+
+def makeExposureTable(dataRefs, registry=None, columns=EXPOSURE_COLUMNS, exposureIndex=None):
+    """ Collect the exposure records of refs into columns
+
+    Each exposure record is read once, even if several refs, e.g., of
+    several detectors, share the exposure.
+
+    Parameters
+    ----------
+    dataRefs : `list` [`lsst.daf.butler.DatasetRef`]
+        The refs, or deferred dataset handles
+    registry : `lsst.daf.butler.Registry`, optional
+        Used to fetch, in a single query, the records of the exposures
+        whose dataIds are not expanded
+    columns : `list` [`str`]
+        The columns of the exposure records to collect
+    exposureIndex : `EoExposureIndex`, optional
+        Consulted for the exposure records the dataIds do not have,
+        before the registry
+
+    Returns
+    -------
+    table : `dict` [`str`, `numpy.ndarray`]
+        The 'exposure' ID and the requested columns, one row per ref
+
+    Raises
+    ------
+    ValueError : Some records are not in the dataIds and no registry is
+        given, or they are not in the registry
+    """
+    table, rows = collectExposureRecords(dataRefs, registry, columns, exposureIndex)
+    return {column: values[rows] for column, values in table.items()}
+
+
+# Per-ref selection functions, kept for backwards compatibility, the
+# selections registered below use the equivalent column cuts
 def eoSelectAny(deferredDatasetRef):
     """Always returns True"""
     return True
@@ -154,51 +403,41 @@ def eoSelectFe55Flat(deferredDatasetRef):
         and exposure.observation_reason == 'fe55'
 
 
-EoDataSelection.addSelection("any",
-                             "Select all exposures",
-                             "",
-                             eoSelectAny)
-EoDataSelection.addSelection("anyBias",
-                             "Select all bias exposures",
-                             "exposure.observation_type = 'bias'",
-                             eoSelectAnyBias)
-EoDataSelection.addSelection("biasBias",
-                             "Select bias exposures from bias acquistions",
-                             "exposure.observation_type = 'bias' AND exposure.observation_reason = 'bias'",  # noqa
-                             eoSelectBiasBias)
-EoDataSelection.addSelection("botPersistenceBias",
-                             "Select bias exposures from bot_persistence acquistions",
-                             "exposure.observation_type = 'bias' AND exposure.observation_reason = 'bot_persistence'",  # noqa
-                             eoSelectBotPersistanceBias)
-EoDataSelection.addSelection("fe55Bias",
-                             "Select bias exposures from Fe55 acquistions",
-                             "exposure.observation_type = 'bias' AND exposure.observation_reason = 'fe55_flat'",  # noqa
-                             eoSelectFe55Bias)
-EoDataSelection.addSelection("darkDark",
-                             "Select dark exposures from dark acquistions",
-                             "exposure.observation_type = 'dark' AND exposure.observation_reason = 'dark'",  # noqa
-                             eoSelectDarkDark)
-EoDataSelection.addSelection("botPersistenceDark",
-                             "Select dark exposures from bot_persistence acquistions",
-                             "exposure.observation_type = 'dark' AND exposure.observation_reason = 'bot_persistence'",  # noqa
-                             eoSelectBotPersistenceDark)
-EoDataSelection.addSelection("flatFlat",
-                             "Select flat exposures from flat pair acquistions",
-                             "exposure.observation_type = 'flat' AND exposure.observation_reason = 'flat'",  # noqa
-                             eoSelectFlatFlat)
-EoDataSelection.addSelection("anySuperFlat",
-                             "Select flat exposures from any superflat acquistions",
-                             "exposure.observation_type = 'flat' AND exposure.observation_reason = 'sflat'",  # noqa
-                             eoSelectAnySuperFlat)
-EoDataSelection.addSelection("superFlatLow",
-                             "Select flat exposures from low-intensity superflat acquistions",
-                             "exposure.observation_type = 'flat' AND exposure.observation_reason = 'sflat' AND exposure.exposure_time < 30.",  # noqa
-                             eoSelectSuperFlatLow)
-EoDataSelection.addSelection("superFlatHigh",
-                             "Select flat exposures from high-intensity superflat acquistions",
-                             "exposure.observation_type = 'flat' AND exposure.observation_reason = 'sflat' AND exposure.exposure_time >= 30.",  # noqa
-                             eoSelectSuperFlatHigh)
-EoDataSelection.addSelection("fe55Flat",
-                             "Select fe55 exposures acquistions",
-                             "exposure.observation_type = 'fe55_flat' AND exposure.observation_reason = 'fe55'",  # noqa
-                             eoSelectFe55Flat)
+EoDataSelection.addColumnSelection("any",
+                                   "Select all exposures")
+EoDataSelection.addColumnSelection("anyBias",
+                                   "Select all bias exposures",
+                                   observationType='bias')
+EoDataSelection.addColumnSelection("biasBias",
+                                   "Select bias exposures from bias acquistions",
+                                   observationType='bias', observationReason='bias')
+EoDataSelection.addColumnSelection("botPersistenceBias",
+                                   "Select bias exposures from bot_persistence acquistions",
+                                   observationType='bias', observationReason='bot_persistence')
+EoDataSelection.addColumnSelection("fe55Bias",
+                                   "Select bias exposures from Fe55 acquistions",
+                                   observationType='bias', observationReason='fe55_flat')
+EoDataSelection.addColumnSelection("darkDark",
+                                   "Select dark exposures from dark acquistions",
+                                   observationType='dark', observationReason='dark')
+EoDataSelection.addColumnSelection("botPersistenceDark",
+                                   "Select dark exposures from bot_persistence acquistions",
+                                   observationType='dark', observationReason='bot_persistence')
+EoDataSelection.addColumnSelection("flatFlat",
+                                   "Select flat exposures from flat pair acquistions",
+                                   observationType='flat', observationReason='flat')
+EoDataSelection.addColumnSelection("anySuperFlat",
+                                   "Select flat exposures from any superflat acquistions",
+                                   observationType='flat', observationReason='sflat')
+EoDataSelection.addColumnSelection("superFlatLow",
+                                   "Select flat exposures from low-intensity superflat acquistions",
+                                   observationType='flat', observationReason='sflat', maxExposureTime=30.)
+# Exposures of exactly 30 s are neither low nor high superflats, as with
+# eoSelectSuperFlatLow and eoSelectSuperFlatHigh
+EoDataSelection.addColumnSelection("superFlatHigh",
+                                   "Select flat exposures from high-intensity superflat acquistions",
+                                   observationType='flat', observationReason='sflat', minExposureTime=30.,
+                                   includeMinExposureTime=False)
+EoDataSelection.addColumnSelection("fe55Flat",
+                                   "Select fe55 exposures acquistions",
+                                   observationType='fe55_flat', observationReason='fe55')
@@ -0,0 +1,260 @@
+""" Persistent index of the exposure metadata of collections
+
+The exposure records of the raws of a collection (observation type and
+reason, exposure time, day_obs, seq_num, ...) are fetched with a single
+registry query and stored in a small SQLite file, one per collection, in
+an index directory.  `EoDataSelection` can then look them up locally,
+rather than querying the registry in every quantum and every rerun.
+The index only replaces registry queries, it does not change which
+exposures are selected or how flats are paired.
+
+Each file stores a fingerprint of the collection, a hash of the IDs of
+the exposures with raws in it.  `EoExposureIndex.load` checks it against
+the registry and rebuilds the file when the collection changed, e.g.,
+when exposures were associated to it.  Exposure records do not change
+once ingested, so an index that is out of date only lacks exposures;
+lookups of those fall back to the registry.
+
+`bin/eoExposureIndex.py` prebuilds the index of a set of collections.
+"""
+
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from collections import namedtuple
+
+from .eoCache import hashKey
+
+__all__ = ["EoExposureIndex", "ExposureRow", "collectionFingerprint"]
+
+
+# Columns of the index, the name of the exposure ID is 'id' as in the
+# exposure dimension records
+INDEX_COLUMNS = (("id", "INTEGER"), ("instrument", "TEXT"), ("observation_type", "TEXT"),
+                 ("observation_reason", "TEXT"), ("exposure_time", "REAL"), ("day_obs", "INTEGER"),
+                 ("seq_num", "INTEGER"), ("science_program", "TEXT"))
+
+# Row of the index, with the same attributes as an exposure record
+ExposureRow = namedtuple("ExposureRow", [name for name, _ in INDEX_COLUMNS])
+
+INDEX_SUFFIX = ".sqlite"
+
+# Bumped when the layout of the files changes, older files are rebuilt
+INDEX_VERSION = 1
+
+
+def collectionFingerprint(expKeys, collection, datasetType):
+    """ Return the fingerprint of a collection
+
+    Parameters
+    ----------
+    expKeys : `list` [`tuple` [`str`, `int`]]
+        The (instrument, exposure ID) of the exposures in the collection
+    collection : `str`
+        The collection name
+    datasetType : `str`
+        The dataset type the exposures were selected with
+
+    Returns
+    -------
+    fingerprint : `str`
+        The sha256 hex digest
+    """
+    return hashKey(INDEX_VERSION, collection, datasetType,
+                   *["%s:%i" % (instrument, expId) for instrument, expId in sorted(set(expKeys))])
+
+
+class EoExposureIndex:
+    """ Exposure metadata of one or more collections, held in memory
+
+    Parameters
+    ----------
+    rows : `list` [`ExposureRow`]
+        The exposures
+    info : `dict` [`str`, `str`], optional
+        The 'collection', 'datasetType', 'fingerprint', 'version' and
+        'created' time of the index file it was read from
+    """
+
+    def __init__(self, rows, info=None):
+        """ C'tor,  Fills class parameters """
+        self._rows = {(row.instrument, row.id): row for row in rows}
+        self._info = dict(info or {})
+
+    @property
+    def info(self):
+        """ Return the description of the index file """
+        return self._info
+
+    def __len__(self):
+        return len(self._rows)
+
+    def rows(self):
+        """ Return all the exposures, sorted by instrument and ID """
+        return [self._rows[key] for key in sorted(self._rows)]
+
+    def getRecord(self, instrument, expId):
+        """ Return the metadata of an exposure, `None` if it is not in the
+        index """
+        return self._rows.get((instrument, int(expId)))
+
+    @staticmethod
+    def path(indexDir, collection):
+        """ Return the path to the index file of a collection
+
+        The file name is the collection name, with unsafe characters
+        replaced, and a short hash that keeps names distinct.
+        """
+        safeName = re.sub(r"[^A-Za-z0-9_.-]", "_", collection)
+        return os.path.join(indexDir, "%s-%s%s" % (safeName, hashKey(collection)[:8], INDEX_SUFFIX))
+
+    @classmethod
+    def read(cls, path):
+        """ Read an index file """
+        connection = sqlite3.connect(path)
+        try:
+            info = dict(connection.execute("SELECT key, value FROM info"))
+            rows = [ExposureRow(*values) for values in connection.execute(
+                "SELECT %s FROM exposures" % ", ".join(name for name, _ in INDEX_COLUMNS))]
+        finally:
+            connection.close()
+        return cls(rows, info)
+
+    def write(self, path):
+        """ Write the index to a file, atomically """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        os.close(fd)
+        try:
+            connection = sqlite3.connect(tmpPath)
+            try:
+                with connection:
+                    connection.execute("CREATE TABLE info (key TEXT PRIMARY KEY, value TEXT)")
+                    connection.execute("CREATE TABLE exposures (%s, PRIMARY KEY (instrument, id))" %
+                                       ", ".join("%s %s" % column for column in INDEX_COLUMNS))
+                    connection.executemany("INSERT INTO info VALUES (?, ?)",
+                                           [(key, str(value)) for key, value in self._info.items()])
+                    connection.executemany("INSERT INTO exposures VALUES (%s)" %
+                                           ", ".join("?"*len(INDEX_COLUMNS)), self.rows())
+            finally:
+                connection.close()
+            os.replace(tmpPath, path)
+        except BaseException:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
+
+    @classmethod
+    def build(cls, registry, collection, datasetType="raw", **kwargs):
+        """ Build the index of a collection with a single registry query
+
+        Parameters
+        ----------
+        registry : `lsst.daf.butler.Registry`
+            The registry
+        collection : `str`
+            The collection
+        datasetType : `str`
+            Only the exposures with datasets of this type are indexed
+        kwargs
+            Passed to `queryDimensionRecords`, e.g., instrument='LSSTCam'
+
+        Returns
+        -------
+        index : `EoExposureIndex`
+            The index
+        """
+        records = registry.queryDimensionRecords("exposure", datasets=datasetType, collections=collection,
+                                                 **kwargs)
+        rows = [ExposureRow(*[getattr(record, name, None) for name, _ in INDEX_COLUMNS])
+                for record in records]
+        info = dict(collection=collection, datasetType=datasetType, version=INDEX_VERSION,
+                    created=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    fingerprint=collectionFingerprint([(row.instrument, row.id) for row in rows],
+                                                      collection, datasetType))
+        return cls(rows, info)
+
+    @staticmethod
+    def queryFingerprint(registry, collection, datasetType="raw", **kwargs):
+        """ Return the current fingerprint of a collection, this only
+        queries the exposure IDs """
+        dataIds = registry.queryDataIds(["exposure"], datasets=datasetType, collections=collection,
+                                        **kwargs)
+        return collectionFingerprint([(dataId['instrument'], dataId['exposure']) for dataId in dataIds],
+                                     collection, datasetType)
+
+    def isValid(self, registry, **kwargs):
+        """ Return True if the collection of the index did not change """
+        return self._info.get('fingerprint') == self.queryFingerprint(
+            registry, self._info.get('collection'), self._info.get('datasetType', "raw"), **kwargs)
+
+    @classmethod
+    def load(cls, indexDir, collection, registry=None, datasetType="raw", rebuild=False, **kwargs):
+        """ Read the index of a collection, building it if needed
+
+        Parameters
+        ----------
+        indexDir : `str`
+            The index directory
+        collection : `str`
+            The collection
+        registry : `lsst.daf.butler.Registry`, optional
+            Used to check that the index is up to date, and to build it
+            if it is not, or if it does not exist
+        datasetType : `str`
+            Only the exposures with datasets of this type are indexed
+        rebuild : `bool`
+            Rebuild the index even if it is up to date
+        kwargs
+            Passed to the registry queries, e.g., instrument='LSSTCam'
+
+        Returns
+        -------
+        index : `EoExposureIndex` or `None`
+            The index, `None` if it does not exist and no registry is
+            given
+        """
+        path = cls.path(indexDir, collection)
+        index = None
+        if os.path.exists(path) and not rebuild:
+            try:
+                index = cls.read(path)
+            except sqlite3.DatabaseError:
+                index = None
+        if registry is None:
+            return index
+        if index is not None and index.info.get('version') == str(INDEX_VERSION) and \
+                index.info.get('datasetType') == datasetType and index.isValid(registry, **kwargs):
+            return index
+        index = cls.build(registry, collection, datasetType, **kwargs)
+        index.write(path)
+        return index
+
+    @classmethod
+    def fromDirectory(cls, indexDir):
+        """ Read and merge all the index files in a directory """
+        rows = []
+        for fileName in sorted(os.listdir(indexDir)):
+            if fileName.endswith(INDEX_SUFFIX):
+                rows += cls.read(os.path.join(indexDir, fileName)).rows()
+        return cls(rows, dict(indexDir=indexDir))
+
+    @classmethod
+    def fromConfig(cls, config):
+        """ Read the indices of `config.exposureIndexDir`, `None` if it is
+        not set or does not exist """
+        indexDir = getattr(config, 'exposureIndexDir', "")
+        if not indexDir or not os.path.isdir(indexDir):
+            return None
+        return cls.fromDirectory(indexDir)
+
+    def summary(self):
+        """ Return the number of exposures of each (observation_type,
+        observation_reason) """
+        counts = {}
+        for row in self._rows.values():
+            key = (row.observation_type, row.observation_reason)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
@@ -0,0 +1,268 @@
+""" Numpy implementation of the reduced ISR used by EO tasks
+
+The EO tasks turn off almost all of `lsst.ip.isr.IsrTask`, leaving only
+overscan, bias and dark subtraction (and saturation masking for the
+combine tasks).  `EoFastIsrTask` does those steps directly on the numpy
+arrays of the exposure, and falls back to `IsrTask` for anything else.
+
+To use it, retarget the `isr` sub-task of an EO task, e.g.::
+
+    from lsst.eotask_gen3.eoFastIsr import EoFastIsrTask
+    config.isr.retarget(EoFastIsrTask)
+
+All the existing `isr` configuration settings keep working.
+"""
+
+import math
+
+import numpy as np
+
+import lsst.pex.config as pexConfig
+import lsst.pipe.base as pipeBase
+from lsst.ip.isr import IsrTask, IsrTaskConfig
+
+__all__ = ["EoFastIsrTask", "EoFastIsrTaskConfig"]
+
+
+# IsrTask steps that are not implemented by EoFastIsrTask,
+# if any of these are turned on the task falls back to IsrTask
+FAST_ISR_UNSUPPORTED = ('doSuspect', 'doSetBadRegions', 'doAssembleCcd', 'doTrimToMatchCalib',
+                        'doLinearize', 'doCrosstalk', 'doBrighterFatter', 'doDefect', 'doNanMasking',
+                        'doWidenSaturationTrails', 'doSaturationInterpolation', 'doInterpolate',
+                        'doFlat', 'doFringe', 'doApplyGains', 'doEmpiricalReadNoise', 'doStrayLight',
+                        'doIlluminationCorrection', 'doVignette', 'doAttachTransmissionCurve',
+                        'doCameraSpecificMasking', 'doMeasureBackground', 'doDeferredCharge',
+                        'doAmpOffset', 'doBiasBeforeOverscan', 'doParallelOverscan')
+
+FAST_ISR_FIT_TYPES = ('MEAN', 'MEDIAN', 'MEAN_PER_ROW', 'MEDIAN_PER_ROW')
+
+
+def getOverscanConfig(config):
+    """ Return the overscan fit type and the number of leading and
+    trailing columns to skip, for both the old and new `IsrTaskConfig`
+    layouts """
+    overscan = getattr(config, 'overscan', None)
+    if overscan is not None and hasattr(overscan, 'fitType'):
+        return (overscan.fitType, getattr(overscan, 'leadingColumnsToSkip', 0),
+                getattr(overscan, 'trailingColumnsToSkip', 0))
+    return (config.overscanFitType, getattr(config, 'overscanNumLeadingColumnsToSkip', 0),
+            getattr(config, 'overscanNumTrailingColumnsToSkip', 0))
+
+
+def bboxSlices(bbox, xy0):
+    """ Return the numpy slices of a bounding box in an image at xy0 """
+    return (slice(bbox.getMinY() - xy0.getY(), bbox.getMaxY() + 1 - xy0.getY()),
+            slice(bbox.getMinX() - xy0.getX(), bbox.getMaxX() + 1 - xy0.getX()))
+
+
+def getDarkTime(exposure):
+    """ Return the dark time of an exposure, 1 if it is not known """
+    visitInfo = exposure.getInfo().getVisitInfo()
+    if visitInfo is None:
+        return 1.
+    return visitInfo.getDarkTime()
+
+
+class EoFastIsrTaskConfig(IsrTaskConfig):
+    """ Same as `lsst.ip.isr.IsrTaskConfig`, with a switch to turn off the
+    numpy implementation """
+
+    doFastPath = pexConfig.Field("Use the numpy implementation when all the enabled steps are supported",
+                                 bool, default=True)
+
+
+class EoFastIsrTask(IsrTask):
+    """ Reduced ISR for EO tasks, done with numpy
+
+    Implements, in the same order and with the same conventions as
+    `lsst.ip.isr.IsrTask`:
+
+        1. conversion to float (doConvertIntToFloat)
+        2. saturation masking (doSaturation)
+        3. serial overscan subtraction (doOverscan), with fit types
+           MEAN, MEDIAN, MEAN_PER_ROW and MEDIAN_PER_ROW
+        4. bias subtraction (doBias)
+        5. variance from the amplifier gain and read noise (doVariance)
+        6. dark subtraction, scaled by dark time (doDark)
+
+    If any other step is turned on, or the calibrations do not match the
+    exposure, `IsrTask.run` is used instead.
+    """
+
+    ConfigClass = EoFastIsrTaskConfig
+    _DefaultName = "eoFastIsr"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._unsupported = self.findUnsupported()
+
+    def findUnsupported(self):
+        """ Return the list of enabled steps that the numpy
+        implementation does not support """
+        unsupported = [flag for flag in FAST_ISR_UNSUPPORTED if getattr(self.config, flag, False)]
+        if self.config.doOverscan:
+            fitType = getOverscanConfig(self.config)[0]
+            if fitType not in FAST_ISR_FIT_TYPES:
+                unsupported.append("overscan fitType=%s" % fitType)
+            if getattr(self.config, 'overscanBiasJump', False):
+                unsupported.append('overscanBiasJump')
+        return unsupported
+
+    def run(self, ccdExposure, **kwargs):  # pylint: disable=arguments-differ
+        """ Run method
+
+        Parameters
+        ----------
+        ccdExposure : `lsst.afw.image.Exposure`
+            The raw exposure, for one amp or for the full detector
+
+        Keywords are the same as for `lsst.ip.isr.IsrTask.run`, only
+        bias and dark are used by the numpy implementation
+
+        Returns
+        -------
+        result : `lsst.pipe.base.Struct`
+            exposure : `lsst.afw.image.Exposure`
+                The ISR-processed exposure
+        """
+        bias = kwargs.get('bias', None)
+        dark = kwargs.get('dark', None)
+        if not self.useFastPath(ccdExposure, bias, dark):
+            return super().run(ccdExposure, **kwargs)
+        return pipeBase.Struct(exposure=self.runFast(ccdExposure, bias, dark))
+
+    def useFastPath(self, ccdExposure, bias, dark):
+        """ Check if the numpy implementation can be used """
+        if not self.config.doFastPath or self._unsupported:
+            return False
+        if ccdExposure.getDetector() is None:
+            return False
+        for doCalib, calib in [(self.config.doBias, bias), (self.config.doDark, dark)]:
+            if doCalib and (calib is None or calib.getBBox() != ccdExposure.getBBox()):
+                return False
+        return True
+
+    def runFast(self, ccdExposure, bias=None, dark=None):
+        """ Do the reduced ISR with numpy
+
+        Parameters
+        ----------
+        ccdExposure : `lsst.afw.image.Exposure`
+            The raw exposure
+        bias : `lsst.afw.image.Exposure`, optional
+            The bias frame, with the same bounding box as ccdExposure
+        dark : `lsst.afw.image.Exposure`, optional
+            The dark frame, with the same bounding box as ccdExposure
+
+        Returns
+        -------
+        exposure : `lsst.afw.image.ExposureF`
+            The ISR-processed exposure
+        """
+        if self.config.doConvertIntToFloat:
+            ccdExposure = self.convertIntToFloat(ccdExposure)
+        maskedImage = ccdExposure.getMaskedImage()
+        image = maskedImage.image.array
+        mask = maskedImage.mask.array
+        variance = maskedImage.variance.array
+        expBBox = ccdExposure.getBBox()
+        xy0 = ccdExposure.getXY0()
+        amps = [amp for amp in ccdExposure.getDetector().getAmplifiers()
+                if expBBox.contains(amp.getRawBBox())]
+
+        if self.config.doSaturation:
+            satBit = maskedImage.mask.getPlaneBitMask(self.config.saturatedMaskName)
+            for amp in amps:
+                saturation = amp.getSaturation()
+                if math.isnan(saturation):
+                    continue
+                ampSlices = bboxSlices(amp.getRawBBox(), xy0)
+                mask[ampSlices][image[ampSlices] >= saturation] |= satBit
+
+        if self.config.doOverscan:
+            satBit = maskedImage.mask.getPlaneBitMask("SAT")
+            for amp in amps:
+                self.subtractOverscan(image, mask, amp, xy0, satBit)
+
+        if self.config.doBias:
+            biasMaskedImage = bias.getMaskedImage()
+            image -= biasMaskedImage.image.array
+            mask |= biasMaskedImage.mask.array
+            variance += biasMaskedImage.variance.array
+
+        if self.config.doVariance:
+            for amp in amps:
+                if not expBBox.contains(amp.getBBox()):
+                    continue
+                gain = amp.getGain()
+                if math.isnan(gain):
+                    gain = 1.0
+                    self.log.warn("Gain set to NAN!  Updating to 1.0 to generate Poisson variance.")
+                elif gain <= 0:
+                    raise RuntimeError("Invalid gain %f for amp %s" % (gain, amp.getName()))
+                ampSlices = bboxSlices(amp.getBBox(), xy0)
+                variance[ampSlices] = image[ampSlices]/gain + amp.getReadNoise()**2
+
+        if self.config.doDark:
+            darkScale = getDarkTime(ccdExposure)/getDarkTime(dark)
+            darkMaskedImage = dark.getMaskedImage()
+            image -= darkScale*darkMaskedImage.image.array
+            mask |= darkMaskedImage.mask.array
+            variance += darkScale*darkScale*darkMaskedImage.variance.array
+
+        return ccdExposure
+
+    def subtractOverscan(self, image, mask, amp, xy0, satBit):
+        """ Fit and subtract the serial overscan of one amp
+
+        As in `IsrTask.overscanCorrection`, overscan pixels that deviate by
+        more than `overscanMaxDev` from the median are flagged as saturated
+        and, with all other masked pixels, left out of the fit.  The fitted
+        overscan is subtracted from the full raw region of the amp.
+
+        Parameters
+        ----------
+        image : `numpy.ndarray`
+            The image array, modified in place
+        mask : `numpy.ndarray`
+            The mask array, modified in place
+        amp : `lsst.afw.cameraGeom.Amplifier`
+            The amplifier
+        xy0 : `lsst.geom.Point2I`
+            The origin of the image
+        satBit : `int`
+            The bit used to flag deviant overscan pixels
+        """
+        fitType, nLeading, nTrailing = getOverscanConfig(self.config)
+        oscanBBox = amp.getRawHorizontalOverscanBBox()
+        if oscanBBox.isEmpty():
+            self.log.warn("No overscan region for amp %s, not performing overscan correction." %
+                          amp.getName())
+            return
+        if oscanBBox.getBeginX() > amp.getRawPrescanBBox().getBeginX():
+            dx0, dx1 = nLeading, nTrailing
+        else:
+            dx0, dx1 = nTrailing, nLeading
+        oscanSlices = bboxSlices(oscanBBox, xy0)
+        oscanSlices = (oscanSlices[0], slice(oscanSlices[1].start + dx0, oscanSlices[1].stop - dx1))
+
+        oscanArray = image[oscanSlices]
+        oscanMask = mask[oscanSlices]
+        median = np.ma.median(np.ma.masked_where(oscanMask != 0, oscanArray))
+        oscanMask[np.abs(oscanArray - median) > self.config.overscanMaxDev] |= satBit
+        masked = np.ma.masked_where(oscanMask != 0, oscanArray)
+
+        ampSlices = bboxSlices(amp.getRawBBox(), xy0)
+        if fitType == 'MEAN':
+            image[ampSlices] -= np.ma.mean(masked)
+        elif fitType == 'MEDIAN':
+            image[ampSlices] -= np.ma.median(masked)
+        else:
+            if fitType == 'MEAN_PER_ROW':
+                rowValues = np.ma.mean(masked, axis=1)
+            else:
+                rowValues = np.ma.median(masked, axis=1)
+            rowValues = rowValues.filled(np.ma.median(rowValues) if rowValues.count() else 0.)
+            rowStart = ampSlices[0].start - oscanSlices[0].start
+            rows = rowValues[rowStart:rowStart + image[ampSlices].shape[0]]
+            image[ampSlices] -= rows[:, np.newaxis]
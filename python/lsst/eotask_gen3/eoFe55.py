@@ -1,11 +1,9 @@
 import numpy as np
 
 import lsst.afw.math as afwMath
-import lsst.pipe.base as pipeBase
 import lsst.pipe.base.connectionTypes as cT
 
-from .eoCalibBase import (EoAmpExpCalibTaskConfig, EoAmpExpCalibTaskConnections, EoAmpExpCalibTask,
-                          runIsrOnAmp, extractAmpCalibs)
+from .eoCalibBase import EoAmpExpCalibTaskConfig, EoAmpExpCalibTaskConnections, EoAmpExpCalibTask
 from .eoFe55Data import EoFe55Data
 
 __all__ = ["EoFe55Task", "EoFe55TaskConfig"]
@@ -53,45 +51,25 @@ class EoFe55Task(EoAmpExpCalibTask):
         super().__init__(**kwargs)
         self.statCtrl = afwMath.StatisticsControl()
 
-    def run(self, inputExps, **kwargs):  # pylint: disable=arguments-differ
-        """ Run method
+    def prepareOutputData(self, inputExps, det, **kwargs):
+        """ Build the output data container
 
-        Parameters
-        ----------
-        inputPairs :
-            Used to retrieve the exposures
-
-        Keywords
-        --------
-        camera : `lsst.obs.lsst.camera`
-        bias : `ExposureF`
-        defects : `Defects`
-        gains : `Gains`
+        See base class for argument description
 
         Returns
         -------
-        outputData : `EoCalib`
-            Output data in formatted tables
+        outputData : `lsst.eotask_gen3.EoFe55Data`
+            Container for output data
         """
-        camera = kwargs['camera']
-        det = camera.get(inputExps[0].dataId['detector'])
         amps = det.getAmplifiers()
-
         ampNames = [amp.getName() for amp in amps]
-        outputData = self.makeOutputData(amps=ampNames, nAmps=len(amps), nExposure=len(inputExps),
-                                         camera=camera, detector=det)
-
-        for iamp, amp in enumerate(amps):
-            ampCalibs = extractAmpCalibs(amp, **kwargs)
-            for iExp, inputExp in enumerate(inputExps):
-                calibExp = runIsrOnAmp(self, inputExp.get(parameters={'amp': iamp}), **ampCalibs)
-                self.analyzeAmpExpData(calibExp, outputData, amp, iExp)
-        return pipeBase.Struct(outputData=outputData)
+        return self.makeOutputData(amps=ampNames, nAmps=len(amps), nExposure=len(inputExps),
+                                   camera=kwargs.get('camera'), detector=det)
 
     def makeOutputData(self, amps, nAmps, nExposure, **kwargs):  # pylint: disable=arguments-differ
         return EoFe55Data(amps=amps, nAmps=nAmps, nExposure=nExposure, **kwargs)
 
-    def analyzeAmpExpData(self, calibExp, outputData, amp, iExp):
+    def analyzeAmpExpData(self, calibExp, outputData, iamp, amp, iExp):
         outTable = outputData.ampExp["ampExp_%s" % amp.getName()]
         stats = afwMath.makeStatistics(calibExp.image, afwMath.MEDIAN, self.statCtrl)
         outTable.signal[iExp] = stats.getValue(afwMath.MEDIAN)
@@ -1,17 +1,15 @@
 import numpy as np
 
 import lsst.pex.config as pexConfig
-import lsst.afw.image as afwImage
 import lsst.afw.math as afwMath
 
-import lsst.pipe.base as pipeBase
 import lsst.pipe.base.connectionTypes as cT
 
 from .eoCalibBase import (EoAmpPairCalibTaskConfig, EoAmpPairCalibTaskConnections,
-                          EoAmpPairCalibTask, runIsrOnAmp, extractAmpCalibs,
-                          copyConnect, PHOTODIODE_CONNECT)
+                          EoAmpPairCalibTask, copyConnect, PHOTODIODE_CONNECT)
 from .eoFlatPairData import EoFlatPairData
 from .eoFlatPairUtils import DetectorResponse
+from .eoNumerics import workingMean
 
 __all__ = ["EoFlatPairTask", "EoFlatPairTaskConfig"]
 
@@ -67,46 +65,25 @@ class EoFlatPairTask(EoAmpPairCalibTask):
         super().__init__(**kwargs)
         self.statCtrl = afwMath.StatisticsControl()
 
-    def run(self, inputPairs, **kwargs):  # pylint: disable=arguments-differ
-        """ Run method
+    def prepareOutputData(self, inputPairs, det, **kwargs):
+        """ Build the output data container and fill it with the
+        photodiode data
 
-        Parameters
-        ----------
-        inputPairs : `list` [`tuple` [`lsst.daf.Butler.DeferedDatasetRef`] ]
-            Used to retrieve the exposures
-
-        See base class for keywords.
+        See base class for argument description
 
         Returns
         -------
         outputData : `lsst.eotask_gen3.EoFlatPairData`
-            Output data in formatted tables
+            Container for output data
         """
-        camera = kwargs['camera']
-        nPair = len(inputPairs)
-        if nPair < 1:
-            raise RuntimeError("No valid input data")
-
-        det = inputPairs[0][0][0].get().getDetector()
         amps = det.getAmplifiers()
         ampNames = [amp.getName() for amp in amps]
         outputData = self.makeOutputData(amps=ampNames, nAmps=len(amps), nPair=len(inputPairs),
-                                         camera=camera, detector=det)
+                                         camera=kwargs.get('camera'), detector=det)
         photodiodePairs = kwargs.get('photodiodePairs', None)
         if photodiodePairs is not None:
             self.analyzePdData(photodiodePairs, outputData)
-        for iamp, amp in enumerate(amps):
-            ampCalibs = extractAmpCalibs(amp, **kwargs)
-            for iPair, inputPair in enumerate(inputPairs):
-                if len(inputPair) != 2:
-                    self.log.warn("exposurePair %i has %i items" % (iPair, len(inputPair)))
-                    continue
-                calibExp1 = runIsrOnAmp(self, inputPair[0][0].get(parameters={"amp": iamp}), **ampCalibs)
-                calibExp2 = runIsrOnAmp(self, inputPair[1][0].get(parameters={"amp": iamp}), **ampCalibs)
-                amp2 = calibExp1.getDetector().getAmplifiers()[0]
-                self.analyzeAmpPairData(calibExp1, calibExp2, outputData, amp2, iPair)
-            self.analyzeAmpRunData(outputData, iamp, amp2)
-        return pipeBase.Struct(outputData=outputData)
+        return outputData
 
     def makeOutputData(self, amps, nAmps, nPair, **kwargs):  # pylint: disable=arguments-differ,no-self-use
         """Construct the output data object
@@ -171,7 +148,8 @@ class EoFlatPairTask(EoAmpPairCalibTask):
         outTable.signal[iPair] = signal
         outTable.flat1Signal[iPair] = sig1
         outTable.flat2Signal[iPair] = sig2
-        outTable.rowMeanVar[iPair] = self.rowMeanVariance(calibExp1, calibExp2, amp, self.statCtrl)
+        outTable.rowMeanVar[iPair] = self.rowMeanVariance(calibExp1, calibExp2, amp, self.statCtrl,
+                                                          self.workingDtype)
 
     def analyzeAmpRunData(self, outputData, iamp, amp):
         """Analyze data from a single amp for a run
@@ -228,10 +206,15 @@ class EoFlatPairTask(EoAmpPairCalibTask):
         return np.array([avgMeanValue, flat1Value, flat2Value], dtype=float)
 
     @staticmethod
-    def rowMeanVariance(calibExp1, calibExp2, amp, statCtrl):
+    def rowMeanVariance(calibExp1, calibExp2, amp, statCtrl, dtype=np.float32):
         """Return the variance of the mean of the rows of the
-        difference image"""
-        miDiff = afwImage.MaskedImageF(calibExp1[amp.getRawDataBBox()].getMaskedImage(), deep=True)
-        miDiff -= calibExp2[amp.getRawDataBBox()].getMaskedImage()
-        rowMeans = np.mean(miDiff.getImage().array, axis=1)
-        return afwMath.makeStatistics(rowMeans, afwMath.VARIANCECLIP, statCtrl).getValue()
+        difference image
+
+        The row means of the difference are the differences of the row
+        means, accumulated in float64, so the difference image is never
+        made.
+        """
+        bbox = amp.getRawDataBBox()
+        rowMeans = workingMean(calibExp1[bbox].image.array, axis=1)
+        rowMeans -= workingMean(calibExp2[bbox].image.array, axis=1)
+        return afwMath.makeStatistics(rowMeans.astype(dtype), afwMath.VARIANCECLIP, statCtrl).getValue()
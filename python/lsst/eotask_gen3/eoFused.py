@@ -0,0 +1,523 @@
+""" Task to run several amplifier-level EO analyses in a single pass
+over the raw data
+
+Each amp of each raw exposure is read and run through ISR only once,
+and the calibrated amp is handed to every requested analyzer.
+The analyzers are the usual amp-level tasks (e.g. `EoReadNoiseTask`,
+`EoPtcTask`), run as sub-tasks, each of which produces its own output.
+"""
+
+from collections import OrderedDict
+from contextlib import ExitStack
+from functools import partial
+
+import numpy as np
+
+import lsst.pex.config as pexConfig
+import lsst.pipe.base as pipeBase
+import lsst.pipe.base.connectionTypes as cT
+
+from .eoCalibBase import (EoAmpExpCalibTaskConfig, EoAmpExpCalibTaskConnections, EoAmpExpCalibTask,
+                          EoAmpPairCalibTask, copyConnect, PHOTODIODE_CONNECT, getDetector, getCalibKeys,
+                          arrangeFlatsByExpId,
+                          extractAmpCalibs, mapOverAmps, reloadAmp, logAmpSubset,
+                          readAmp, calibrateAmp, iterPipelined)
+from .eoAmpCalibCache import AMP_CALIB_CACHE
+from .eoAmpMerge import getAmpIndices
+from .eoCheckpoint import EoCheckpoint
+from .eoDataSelection import collectExposureRecords
+from .eoMemory import EoMemoryPlan
+from .eoSharedCalib import EoSharedCalib
+from .eoStageTimer import EoStageTimer, timeStage
+from .eoReadNoise import EoReadNoiseTask
+from .eoBiasStability import EoBiasStabilityTask
+from .eoOverscan import EoOverscanTask
+from .eoPtc import EoPtcTask
+from .eoFlatPair import EoFlatPairTask
+from .eoBrighterFatter import EoBrighterFatterTask
+from .eoTearing import EoTearingTask
+from .eoGainStability import EoGainStabilityTask
+
+__all__ = ["EoFusedCalibTask", "EoFusedCalibTaskConfig", "FUSED_ANALYZERS"]
+
+
+# Map from analyzer name to the name of the output connection
+FUSED_ANALYZERS = OrderedDict([
+    ("readNoise", "outputReadNoise"),
+    ("biasStability", "outputBiasStability"),
+    ("overscan", "outputOverscan"),
+    ("ptc", "outputPtc"),
+    ("flatPair", "outputFlatPair"),
+    ("brighterFatter", "outputBrighterFatter"),
+    ("tearing", "outputTearing"),
+    ("gainStability", "outputGainStability"),
+])
+
+# Analyzers that use the photodiode data
+PHOTODIODE_ANALYZERS = ("ptc", "flatPair", "gainStability")
+
+
+def makeOutputConnect(name):
+    return cT.Output(
+        name=name,
+        doc="Electrial Optical Calibration Output",
+        storageClass="IsrCalib",
+        dimensions=("instrument", "detector"),
+    )
+
+
+class EoFusedCalibTaskConnections(EoAmpExpCalibTaskConnections):
+
+    photodiodeData = copyConnect(PHOTODIODE_CONNECT)
+    outputReadNoise = makeOutputConnect("eoReadNoise")
+    outputBiasStability = makeOutputConnect("eoBiasStability")
+    outputOverscan = makeOutputConnect("eoOverscan")
+    outputPtc = makeOutputConnect("eoPtc")
+    outputFlatPair = makeOutputConnect("eoFlatPair")
+    outputBrighterFatter = makeOutputConnect("eoBrighterFatter")
+    outputTearing = makeOutputConnect("eoTearing")
+    outputGainStability = makeOutputConnect("eoGainStability")
+
+    def __init__(self, *, config=None):
+        super().__init__(config=config)
+        for analyzerName, connectionName in FUSED_ANALYZERS.items():
+            if analyzerName not in config.analyzers:
+                self.outputs.discard(connectionName)
+        if not set(PHOTODIODE_ANALYZERS) & set(config.analyzers):
+            self.inputs.discard("photodiodeData")
+
+
+class EoFusedCalibTaskConfig(EoAmpExpCalibTaskConfig,
+                             pipelineConnections=EoFusedCalibTaskConnections):
+
+    analyzers = pexConfig.ListField(
+        dtype=str,
+        doc="Analyzers to run, from: %s" % ", ".join(FUSED_ANALYZERS.keys()),
+        default=["overscan", "ptc", "flatPair", "brighterFatter"],
+    )
+    readNoise = pexConfig.ConfigurableField(target=EoReadNoiseTask, doc="Read noise analysis")
+    biasStability = pexConfig.ConfigurableField(target=EoBiasStabilityTask, doc="Bias stability analysis")
+    overscan = pexConfig.ConfigurableField(target=EoOverscanTask, doc="Overscan analysis")
+    ptc = pexConfig.ConfigurableField(target=EoPtcTask, doc="Photon transfer curve analysis")
+    flatPair = pexConfig.ConfigurableField(target=EoFlatPairTask, doc="Flat pair linearity analysis")
+    brighterFatter = pexConfig.ConfigurableField(target=EoBrighterFatterTask,
+                                                 doc="Brighter-fatter analysis")
+    tearing = pexConfig.ConfigurableField(target=EoTearingTask, doc="Tearing analysis")
+    gainStability = pexConfig.ConfigurableField(target=EoGainStabilityTask, doc="Gain stability analysis")
+
+    def setDefaults(self):
+        # pylint: disable=no-member
+        self.isr.expectWcs = False
+        self.isr.doSaturation = False
+        self.isr.doSetBadRegions = False
+        self.isr.doAssembleCcd = False
+        self.isr.doBias = True
+        self.isr.doLinearize = False
+        self.isr.doDefect = False
+        self.isr.doNanMasking = False
+        self.isr.doWidenSaturationTrails = False
+        self.isr.doDark = True
+        self.isr.doFlat = False
+        self.isr.doFringe = False
+        self.isr.doInterpolate = False
+        self.isr.doWrite = False
+        self.dataSelection = "flatFlat"
+
+    def validate(self):
+        super().validate()
+        for analyzerName in self.analyzers:
+            if analyzerName not in FUSED_ANALYZERS:
+                raise ValueError("Unknown analyzer %s, should be one of %s" %
+                                 (analyzerName, list(FUSED_ANALYZERS.keys())))
+            if getattr(self, analyzerName).precision != self.precision:
+                raise ValueError("%s.precision (%s) should be the same as precision (%s)" %
+                                 (analyzerName, getattr(self, analyzerName).precision, self.precision))
+            if getattr(self, analyzerName).quickLook:
+                raise ValueError("EoFusedCalibTask does not support quickLook, set %s.quickLook=False" %
+                                 analyzerName)
+            if getattr(self, analyzerName).ampSubset:
+                raise ValueError("Set ampSubset on EoFusedCalibTask rather than on %s" % analyzerName)
+            if getattr(getattr(self, analyzerName), 'doPreScan', False):
+                raise ValueError("EoFusedCalibTask does not support doPreScan, set %s.doPreScan=False" %
+                                 analyzerName)
+        if self.iterationOrder != "ampMajor":
+            raise ValueError("EoFusedCalibTask only supports iterationOrder='ampMajor'")
+        if self.quickLook:
+            raise ValueError("EoFusedCalibTask does not support quickLook")
+        if self.doPreScan:
+            raise ValueError("EoFusedCalibTask does not support doPreScan")
+
+
+class EoFusedCalibTask(EoAmpExpCalibTask):
+    """ Runs several amp-level analyses on the same raw data
+
+    Each amp of each exposure is read and run through ISR once, using
+    the `isr` sub-task of this task (the `isr` configurations of the
+    analyzers are not used), and then passed to all the analyzers in
+    `config.analyzers`:
+
+        - Analyzers derived from `EoAmpExpCalibTask` get
+          analyzeAmpExpData called for each exposure they select,
+          or analyzeAmpCube called once with all of them if they
+          implement it (see `EoAmpExpCalibTask.usesAmpCube`).
+        - Analyzers derived from `EoAmpPairCalibTask` get
+          analyzeAmpPairData called for each pair of exposures they
+          select, paired by exposure ID as in `arrangeFlatsByExpId`.
+
+    Each analyzer applies its own `dataSelection` to the exposures
+    selected by this task, so a single task can feed, e.g., the
+    read noise ('biasBias') and bias stability ('anyBias') analyses.
+    There is one output per analyzer, identical to what the analyzer
+    would produce if it were run by itself with the same ISR.  The
+    calibrated amps are shared by the analyzers, which therefore must not
+    modify them.  The quick look and the pre-scan (`doPreScan`) are not
+    supported.
+    """
+
+    ConfigClass = EoFusedCalibTaskConfig
+    _DefaultName = "eoFused"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.analyzers = OrderedDict()
+        for analyzerName in self.config.analyzers:
+            self.makeSubtask(analyzerName)
+            self.analyzers[analyzerName] = getattr(self, analyzerName)
+        # The selected exposures and their records, from selectInputRefs
+        self._selectedRecords = None
+
+    def selectInputRefs(self, inputRefs, registry=None):
+        """ Apply the data selection to the input refs, in place
+
+        The photodiode data are matched to the exposures by exposure ID,
+        so they do not need to be in one-to-one correspondence.  The
+        exposure records needed by the selections of the analyzers are
+        collected at the same time, and kept for `runWithInputs`.
+
+        Parameters
+        ----------
+        inputRefs : `~lsst.pipe.base.connections.InputQuantizedConnection`
+            Input data refs for one detector
+        registry : `lsst.daf.butler.Registry`, optional
+            Used to fetch the exposure records missing from the dataIds
+            and from `self.exposureIndex`
+        """
+        dataSelections = [self.dataSelection] + [analyzer.dataSelection
+                                                 for analyzer in self.analyzers.values()]
+        columns = list(OrderedDict.fromkeys(column for dataSelection in dataSelections
+                                            for column in dataSelection.columnCuts))
+        exposureRecords = None
+        if columns:
+            exposureRecords = collectExposureRecords(inputRefs.inputExps, registry, columns,
+                                                     self.exposureIndex)
+        selected = np.flatnonzero(self.dataSelection.selectMask(inputRefs.inputExps, registry,
+                                                                self.exposureIndex, exposureRecords))
+        inputRefs.inputExps = [inputRefs.inputExps[idx] for idx in selected]
+        if exposureRecords is not None:
+            self._selectedRecords = (inputRefs.inputExps, (exposureRecords[0], exposureRecords[1][selected]))
+        if hasattr(inputRefs, 'photodiodeData'):
+            inputRefs.photodiodeData = self.dataSelection.selectData(inputRefs.photodiodeData, registry,
+                                                                     self.exposureIndex)
+
+    def getSelectedRecords(self, inputExps):
+        """ Return the exposure records collected by `selectInputRefs`,
+        `None` if they are not those of inputExps """
+        if self._selectedRecords is None or self._selectedRecords[0] is not inputExps:
+            return None
+        return self._selectedRecords[1]
+
+    def runWithInputs(self, inputRefs, inputs):
+        """ Work out which exposures each analyzer uses and call run with
+        the inputs read for one detector
+
+        Parameters
+        ----------
+        inputRefs : `~lsst.pipe.base.connections.InputQuantizedConnection`
+            The selected input data refs
+        inputs : `dict`
+            The inputs, as returned by butlerQC.get(inputRefs)
+
+        Returns
+        -------
+        outputs : `lsst.pipe.base.Struct`
+            The outputs of run
+        """
+        inputs['calibKeys'] = getCalibKeys(inputRefs)
+        exposureRecords = self.getSelectedRecords(inputRefs.inputExps)
+        inputs['analyzerSelections'] = {
+            analyzerName: np.flatnonzero(analyzer.dataSelection.selectMask(
+                inputRefs.inputExps, exposureIndex=self.exposureIndex,
+                exposureRecords=exposureRecords)).tolist()
+            for analyzerName, analyzer in self.analyzers.items()}
+        return self.run(**inputs)
+
+    def run(self, inputExps, photodiodeData=None, analyzerSelections=None,
+            **kwargs):  # pylint: disable=arguments-differ
+        """ Run method
+
+        Parameters
+        ----------
+        inputExps : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+            Used to retrieve the exposures
+        photodiodeData : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+            Used to retrieve the photodiode data, matched to the exposures
+            by exposure ID
+        analyzerSelections : `dict` [`str`, `list` [`int`]]
+            Indices of the exposures used by each analyzer, by default
+            each analyzer uses all the exposures
+
+        See `EoAmpExpCalibTask.run` for the keywords
+
+        Returns
+        -------
+        outputs : `lsst.pipe.base.Struct`
+            One `lsst.eotask_gen3.EoCalib` per analyzer, using the
+            output connection names in `FUSED_ANALYZERS`
+        """
+        camera = kwargs['camera']
+        if len(inputExps) < 1:
+            raise RuntimeError("No valid input data")
+
+        det = getDetector(inputExps[0], camera)
+        amps = det.getAmplifiers()
+        expIds = [inputExp.dataId['exposure'] for inputExp in inputExps]
+        if photodiodeData is not None:
+            pdDict = {pdRef.dataId['exposure']: pdRef for pdRef in photodiodeData}
+        else:
+            pdDict = None
+        if analyzerSelections is None:
+            analyzerSelections = {}
+
+        plans = OrderedDict()
+        outputs = OrderedDict()
+        for analyzerName, analyzer in self.analyzers.items():
+            selected = analyzerSelections.get(analyzerName, list(range(len(inputExps))))
+            plan = self.makePlan(analyzer, selected, inputExps, expIds, pdDict)
+            if not plan.inputs:
+                raise RuntimeError("No valid input data for analyzer %s" % analyzerName)
+            plans[analyzerName] = plan
+            outputs[analyzerName] = analyzer.prepareOutputData(plan.inputs, det, **plan.pdKwargs, **kwargs)
+
+        toRead = sorted(set().union(*[plan.index.keys() for plan in plans.values()]),
+                        key=lambda iExp: expIds[iExp])
+        checkpoint = EoCheckpoint.fromTask(self, inputExps, kwargs.get('calibKeys'))
+        memoryPlan = self.makeFusedMemoryPlan(amps, toRead, plans)
+        self.log.info("Memory plan: %s" % memoryPlan)
+        timer = EoStageTimer() if self.config.doStageTiming else None
+        self.runFusedAmpLoops(inputExps, toRead, plans, outputs, amps, detector=det, checkpoint=checkpoint,
+                              memoryPlan=memoryPlan, timer=timer, **kwargs)
+
+        for analyzerName, analyzer in self.analyzers.items():
+            with timeStage(timer, 'detRun'):
+                analyzer.analyzeDetRunData(outputs[analyzerName])
+        if self.isrCache is not None:
+            self.log.info(self.isrCache.summary())
+        if timer is not None:
+            timer.record(self, outputs.values())
+        self.log.info(memoryPlan.report())
+        if checkpoint is not None:
+            checkpoint.remove()
+        return pipeBase.Struct(**{FUSED_ANALYZERS[analyzerName]: outputData
+                                  for analyzerName, outputData in outputs.items()})
+
+    @staticmethod
+    def makePlan(analyzer, selected, inputExps, expIds, pdDict):
+        """ Work out how the exposures are passed to one analyzer
+
+        Parameters
+        ----------
+        analyzer : `EoAmpExpCalibTask` or `EoAmpPairCalibTask`
+            The analyzer
+        selected : `list` [`int`]
+            Indices of the exposures the analyzer uses
+        inputExps : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+            Used to retrieve the exposures
+        expIds : `list` [`int`]
+            The exposure IDs
+        pdDict : `dict` or `None`
+            Photodiode data, keyed by exposure ID
+
+        Returns
+        -------
+        plan : `lsst.pipe.base.Struct`
+            isPair : `bool`
+                True for pair analyzers
+            inputs : `list`
+                The inputs, as they would be passed to the analyzer's run
+            index : `dict` [`int`, `int` or `tuple`]
+                Map from exposure index to the index used by the analyzer,
+                (pair index, position in pair) for pair analyzers
+            pdKwargs : `dict`
+                The photodiode data, as they would be passed to the
+                analyzer's run
+        """
+        pdKwargs = {}
+        if not isinstance(analyzer, EoAmpPairCalibTask):
+            inputs = [inputExps[iExp] for iExp in selected]
+            index = {iExp: jExp for jExp, iExp in enumerate(selected)}
+            if pdDict is not None and all(expIds[iExp] in pdDict for iExp in selected):
+                pdKwargs['photodiodeData'] = [pdDict[expIds[iExp]] for iExp in selected]
+            return pipeBase.Struct(isPair=False, inputs=inputs, index=index, pdKwargs=pdKwargs)
+
+        # Paired as in EoAmpPairCalibTask.runWithInputs, the last exposure
+        # of an odd number is left out
+        pairs = [tuple(iExp for iExp, _ in expPair) for expPair in
+                 arrangeFlatsByExpId(selected, [expIds[iExp] for iExp in selected]).values()
+                 if len(expPair) == 2]
+        inputs = [[(inputExps[iExp], expIds[iExp]) for iExp in pair] for pair in pairs]
+        index = {}
+        for iPair, pair in enumerate(pairs):
+            index[pair[0]] = (iPair, 0)
+            index[pair[1]] = (iPair, 1)
+        if pdDict is not None and all(expIds[iExp] in pdDict for iExp in index):
+            pdKwargs['photodiodePairs'] = [[pdDict[expIds[iExp]] for iExp in pair] for pair in pairs]
+        return pipeBase.Struct(isPair=True, inputs=inputs, index=index, pdKwargs=pdKwargs)
+
+    def getCubeAnalyzers(self, plans):
+        """ Return the names of the analyzers that use analyzeAmpCube """
+        return [analyzerName for analyzerName, plan in plans.items()
+                if not plan.isPair and self.analyzers[analyzerName].usesAmpCube()]
+
+    def makeFusedMemoryPlan(self, amps, toRead, plans):
+        """ Plan the amp loops to fit in `config.memoryBudget`
+
+        Each worker holds two exposures of its amp if any analyzer works
+        on pairs, and one cube per analyzer that uses analyzeAmpCube.
+
+        Parameters
+        ----------
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        toRead : `list` [`int`]
+            Indices of the exposures to read
+        plans : `dict` [`str`, `lsst.pipe.base.Struct`]
+            How the exposures are passed to each analyzer, see `makePlan`
+
+        Returns
+        -------
+        memoryPlan : `lsst.eotask_gen3.eoMemory.EoMemoryPlan`
+            The plan
+        """
+        nHeld = 2 if any(plan.isPair for plan in plans.values()) else 1
+        return EoMemoryPlan.forAmpLoops(self.config, amps, len(toRead), nHeld=nHeld,
+                                        nCubes=len(self.getCubeAnalyzers(plans)))
+
+    def runFusedAmpLoops(self, inputExps, toRead, plans, outputs, amps, memoryPlan=None, timer=None,
+                         **kwargs):
+        """ Run the loops over amps and exposures for all the analyzers
+
+        This uses the memory plan and `config.ampBackend` to decide
+        how to process the amps in parallel.
+
+        Parameters
+        ----------
+        inputExps : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+            Used to retrieve the exposures
+        toRead : `list` [`int`]
+            Indices of the exposures to read, sorted by exposure ID
+        plans : `dict` [`str`, `lsst.pipe.base.Struct`]
+            How the exposures are passed to each analyzer, see `makePlan`
+        outputs : `dict` [`str`, `lsst.eotask_gen3.EoCalib`]
+            The output data containers
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        memoryPlan : `lsst.eotask_gen3.eoMemory.EoMemoryPlan`, optional
+            The memory plan, default is from `makeFusedMemoryPlan`
+        timer : `lsst.eotask_gen3.eoStageTimer.EoStageTimer`, optional
+            Used to time the processing stages, the analyzers are timed
+            separately, each under its own name
+
+        Keywords are used to extract the per-amp calibrations
+        """
+        AMP_CALIB_CACHE.resize(int(self.config.ampCalibCacheSize*1024**2))
+        if memoryPlan is None:
+            memoryPlan = self.makeFusedMemoryPlan(amps, toRead, plans)
+        nAmps = len(amps)
+        numThreads = memoryPlan.numThreads
+        ampIndices = getAmpIndices(self.config.ampSubset, amps)
+        logAmpSubset(self, amps)
+        with ExitStack() as stack:
+            backend = "thread"
+            if self.config.ampBackend == "process" and numThreads > 1 and len(ampIndices) > 1:
+                backend = "process"
+                outputs = OrderedDict([(analyzerName, stack.enter_context(EoSharedCalib(outputData)).calib)
+                                       for analyzerName, outputData in outputs.items()])
+            ampTimers = mapOverAmps(partial(self.processFusedAmp, amps=amps, inputExps=inputExps,
+                                            toRead=toRead, plans=plans, outputs=outputs,
+                                            memoryPlan=memoryPlan, doTiming=timer is not None, **kwargs),
+                                    nAmps, numThreads, backend, ampIndices)
+        if timer is not None:
+            for ampTimer in ampTimers:
+                timer.merge(ampTimer)
+
+    def processFusedAmp(self, iamp, amps, inputExps, toRead, plans, outputs, checkpoint=None,
+                        memoryPlan=None, doTiming=False, **kwargs):
+        """ Process all the exposures for one amp, for all the analyzers
+
+        Parameters
+        ----------
+        iamp : `int`
+            Index for the amplifier
+        checkpoint : `lsst.eotask_gen3.eoCheckpoint.EoCheckpoint`, optional
+            Used to reload the results of the amp for all the analyzers
+            if it was already processed, and to save them otherwise
+        memoryPlan : `lsst.eotask_gen3.eoMemory.EoMemoryPlan`, optional
+            Used to size the amp cubes
+        doTiming : `bool`
+            If True, time the processing stages of this amp
+
+        See `runFusedAmpLoops` for the other parameters.
+
+        Returns
+        -------
+        timer : `lsst.eotask_gen3.eoStageTimer.EoStageTimer` or `None`
+            The timings for this amp
+        """
+        if reloadAmp(self, checkpoint, amps, iamp, outputs):
+            return None
+        timer = EoStageTimer() if doTiming else None
+        ampCalibs = extractAmpCalibs(amps[iamp], **kwargs)
+        cubeAnalyzers = self.getCubeAnalyzers(plans)
+        numThreads = memoryPlan.numThreads if memoryPlan is not None else self.config.numThreads
+        cubes = {analyzerName: self.makeAmpCube(len(plans[analyzerName].index),
+                                                numThreads*len(cubeAnalyzers), memoryPlan)
+                 for analyzerName in cubeAnalyzers}
+        firstOfPair = {}
+        calibExps = iterPipelined(self, [inputExps[iExp] for iExp in toRead],
+                                  lambda inputExp: readAmp(self, inputExp, iamp, amps, timer=timer, **kwargs),
+                                  lambda ampRead: calibrateAmp(self, ampRead, ampCalibs, timer=timer),
+                                  timer=timer)
+        for iRead, calibExp in calibExps:
+            iExp = toRead[iRead]
+            amp2 = calibExp.getDetector().getAmplifiers()[0]
+            for analyzerName, plan in plans.items():
+                if iExp not in plan.index:
+                    continue
+                analyzer = self.analyzers[analyzerName]
+                if analyzerName in cubes:
+                    with timeStage(timer, 'cubeFill'):
+                        cubes[analyzerName].fill(plan.index[iExp], calibExp.image.array)
+                    continue
+                if not plan.isPair:
+                    with timeStage(timer, analyzerName):
+                        analyzer.analyzeAmpExpData(calibExp, outputs[analyzerName], iamp, amp2,
+                                                   plan.index[iExp])
+                    continue
+                iPair, iInPair = plan.index[iExp]
+                if iInPair == 0:
+                    firstOfPair[analyzerName] = calibExp
+                else:
+                    with timeStage(timer, analyzerName):
+                        analyzer.analyzeAmpPairData(firstOfPair.pop(analyzerName), calibExp,
+                                                    outputs[analyzerName], amp2, iPair)
+        for analyzerName, cube in cubes.items():
+            if cube.array is not None:
+                with timeStage(timer, analyzerName):
+                    self.analyzers[analyzerName].analyzeAmpCube(cube.array, outputs[analyzerName], iamp,
+                                                                amp2)
+        for analyzerName, analyzer in self.analyzers.items():
+            with timeStage(timer, 'ampRun'):
+                analyzer.analyzeAmpRunData(outputs[analyzerName], iamp, amp2)
+        if checkpoint is not None:
+            checkpoint.save(amps[iamp].getName(), iamp, outputs)
+        return timer
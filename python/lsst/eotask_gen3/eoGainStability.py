@@ -1,11 +1,11 @@
 import numpy as np
 
 import lsst.afw.math as afwMath
-import lsst.pipe.base as pipeBase
 import lsst.pipe.base.connectionTypes as cT
 
+from .eoAmpCube import cubeMedian
 from .eoCalibBase import (EoAmpExpCalibTaskConfig, EoAmpExpCalibTaskConnections, EoAmpExpCalibTask,
-                          runIsrOnAmp, extractAmpCalibs, copyConnect, PHOTODIODE_CONNECT)
+                          copyConnect, PHOTODIODE_CONNECT)
 from .eoGainStabilityData import EoGainStabilityData
 
 __all__ = ["EoGainStabilityTask", "EoGainStabilityTaskConfig"]
@@ -59,41 +59,24 @@ class EoGainStabilityTask(EoAmpExpCalibTask):
         super().__init__(**kwargs)
         self.statCtrl = afwMath.StatisticsControl()
 
-    def run(self, inputExps, photodiodeData, **kwargs):  # pylint: disable=arguments-differ
-        """ Run method
+    def prepareOutputData(self, inputExps, det, photodiodeData=None, **kwargs):
+        """ Build the output data container and fill it with the
+        photodiode data
 
-        Parameters
-        ----------
-        inputExps : `list` [`lsst.daf.Butler.DeferedDatasetRef`]
-            Used to retrieve the exposures
-
-        photodiodeData : `list` [`astropy.Table`]
-            The photodiode data
+        See base class for argument description
 
         Returns
         -------
         outputData : `lsst.eotask_gen3.EoGainStabilityData`
-            Output data in formatted tables
+            Container for output data
         """
-        camera = kwargs['camera']
-        numExps = len(inputExps)
-        if numExps < 1:
-            raise RuntimeError("No valid input data")
-
-        det = inputExps[0].get().getDetector()
         amps = det.getAmplifiers()
-
         ampNames = [amp.getName() for amp in amps]
         outputData = self.makeOutputData(amps=ampNames, nAmps=len(amps), nExposure=len(inputExps),
-                                         camera=camera, detector=det)
-
-        self.analyzePdData(photodiodeData, outputData)
-        for iamp, amp in enumerate(amps):
-            ampCalibs = extractAmpCalibs(amp, **kwargs)
-            for iExp, inputExp in enumerate(inputExps):
-                calibExp = runIsrOnAmp(self, inputExp.get(parameters={'amp': iamp}), **ampCalibs)
-                self.analyzeAmpExpData(calibExp, outputData, amp, iExp)
-        return pipeBase.Struct(outputData=outputData)
+                                         camera=kwargs.get('camera'), detector=det)
+        if photodiodeData is not None:
+            self.analyzePdData(photodiodeData, outputData)
+        return outputData
 
     def makeOutputData(self, amps, nAmps, nExposure, **kwargs):  # pylint: disable=arguments-differ
         """Construct the output data object
@@ -116,7 +99,7 @@ class EoGainStabilityTask(EoAmpExpCalibTask):
         """
         return EoGainStabilityData(amps=amps, nAmps=nAmps, nExposure=nExposure, **kwargs)
 
-    def analyzeAmpExpData(self, calibExp, outputData, amp, iExp):
+    def analyzeAmpExpData(self, calibExp, outputData, iamp, amp, iExp):
         """Analyze data from a single amp for a single exposure
 
         See base class for argument description
@@ -128,6 +111,15 @@ class EoGainStabilityTask(EoAmpExpCalibTask):
         stats = afwMath.makeStatistics(calibExp.image, afwMath.MEDIAN, self.statCtrl)
         outTable.signal[iExp] = stats.getValue(afwMath.MEDIAN)
 
+    def analyzeAmpCube(self, cube, outputData, iamp, amp):
+        """Analyze data from a single amp for all the exposures
+
+        See base class for argument description
+
+        Same as `analyzeAmpExpData`, for all the exposures at once.
+        """
+        outputData.ampExp["ampExp_%s" % amp.getName()].signal[:] = cubeMedian(cube)
+
     def analyzePdData(self, photodiodeData, outputData):
         """ Analyze the photodidode data and fill the output table
 
@@ -0,0 +1,142 @@
+""" On-disk cache of ISR-processed amplifier images
+
+The reduced-ISR output for one amp of one raw exposure only depends on
+the raw dataset, the amp, the calibration datasets and the `isr`
+configuration, so it can be reused by every task that uses the same
+inputs and by later runs of the same pipeline.
+"""
+
+import numpy as np
+
+import lsst.geom as lsstGeom
+import lsst.afw.image as afwImage
+from lsst.afw.cameraGeom import AmplifierIsolator
+
+from .eoCache import EoDiskCache, hashKey, hashConfig
+
+__all__ = ["EoIsrCache"]
+
+
+class EoIsrCache:
+    """ Content-addressed on-disk cache of ISR-processed amplifier images
+
+    The image and variance planes are stored as float32 arrays and the
+    mask plane as int32, together with the origin of the amp bounding box.
+    The amp exposure is rebuilt from those and from the detector geometry.
+
+    Parameters
+    ----------
+    cacheDir : `str`
+        The cache directory
+    maxBytes : `int`
+        Bound on the total size of the cache, least recently used entries
+        are removed to stay below it
+    isrConfig : `lsst.ip.isr.IsrTaskConfig`
+        The `isr` configuration, hashed into every key
+    """
+
+    def __init__(self, cacheDir, maxBytes, isrConfig):
+        """ C'tor,  Fills class parameters """
+        self._diskCache = EoDiskCache(cacheDir, maxBytes)
+        self._isrConfigHash = hashConfig(isrConfig)
+
+    @classmethod
+    def fromConfig(cls, config):
+        """ Build the cache from a task configuration
+
+        Parameters
+        ----------
+        config : `lsst.pex.config.Config`
+            Used to get `isrCacheDir`, `isrCacheSize` and `isr`
+
+        Returns
+        -------
+        isrCache : `EoIsrCache` or `None`
+            The cache, `None` if `isrCacheDir` is not set
+        """
+        if not config.isrCacheDir:
+            return None
+        return cls(config.isrCacheDir, int(config.isrCacheSize*1024**2), config.isr)
+
+    @property
+    def diskCache(self):
+        """ Return the underlying `EoDiskCache` """
+        return self._diskCache
+
+    def makeKey(self, rawId, ampName, calibKeys):
+        """ Return the key for one amp of one raw exposure
+
+        Parameters
+        ----------
+        rawId : `str`
+            The raw dataset ID
+        ampName : `str`
+            The amplifier name
+        calibKeys : `dict` [`str`, `str`]
+            The calibration dataset IDs, keyed by calibration type
+
+        Returns
+        -------
+        key : `str`
+            The cache key
+        """
+        calibParts = ["%s=%s" % (name, calibId) for name, calibId in sorted(calibKeys.items())]
+        return hashKey(rawId, ampName, *calibParts, self._isrConfigHash)
+
+    def has(self, key):
+        """ Return True if an entry is in the cache """
+        return self._diskCache.has(key)
+
+    def get(self, key, detector, amp):
+        """ Read one amp exposure from the cache
+
+        Parameters
+        ----------
+        key : `str`
+            The cache key
+        detector : `lsst.afw.cameraGeom.Detector`
+            The full detector
+        amp : `lsst.afw.cameraGeom.Amplifier`
+            The amplifier, as found in the full detector
+
+        Returns
+        -------
+        calibExp : `lsst.afw.image.ExposureF` or `None`
+            The ISR-processed amp exposure, `None` if not in the cache
+        """
+        arrays, meta = self._diskCache.get(key)
+        if arrays is None:
+            return None
+        maskedImage = afwImage.MaskedImageF(afwImage.ImageF(arrays['image'], deep=False),
+                                            afwImage.Mask(arrays['mask'], deep=False),
+                                            afwImage.ImageF(arrays['variance'], deep=False))
+        maskedImage.setXY0(lsstGeom.Point2I(meta['x0'], meta['y0']))
+        calibExp = afwImage.makeExposure(maskedImage)  # pylint: disable=no-member
+        parentBBox = lsstGeom.Box2I()
+        for parentAmp in detector.getAmplifiers():
+            parentBBox.include(parentAmp.getRawBBox())
+        calibExp.setDetector(AmplifierIsolator(amp, parentBBox, detector).make_detector())
+        return calibExp
+
+    def put(self, key, calibExp):
+        """ Write one amp exposure to the cache
+
+        Parameters
+        ----------
+        key : `str`
+            The cache key
+        calibExp : `lsst.afw.image.ExposureF`
+            The ISR-processed amp exposure
+        """
+        maskedImage = calibExp.getMaskedImage()
+        arrays = dict(image=maskedImage.image.array.astype(np.float32, copy=False),
+                      mask=maskedImage.mask.array,
+                      variance=maskedImage.variance.array.astype(np.float32, copy=False))
+        xy0 = calibExp.getXY0()
+        self._diskCache.put(key, arrays, dict(x0=xy0.getX(), y0=xy0.getY()))
+
+    def summary(self):
+        """ Return a one line description of the cache usage """
+        return "ISR cache %s: %i hits, %i misses, %i evictions, %.1f MB" % (
+            self._diskCache.cacheDir, self._diskCache.nHits, self._diskCache.nMisses,
+            self._diskCache.nEvictions, self._diskCache.nBytes/1024**2)
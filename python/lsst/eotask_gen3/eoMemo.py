@@ -0,0 +1,406 @@
+""" Memoization of the outputs of EO task quanta
+
+With `config.memoDir` set, the outputs of a quantum are saved in a local
+content-addressed store, keyed by a hash of the task class, its frozen
+configuration, the version of this package and the inputs.  When a
+quantum with the same key is run again, e.g., because the output run was
+regenerated after changing the configuration of another task of the
+pipeline, the saved outputs are returned without reading any input.
+
+Raws and calibration products are identified by their dataset IDs.  The
+outputs of memoized quanta carry the key of the quantum that produced
+them, in the 'EOMEMOKEY' metadata of their first table, and the store
+keeps the key of each dataset ID they were put with.  Downstream quanta
+identify those inputs by that key, rather than by their dataset ID, so
+that they still hit when the upstream outputs were regenerated with new
+IDs but the same content.
+
+Every lookup is appended to a log in the store, `summarizeMemoLog`
+gives the hit and miss counts of each task from it.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict, defaultdict
+
+import lsst.pipe.base as pipeBase
+from lsst.utils import doImportType
+from lsst.utils.introspection import get_full_type_name
+
+from .eoCache import hashKey, hashConfig, getDatasetId
+
+__all__ = ["EoMemoStore", "computeMemoized", "runQuantumMemoized", "recordMemoOutputs", "getMemoKey",
+           "summarizeMemoLog"]
+
+
+# Name of the file with the type of each output, in each entry
+MEMO_INDEX_NAME = "outputs.json"
+
+# Name of the log of the lookups, at the top of the store
+MEMO_LOG_NAME = "memo.log"
+
+# Directory of the keys of the quanta that produced each dataset ID, in
+# the store
+MEMO_PROVENANCE_DIR = "provenance"
+
+# Table metadata key used to store the key of the producing quantum
+MEMO_KEY_KEY = "EOMEMOKEY"
+
+
+def getPackageVersion():
+    """ Return the version of this package, "unknown" if it was not built
+    by scons """
+    try:
+        from .version import __version__
+    except ImportError:
+        return "unknown"
+    return __version__
+
+
+def iterRefs(quantizedRefs):
+    """ Yield the (connection name, ref) of all the refs of a quantum
+
+    Parameters
+    ----------
+    quantizedRefs : `~lsst.pipe.base.connections.QuantizedConnection`
+        The input or output refs of a quantum, a `lsst.pipe.base.Struct`
+        or `dict` of refs also works
+    """
+    if isinstance(quantizedRefs, pipeBase.Struct):
+        items = quantizedRefs.getDict().items()
+    elif isinstance(quantizedRefs, dict):
+        items = quantizedRefs.items()
+    else:
+        items = quantizedRefs
+    for name, refs in items:
+        for ref in (refs if isinstance(refs, (list, tuple)) else [refs]):
+            yield name, ref
+
+
+def getInputIds(inputRefs, getProducerKey=None):
+    """ Return the sorted '<connection>=<input ID>' strings of all the
+    inputs of a quantum, `None` if an input does not have a dataset ID
+
+    Parameters
+    ----------
+    inputRefs : `~lsst.pipe.base.connections.InputQuantizedConnection`
+        The input data refs
+    getProducerKey : `Callable`, optional
+        Returns the key of the quantum that produced a dataset ID, or
+        `None`, the inputs with a key are identified by it
+
+    Returns
+    -------
+    inputIds : `list` [`str`] or `None`
+        The input IDs
+    """
+    inputIds = []
+    for name, ref in iterRefs(inputRefs):
+        datasetId = getDatasetId(ref)
+        if datasetId is None:
+            return None
+        producerKey = getProducerKey(datasetId) if getProducerKey is not None else None
+        if producerKey is not None:
+            inputIds.append("%s=memo:%s" % (name, producerKey))
+        else:
+            inputIds.append("%s=%s" % (name, datasetId))
+    return sorted(inputIds)
+
+
+def setMemoKey(outputs, key):
+    """ Record the key of the quantum that produced the outputs in their
+    metadata
+
+    Parameters
+    ----------
+    outputs : `lsst.pipe.base.Struct`
+        The outputs, only the `lsst.eotask_gen3.EoCalib` are changed
+    key : `str`
+        The key of the quantum
+    """
+    for name, value in outputs.getDict().items():
+        tables = getattr(value, 'tables', None)
+        if tables:
+            tables[0].meta[MEMO_KEY_KEY] = "%s/%s" % (key, name)
+
+
+def getMemoKey(calib):
+    """ Read back the key of the quantum that produced an output
+
+    Parameters
+    ----------
+    calib : `lsst.eotask_gen3.EoCalib`
+        The output of a task
+
+    Returns
+    -------
+    key : `str` or `None`
+        The key of the quantum and the name of the output, `None` if the
+        quantum was not memoized
+    """
+    tables = getattr(calib, 'tables', None)
+    if not tables:
+        return None
+    return tables[0].meta.get(MEMO_KEY_KEY)
+
+
+class EoMemoStore:
+    """ Local content-addressed store of the outputs of quanta
+
+    Each entry is a directory named after its key, with one FITS file for
+    each output and an index with their types.  Entries are written to a
+    temporary directory and then renamed, so that several processes can
+    share the same store.
+
+    Parameters
+    ----------
+    memoDir : `str`
+        The store directory, created if needed
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, memoDir):
+        """ C'tor,  Fills class parameters """
+        self._memoDir = memoDir
+        os.makedirs(memoDir, exist_ok=True)
+
+    @classmethod
+    def fromConfig(cls, config):
+        """ Build the store, `None` if `config.memoDir` is not set """
+        memoDir = getattr(config, 'memoDir', "")
+        if not memoDir:
+            return None
+        return cls(memoDir)
+
+    @property
+    def memoDir(self):
+        """ Return the store directory """
+        return self._memoDir
+
+    def makeKey(self, task, inputRefs):
+        """ Return the key of a quantum
+
+        The inputs produced by memoized quanta are identified by the key
+        of those quanta, the others by their dataset ID.
+
+        Parameters
+        ----------
+        task : `lsst.pipe.base.PipelineTask`
+            The task, used for its class and `config`
+        inputRefs : `~lsst.pipe.base.connections.InputQuantizedConnection`
+            The input data refs, after any data selection
+
+        Returns
+        -------
+        key : `str` or `None`
+            The key, `None` if not all the inputs have a dataset ID
+        """
+        inputIds = getInputIds(inputRefs, self.getProducerKey)
+        if inputIds is None:
+            return None
+        return hashKey(get_full_type_name(task), hashConfig(task.config), getPackageVersion(), *inputIds)
+
+    def path(self, key):
+        """ Return the directory of an entry """
+        return os.path.join(self._memoDir, key[:2], key)
+
+    def get(self, key):
+        """ Read the outputs of a quantum
+
+        Parameters
+        ----------
+        key : `str`
+            The key of the quantum
+
+        Returns
+        -------
+        outputs : `lsst.pipe.base.Struct` or `None`
+            The outputs, `None` if they are not in the store
+        """
+        entryDir = self.path(key)
+        try:
+            with open(os.path.join(entryDir, MEMO_INDEX_NAME)) as fin:
+                outputTypes = json.load(fin, object_pairs_hook=OrderedDict)
+            outputs = {name: doImportType(typeName).readFits(os.path.join(entryDir, "%s.fits" % name))
+                       for name, typeName in outputTypes.items()}
+        except (OSError, ValueError):
+            return None
+        return pipeBase.Struct(**outputs)
+
+    def put(self, key, outputs):
+        """ Save the outputs of a quantum
+
+        Parameters
+        ----------
+        key : `str`
+            The key of the quantum
+        outputs : `lsst.pipe.base.Struct`
+            The outputs, e.g., `lsst.eotask_gen3.EoCalib` or
+            `lsst.ip.isr.Defects`, they must all have writeFits and
+            readFits methods
+
+        Returns
+        -------
+        saved : `bool`
+            False if some outputs can not be saved
+        """
+        outputDict = outputs.getDict()
+        if not all(hasattr(value, 'writeFits') and hasattr(value, 'readFits')
+                   for value in outputDict.values()):
+            return False
+        entryDir = self.path(key)
+        os.makedirs(os.path.dirname(entryDir), exist_ok=True)
+        tmpDir = tempfile.mkdtemp(dir=os.path.dirname(entryDir), suffix=".tmp")
+        try:
+            outputTypes = OrderedDict()
+            for name, value in outputDict.items():
+                value.writeFits(os.path.join(tmpDir, "%s.fits" % name))
+                outputTypes[name] = get_full_type_name(value)
+            with open(os.path.join(tmpDir, MEMO_INDEX_NAME), "w") as fout:
+                json.dump(outputTypes, fout)
+            if os.path.exists(entryDir):
+                # Written by another process in the meantime
+                shutil.rmtree(tmpDir)
+            else:
+                os.replace(tmpDir, entryDir)
+        except BaseException:
+            shutil.rmtree(tmpDir, ignore_errors=True)
+            raise
+        return True
+
+    def provenancePath(self, datasetId):
+        """ Return the file with the key of the quantum that produced a
+        dataset """
+        return os.path.join(self._memoDir, MEMO_PROVENANCE_DIR, datasetId[:2], datasetId)
+
+    def getProducerKey(self, datasetId):
+        """ Return the key of the quantum that produced a dataset, `None`
+        if it was not produced by a memoized quantum """
+        try:
+            with open(self.provenancePath(datasetId)) as fin:
+                return fin.read().strip() or None
+        except OSError:
+            return None
+
+    def recordOutputs(self, outputs, outputRefs):
+        """ Record the key of the quantum that produced each output
+        dataset, from the metadata of the outputs
+
+        Parameters
+        ----------
+        outputs : `lsst.pipe.base.Struct`
+            The outputs, as put
+        outputRefs : `~lsst.pipe.base.connections.OutputQuantizedConnection`
+            The output data refs, a `dict` of refs also works
+        """
+        for name, ref in iterRefs(outputRefs):
+            key = getMemoKey(getattr(outputs, name, None))
+            datasetId = getDatasetId(ref)
+            if key is None or datasetId is None:
+                continue
+            path = self.provenancePath(datasetId)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w") as fout:
+                fout.write(key)
+            os.replace(tmpPath, path)
+
+    def logLookup(self, task, key, hit):
+        """ Append a lookup to the log of the store """
+        with self._lock:
+            with open(os.path.join(self._memoDir, MEMO_LOG_NAME), "a") as fout:
+                fout.write("%s %s %s\n" % ("hit" if hit else "miss", get_full_type_name(task), key))
+
+
+def computeMemoized(task, inputRefs, compute):
+    """ Return the outputs of a quantum, computing them only if they are
+    not in the store
+
+    Parameters
+    ----------
+    task : `lsst.pipe.base.PipelineTask`
+        The task, if `config.memoDir` is not set the outputs are always
+        computed
+    inputRefs : `~lsst.pipe.base.connections.InputQuantizedConnection`
+        Input data refs, after any data selection, a
+        `lsst.pipe.base.Struct` of refs also works
+    compute : `Callable`
+        Called without arguments to read the inputs and compute the
+        outputs
+
+    Returns
+    -------
+    outputs : `lsst.pipe.base.Struct`
+        The outputs
+    """
+    memoStore = EoMemoStore.fromConfig(task.config)
+    if memoStore is None:
+        return compute()
+    key = memoStore.makeKey(task, inputRefs)
+    if key is None:
+        task.log.warn("Not all inputs have a dataset ID, memoization is disabled")
+        return compute()
+    outputs = memoStore.get(key)
+    memoStore.logLookup(task, key, outputs is not None)
+    if outputs is not None:
+        task.log.info("Reusing the memoized outputs %s" % key)
+        return outputs
+    outputs = compute()
+    setMemoKey(outputs, key)
+    if not memoStore.put(key, outputs):
+        task.log.warn("Some outputs can not be memoized")
+    return outputs
+
+
+def recordMemoOutputs(task, outputs, outputRefs):
+    """ Record the key of the quantum that produced each output dataset,
+    if `config.memoDir` is set, see `EoMemoStore.recordOutputs` """
+    memoStore = EoMemoStore.fromConfig(task.config)
+    if memoStore is not None:
+        memoStore.recordOutputs(outputs, outputRefs)
+
+
+def runQuantumMemoized(task, butlerQC, inputRefs, outputRefs, compute):
+    """ Put the outputs of a quantum, computing them only if they are not
+    in the store, see `computeMemoized`, and record the key of the quantum
+    for each of their dataset IDs
+
+    Parameters
+    ----------
+    butlerQC : `~lsst.daf.butler.butlerQuantumContext.ButlerQuantumContext`
+        Butler to operate on.
+    outputRefs : `~lsst.pipe.base.connections.OutputQuantizedConnection`
+        Output data refs to persist.
+    """
+    outputs = computeMemoized(task, inputRefs, compute)
+    butlerQC.put(outputs, outputRefs)
+    recordMemoOutputs(task, outputs, outputRefs)
+
+
+def summarizeMemoLog(memoDir):
+    """ Count the hits and misses in the log of a store
+
+    Parameters
+    ----------
+    memoDir : `str`
+        The store directory
+
+    Returns
+    -------
+    counts : `dict` [`str`, `dict` [`str`, `int`]]
+        The number of 'hit' and 'miss' for each task class
+    """
+    counts = defaultdict(lambda: dict(hit=0, miss=0))
+    logPath = os.path.join(memoDir, MEMO_LOG_NAME)
+    if not os.path.exists(logPath):
+        return {}
+    with open(logPath) as fin:
+        for line in fin:
+            tokens = line.split()
+            if len(tokens) == 3 and tokens[0] in ("hit", "miss"):
+                counts[tokens[1]][tokens[0]] += 1
+    return dict(counts)
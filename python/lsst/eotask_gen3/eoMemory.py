@@ -0,0 +1,180 @@
+""" Memory budget for EO tasks
+
+The memory used by a quantum is dominated by the amp images held at the
+same time: one or two per worker for the amp loops, the full raw exposure
+when iterating over exposures first, the per-amp image cubes, or all the
+exposures of an amp when stacking.  These can all be estimated from the
+detector geometry, which is what `EoMemoryPlan` does to pick the number
+of workers, the size of the in-memory cubes and whether to spill to
+memory-mapped scratch files, given a memory budget.
+"""
+
+import resource
+import sys
+
+from .eoNumerics import getWorkingDtype
+
+__all__ = ["EoMemoryPlan", "estimateAmpBytes", "getPeakRss"]
+
+
+# int32 raw pixels
+RAW_BYTES_PER_PIXEL = 4
+
+# float32 image, int32 mask and float32 variance
+CALIB_BYTES_PER_PIXEL = 12
+
+
+def getAmpPixels(amp):
+    """ Return the number of pixels in the raw image of an amp """
+    return amp.getRawBBox().getArea()
+
+
+def estimateAmpBytes(amp, calibrated=True):
+    """ Estimate the memory needed to process one amp of one exposure
+
+    Parameters
+    ----------
+    amp : `lsst.afw.cameraGeom.Amplifier`
+        The amplifier
+    calibrated : `bool`
+        If True, include the ISR-processed copy of the image
+
+    Returns
+    -------
+    nBytes : `int`
+        The estimated number of bytes
+    """
+    bytesPerPixel = RAW_BYTES_PER_PIXEL + (CALIB_BYTES_PER_PIXEL if calibrated else 0)
+    return bytesPerPixel*getAmpPixels(amp)
+
+
+def getPeakRss():
+    """ Return the peak resident set size of this process, or of the
+    largest of its finished child processes, in bytes """
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return scale*max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                     resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+class EoMemoryPlan:
+    """ How a quantum is run to fit in its memory budget
+
+    Parameters
+    ----------
+    budget : `int`
+        The memory budget, in bytes, 0 for no budget
+    estimate : `int`
+        The estimated memory use of the plan, in bytes
+    numThreads : `int`
+        Number of amps to process at once
+    ampCubeBytes : `int`
+        Bound on the total size of the in-memory per-amp cubes
+    spill : `bool`
+        True if the large per-amp arrays go to memory-mapped scratch files
+    chunkRows : `int`
+        Number of rows to process at once when stacking, 0 for all
+    """
+
+    def __init__(self, budget=0, estimate=0, numThreads=1, ampCubeBytes=0, spill=False, chunkRows=0):
+        """ C'tor,  Fills class parameters """
+        self.budget = budget
+        self.estimate = estimate
+        self.numThreads = numThreads
+        self.ampCubeBytes = ampCubeBytes
+        self.spill = spill
+        self.chunkRows = chunkRows
+
+    @classmethod
+    def forAmpLoops(cls, config, amps, nExposure, nHeld=1, nCubes=0, expMajor=False, holdCalibrated=False):
+        """ Plan the loops over amps and exposures
+
+        Parameters
+        ----------
+        config : `lsst.pex.config.Config`
+            Used to get `memoryBudget`, `numThreads`, `ampCubeSize`,
+            `precision` and `pipelineDepth`
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        nExposure : `int`
+            Number of exposures
+        nHeld : `int`
+            Number of exposures of an amp held at the same time by a
+            worker, also the number of full raw exposures held at the
+            same time if expMajor is True
+        nCubes : `int`
+            Number of per-amp cubes filled by each worker
+        expMajor : `bool`
+            True if the full raw exposure is read and kept while its
+            amps are processed
+        holdCalibrated : `bool`
+            True if the ISR-processed copies of all the amps of the nHeld
+            exposures are kept until they are all analyzed, only used if
+            expMajor is True
+
+        Returns
+        -------
+        plan : `EoMemoryPlan`
+            The plan
+        """
+        budget = int(config.memoryBudget*1024**2)
+        numThreads = config.numThreads
+        ampCubeBytes = int(getattr(config, 'ampCubeSize', 0.)*1024**2)
+        ampBytes = max(estimateAmpBytes(amp) for amp in amps)
+        # Exposures read ahead by the pipeline, see eoPipeline
+        readAhead = max(getattr(config, 'pipelineDepth', 0), 0)
+        fixedBytes = 0
+        if expMajor:
+            fixedBytes = nHeld*(sum(estimateAmpBytes(amp, calibrated=False) for amp in amps)
+                                + readAhead*sum(estimateAmpBytes(amp) for amp in amps))
+            if holdCalibrated:
+                fixedBytes += nHeld*CALIB_BYTES_PER_PIXEL*sum(getAmpPixels(amp) for amp in amps)
+        else:
+            nHeld *= 1 + readAhead
+        cubeBytes = nCubes*nExposure*getWorkingDtype(config).itemsize*max(getAmpPixels(amp) for amp in amps)
+        if budget > 0:
+            available = max(budget - fixedBytes, 0)
+            numThreads = int(max(1, min(numThreads, available // (nHeld*ampBytes))))
+            ampCubeBytes = min(ampCubeBytes, max(available - numThreads*nHeld*ampBytes, 0))
+        nCubesAlive = len(amps) if expMajor else min(numThreads, len(amps))
+        spill = cubeBytes*nCubesAlive > ampCubeBytes
+        estimate = fixedBytes + numThreads*nHeld*ampBytes + min(cubeBytes*nCubesAlive, ampCubeBytes)
+        return cls(budget=budget, estimate=estimate, numThreads=numThreads, ampCubeBytes=ampCubeBytes,
+                   spill=spill and nCubes > 0)
+
+    @classmethod
+    def forStack(cls, config, amps, nExposure):
+        """ Plan the per-amp stacking of all the exposures
+
+        Parameters
+        ----------
+        config : `lsst.pex.config.Config`
+            Used to get `memoryBudget`
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        nExposure : `int`
+            Number of exposures
+
+        Returns
+        -------
+        plan : `EoMemoryPlan`
+            The plan
+        """
+        budget = int(config.memoryBudget*1024**2)
+        ampPixels = max(getAmpPixels(amp) for amp in amps)
+        stackBytes = nExposure*CALIB_BYTES_PER_PIXEL*ampPixels
+        if budget <= 0 or stackBytes <= budget:
+            return cls(budget=budget, estimate=stackBytes)
+        width = max(amp.getRawBBox().getWidth() for amp in amps)
+        chunkRows = int(max(1, (budget//2) // (nExposure*CALIB_BYTES_PER_PIXEL*width)))
+        estimate = nExposure*CALIB_BYTES_PER_PIXEL*width*chunkRows
+        return cls(budget=budget, estimate=estimate, spill=True, chunkRows=chunkRows)
+
+    def __str__(self):
+        return ("budget %s, estimated %.1f MB, %i thread(s), %.1f MB for cubes, spill=%s, chunkRows=%s" %
+                ("%.1f MB" % (self.budget/1024**2) if self.budget > 0 else "none", self.estimate/1024**2,
+                 self.numThreads, self.ampCubeBytes/1024**2, self.spill, self.chunkRows or "all"))
+
+    def report(self):
+        """ Return a one line description of the plan and of the peak
+        memory use so far """
+        return "Memory plan: %s; peak RSS %.1f MB" % (self, getPeakRss()/1024**2)
@@ -0,0 +1,117 @@
+""" Working precision of the EO analyzers
+
+The ISR-processed amp images are float32.  With ``precision = "float32"``
+the analyzers work on these arrays directly, or on float32 copies, which
+halves the per-amp working set compared to ``precision = "float64"``, the
+reference mode where every working array is promoted to float64.
+
+In both modes the sums behind means and variances are accumulated in
+float64, so the only extra error of the float32 mode is the rounding of
+each pixel value, at most ``FLOAT32_EPS/2`` relative.  This gives the
+following bounds, relative to the float64 reference:
+
+- means and medians: ``FLOAT32_EPS`` relative, independent of the number
+  of pixels, since the rounding errors do not accumulate;
+- variances of the difference of two images of level ``mean``: an
+  additional ``(FLOAT32_EPS*mean)**2/12`` absolute, i.e. ``1e-9`` relative
+  for shot-noise limited images up to ``1e6`` ADU;
+- statistics computed from a small difference of large values, such as
+  the pixel correlations of flat pairs: ``FLOAT32_EPS*mean/sigma``
+  relative, where ``sigma`` is the pixel noise.
+
+The analyzers summed float32 arrays in float32 before the precision
+option was added.  The default float32 mode differs from those results
+by at most their own rounding error, i.e. an extra ``FLOAT32_EPS*log2(n)``
+relative for statistics of ``n`` pixels, on top of the bounds above.
+
+`tests/test_numerics.py` checks these bounds, against the float64 mode
+and against copies of the previous implementations.
+"""
+
+import numpy as np
+
+import lsst.afw.image as afwImage
+
+__all__ = ["getWorkingDtype", "asWorkingArray", "workingMean", "workingVar", "workingStd",
+           "workingMedian", "makeWorkingImage"]
+
+
+# Relative precision of float32
+FLOAT32_EPS = float(np.finfo(np.float32).eps)
+
+# Type used to accumulate sums, whatever the working precision
+ACCUMULATOR_DTYPE = np.float64
+
+PRECISION_CHOICES = {
+    "float32": "Work on float32 arrays, accumulate in float64",
+    "float64": "Promote all the working arrays to float64 (reference mode)",
+}
+
+
+def getWorkingDtype(config):
+    """ Return the working dtype given by `config.precision`, float32 if
+    the config does not have a `precision` field """
+    return np.dtype(getattr(config, 'precision', 'float32'))
+
+
+def asWorkingArray(array, dtype, copy=False):
+    """ Return an array in the working precision
+
+    Parameters
+    ----------
+    array : `numpy.ndarray`
+        The input array
+    dtype : `numpy.dtype`
+        The working dtype
+    copy : `bool`
+        If False, the input array itself is returned when it already has
+        the working dtype, so it may be modified in place
+
+    Returns
+    -------
+    array : `numpy.ndarray`
+        The array in the working precision
+    """
+    return np.asarray(array).astype(dtype, copy=copy)
+
+
+def workingMean(array, axis=None):
+    """ Return the mean of an array, accumulated in float64 """
+    return np.mean(array, axis=axis, dtype=ACCUMULATOR_DTYPE)
+
+
+def workingVar(array, dtype, axis=None, ddof=0):
+    """ Return the variance of an array
+
+    The residuals are computed in the working precision, in a single
+    temporary array, and their squares are summed in float64.
+    """
+    mean = np.mean(array, axis=axis, dtype=ACCUMULATOR_DTYPE, keepdims=True)
+    resid = np.subtract(array, mean.astype(dtype), dtype=dtype)
+    np.square(resid, out=resid)
+    nValues = array.size if axis is None else np.prod([array.shape[ax] for ax in np.atleast_1d(axis)])
+    return np.sum(resid, axis=axis, dtype=ACCUMULATOR_DTYPE)/(nValues - ddof)
+
+
+def workingStd(array, dtype, axis=None, ddof=0):
+    """ Return the standard deviation of an array, see `workingVar` """
+    return np.sqrt(workingVar(array, dtype, axis=axis, ddof=ddof))
+
+
+def workingMedian(array, dtype, axis=None):
+    """ Return the median of an array, computed in the working precision
+
+    The input array is not modified.  Only one working copy is made, even
+    when the array has to be converted to the working dtype.
+    """
+    if array.dtype == dtype:
+        return np.median(array, axis=axis)
+    return np.median(array.astype(dtype), axis=axis, overwrite_input=True)
+
+
+def makeWorkingImage(array):
+    """ Wrap a 2D working array, without copying it, into an afw image
+    for use with `lsst.afw.math` """
+    if array.dtype == np.float64:
+        return afwImage.ImageD(array, deep=False)
+    return afwImage.ImageF(array, deep=False)
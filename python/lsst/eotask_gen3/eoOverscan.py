@@ -5,6 +5,7 @@ import lsst.afw.math as afwMath
 import lsst.pipe.base.connectionTypes as cT
 
 from .eoCalibBase import EoAmpExpCalibTaskConfig, EoAmpExpCalibTaskConnections, EoAmpExpCalibTask
+from .eoNumerics import workingMean, workingVar, workingStd
 from .eoOverscanData import EoOverscanData
 
 __all__ = ["EoOverscanTask", "EoOverscanTaskConfig"]
@@ -94,17 +95,66 @@ class EoOverscanTask(EoAmpExpCalibTask):
         amplifier overscan regions.
         """
         outTable = outputData.ampExp["ampExp_%s" % amp.getName()]
+        rows, cols, serialCols, parallelRows = self.getRegions(amp)
 
+        imarr = calibExp.image.array
+        dtype = self.workingDtype
+        outTable.columnMean[iExp] = workingMean(imarr[rows, serialCols], axis=0)
+        outTable.columnVariance[iExp] = workingVar(imarr[rows, serialCols], dtype, axis=0)
+        outTable.rowMean[iExp] = workingMean(imarr[parallelRows, cols], axis=1)
+        outTable.rowVariance[iExp] = workingVar(imarr[parallelRows, cols], dtype, axis=1)
+        outTable.serialOverscanNoise[iExp] = np.mean(workingStd(imarr[rows, serialCols.start+3:], dtype,
+                                                                axis=1))
+        outTable.parallenOverscanNoise[iExp] = np.mean(workingStd(imarr[parallelRows.start+3:, cols], dtype,
+                                                                  axis=1))
+        outTable.flatFieldSignal[iExp] = workingMean(imarr[rows, cols])
+
+    def analyzeAmpCube(self, cube, outputData, iamp, amp):
+        """Analyze data from a single amp for all the exposures
+
+        See base class for argument description
+
+        Same as `analyzeAmpExpData`, for all the exposures at once.
+        """
+        outTable = outputData.ampExp["ampExp_%s" % amp.getName()]
+        rows, cols, serialCols, parallelRows = self.getRegions(amp)
+
+        dtype = self.workingDtype
+        outTable.columnMean[:] = workingMean(cube[:, rows, serialCols], axis=1)
+        outTable.columnVariance[:] = workingVar(cube[:, rows, serialCols], dtype, axis=1)
+        outTable.rowMean[:] = workingMean(cube[:, parallelRows, cols], axis=2)
+        outTable.rowVariance[:] = workingVar(cube[:, parallelRows, cols], dtype, axis=2)
+        outTable.serialOverscanNoise[:] = np.mean(workingStd(cube[:, rows, serialCols.start+3:], dtype,
+                                                             axis=2), axis=1)
+        outTable.parallenOverscanNoise[:] = np.mean(workingStd(cube[:, parallelRows.start+3:, cols], dtype,
+                                                               axis=2), axis=1)
+        outTable.flatFieldSignal[:] = workingMean(cube[:, rows, cols], axis=(1, 2))
+
+    @staticmethod
+    def getRegions(amp):
+        """Get the regions of the amp image used in the analysis
+
+        Parameters
+        ----------
+        amp : `lsst.afw.geom.AmplifierGeometry`
+            The amplifier
+
+        Returns
+        -------
+        rows : `slice`
+            The rows of the imaging region
+        cols : `slice`
+            The columns of the imaging region
+        serialCols : `slice`
+            The columns from the last imaging column to the end of the
+            serial overscan, the noise is computed without the first 3
+        parallelRows : `slice`
+            The rows from the last imaging row to the end of the
+            parallel overscan, the noise is computed without the first 3
+        """
         xmin = amp.getRawDataBBox().getMinX()
         xmax = amp.getRawDataBBox().getMaxX()
         ymin = amp.getRawDataBBox().getMinY()
         ymax = amp.getRawDataBBox().getMaxY()
-
-        imarr = calibExp.image.array
-        outTable.columnMean[iExp] = np.mean(imarr[max(ymin-1, 0):ymax, xmax-1:], axis=0)
-        outTable.columnVariance[iExp] = np.var(imarr[max(ymin-1, 0):ymax, xmax-1:], axis=0)
-        outTable.rowMean[iExp] = np.mean(imarr[ymax-1:, max(xmin-1, 0):xmax], axis=1)
-        outTable.rowVariance[iExp] = np.var(imarr[ymax-1:, max(xmin-1, 0):xmax], axis=1)
-        outTable.serialOverscanNoise[iExp] = np.mean(np.std(imarr[max(ymin-1, 0):ymax, xmax+2:], axis=1))
-        outTable.parallenOverscanNoise[iExp] = np.mean(np.std(imarr[ymax+2:, max(xmin-1, 0):xmax], axis=1))
-        outTable.flatFieldSignal[iExp] = np.mean(imarr[max(ymin-1, 0):ymax, max(xmin-1, 0):xmax])
+        return (slice(max(ymin-1, 0), ymax), slice(max(xmin-1, 0), xmax),
+                slice(xmax-1, None), slice(ymax-1, None))
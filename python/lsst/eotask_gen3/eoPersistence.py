@@ -1,6 +1,7 @@
 import lsst.afw.math as afwMath
 
 import lsst.pipe.base.connectionTypes as cT
+from .eoAmpCube import cubeClippedStats
 from .eoCalibBase import EoAmpExpCalibTaskConfig, EoAmpExpCalibTaskConnections, EoAmpExpCalibTask
 from .eoPersistenceData import EoPersistenceData
 
@@ -87,3 +88,14 @@ class EoPersistenceTask(EoAmpExpCalibTask):
         stats = afwMath.makeStatistics(calibExp.image, afwMath.MEANCLIP | afwMath.STDEVCLIP, self.statCtrl)
         outputData.ampExp["ampExp_%s" % amp.getName()].mean[iExp] = stats.getValue(afwMath.MEANCLIP)
         outputData.ampExp["ampExp_%s" % amp.getName()].stdev[iExp] = stats.getValue(afwMath.STDEVCLIP)
+
+    def analyzeAmpCube(self, cube, outputData, iamp, amp):
+        """Analyze data from a single amp for all the exposures
+
+        See base class for argument description
+
+        Same as `analyzeAmpExpData`, for all the exposures at once.
+        """
+        mean, stdev = cubeClippedStats(cube, self.statCtrl.getNumSigmaClip(), self.statCtrl.getNumIter())
+        outputData.ampExp["ampExp_%s" % amp.getName()].mean[:] = mean
+        outputData.ampExp["ampExp_%s" % amp.getName()].stdev[:] = stdev
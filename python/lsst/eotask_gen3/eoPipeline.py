@@ -0,0 +1,226 @@
+""" Pipelined execution of the read, ISR and analysis stages of EO tasks
+
+`EoPipeline` runs the processing of a sequence of exposures as three
+stages connected by bounded queues: a reader thread that issues the
+(blocking) reads ahead of time, ISR worker threads, and the analysis,
+which is the loop over `EoPipeline.iterate` in the calling thread and
+sees the exposures in their original order.  The number of exposures
+read but not yet analyzed is capped, so that I/O and compute overlap
+while the memory stays bounded: when the analysis falls behind, the
+reader waits.
+
+The time each stage spends waiting for the others (the stalls) and the
+largest depth of each queue are reported, they tell which stage is the
+bottleneck.
+"""
+
+import queue
+import threading
+import time
+
+__all__ = ["EoPipeline"]
+
+
+# Interval at which waiting stages check whether the pipeline was stopped,
+# in seconds
+POLL_INTERVAL = 0.05
+
+# Marks the end of the input of the ISR workers
+_DONE = object()
+
+# Returned to a waiting stage when the pipeline was stopped by an error
+_STOP = object()
+
+PIPELINE_STAGES = {
+    "read": "Reader waiting for the analysis to catch up (backpressure)",
+    "isr": "ISR workers waiting for reads",
+    "analyze": "Analysis waiting for ISR",
+}
+
+
+class EoPipeline:
+    """ Runs the read, ISR and analysis stages over a sequence of items
+
+    Parameters
+    ----------
+    read : `Callable`
+        Called as read(item) in the reader thread, e.g., to read an
+        exposure
+    isr : `Callable`
+        Called as isr(readResult) in the ISR worker threads
+    depth : `int`
+        Number of items read ahead of the ISR workers, the number of items
+        read but not yet analyzed is at most depth + numWorkers
+    numWorkers : `int`
+        Number of ISR worker threads
+    """
+
+    def __init__(self, read, isr, depth=2, numWorkers=1):
+        """ C'tor,  Fills class parameters """
+        self.read = read
+        self.isr = isr
+        self.depth = max(depth, 1)
+        self.numWorkers = max(numWorkers, 1)
+        self._stalls = {stage: 0. for stage in PIPELINE_STAGES}
+        self._maxQueueDepth = dict(read=0, isr=0)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._errors = []
+
+    @property
+    def capacity(self):
+        """ The maximum number of items read but not yet analyzed """
+        return self.depth + self.numWorkers
+
+    def iterate(self, items):
+        """ Run the read and ISR stages over items, and yield the results
+        in order
+
+        The slot of an item is freed when the loop asks for the next one,
+        so the body of the loop is the analysis stage.  The stall times
+        and queue depths are accumulated over successive calls, which
+        must not overlap.
+
+        Parameters
+        ----------
+        items : `list`
+            The items, e.g., the input exposure handles
+
+        Yields
+        ------
+        index : `int`
+            The index of the item
+        result :
+            The value returned by isr for the item
+
+        Raises
+        ------
+        Exception : The first exception raised by the read or ISR stages,
+            the other stages are stopped
+        """
+        items = list(items)
+        self._stop.clear()
+        self._errors = []
+        slots = threading.Semaphore(self.capacity)
+        readQueue = queue.Queue(self.capacity + self.numWorkers)
+        isrQueue = queue.Queue(self.capacity)
+        threads = [threading.Thread(target=self._runReader, args=(items, slots, readQueue),
+                                    name="eoPipelineRead", daemon=True)]
+        threads += [threading.Thread(target=self._runWorker, args=(readQueue, isrQueue),
+                                     name="eoPipelineIsr%i" % iWorker, daemon=True)
+                    for iWorker in range(self.numWorkers)]
+        for thread in threads:
+            thread.start()
+        try:
+            pending = {}
+            for idx in range(len(items)):
+                while idx not in pending:
+                    entry = self._get(isrQueue, "analyze")
+                    if entry is _STOP:
+                        raise self._errors[0]
+                    pending[entry[0]] = entry[1]
+                yield idx, pending.pop(idx)
+                slots.release()
+        finally:
+            # Also reached if the loop is left early
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _runReader(self, items, slots, readQueue):
+        """ Read the items, waiting for a free slot before each read """
+        try:
+            for idx, item in enumerate(items):
+                if not self._wait(slots.acquire, "read"):
+                    return
+                data = self.read(item)
+                readQueue.put((idx, data))
+                self._trackDepth("read", readQueue)
+        except BaseException as err:
+            self._fail(err)
+        finally:
+            for _ in range(self.numWorkers):
+                readQueue.put(_DONE)
+
+    def _runWorker(self, readQueue, isrQueue):
+        """ Run ISR on the items read, until the reader is done """
+        while True:
+            entry = self._get(readQueue, "isr")
+            if entry is _STOP or entry is _DONE:
+                return
+            idx, data = entry
+            try:
+                result = self.isr(data)
+            except BaseException as err:
+                self._fail(err)
+                return
+            isrQueue.put((idx, result))
+            self._trackDepth("isr", isrQueue)
+
+    def _wait(self, acquire, stage):
+        """ Call acquire(timeout=...) until it succeeds, recording the time
+        waited as a stall of stage, returns False if the pipeline was
+        stopped """
+        tStart = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                if acquire(timeout=POLL_INTERVAL):
+                    return True
+            return False
+        finally:
+            self._addStall(stage, time.perf_counter() - tStart)
+
+    def _get(self, theQueue, stage):
+        """ Get the next entry of a queue, recording the time waited as a
+        stall of stage, returns _STOP if the pipeline was stopped """
+        tStart = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    return theQueue.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    pass
+            return _STOP
+        finally:
+            self._addStall(stage, time.perf_counter() - tStart)
+
+    def _fail(self, err):
+        """ Record an exception and stop all the stages """
+        with self._lock:
+            self._errors.append(err)
+        self._stop.set()
+
+    def _addStall(self, stage, duration):
+        with self._lock:
+            self._stalls[stage] += duration
+
+    def _trackDepth(self, name, theQueue):
+        with self._lock:
+            self._maxQueueDepth[name] = max(self._maxQueueDepth[name], theQueue.qsize())
+
+    def summary(self):
+        """ Return the queue depths and stall times
+
+        Returns
+        -------
+        summary : `dict`
+            The 'depth' and 'numWorkers' of the pipeline, the 'stalls' of
+            each stage, in seconds, see `PIPELINE_STAGES`, and the
+            'maxQueueDepth' of the 'read' and 'isr' queues
+        """
+        with self._lock:
+            return dict(depth=self.depth, numWorkers=self.numWorkers, stalls=dict(self._stalls),
+                        maxQueueDepth=dict(self._maxQueueDepth))
+
+    def record(self, timer=None):
+        """ Add the stall times to a stage timer, as '<stage>Stall' stages,
+        and return a one line report """
+        summary = self.summary()
+        if timer is not None:
+            for stage, duration in summary['stalls'].items():
+                timer.add("%sStall" % stage, duration)
+        return ("Pipeline: depth %i, %i ISR worker(s), max queue depths read %i, isr %i; "
+                "stalls read %.3f s, isr %.3f s, analyze %.3f s" %
+                (summary['depth'], summary['numWorkers'], summary['maxQueueDepth']['read'],
+                 summary['maxQueueDepth']['isr'], summary['stalls']['read'], summary['stalls']['isr'],
+                 summary['stalls']['analyze']))
@@ -0,0 +1,406 @@
+""" Pre-scan of the input exposures of EO tasks
+
+With `config.doPreScan` set, the tasks that loop over amps and exposures
+(or pairs) look at each exposure cheaply before the full pixel reads and
+ISR, and drop the unusable ones:
+
+    shutter     the shutter open time of a flat differs from its
+                exposure time, from the header
+    missingAmp  an amp has constant pixel values, in a few rows read in
+                the middle of its data region, but not in every exposure
+                (an amp that is dead in every exposure is left to the
+                analysis)
+    saturated   most of the pre-scan pixels of an amp are saturated
+    noPdFlux    the photodiode integral is not positive
+    pdMismatch  the photodiode integrals of the two exposures of a pair
+                differ by more than `maxPdFracDev`
+    unreadable  the header or pixels can not be read
+
+An exposure pair is dropped if either exposure is.  The dropped
+exposures and the reasons are stored as a JSON string in the metadata of
+the first table of the output `EoCalib`, and can be read back with
+`getPreScanSummary`.
+"""
+
+import json
+
+import numpy as np
+
+import lsst.geom as lsstGeom
+
+__all__ = ["EoPreScan", "getPreScanSummary", "integratePdFlux"]
+
+
+# Table metadata key used to store the summary
+PRE_SCAN_KEY = "EOPRESCAN"
+
+PRE_SCAN_REASONS = {
+    "shutter": "Shutter open time differs from the exposure time",
+    "missingAmp": "Amp with constant pixel values, but not in every exposure",
+    "saturated": "Amp mostly saturated",
+    "noPdFlux": "Photodiode integral not positive",
+    "pdMismatch": "Photodiode integrals of the pair differ",
+    "unreadable": "Header or pixels can not be read",
+}
+
+# Image types, from the IMGTYPE header keyword, for which the shutter
+# should be open for the exposure time
+SHUTTER_IMAGE_TYPES = ("FLAT", "SFLAT", "LAMBDA")
+
+
+def integratePdFlux(pdData, factor=5):
+    """Integrate the photodiode current, see `EoPtcTask.getFlux`
+
+    This does top-hat integration after removing an offset level, the
+    median of all readings less than 1/'factor' times maximum reading.
+    Unlike `EoPtcTask.getFlux`, the table is not modified, and a constant
+    current, i.e., no light pulse, gives 0.
+    """
+    x = np.asarray(pdData['Time'], dtype=float)
+    y = np.array(pdData['Current'], dtype=float)
+    ythresh = (y.max() - y.min())/factor + y.min()
+    below = y < ythresh
+    if not below.any():
+        return 0.
+    y -= np.median(y[below])
+    return np.sum((y[1:] + y[:-1])/2.*(x[1:] - x[:-1]))
+
+
+def getExposureId(inputExp):
+    """ Return the exposure ID of a handle, `None` if it has none """
+    try:
+        return int(inputExp.dataId['exposure'])
+    except (AttributeError, KeyError, TypeError):
+        return None
+
+
+class EoPreScan:
+    """ Cheap checks of the input exposures, see module documentation
+
+    Parameters
+    ----------
+    nRows : `int`
+        Number of rows read in the middle of the data region of each amp
+    maxSaturatedFraction : `float`
+        Maximum fraction of saturated pre-scan pixels in an amp
+    maxShutterDev : `float`
+        Maximum fractional difference between the shutter open time and
+        the exposure time of flats
+    maxPdFracDev : `float`
+        Maximum fractional difference between the photodiode integrals of
+        the two exposures of a pair
+    """
+
+    def __init__(self, nRows=4, maxSaturatedFraction=0.9, maxShutterDev=0.1, maxPdFracDev=0.05):
+        """ C'tor,  Fills class parameters """
+        self.nRows = max(nRows, 1)
+        self.maxSaturatedFraction = maxSaturatedFraction
+        self.maxShutterDev = maxShutterDev
+        self.maxPdFracDev = maxPdFracDev
+
+    @classmethod
+    def fromConfig(cls, config):
+        """ Build from the `preScan...` fields of a task config, returns
+        `None` if the pre-scan is off """
+        if not getattr(config, 'doPreScan', False):
+            return None
+        return cls(config.preScanRows, config.preScanMaxSaturated, config.preScanMaxShutterDev,
+                   config.preScanMaxPdFracDev)
+
+    def getStrips(self, amps):
+        """ Return the strips of rows read by the pre-scan
+
+        The amps whose data regions span the same rows share a strip, so
+        that a raw with two rows of amps is read with two small reads.
+
+        Parameters
+        ----------
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+
+        Returns
+        -------
+        strips : `list` [`tuple`]
+            The `lsst.geom.Box2I` of each strip, in raw coordinates, and
+            the (iamp, first column, last column + 1) of its amps, in
+            strip coordinates
+        """
+        rowGroups = {}
+        for iamp, amp in enumerate(amps):
+            bbox = amp.getRawDataBBox()
+            rowGroups.setdefault((bbox.getMinY(), bbox.getHeight()), []).append((iamp, bbox))
+        strips = []
+        for (minY, height), ampBoxes in sorted(rowGroups.items()):
+            nRows = min(self.nRows, height)
+            minX = min(bbox.getMinX() for _, bbox in ampBoxes)
+            maxX = max(bbox.getMaxX() for _, bbox in ampBoxes)
+            stripBox = lsstGeom.Box2I(lsstGeom.Point2I(minX, minY + (height - nRows)//2),
+                                      lsstGeom.Extent2I(maxX - minX + 1, nRows))
+            strips.append((stripBox, [(iamp, bbox.getMinX() - minX, bbox.getMaxX() - minX + 1)
+                                      for iamp, bbox in ampBoxes]))
+        return strips
+
+    def scanPixels(self, inputExp, amps, strips):
+        """ Read the strips of an exposure
+
+        Parameters
+        ----------
+        inputExp : `lsst.daf.butler.DeferredDatasetHandle`
+            Handle used to retrieve the exposure
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        strips : `list` [`tuple`]
+            The strips, as returned by `getStrips`
+
+        Returns
+        -------
+        constant : `numpy.ndarray` [`bool`]
+            True for the amps with constant, or no finite, pixel values
+        saturated : `numpy.ndarray` [`float`]
+            The fraction of saturated pixels of each amp
+        """
+        constant = np.zeros(len(amps), dtype=bool)
+        saturated = np.zeros(len(amps))
+        for stripBox, ampColumns in strips:
+            stripArray = inputExp.get(parameters={'bbox': stripBox}).image.array
+            for iamp, col0, col1 in ampColumns:
+                pixels = stripArray[:, col0:col1]
+                finite = pixels[np.isfinite(pixels)]
+                constant[iamp] = finite.size == 0 or finite.min() == finite.max()
+                saturation = amps[iamp].getSaturation()
+                if np.isfinite(saturation) and finite.size:
+                    saturated[iamp] = np.count_nonzero(finite >= saturation)/finite.size
+        return constant, saturated
+
+    def checkHeader(self, inputExp):
+        """ Return the reasons to drop an exposure found in its header """
+        metadata = inputExp.get(component='metadata')
+        imageType = str(metadata.get('IMGTYPE') or "").upper()
+        expTime = metadata.get('EXPTIME')
+        shutTime = metadata.get('SHUTTIME')
+        if not imageType.startswith(SHUTTER_IMAGE_TYPES) or expTime is None or shutTime is None:
+            return []
+        if expTime > 0 and abs(shutTime - expTime) > self.maxShutterDev*expTime:
+            return ["shutter"]
+        return []
+
+    def scanExposures(self, task, inputExps, amps, pdData=None):
+        """ Find the reasons to drop each exposure
+
+        Parameters
+        ----------
+        task : `lsst.pipe.base.Task`
+            The task, used to log unreadable exposures
+        inputExps : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+            Handles used to retrieve the exposures
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        pdData : `list` [`lsst.daf.butler.DeferredDatasetHandle`], optional
+            Handles used to retrieve the matching photodiode data
+
+        Returns
+        -------
+        reasons : `list` [`list` [`str`]]
+            The reasons to drop each exposure, empty for good exposures
+        pdFluxes : `list` [`float`] or `None`
+            The photodiode integral of each exposure
+        """
+        strips = self.getStrips(amps)
+        reasons = [[] for _ in inputExps]
+        constant = np.zeros((len(inputExps), len(amps)), dtype=bool)
+        for iExp, inputExp in enumerate(inputExps):
+            try:
+                reasons[iExp] += self.checkHeader(inputExp)
+                constant[iExp], saturated = self.scanPixels(inputExp, amps, strips)
+            except Exception as err:
+                task.log.warn("Pre-scan can not read exposure %s: %s" % (getExposureId(inputExp), err))
+                reasons[iExp].append("unreadable")
+                continue
+            if np.any(saturated > self.maxSaturatedFraction):
+                reasons[iExp].append("saturated")
+        readable = np.array(["unreadable" not in expReasons for expReasons in reasons])
+        if readable.any():
+            # Amps that are dead in every exposure are a property of the
+            # detector, not of the exposures
+            deadAmps = constant[readable].all(axis=0)
+            for iExp in np.flatnonzero(readable & (constant & ~deadAmps).any(axis=1)):
+                reasons[iExp].append("missingAmp")
+        pdFluxes = None
+        if pdData is not None:
+            pdFluxes = [integratePdFlux(pdRef.get()) for pdRef in pdData]
+            for iExp, pdFlux in enumerate(pdFluxes):
+                if not pdFlux > 0:
+                    reasons[iExp].append("noPdFlux")
+        return reasons, pdFluxes
+
+    def selectExposures(self, task, inputExps, amps, kwargs, pdName='photodiodeData'):
+        """ Drop the unusable exposures
+
+        Parameters
+        ----------
+        task : `lsst.pipe.base.Task`
+            The task, used for logging
+        inputExps : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+            Handles used to retrieve the exposures
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        kwargs : `dict`
+            The keywords passed to run
+        pdName : `str`
+            Name of the keyword with the matching photodiode data
+
+        Returns
+        -------
+        inputExps : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+            The kept exposures
+        kwargs : `dict`
+            The keywords, with the matching photodiode data
+        summary : `dict`
+            The pre-scan summary, see `record`
+        """
+        pdData = kwargs.get(pdName)
+        if pdData is not None and len(pdData) != len(inputExps):
+            pdData = None
+        reasons, _ = self.scanExposures(task, inputExps, amps, pdData)
+        keep = [iExp for iExp, expReasons in enumerate(reasons) if not expReasons]
+        if pdData is not None:
+            kwargs = dict(kwargs)
+            kwargs[pdName] = [pdData[iExp] for iExp in keep]
+        summary = self.summarize(task, len(inputExps), [
+            dict(exposures=[getExposureId(inputExps[iExp])], reasons=expReasons)
+            for iExp, expReasons in enumerate(reasons) if expReasons])
+        return [inputExps[iExp] for iExp in keep], kwargs, summary
+
+    def selectPairs(self, task, inputPairs, amps, kwargs, pdName='photodiodePairs'):
+        """ Drop the pairs with an unusable exposure, or with mismatched
+        photodiode integrals
+
+        Incomplete pairs, e.g., the last exposure of an odd number of
+        flats, are not scanned and are kept as they are, the amp loops
+        skip them.
+
+        Parameters
+        ----------
+        task : `lsst.pipe.base.Task`
+            The task, used for logging
+        inputPairs : `list` [`list` [`tuple`]]
+            The (handle, exposure ID) of the two exposures of each pair
+        amps : `list` [`lsst.afw.cameraGeom.Amplifier`]
+            The amplifiers of the detector
+        kwargs : `dict`
+            The keywords passed to run
+        pdName : `str`
+            Name of the keyword with the matching photodiode data pairs
+
+        Returns
+        -------
+        inputPairs : `list` [`list` [`tuple`]]
+            The kept pairs
+        kwargs : `dict`
+            The keywords, with the matching photodiode data pairs
+        summary : `dict`
+            The pre-scan summary, see `record`
+        """
+        pdPairs = kwargs.get(pdName)
+        if pdPairs is not None and len(pdPairs) != len(inputPairs):
+            pdPairs = None
+        # Offset of the first exposure of each complete pair in the
+        # scanned exposures
+        offsets = {}
+        for iPair, inputPair in enumerate(inputPairs):
+            if len(inputPair) == 2:
+                offsets[iPair] = 2*len(offsets)
+        handles = [handle for iPair in offsets for handle, _ in inputPairs[iPair]]
+        pdData = [pdRef for iPair in offsets for pdRef in pdPairs[iPair]] if pdPairs is not None else None
+        reasons, pdFluxes = self.scanExposures(task, handles, amps, pdData)
+        rejected = []
+        keep = []
+        for iPair, inputPair in enumerate(inputPairs):
+            if iPair not in offsets:
+                keep.append(iPair)
+                continue
+            offset = offsets[iPair]
+            pairReasons = sorted(set(reasons[offset] + reasons[offset + 1]))
+            if pdFluxes is not None and not pairReasons:
+                pd1, pd2 = pdFluxes[offset:offset + 2]
+                if np.abs((pd1 - pd2)/((pd1 + pd2)/2.)) > self.maxPdFracDev:
+                    pairReasons.append("pdMismatch")
+            if pairReasons:
+                rejected.append(dict(exposures=[getExposureId(handle) for handle, _ in inputPair],
+                                     reasons=pairReasons))
+            else:
+                keep.append(iPair)
+        if pdPairs is not None:
+            kwargs = dict(kwargs)
+            kwargs[pdName] = [pdPairs[iPair] for iPair in keep]
+        summary = self.summarize(task, len(inputPairs), rejected)
+        return [inputPairs[iPair] for iPair in keep], kwargs, summary
+
+    @staticmethod
+    def summarize(task, nInput, rejected):
+        """ Build the pre-scan summary and log it
+
+        Parameters
+        ----------
+        task : `lsst.pipe.base.Task`
+            The task, used for logging
+        nInput : `int`
+            Number of input exposures (or pairs)
+        rejected : `list` [`dict`]
+            The 'exposures' and 'reasons' of each dropped exposure (or
+            pair)
+
+        Returns
+        -------
+        summary : `dict`
+            The 'nInput', 'nRejected', 'rejected' and the number of
+            exposures (or pairs) dropped for each reason, 'counts'
+        """
+        counts = {}
+        for item in rejected:
+            for reason in item['reasons']:
+                counts[reason] = counts.get(reason, 0) + 1
+        summary = dict(nInput=nInput, nRejected=len(rejected), rejected=rejected, counts=counts)
+        task.log.info("Pre-scan: dropped %i of %i input(s) %s" % (len(rejected), nInput, counts))
+        for item in rejected:
+            task.log.info("Pre-scan: dropped exposure(s) %s: %s" %
+                          (item['exposures'], ", ".join(item['reasons'])))
+        return summary
+
+    @staticmethod
+    def record(calib, summary):
+        """ Store the pre-scan summary in the output data
+
+        Parameters
+        ----------
+        calib : `lsst.eotask_gen3.EoCalib`
+            The output data
+        summary : `dict`
+            The summary, as returned by `selectExposures` or `selectPairs`
+        """
+        if calib.tables:
+            calib.tables[0].meta[PRE_SCAN_KEY] = json.dumps(summary, sort_keys=True)
+
+
+def getPreScanSummary(calib):
+    """ Read back the pre-scan summary of an `EoCalib`
+
+    Parameters
+    ----------
+    calib : `lsst.eotask_gen3.EoCalib`
+        The output of a task
+
+    Returns
+    -------
+    summary : `dict` or `None`
+        The number of input exposures (or pairs) 'nInput', the number
+        dropped 'nRejected', the 'exposures' and 'reasons' of each
+        dropped one, 'rejected', and the number dropped for each reason,
+        'counts'; `None` if the task did not run the pre-scan
+    """
+    if not calib.tables:
+        return None
+    value = calib.tables[0].meta.get(PRE_SCAN_KEY)
+    if value is None:
+        return None
+    return json.loads(value)
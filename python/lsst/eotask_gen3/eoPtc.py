@@ -7,13 +7,13 @@ import astropy.stats as astats
 import lsst.pex.config as pexConfig
 import lsst.afw.math as afwMath
 
-import lsst.pipe.base as pipeBase
 import lsst.pipe.base.connectionTypes as cT
 
 from .eoCalibBase import (EoAmpPairCalibTaskConfig, EoAmpPairCalibTaskConnections,
-                          EoAmpPairCalibTask, runIsrOnAmp, extractAmpCalibs,
-                          copyConnect, PHOTODIODE_CONNECT)
+                          EoAmpPairCalibTask, copyConnect, PHOTODIODE_CONNECT)
+from .eoNumerics import asWorkingArray, workingMean, workingVar
 from .eoPtcData import EoPtcData
+from .eoQuickLook import sampleArray
 
 __all__ = ["EoPtcTask", "EoPtcTaskConfig"]
 
@@ -87,48 +87,25 @@ class EoPtcTask(EoAmpPairCalibTask):
         super().__init__(**kwargs)
         self.statCtrl = afwMath.StatisticsControl()
 
-    def run(self, inputPairs, **kwargs):  # pylint: disable=arguments-differ
-        """ Run method
+    def prepareOutputData(self, inputPairs, det, **kwargs):
+        """ Build the output data container and fill it with the
+        photodiode data
 
-        Parameters
-        ----------
-        inputPairs : `list` [`tuple` [`lsst.daf.Butler.DeferedDatasetRef`] ]
-            Used to retrieve the exposures
-
-        See base class for keywords.
+        See base class for argument description
 
         Returns
         -------
         outputData : `lsst.eotask_gen3.EoPtcData`
-            Output data in formatted tables
+            Container for output data
         """
-        camera = kwargs['camera']
-        # det = camera.get(inputPairs[0][0][0].dataId['detector'])
-        nPair = len(inputPairs)
-        if nPair < 1:
-            raise RuntimeError("No valid input data")
-
-        det = inputPairs[0][0][0].get().getDetector()
-
         amps = det.getAmplifiers()
         ampNames = [amp.getName() for amp in amps]
         outputData = self.makeOutputData(amps=ampNames, nAmps=len(amps), nPair=len(inputPairs),
-                                         camera=camera, detector=det)
+                                         camera=kwargs.get('camera'), detector=det)
         photodiodePairs = kwargs.get('photodiodePairs', None)
         if photodiodePairs is not None:
             self.analyzePdData(photodiodePairs, outputData)
-        for iamp, amp in enumerate(amps):
-            ampCalibs = extractAmpCalibs(amp, **kwargs)
-            for iPair, inputPair in enumerate(inputPairs):
-                if len(inputPair) != 2:
-                    self.log.warn("exposurePair %i has %i items" % (iPair, len(inputPair)))
-                    continue
-                calibExp1 = runIsrOnAmp(self, inputPair[0][0].get(parameters={"amp": iamp}), **ampCalibs)
-                calibExp2 = runIsrOnAmp(self, inputPair[1][0].get(parameters={"amp": iamp}), **ampCalibs)
-                amp2 = calibExp1.getDetector().getAmplifiers()[0]
-                self.analyzeAmpPairData(calibExp1, calibExp2, outputData, amp2, iPair)
-            self.analyzeAmpRunData(outputData, iamp, amp2)
-        return pipeBase.Struct(outputData=outputData)
+        return outputData
 
     def makeOutputData(self, amps, nAmps, nPair, **kwargs):  # pylint: disable=arguments-differ,no-self-use
         """Construct the output data object
@@ -185,7 +162,8 @@ class EoPtcTask(EoAmpPairCalibTask):
         amplifier imaging region.
         """
         outTable = outputData.ampExp["ampExp_%s" % amp.getName()]
-        results = self.pairMean(calibExp1, calibExp2, amp, self.statCtrl)
+        results = self.pairMean(calibExp1, calibExp2, amp, self.statCtrl, self.workingDtype,
+                                quickLook=self.quickLook)
         outTable.mean[iPair] = results[0]
         outTable.var[iPair] = results[1]
         outTable.discard[iPair] = results[2]
@@ -211,44 +189,73 @@ class EoPtcTask(EoAmpPairCalibTask):
         outTable.ptcTurnoff[iamp] = results[6]
 
     @staticmethod
-    def pairMean(calibExp1, calibExp2, amp, statCtrl):
-        """Return the mean of the two exposures, and the mean of the means"""
-        mean1 = afwMath.makeStatistics(calibExp1[amp.getRawDataBBox()].image,
-                                       afwMath.MEAN, statCtrl).getValue()
-        mean2 = afwMath.makeStatistics(calibExp2[amp.getRawDataBBox()].image,
-                                       afwMath.MEAN, statCtrl).getValue()
+    def pairMean(calibExp1, calibExp2, amp, statCtrl, dtype=np.float32, quickLook=None):
+        """Return the mean of the two exposures, and the mean of the means
+
+        The input images are not modified, the re-weighted images are
+        copies in the working dtype, so the same calibrated images
+        can be handed to other analyzers, see `EoFusedCalibTask`.  The
+        outlier filter is a boolean mask rather than an index array, and
+        all the means and variances are accumulated in float64.
+
+        If quickLook is given, only the pixels it samples are used.
+        """
+        if quickLook is None:
+            mean1 = afwMath.makeStatistics(calibExp1[amp.getRawDataBBox()].image,
+                                           afwMath.MEAN, statCtrl).getValue()
+            mean2 = afwMath.makeStatistics(calibExp2[amp.getRawDataBBox()].image,
+                                           afwMath.MEAN, statCtrl).getValue()
+        else:
+            bbox = amp.getRawDataBBox()
+            mean1 = np.nanmean(quickLook.sample(calibExp1[bbox].image.array), dtype=np.float64)
+            mean2 = np.nanmean(quickLook.sample(calibExp2[bbox].image.array), dtype=np.float64)
         fmean = (mean1 + mean2)/2.
         # Pierre Astier's symmetric weights to make the difference
         # image have zero mean
         weight1 = mean2/fmean
         weight2 = mean1/fmean
-        calibExp1.image.array *= weight1
-        calibExp2.image.array *= weight2
+        image1 = np.ravel(asWorkingArray(sampleArray(quickLook, calibExp1.image.array), dtype, copy=True))
+        image2 = np.ravel(asWorkingArray(sampleArray(quickLook, calibExp2.image.array), dtype, copy=True))
+        image1 *= weight1
+        image2 *= weight2
 
         # Make a robust estimate of variance by filtering outliers
-        image1 = np.ravel(calibExp1.image.array)
-        image2 = np.ravel(calibExp2.image.array)
         fdiff = image1 - image2
         mad = astats.mad_std(fdiff)  # /2.
         # The factor 14.826 below makes the filter the equivalent of a 10-sigma
         # cut for a normal distribution
-        keep = np.where((np.abs(fdiff) < (mad*14.826)))[0]
+        keep = np.abs(fdiff, out=fdiff) < (mad*14.826)
+        del fdiff
 
         # Re-weight the images
-        mean1 = np.mean(image1[keep], dtype=np.float64)
-        mean2 = np.mean(image2[keep], dtype=np.float64)
+        kept1 = image1[keep]
+        kept2 = image2[keep]
+        mean1 = workingMean(kept1)
+        mean2 = workingMean(kept2)
         fmean = (mean1 + mean2)/2.
         weight1 = mean2/fmean
         weight2 = mean1/fmean
-        image1 *= weight1
-        image2 *= weight2
+        kept1 *= weight1
+        kept1 -= weight2*kept2
 
         fmean = (mean1 + mean2)/2.
-        fvar = np.var(image1[keep] - image2[keep])/2.
-        discard = len(image1) - len(keep)
+        fvar = workingVar(kept1, dtype)/2.
+        discard = len(image1) - len(kept1)
 
         return fmean, fvar, discard
 
+    def getQuickLookErrors(self, outputData, amps):
+        """Return the statistical errors on the metrics in quick-look mode
+
+        See base class for argument description
+
+        These are the errors from the fit of the PTC curve to the
+        analyzed pairs.
+        """
+        ampTable = outputData.amps['amps']
+        return dict(ptcGain=ampTable.ptcGainError, ptcA00=ampTable.ptcA00Error,
+                    ptcNoise=ampTable.ptcNoiseError)
+
     def fitPtcCurve(self, mean, var, sigCut=5):
         """Fit the PTC curve for a set of mean-variance points."""
         indexOld = []
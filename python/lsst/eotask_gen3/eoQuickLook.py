@@ -0,0 +1,289 @@
+""" Quick-look mode for EO tasks
+
+In quick-look mode the tasks analyze a deterministic subsample of the
+pixels of each amp, either strided rows and columns or randomly placed
+blocks drawn with a fixed seed, and at most `quickLookExposures`
+exposures (or pairs), evenly spaced in the run.  The results are
+approximate, so each task also estimates the statistical uncertainty of
+its metrics from the subsample.  The sampled fractions and the
+uncertainties are stored as a JSON string in the metadata of the first
+table of the output `EoCalib`, and can be read back with
+`getQuickLookSummary`.
+"""
+
+import json
+import math
+
+import numpy as np
+
+import lsst.geom as lsstGeom
+
+__all__ = ["EoQuickLook", "getQuickLookSummary", "sampleArray", "getColumnBoxes",
+           "medianError", "quantileError", "countEstimate"]
+
+
+# Table metadata key used to store the summary
+QUICK_LOOK_KEY = "EOQUICKLOOK"
+
+# Width of the blocks in "blocks" mode, in pixels
+QUICK_LOOK_BLOCK_SIZE = 32
+
+# Seed for the placement of the blocks
+QUICK_LOOK_SEED = 1234
+
+QUICK_LOOK_MODES = {
+    "strided": "Every n-th row and column",
+    "blocks": "Blocks of %i rows and columns at random (but reproducible) locations" % QUICK_LOOK_BLOCK_SIZE,
+}
+
+# Ratio of the error on the median to the error on the mean, for
+# gaussian data
+MEDIAN_ERROR_FACTOR = math.sqrt(math.pi/2.)
+
+
+class EoQuickLook:
+    """ Subsample of the pixels and exposures analyzed in quick-look mode
+
+    Parameters
+    ----------
+    pixelFraction : `float`
+        Target fraction of the pixels of each amp to analyze
+    maxExposures : `int`
+        Maximum number of exposures (or pairs) to analyze, 0 for all
+    mode : `str`
+        How the pixels are sampled, see `QUICK_LOOK_MODES`
+    """
+
+    def __init__(self, pixelFraction=0.1, maxExposures=0, mode="strided"):
+        """ C'tor,  Fills class parameters """
+        self.pixelFraction = min(max(pixelFraction, 0.), 1.)
+        self.maxExposures = maxExposures
+        self.mode = mode
+
+    @classmethod
+    def fromConfig(cls, config):
+        """ Build from the `quickLook...` fields of a task config, returns
+        `None` if quick-look mode is off """
+        if not getattr(config, 'quickLook', False):
+            return None
+        return cls(config.quickLookFraction, config.quickLookExposures, config.quickLookMode)
+
+    def selectExposureIndices(self, nExposure):
+        """ Return the indices of the exposures to analyze, evenly spaced
+        between the first and the last one """
+        if self.maxExposures <= 0 or nExposure <= self.maxExposures:
+            return list(range(nExposure))
+        return sorted(set(np.linspace(0, nExposure - 1, self.maxExposures).round().astype(int).tolist()))
+
+    def selectExposures(self, items):
+        """ Return the exposures (or pairs) to analyze from a list """
+        return [items[idx] for idx in self.selectExposureIndices(len(items))]
+
+    def selectRanges(self, nPix, fraction, salt=0):
+        """ Return the sampled ranges of indices along one axis
+
+        Parameters
+        ----------
+        nPix : `int`
+            Size of the axis
+        fraction : `float`
+            Target fraction of the indices to keep
+        salt : `int`
+            Changes the placement of the blocks, so that rows and
+            columns are not sampled at the same positions
+
+        Returns
+        -------
+        ranges : `list` [`tuple` [`int`, `int`]]
+            The (start, stop) of each sampled range, sorted
+        """
+        width = 1 if self.mode == "strided" else QUICK_LOOK_BLOCK_SIZE
+        nBlock = (nPix + width - 1)//width
+        nKeep = min(max(1, int(round(fraction*nBlock))), nBlock)
+        if self.mode == "strided":
+            blocks = np.arange(0, nBlock, max(1, int(round(nBlock/nKeep))))
+        else:
+            rng = np.random.default_rng([QUICK_LOOK_SEED, nPix, salt])
+            blocks = np.sort(rng.choice(nBlock, nKeep, replace=False))
+        return [(int(block)*width, min((int(block) + 1)*width, nPix)) for block in blocks]
+
+    def selectIndices(self, nPix, fraction, salt=0):
+        """ Return the sampled indices along one axis, see `selectRanges` """
+        ranges = self.selectRanges(nPix, fraction, salt)
+        return np.concatenate([np.arange(start, stop) for start, stop in ranges])
+
+    def getStrides(self, shape):
+        """ Return the row and column strides in "strided" mode """
+        axisFraction = math.sqrt(self.pixelFraction)
+        if axisFraction <= 0.:
+            return tuple(shape)
+        return tuple(max(1, int(round(1./axisFraction))) for _ in shape)
+
+    def sample(self, array):
+        """ Return the sampled pixels of an image, or of each image of a
+        cube
+
+        In "strided" mode, this is a view of the input array.
+
+        Parameters
+        ----------
+        array : `numpy.ndarray`
+            The image, or cube of images, the last two axes are the rows
+            and columns
+
+        Returns
+        -------
+        sampled : `numpy.ndarray`
+            The sampled rows and columns
+        """
+        if self.mode == "strided":
+            rowStride, colStride = self.getStrides(array.shape[-2:])
+            return array[..., ::rowStride, ::colStride]
+        axisFraction = math.sqrt(self.pixelFraction)
+        rows = self.selectIndices(array.shape[-2], axisFraction, 0)
+        cols = self.selectIndices(array.shape[-1], axisFraction, 1)
+        return array[..., rows, :][..., cols]
+
+    def sampleRows(self, array):
+        """ Return the sampled rows of an image, or of each image of a cube,
+        with all their columns, a fraction `pixelFraction` of the rows is
+        kept """
+        if self.mode == "strided":
+            rowStride = array.shape[-2]
+            if self.pixelFraction > 0.:
+                rowStride = max(1, int(round(1./self.pixelFraction)))
+            return array[..., ::rowStride, :]
+        return array[..., self.selectIndices(array.shape[-2], self.pixelFraction), :]
+
+    def sampledFraction(self, shape):
+        """ Return the actual fraction of the pixels sampled from an image
+        with the given (rows, columns) shape """
+        nRows, nCols = shape
+        if self.mode == "strided":
+            rowStride, colStride = self.getStrides(shape)
+            nSampled = len(range(0, nRows, rowStride))*len(range(0, nCols, colStride))
+        else:
+            axisFraction = math.sqrt(self.pixelFraction)
+            nSampledRows = len(self.selectIndices(nRows, axisFraction, 0))
+            nSampled = nSampledRows*len(self.selectIndices(nCols, axisFraction, 1))
+        return nSampled/float(nRows*nCols)
+
+    def columnBoxes(self, bbox):
+        """ Return the sampled bands of full columns of a bounding box
+
+        Full columns are needed to find bad columns, so the tasks that
+        look for defects sample bands of columns, with a fraction
+        `pixelFraction` of the columns, rather than pixels.
+        """
+        return [lsstGeom.Box2I(lsstGeom.Point2I(bbox.getMinX() + start, bbox.getMinY()),
+                               lsstGeom.Extent2I(stop - start, bbox.getHeight()))
+                for start, stop in self.selectRanges(bbox.getWidth(), self.pixelFraction)]
+
+    def columnFraction(self, bbox):
+        """ Return the actual fraction of the columns of a bounding box in
+        the bands given by `columnBoxes` """
+        return sum(box.getWidth() for box in self.columnBoxes(bbox))/float(bbox.getWidth())
+
+    def record(self, task, calib, pixelFraction, nExposure=None, errors=None):
+        """ Store the sampled fractions and the error estimates in the
+        output data, and log them
+
+        Parameters
+        ----------
+        task : `lsst.pipe.base.Task`
+            The task, used to log the summary
+        calib : `lsst.eotask_gen3.EoCalib`
+            The output data
+        pixelFraction : `float`
+            Actual fraction of the pixels of each amp analyzed
+        nExposure : `int`, optional
+            Number of input exposures (or pairs), `None` for tasks that
+            analyze a stacked image
+        errors : `dict` [`str`, `list`], optional
+            The error estimates for each metric, by amp
+        """
+        summary = dict(mode=self.mode, pixelFraction=float(pixelFraction),
+                       errors={key: np.asarray(value, dtype=float).tolist()
+                               for key, value in (errors or {}).items()})
+        if nExposure is not None:
+            summary['nExposure'] = nExposure
+            summary['nExposureUsed'] = len(self.selectExposureIndices(nExposure))
+            summary['exposureFraction'] = summary['nExposureUsed']/float(max(nExposure, 1))
+        if calib.tables:
+            calib.tables[0].meta[QUICK_LOOK_KEY] = json.dumps(summary, sort_keys=True)
+        task.log.info("Quick-look mode: %.3f of the pixels, %s exposure(s)" %
+                      (pixelFraction, "%i/%i" % (summary['nExposureUsed'], nExposure)
+                       if nExposure is not None else "stacked"))
+
+
+def getQuickLookSummary(calib):
+    """ Read back the quick-look summary of an `EoCalib`
+
+    Parameters
+    ----------
+    calib : `lsst.eotask_gen3.EoCalib`
+        The output of a task
+
+    Returns
+    -------
+    summary : `dict` or `None`
+        The sampling 'mode', the analyzed 'pixelFraction', the
+        'nExposure', 'nExposureUsed' and 'exposureFraction' for tasks
+        that read exposures, and the 'errors' of each metric, by amp;
+        `None` if the task did not run in quick-look mode
+    """
+    if not calib.tables:
+        return None
+    value = calib.tables[0].meta.get(QUICK_LOOK_KEY)
+    if value is None:
+        return None
+    return json.loads(value)
+
+
+def sampleArray(quickLook, array):
+    """ Return the sampled pixels of an array, or the array itself if
+    quickLook is `None` """
+    if quickLook is None:
+        return array
+    return quickLook.sample(array)
+
+
+def getColumnBoxes(quickLook, bbox):
+    """ Return the sampled bands of columns of a bounding box, or the
+    bounding box itself if quickLook is `None` """
+    if quickLook is None:
+        return [bbox]
+    return quickLook.columnBoxes(bbox)
+
+
+def medianError(values):
+    """ Return the statistical error on the median of a set of values,
+    NaN if there are fewer than two values """
+    values = np.asarray(values, dtype=float).ravel()
+    values = values[np.isfinite(values)]
+    if values.size < 2:
+        return np.nan
+    return MEDIAN_ERROR_FACTOR*np.std(values, ddof=1)/math.sqrt(values.size)
+
+
+def quantileError(values, quantile):
+    """ Return the statistical error on a quantile of a set of values
+
+    This is half the width of the 68% confidence interval of the
+    quantile, given by the binomial distribution of the number of values
+    below it.
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    if values.size < 2:
+        return np.nan
+    delta = math.sqrt(quantile*(1. - quantile)/values.size)
+    low, high = np.quantile(values, [max(quantile - delta, 0.), min(quantile + delta, 1.)])
+    return 0.5*(high - low)
+
+
+def countEstimate(count, fraction):
+    """ Return the estimate of a count over all the pixels, and its
+    Poisson error, from the count in a sampled fraction of them """
+    if fraction <= 0.:
+        return 0, np.nan
+    return int(round(count/fraction)), math.sqrt(max(count, 1))/fraction
@@ -0,0 +1,294 @@
+""" Task to run a detector-level EO task on all the detectors of a raft
+in a single quantum
+
+The quantum has only the "instrument" dimension, so it gets the inputs
+of all the detectors selected by the data query; to get one quantum per
+raft, restrict the query to a raft, e.g. ``detector.raft = 'R22'``.
+The camera is read once, and each worker keeps its own instance of the
+detector-level task, with its `isr` sub-task, for all the detectors it
+processes.  There is still one output per detector, with the same
+dataset type as the detector-level task, so downstream tasks do not
+change.
+"""
+
+import dataclasses
+import queue
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import lsst.pex.config as pexConfig
+import lsst.pipe.base as pipeBase
+import lsst.pipe.base.connectionTypes as cT
+
+from .eoCalibBase import (CAMERA_CONNECT, BIAS_CONNECT, DARK_CONNECT, DEFECTS_CONNECT, GAINS_CONNECT,
+                          PHOTODIODE_CONNECT, INPUT_RAW_AMPS_CONNECT, copyConnect)
+from .eoMemo import computeMemoized, recordMemoOutputs
+from .eoReadNoise import EoReadNoiseTask
+
+__all__ = ["EoRaftCalibTask", "EoRaftCalibTaskConfig", "groupInputsByDetector", "groupDetectorsByRaft"]
+
+
+def makeRaftConnect(connection):
+    """ Return a copy of a per-detector connection that gets the datasets
+    for all the detectors, without reading them """
+    return dataclasses.replace(connection, multiple=True, deferLoad=True)
+
+
+def getDetectorId(ref):
+    """ Return the detector ID of a dataset ref, `None` if it does not
+    have the detector dimension """
+    try:
+        return ref.dataId['detector']
+    except KeyError:
+        return None
+
+
+def groupInputsByDetector(inputRefs, inputs):
+    """ Split the input refs and inputs of a quantum by detector
+
+    Datasets without the detector dimension (e.g., the camera or the
+    photodiode data) are given to all the detectors.
+
+    Parameters
+    ----------
+    inputRefs : `~lsst.pipe.base.connections.InputQuantizedConnection`
+        Input data refs of the quantum
+    inputs : `dict`
+        The inputs, as returned by butlerQC.get(inputRefs)
+
+    Returns
+    -------
+    detInputs : `dict` [`int`, `tuple` [`dict`, `dict`]]
+        For each detector ID, the refs and the inputs, keyed by
+        connection name
+    """
+    shared = []
+    grouped = defaultdict(lambda: (defaultdict(list), defaultdict(list)))
+    for name, refs in inputRefs:
+        if not isinstance(refs, (list, tuple)):
+            shared.append((name, refs, inputs[name]))
+            continue
+        if refs and getDetectorId(refs[0]) is None:
+            shared.append((name, list(refs), list(inputs[name])))
+            continue
+        for ref, value in zip(refs, inputs[name]):
+            detRefs, detValues = grouped[getDetectorId(ref)]
+            detRefs[name].append(ref)
+            detValues[name].append(value)
+    detInputs = OrderedDict()
+    for detId in sorted(grouped.keys()):
+        detRefs, detValues = grouped[detId]
+        detRefs = dict(detRefs)
+        detValues = dict(detValues)
+        for name, refs, value in shared:
+            detRefs[name] = refs
+            detValues[name] = value
+        detInputs[detId] = (detRefs, detValues)
+    return detInputs
+
+
+def groupDetectorsByRaft(camera, detIds):
+    """ Group detector IDs by raft name
+
+    Parameters
+    ----------
+    camera : `lsst.afw.cameraGeom.Camera`
+        The camera, detector names are expected to be <raft>_<sensor>
+    detIds : `list` [`int`]
+        The detector IDs
+
+    Returns
+    -------
+    rafts : `dict` [`str`, `list` [`int`]]
+        The detector IDs for each raft, sorted by raft name
+    """
+    rafts = defaultdict(list)
+    for detId in detIds:
+        rafts[camera[detId].getName().split('_')[0]].append(detId)
+    return OrderedDict([(raftName, rafts[raftName]) for raftName in sorted(rafts.keys())])
+
+
+class EoRaftCalibTaskConnections(pipeBase.PipelineTaskConnections,
+                                 dimensions=("instrument",)):
+    """ Same inputs as `EoAmpExpCalibTaskConnections` and
+    `EoAmpPairCalibTaskConnections`, but for many detectors """
+    camera = copyConnect(CAMERA_CONNECT)
+    bias = makeRaftConnect(BIAS_CONNECT)
+    defects = makeRaftConnect(DEFECTS_CONNECT)
+    dark = makeRaftConnect(DARK_CONNECT)
+    gains = makeRaftConnect(GAINS_CONNECT)
+    inputExps = copyConnect(INPUT_RAW_AMPS_CONNECT)
+    photodiodeData = copyConnect(PHOTODIODE_CONNECT)
+
+    outputData = cT.Output(
+        name="eoReadNoise",
+        doc="Electrial Optical Calibration Output, one per detector",
+        storageClass="IsrCalib",
+        dimensions=("instrument", "detector"),
+        multiple=True,
+    )
+
+    def __init__(self, *, config=None):
+        super().__init__(config=config)
+        calibConfig = config.calib.value
+        calibConnections = type(calibConfig).ConnectionsClass(config=calibConfig)
+        for name in ("bias", "defects", "dark", "photodiodeData"):
+            if name not in calibConnections.inputs:
+                self.inputs.discard(name)
+        if "gains" not in calibConnections.prerequisiteInputs:
+            self.prerequisiteInputs.discard("gains")
+
+
+class EoRaftCalibTaskConfig(pipeBase.PipelineTaskConfig,
+                            pipelineConnections=EoRaftCalibTaskConnections):
+
+    calib = pexConfig.ConfigurableField(
+        target=EoReadNoiseTask,
+        doc="The detector-level task run on each detector, derived from EoAmpExpCalibTask or "
+        "EoAmpPairCalibTask",
+    )
+    numDetThreads = pexConfig.Field("Number of detectors processed at once", int, default=1)
+
+    def validate(self):
+        super().validate()
+        # pylint: disable=no-member
+        if self.connections.outputData != self.calib.connections.outputData:
+            raise ValueError("connections.outputData (%s) should be the output of the calib task (%s)" %
+                             (self.connections.outputData, self.calib.connections.outputData))
+
+
+class EoRaftCalibTask(pipeBase.PipelineTask):
+    """ Runs a detector-level task on all the detectors of a quantum
+
+    The detectors are processed raft by raft, up to
+    `config.numDetThreads` at once.  For each detector, the inputs are
+    selected and passed to run as if the detector-level task had been run
+    by itself, using its `selectInputRefs` and `runWithInputs` methods.
+    """
+
+    ConfigClass = EoRaftCalibTaskConfig
+    _DefaultName = "eoRaft"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.makeSubtask("calib")
+        self._workers = queue.Queue()
+        self._workers.put(self.calib)
+        for iWorker in range(1, max(self.config.numDetThreads, 1)):
+            self._workers.put(self.config.calib.apply(name="calib%i" % iWorker, parentTask=self))
+        calibConfig = self.calib.config
+        self.calibConnections = type(calibConfig).ConnectionsClass(config=calibConfig)
+
+    def runQuantum(self, butlerQC, inputRefs, outputRefs):
+        """ Run the detector-level task on each detector
+
+        Parameters
+        ----------
+        butlerQC : `~lsst.daf.butler.butlerQuantumContext.ButlerQuantumContext`
+            Butler to operate on.
+        inputRefs : `~lsst.pipe.base.connections.InputQuantizedConnection`
+            Input data refs to load.
+        ouptutRefs : `~lsst.pipe.base.connections.OutputQuantizedConnection`
+            Output data refs to persist.
+        """
+        inputs = butlerQC.get(inputRefs)
+        detInputs = groupInputsByDetector(inputRefs, inputs)
+        outputRefDict = {getDetectorId(ref): ref for ref in outputRefs.outputData}
+        rafts = groupDetectorsByRaft(inputs['camera'], detInputs.keys())
+        for raftName, detIds in rafts.items():
+            self.log.info("Raft %s: %i detector(s)" % (raftName, len(detIds)))
+
+        with ThreadPoolExecutor(max_workers=max(self.config.numDetThreads, 1)) as pool:
+            futures = {pool.submit(self.runDetector, *detInputs[detId]): detId
+                       for detIds in rafts.values() for detId in detIds}
+            for future in as_completed(futures):
+                outputRef = outputRefDict[futures[future]]
+                butlerQC.put(future.result().outputData, outputRef)
+                recordMemoOutputs(self.calib, future.result(), dict(outputData=outputRef))
+
+    def runDetector(self, detRefs, detValues):
+        """ Run the detector-level task on one detector
+
+        Parameters
+        ----------
+        detRefs : `dict` [`str`, `list`]
+            The input refs of the detector, keyed by connection name
+        detValues : `dict` [`str`, `list`]
+            The inputs of the detector, keyed by connection name
+
+        Returns
+        -------
+        outputs : `lsst.pipe.base.Struct`
+            The outputs of the detector-level task
+        """
+        task = self._workers.get()
+        try:
+            refs = self.selectDetectorRefs(task, detRefs)
+
+            def compute():
+                return task.runWithInputs(refs, self.readDetectorInputs(refs, detRefs, detValues))
+
+            return computeMemoized(task, refs, compute)
+        finally:
+            self._workers.put(task)
+
+    def selectDetectorRefs(self, task, detRefs):
+        """ Select the input refs of one detector
+
+        Parameters
+        ----------
+        task : `lsst.pipe.base.PipelineTask`
+            The detector-level task
+        detRefs : `dict` [`str`, `list`]
+            The input refs of the detector, keyed by connection name
+
+        Returns
+        -------
+        refs : `lsst.pipe.base.Struct`
+            The selected refs, as in the detector-level quantum
+        """
+        refs = pipeBase.Struct()
+        for name, refList in detRefs.items():
+            connection = self.calibConnections.allConnections.get(name)
+            if connection is None or not refList:
+                continue
+            if connection.multiple or not isinstance(refList, list):
+                setattr(refs, name, refList)
+            else:
+                setattr(refs, name, refList[0])
+        task.selectInputRefs(refs)
+        return refs
+
+    def readDetectorInputs(self, refs, detRefs, detValues):
+        """ Convert the selected inputs of one detector to what the
+        detector-level task expects
+
+        Parameters
+        ----------
+        refs : `lsst.pipe.base.Struct`
+            The selected refs, see `selectDetectorRefs`
+        detRefs : `dict` [`str`, `list`]
+            The input refs of the detector, keyed by connection name
+        detValues : `dict` [`str`, `list`]
+            The inputs of the detector, keyed by connection name
+
+        Returns
+        -------
+        inputs : `dict`
+            The selected inputs, as returned by butlerQC.get(refs)
+        """
+        inputs = {}
+        for name, value in refs.getDict().items():
+            connection = self.calibConnections.allConnections[name]
+            if not isinstance(detRefs[name], list):
+                inputs[name] = detValues[name]
+                continue
+            valueDict = {ref.id: handle for ref, handle in zip(detRefs[name], detValues[name])}
+            if connection.multiple:
+                handles = [valueDict[ref.id] for ref in value]
+            else:
+                handles = [valueDict[value.id]]
+            if not connection.deferLoad:
+                handles = [handle.get() for handle in handles]
+            inputs[name] = handles if connection.multiple else handles[0]
+        return inputs
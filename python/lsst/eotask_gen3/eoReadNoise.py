@@ -6,6 +6,7 @@ import lsst.geom as lsstGeom
 import lsst.pipe.base.connectionTypes as cT
 
 from .eoCalibBase import EoAmpExpCalibTaskConfig, EoAmpExpCalibTaskConnections, EoAmpExpCalibTask
+from .eoQuickLook import sampleArray, medianError
 from .eoReadNoiseData import EoReadNoiseData
 
 __all__ = ["EoReadNoiseTask", "EoReadNoiseTaskConfig"]
@@ -31,14 +32,15 @@ class SubRegionSampler:
         """ Create and return a sub-image starting at x, y """
         return im.Factory(im, self.bbox(x, y))
 
-    def noiseSamples(self, calibExp, statCtrl=afwMath.StatisticsControl()):
-        """ Compute the noise in a set of samples of the imaging region """
+    def noiseSamples(self, calibExp, statCtrl=afwMath.StatisticsControl(), quickLook=None):
+        """ Compute the noise in a set of samples of the imaging region,
+        using only the pixels sampled by quickLook if it is given """
         image = calibExp.Factory(calibExp, self.imaging)
         bbox = image.getBBox()
         samples = []
         for x, y in zip(self.xarr, self.yarr):
             subim = self.subim(image, x + bbox.getMinX(), y + bbox.getMinY())
-            stdev = afwMath.makeStatistics(subim.image.array.flatten(),
+            stdev = afwMath.makeStatistics(sampleArray(quickLook, subim.image.array).flatten(),
                                            afwMath.STDEV, statCtrl).getValue()  # pylint: disable=no-member
         samples.append(stdev)
         return np.array(samples)
@@ -128,7 +130,8 @@ class EoReadNoiseTask(EoAmpExpCalibTask):
         nsamp = self.config.nsamp
 
         sampler = SubRegionSampler(dx, dy, nsamp, imaging=imaging)
-        outputData.ampExp["ampExp_%s" % amp.getName()].totalNoise[iExp] = sampler.noiseSamples(calibExp)
+        outputData.ampExp["ampExp_%s" % amp.getName()].totalNoise[iExp] = \
+            sampler.noiseSamples(calibExp, quickLook=self.quickLook)
 
     def analyzeAmpRunData(self, outputData, iamp, amp):
         """Analyze data from a single amp for a run
@@ -149,3 +152,19 @@ class EoReadNoiseTask(EoAmpExpCalibTask):
         outputData.amps["amps"].totalNoise[iamp] = totalNoise
         outputData.amps["amps"].systemNoise[iamp] = systemNoise
         outputData.amps["amps"].readNoise[iamp] = readNoise
+
+    def getQuickLookErrors(self, outputData, amps):
+        """Return the statistical errors on the metrics in quick-look mode
+
+        See base class for argument description
+
+        The error on the total noise is the error on the median of the
+        noise samples of the analyzed exposures.
+        """
+        totalNoiseErrors = [medianError(outputData.ampExp["ampExp_%s" % amp.getName()].totalNoise)
+                            for amp in amps]
+        ampTable = outputData.amps["amps"]
+        readNoiseErrors = []
+        for error, totalNoise, readNoise in zip(totalNoiseErrors, ampTable.totalNoise, ampTable.readNoise):
+            readNoiseErrors.append(error*totalNoise/readNoise if readNoise > 0 else np.nan)
+        return dict(totalNoise=totalNoiseErrors, readNoise=readNoiseErrors)
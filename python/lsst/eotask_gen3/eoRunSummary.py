@@ -0,0 +1,214 @@
+""" Camera-wide summary of the outputs of a detector-level EO task
+
+The detector-level outputs are read one at a time: only the requested
+per-amp columns are copied into a compact detector x column x amp array,
+which is the output table itself, and each `EoCalib` is dropped before
+the next one is read, so the memory does not grow with the number of
+detectors.
+"""
+
+import numpy as np
+
+import lsst.pex.config as pexConfig
+import lsst.pipe.base as pipeBase
+import lsst.pipe.base.connectionTypes as cT
+
+from .eoCalibBase import (EoRunCalibTaskConnections, EoRunCalibTaskConfig, EoRunCalibTask,
+                          CAMERA_CONNECT, copyConnect)
+from .eoCalibTable import EoCalibTableHandle
+from .eoRunSummaryData import EoRunSummaryData
+
+__all__ = ["EoRunSummaryTask", "EoRunSummaryTaskConfig", "iterDetectorData"]
+
+
+def iterDetectorData(inputData):
+    """ Read the detector-level outputs one at a time
+
+    Parameters
+    ----------
+    inputData : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+        Handles for the outputs of a detector-level task
+
+    Yields
+    ------
+    detId : `int`
+        The detector ID
+    calib : `lsst.eotask_gen3.EoCalib`
+        The output for that detector, the caller should not keep a
+        reference to it
+    """
+    for handle in inputData:
+        calib = handle.get()
+        yield handle.dataId['detector'], calib
+        del calib
+
+
+def splitColumnName(columnName):
+    """ Split a '<table>.<COLUMN>' name into the table and column names """
+    tableName, _, colName = columnName.rpartition('.')
+    if not tableName:
+        raise ValueError("Column names should be given as <table>.<COLUMN>, not %s" % columnName)
+    return tableName, colName
+
+
+class EoRunSummaryTaskConnections(EoRunCalibTaskConnections):
+
+    camera = copyConnect(CAMERA_CONNECT)
+
+    inputData = cT.Input(
+        name="eoReadNoise",
+        doc="Electrial Optical Calibration Output, one per detector",
+        storageClass="IsrCalib",
+        dimensions=("instrument", "detector"),
+        multiple=True,
+        deferLoad=True,
+    )
+
+    outputData = cT.Output(
+        name="eoReadNoiseRunSummary",
+        doc="Camera-wide summary of the per-amp results",
+        storageClass="IsrCalib",
+        dimensions=("instrument",),
+    )
+
+    def __init__(self, *, config=None):
+        super().__init__(config=config)
+        # The per-detector output of the base class is replaced by outputData
+        self.outputs.discard("output")
+
+
+class EoRunSummaryTaskConfig(EoRunCalibTaskConfig,
+                             pipelineConnections=EoRunSummaryTaskConnections):
+
+    columns = pexConfig.ListField(
+        "Per-amp columns to summarize, as <table>.<COLUMN>, the tables should have one row per amp",
+        str,
+        default=["amps.READ_NOISE", "amps.TOTAL_NOISE", "amps.SYSTEM_NOISE"],
+    )
+
+    def validate(self):
+        super().validate()
+        for columnName in self.columns:
+            splitColumnName(columnName)
+
+
+class EoRunSummaryTask(EoRunCalibTask):
+    """ Summarize per-amp columns of a detector-level output over the
+    camera
+
+    The output has the per-amp values of each column for each detector,
+    in the 'detectors' table, and their statistics over all the amps of
+    all the detectors, in the 'columns' table.  Amps of detectors that
+    do not have a column are left at NaN and ignored by the statistics,
+    as are the missing amps of detectors with fewer amps than the others,
+    e.g., the corner sensors.
+    """
+
+    ConfigClass = EoRunSummaryTaskConfig
+    _DefaultName = "eoRunSummary"
+
+    def run(self, inputData, **kwargs):  # pylint: disable=arguments-differ
+        """ Run method
+
+        Parameters
+        ----------
+        inputData : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+            Handles for the outputs of a detector-level task
+
+        Keywords
+        --------
+        camera : `lsst.obs.lsst.camera`
+            The camera object, used to get the largest number of amps of
+            the detectors
+
+        Returns
+        -------
+        outputData : `lsst.eotask_gen3.EoCalib`
+            Output data in formatted tables
+        """
+        camera = kwargs['camera']
+        nAmp = max(len(camera[handle.dataId['detector']].getAmplifiers()) for handle in inputData)
+        outputData = self.makeOutputData(nDetector=len(inputData), nColumn=len(self.config.columns),
+                                         nAmp=nAmp)
+        self.analyzeRunData(outputData, inputData=inputData)
+        return pipeBase.Struct(outputData=outputData)
+
+    def makeOutputData(self, **kwargs):  # pylint: disable=arguments-differ
+        outputData = EoRunSummaryData(**kwargs)
+        outputData.setColumnNames(self.config.columns)
+        return outputData
+
+    def analyzeRunData(self, outputData, **kwargs):  # pylint: disable=arguments-differ
+        """ Fill the per-detector values, one detector at a time, then
+        compute the statistics of each column
+
+        Parameter
+        ---------
+        outputData : `lsst.eotask_gen3.EoCalib`
+            The output data container
+
+        Keywords
+        --------
+        inputData : `list` [`lsst.daf.butler.DeferredDatasetHandle`]
+            Handles for the outputs of a detector-level task
+        """
+        detTable = outputData.detectors['detectors']
+        detTable.values[:] = np.nan
+        for iDet, (detId, calib) in enumerate(iterDetectorData(kwargs['inputData'])):
+            detTable.detector[iDet] = detId
+            self.extractDetData(calib, detTable.values[iDet], detId)
+            del calib
+        self.reduceRunData(outputData)
+        self.log.info("Summarized %i column(s) of %i detector(s)" %
+                      (len(self.config.columns), len(detTable.detector)))
+
+    def extractDetData(self, calib, detValues, detId):
+        """ Copy the per-amp values of the summarized columns of one
+        detector
+
+        Parameters
+        ----------
+        calib : `lsst.eotask_gen3.EoCalib`
+            The output of the detector-level task for that detector
+        detValues : `numpy.ndarray`
+            The column x amp array to fill, the values of a detector with
+            fewer amps go first and the others are left as they are
+        detId : `int`
+            The detector ID, used for error messages
+
+        Raises
+        ------
+        ValueError : A column does not have one value per amp
+        """
+        tables = {EoCalibTableHandle.findTableMeta(table, 'name'): table for table in calib.tables}
+        for iCol, columnName in enumerate(self.config.columns):
+            tableName, colName = splitColumnName(columnName)
+            table = tables.get(tableName)
+            if table is None or colName not in table.colnames:
+                self.log.warn("Detector %i has no column %s" % (detId, columnName))
+                continue
+            column = np.asarray(table[colName], dtype=float)
+            if column.ndim != 1 or len(column) > len(detValues[iCol]):
+                raise ValueError("Column %s of detector %i has shape %s, expected one value per amp (at most "
+                                 "%i)" % (columnName, detId, column.shape, len(detValues[iCol])))
+            detValues[iCol][:len(column)] = column
+
+    @staticmethod
+    def reduceRunData(outputData):
+        """ Compute the statistics of each column over all the amps of
+        all the detectors """
+        values = outputData.detectors['detectors'].values
+        colTable = outputData.columns['columns']
+        for iCol in range(values.shape[1]):
+            colValues = np.asarray(values[:, iCol]).ravel()
+            colValues = colValues[np.isfinite(colValues)]
+            colTable.nGood[iCol] = len(colValues)
+            if not len(colValues):
+                colTable.median[iCol] = colTable.mean[iCol] = colTable.stdev[iCol] = np.nan
+                colTable.minimum[iCol] = colTable.maximum[iCol] = np.nan
+                continue
+            colTable.median[iCol] = np.median(colValues)
+            colTable.mean[iCol] = np.mean(colValues)
+            colTable.stdev[iCol] = np.std(colValues)
+            colTable.minimum[iCol] = np.min(colValues)
+            colTable.maximum[iCol] = np.max(colValues)
@@ -0,0 +1,134 @@
+import json
+
+from .eoCalibTable import EoCalibField, EoCalibTableSchema, EoCalibTable, EoCalibTableHandle
+from .eoCalib import EoCalibSchema, EoCalib, RegisterEoCalibSchema
+
+__all__ = ["EoRunSummaryDetData",
+           "EoRunSummaryColumnData",
+           "EoRunSummaryData"]
+
+
+# Key of the table meta data with the names of the summarized columns
+RUN_SUMMARY_COLUMNS_KEY = "EOSUMCOLS"
+
+
+class EoRunSummaryDetDataSchemaV0(EoCalibTableSchema):
+    """Schema definitions for output data for per-detector table
+    for EoRunSummaryTask.
+
+    These are the per-amp values of each summarized column, for each
+    detector, as a detector x column x amp array.
+    """
+
+    TABLELENGTH = "nDetector"
+
+    detector = EoCalibField(name="DETECTOR", dtype=int)
+    values = EoCalibField(name="VALUES", dtype=float, shape=["nColumn", "nAmp"])
+
+
+class EoRunSummaryDetData(EoCalibTable):
+    """Container class and interface for per-detector table
+    for EoRunSummaryTask."""
+
+    SCHEMA_CLASS = EoRunSummaryDetDataSchemaV0
+
+    def __init__(self, data=None, **kwargs):
+        """C'tor, arguments are passed to base class.
+
+        Class specialization just associates class properties with columns
+        """
+        super(EoRunSummaryDetData, self).__init__(data=data, **kwargs)
+        self.detector = self.table[self.SCHEMA_CLASS.detector.name]
+        self.values = self.table[self.SCHEMA_CLASS.values.name]
+
+
+class EoRunSummaryColumnDataSchemaV0(EoCalibTableSchema):
+    """Schema definitions for output data for per-column table
+    for EoRunSummaryTask.
+
+    These are the statistics of each summarized column over all the
+    amps of all the detectors, ignoring missing (NaN) values.
+    """
+
+    TABLELENGTH = "nColumn"
+
+    median = EoCalibField(name="MEDIAN", dtype=float)
+    mean = EoCalibField(name="MEAN", dtype=float)
+    stdev = EoCalibField(name="STDEV", dtype=float)
+    minimum = EoCalibField(name="MIN", dtype=float)
+    maximum = EoCalibField(name="MAX", dtype=float)
+    nGood = EoCalibField(name="NGOOD", dtype=int)
+
+
+class EoRunSummaryColumnData(EoCalibTable):
+    """Container class and interface for per-column table
+    for EoRunSummaryTask."""
+
+    SCHEMA_CLASS = EoRunSummaryColumnDataSchemaV0
+
+    def __init__(self, data=None, **kwargs):
+        """C'tor, arguments are passed to base class.
+
+        Class specialization just associates class properties with columns
+        """
+        super(EoRunSummaryColumnData, self).__init__(data=data, **kwargs)
+        self.median = self.table[self.SCHEMA_CLASS.median.name]
+        self.mean = self.table[self.SCHEMA_CLASS.mean.name]
+        self.stdev = self.table[self.SCHEMA_CLASS.stdev.name]
+        self.minimum = self.table[self.SCHEMA_CLASS.minimum.name]
+        self.maximum = self.table[self.SCHEMA_CLASS.maximum.name]
+        self.nGood = self.table[self.SCHEMA_CLASS.nGood.name]
+
+
+class EoRunSummaryDataSchemaV0(EoCalibSchema):
+    """Schema definitions for output data for for EoRunSummaryTask
+
+    This defines correct versions of the sub-tables"""
+
+    detectors = EoCalibTableHandle(tableName="detectors",
+                                   tableClass=EoRunSummaryDetData)
+
+    columns = EoCalibTableHandle(tableName="columns",
+                                 tableClass=EoRunSummaryColumnData)
+
+
+class EoRunSummaryData(EoCalib):
+    """Container class and interface for EoRunSummaryTask outputs."""
+
+    SCHEMA_CLASS = EoRunSummaryDataSchemaV0
+
+    _OBSTYPE = 'summary'
+    _SCHEMA = SCHEMA_CLASS.fullName()
+    _VERSION = SCHEMA_CLASS.version()
+
+    def __init__(self, **kwargs):
+        """C'tor, arguments are passed to base class.
+
+        Class specialization just associates instance properties with
+        sub-tables
+        """
+        super(EoRunSummaryData, self).__init__(**kwargs)
+        self.detectors = self['detectors']
+        self.columns = self['columns']
+
+    def setColumnNames(self, columnNames):
+        """ Store the names of the summarized columns, as
+        '<table>.<COLUMN>' """
+        self.tables[0].meta[RUN_SUMMARY_COLUMNS_KEY] = json.dumps(list(columnNames))
+
+    def getColumnNames(self):
+        """ Return the names of the summarized columns, `None` if they
+        were not set """
+        value = self.tables[0].meta.get(RUN_SUMMARY_COLUMNS_KEY)
+        if value is None:
+            return None
+        return json.loads(value)
+
+
+RegisterEoCalibSchema(EoRunSummaryData)
+
+
+NDETECTOR = 4
+NCOLUMN = 3
+NAMP = 16
+EoRunSummaryData.testData = dict(testCtor=dict(nDetector=NDETECTOR, nColumn=NCOLUMN, nAmp=NAMP))
@@ -0,0 +1,103 @@
+""" Shared memory copies of Electrical Optical (EO) calibration data
+
+These are used to let forked worker processes fill the output tables
+of an `EoCalib` object without having to send the tables back and forth
+between processes.
+"""
+
+import copy
+import mmap
+
+import numpy as np
+
+from astropy.table import Table, Column
+
+__all__ = ["EoSharedCalib"]
+
+
+class EoSharedCalib:
+    """ A copy of an `EoCalib` object where all the columns of all the
+    tables are views into a single block of shared memory
+
+    The memory block is an anonymous shared mapping, so that it is inherited
+    by processes forked after this object is created.  Any values written
+    into the tables of `calib` by those processes are visible to the
+    parent process, and are copied back into the original object by
+    `copyBack`.
+
+    Parameters
+    ----------
+    calib : `lsst.eotask_gen3.EoCalib`
+        The object being shared
+
+    Notes
+    -----
+    Different processes should only write to different parts of the tables,
+    e.g., the 'ampExp_<amp>' table and row `iamp` of the 'amps' table
+    for their own amplifier.
+    """
+
+    ALIGN = 64
+
+    def __init__(self, calib):
+        """ C'tor,  Fills class parameters """
+        self._calib = calib
+        offsets = []
+        nBytes = 0
+        for table in calib.tables:
+            for col in table.itercols():
+                if col.dtype.hasobject:  # pragma: no cover
+                    raise TypeError("Can not put column %s of type %s in shared memory" %
+                                    (col.name, col.dtype))
+                offsets.append(nBytes)
+                nBytes += -(-col.data.nbytes // self.ALIGN) * self.ALIGN
+        self._buffer = mmap.mmap(-1, max(nBytes, 1))
+        sharedTables = []
+        iCol = 0
+        for table in calib.tables:
+            columns = []
+            for col in table.itercols():
+                array = np.ndarray(col.shape, dtype=col.dtype, buffer=self._buffer, offset=offsets[iCol])
+                array[...] = col.data
+                columns.append(Column(data=array, name=col.name, unit=col.unit,
+                                      description=col.description, copy=False))
+                iCol += 1
+            sharedTables.append(Table(columns, meta=copy.deepcopy(table.meta), copy=False))
+        self._sharedCalib = type(calib).fromTable(sharedTables)
+
+    @property
+    def calib(self):
+        """ Return the shared memory version of the `EoCalib` """
+        return self._sharedCalib
+
+    @property
+    def nBytes(self):
+        """ Return the size of the shared memory block """
+        return len(self._buffer)
+
+    def copyBack(self):
+        """ Copy the values from shared memory back to the original object """
+        for table, sharedTable in zip(self._calib.tables, self._sharedCalib.tables):
+            for colName in table.colnames:
+                table[colName][...] = sharedTable[colName]
+
+    def release(self):
+        """ Release the shared memory
+
+        The block will only be unmapped once nothing refers to the
+        shared tables
+        """
+        self._sharedCalib = None
+        try:
+            self._buffer.close()
+        except BufferError:  # pragma: no cover
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.copyBack()
+        self.release()
+        return False
@@ -0,0 +1,176 @@
+""" Per-stage timing and byte counts for EO tasks
+
+The base task loops time each stage of the processing of each amp
+(reading, ISR, analysis, ...) with `time.perf_counter`, and count the
+bytes and pixels read.  A compact summary, with the total, median and
+95th percentile duration of each stage, is stored as a JSON string in the
+metadata of the first table of the output `EoCalib` and can be read back
+with `getStageSummary`.
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+__all__ = ["EoStageTimer", "getStageSummary", "formatStageSummary", "timeStage"]
+
+
+# Table metadata key used to store the summary
+STAGE_SUMMARY_KEY = "EOSTAGES"
+
+
+class EoStageTimer:
+    """ Accumulates the durations, and the bytes and pixels counts, of the
+    processing stages of a task
+
+    This can be shared between threads.  To gather results from forked
+    processes, give each amp its own timer and `merge` the timers returned
+    by the workers.
+    """
+
+    def __init__(self):
+        """ C'tor,  Fills class parameters """
+        self._durations = defaultdict(list)
+        self._nBytes = defaultdict(int)
+        self._nPixels = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return dict(durations=dict(self._durations), nBytes=dict(self._nBytes), nPixels=dict(self._nPixels))
+
+    def __setstate__(self, state):
+        self.__init__()
+        self._durations.update(state['durations'])
+        self._nBytes.update(state['nBytes'])
+        self._nPixels.update(state['nPixels'])
+
+    @contextmanager
+    def time(self, stage):
+        """ Time the enclosed block as one call of a stage """
+        tStart = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - tStart)
+
+    def add(self, stage, duration, nBytes=0, nPixels=0):
+        """ Record one call of a stage
+
+        Parameters
+        ----------
+        stage : `str`
+            Name of the stage
+        duration : `float`
+            Duration of the call, in seconds
+        nBytes : `int`
+            Number of bytes read
+        nPixels : `int`
+            Number of pixels read
+        """
+        with self._lock:
+            self._durations[stage].append(duration)
+            self._nBytes[stage] += nBytes
+            self._nPixels[stage] += nPixels
+
+    def count(self, stage, exposure):
+        """ Add the size of the image of an exposure to the counts of a stage
+        """
+        array = exposure.image.array
+        with self._lock:
+            self._nBytes[stage] += array.nbytes
+            self._nPixels[stage] += array.size
+
+    def merge(self, other):
+        """ Add the records of another timer, `None` is ignored """
+        if other is None:
+            return
+        with self._lock:
+            for stage, durations in other._durations.items():
+                self._durations[stage] += durations
+                self._nBytes[stage] += other._nBytes[stage]
+                self._nPixels[stage] += other._nPixels[stage]
+
+    def summary(self):
+        """ Return the summary of all the stages
+
+        Returns
+        -------
+        summary : `dict` [`str`, `dict`]
+            For each stage, the number of calls 'n', the 'total', 'p50'
+            and 'p95' durations, in seconds, and the 'bytes' and
+            'pixels' read
+        """
+        summary = {}
+        with self._lock:
+            for stage, durations in self._durations.items():
+                p50, p95 = np.percentile(durations, [50., 95.])
+                summary[stage] = dict(n=len(durations), total=float(np.sum(durations)),
+                                      p50=float(p50), p95=float(p95),
+                                      bytes=int(self._nBytes[stage]), pixels=int(self._nPixels[stage]))
+        return summary
+
+    def record(self, task, calibs=()):
+        """ Store the summary in task metadata and in the output data
+
+        Parameters
+        ----------
+        task : `lsst.pipe.base.Task`
+            The task, the summary is added to its metadata
+        calibs : `list` [`lsst.eotask_gen3.EoCalib`]
+            The output data, the summary is added to the metadata of
+            their first table
+        """
+        summary = self.summary()
+        for stage, stageSummary in summary.items():
+            for key, value in stageSummary.items():
+                task.metadata["stages.%s.%s" % (stage, key)] = value
+        for calib in calibs:
+            if calib.tables:
+                calib.tables[0].meta[STAGE_SUMMARY_KEY] = json.dumps(summary, sort_keys=True)
+        task.log.info("Stage timing:\n%s" % formatStageSummary(summary))
+
+
+def getStageSummary(calib):
+    """ Read back the stage summary of an `EoCalib`
+
+    Parameters
+    ----------
+    calib : `lsst.eotask_gen3.EoCalib`
+        The output of a task
+
+    Returns
+    -------
+    summary : `dict` [`str`, `dict`] or `None`
+        The summary, see `EoStageTimer.summary`, `None` if the task
+        did not record one
+    """
+    if not calib.tables:
+        return None
+    value = calib.tables[0].meta.get(STAGE_SUMMARY_KEY)
+    if value is None:
+        return None
+    return json.loads(value)
+
+
+def formatStageSummary(summary):
+    """ Format a stage summary as a text table, one line per stage,
+    slowest stage first """
+    lines = ["%-12s %8s %10s %10s %10s %10s %12s" %
+             ("stage", "n", "total [s]", "p50 [ms]", "p95 [ms]", "MB", "Mpix")]
+    for stage, values in sorted(summary.items(), key=lambda item: -item[1]['total']):
+        lines.append("%-12s %8i %10.3f %10.3f %10.3f %10.1f %12.2f" %
+                     (stage, values['n'], values['total'], 1e3*values['p50'], 1e3*values['p95'],
+                      values['bytes']/1024**2, values['pixels']/1e6))
+    return "\n".join(lines)
+
+
+def timeStage(timer, stage):
+    """ Return a context manager that times a stage with timer, or does
+    nothing if timer is `None` """
+    if timer is None:
+        return nullcontext()
+    return timer.time(stage)
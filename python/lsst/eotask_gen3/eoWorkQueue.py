@@ -0,0 +1,429 @@
+""" File-system backed work queue to run EO quanta on several nodes
+
+The queue is a shared directory, e.g., on a file system mounted by all
+the nodes, with one JSON file per job in one sub-directory per state:
+
+    pending/  jobs waiting to be run
+    claimed/  jobs being run by a worker
+    done/     jobs that succeeded
+    failed/   jobs that failed `maxAttempts` times, or whose
+              dependencies failed
+
+A job is a command, e.g., a `pipetask run` of a task subset restricted to
+one detector, and optionally the IDs of jobs that must succeed first.
+Workers claim a job by renaming its file from pending/ to claimed/,
+which is atomic, so each job is run by a single worker without any
+external service.  While the command runs, the worker touches the claim
+file, claims that are not touched for a while, e.g., because the node
+died, can be put back in pending/ by any worker with `requeueStale`.  A
+failed job goes back to pending/ until it has been tried `maxAttempts`
+times.  Retries run the command with the job's extra retry arguments,
+e.g., so that a `pipetask run` extends the output run of the failed
+attempt rather than failing because it exists.  Each attempt is recorded
+in the job file, with the worker, the command, the timing, the return
+code and the log file of the command.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+import uuid
+
+__all__ = ["EoWorkQueue", "JOB_STATES"]
+
+
+JOB_STATES = ("pending", "claimed", "done", "failed")
+
+# Name of the directory with the logs of the commands
+LOG_DIR_NAME = "logs"
+
+# Suffix of the files of the jobs being moved to another state
+MOVING_SUFFIX = ".moving"
+
+
+def makeWorkerId():
+    """ Return an ID unique to this process """
+    return "%s-%i-%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:6])
+
+
+class EoWorkQueue:
+    """ Shared directory of jobs, see module documentation
+
+    Parameters
+    ----------
+    queueDir : `str`
+        The queue directory, created if needed
+    """
+
+    def __init__(self, queueDir):
+        """ C'tor,  Fills class parameters """
+        self._queueDir = queueDir
+        for dirName in JOB_STATES + (LOG_DIR_NAME,):
+            os.makedirs(os.path.join(queueDir, dirName), exist_ok=True)
+
+    @property
+    def queueDir(self):
+        """ Return the queue directory """
+        return self._queueDir
+
+    def path(self, state, jobId):
+        """ Return the path to the file of a job in a given state """
+        return os.path.join(self._queueDir, state, "%s.json" % jobId)
+
+    def listJobs(self, state):
+        """ Return the sorted IDs of the jobs in a given state """
+        fileNames = os.listdir(os.path.join(self._queueDir, state))
+        return sorted(fileName[:-5] for fileName in fileNames
+                      if fileName.endswith(".json") and not fileName.startswith("."))
+
+    def findJob(self, jobId):
+        """ Return the state of a job, `None` if it is not in the queue """
+        for state in JOB_STATES:
+            if os.path.exists(self.path(state, jobId)):
+                return state
+        return None
+
+    def readJob(self, state, jobId):
+        """ Read the file of a job, `None` if it is no longer in that
+        state """
+        try:
+            with open(self.path(state, jobId)) as fin:
+                return json.load(fin)
+        except FileNotFoundError:
+            return None
+
+    def _writeJob(self, state, job):
+        """ Write the file of a job, atomically """
+        path = self.path(state, job['jobId'])
+        tmpPath = os.path.join(os.path.dirname(path), ".%s.%s.tmp" % (job['jobId'], uuid.uuid4().hex))
+        with open(tmpPath, "w") as fout:
+            json.dump(job, fout, indent=1)
+        os.replace(tmpPath, path)
+
+    def _move(self, job, fromState, toState):
+        """ Move a job to another state, writing its updated content
+
+        The file is first renamed to a private name in fromState, which
+        only one worker can do, then the content is written and the file
+        is renamed to toState, so that nothing is written once another
+        worker can see the job there, e.g., claim it from pending/.
+
+        Returns
+        -------
+        moved : `bool`
+            False if the job was no longer in fromState, e.g., because
+            another worker moved it first
+        """
+        movingPath = os.path.join(self._queueDir, fromState,
+                                  ".%s.%s%s" % (job['jobId'], uuid.uuid4().hex, MOVING_SUFFIX))
+        try:
+            os.rename(self.path(fromState, job['jobId']), movingPath)
+        except FileNotFoundError:
+            return False
+        with open(movingPath, "w") as fout:
+            json.dump(job, fout, indent=1)
+        os.rename(movingPath, self.path(toState, job['jobId']))
+        return True
+
+    def ownsClaim(self, job):
+        """ Return True if the job is claimed by the attempt of the job,
+        False if it is no longer claimed or was claimed again, e.g., by
+        another worker after it was requeued as stale """
+        claimed = self.readJob("claimed", job['jobId'])
+        if claimed is None or not claimed['attempts'] or not job['attempts']:
+            return False
+        ownerKeys = ('worker', 'claimed')
+        return all(claimed['attempts'][-1].get(key) == job['attempts'][-1].get(key) for key in ownerKeys)
+
+    def submit(self, jobId, command, dependsOn=(), maxAttempts=3, meta=None, retryArgs=()):
+        """ Add a job to the queue
+
+        Parameters
+        ----------
+        jobId : `str`
+            Unique ID of the job, used as file name
+        command : `list` [`str`]
+            The command, run without a shell
+        dependsOn : `list` [`str`]
+            IDs of the jobs that must succeed before this one can run,
+            they must already be in the queue
+        maxAttempts : `int`
+            Number of times the command is tried before the job fails
+        meta : `dict`, optional
+            Extra information, e.g., the detector and task subset
+        retryArgs : `list` [`str`]
+            Arguments appended to the command on the attempts after the
+            first one, see `makeCommand`
+
+        Returns
+        -------
+        submitted : `bool`
+            False if a job with that ID is already in the queue
+
+        Raises
+        ------
+        ValueError : A dependency is not in the queue
+        """
+        if self.findJob(jobId) is not None:
+            return False
+        missing = [depId for depId in dependsOn if self.findJob(depId) is None]
+        if missing:
+            raise ValueError("Job %s depends on jobs %s, which are not in the queue" % (jobId, missing))
+        self._writeJob("pending", dict(jobId=jobId, command=list(command), dependsOn=list(dependsOn),
+                                       maxAttempts=maxAttempts, meta=meta or {}, attempts=[],
+                                       retryArgs=list(retryArgs)))
+        return True
+
+    def claim(self, workerId):
+        """ Claim the first pending job whose dependencies succeeded
+
+        Jobs with a failed dependency are moved to failed/ on the way.
+
+        Parameters
+        ----------
+        workerId : `str`
+            ID of the worker, recorded in the job
+
+        Returns
+        -------
+        job : `dict` or `None`
+            The job, `None` if no job can be run now
+        """
+        for jobId in self.listJobs("pending"):
+            job = self.readJob("pending", jobId)
+            if job is None:
+                continue
+            depStates = [self.findJob(depId) for depId in job['dependsOn']]
+            if "failed" in depStates:
+                job['status'] = "dependencyFailed"
+                self._move(job, "pending", "failed")
+                continue
+            if any(depState != "done" for depState in depStates):
+                continue
+            try:
+                # Touched first, so that the claim is not seen as stale
+                os.utime(self.path("pending", jobId))
+                os.rename(self.path("pending", jobId), self.path("claimed", jobId))
+            except FileNotFoundError:
+                # Claimed by another worker
+                continue
+            # Read again, the job may have been retried since it was read
+            job = self.readJob("claimed", jobId)
+            job['attempts'].append(dict(worker=workerId, host=socket.gethostname(), pid=os.getpid(),
+                                        claimed=time.time()))
+            self._writeJob("claimed", job)
+            return job
+        return None
+
+    def complete(self, job, returnCode, tStart, tEnd, logPath=None):
+        """ Record the outcome of a claimed job
+
+        The job goes to done/ if returnCode is 0, otherwise it goes
+        back to pending/, or to failed/ after `maxAttempts` attempts.
+
+        Returns
+        -------
+        state : `str` or `None`
+            The new state of the job, `None` if it was no longer claimed
+            by this attempt, e.g., because it was requeued as stale
+        """
+        if not self.ownsClaim(job):
+            return None
+        job['attempts'][-1].update(start=tStart, end=tEnd, duration=tEnd - tStart, returnCode=returnCode,
+                                   log=logPath)
+        if returnCode == 0:
+            job['status'] = "done"
+            state = "done"
+        elif len(job['attempts']) >= job['maxAttempts']:
+            job['status'] = "failed"
+            state = "failed"
+        else:
+            state = "pending"
+        return state if self._move(job, "claimed", state) else None
+
+    def requeueStale(self, timeout):
+        """ Put back in pending/ the claims that were not touched for
+        timeout seconds
+
+        Returns
+        -------
+        jobIds : `list` [`str`]
+            IDs of the requeued jobs
+        """
+        requeued = []
+        now = time.time()
+        for jobId in self.listJobs("claimed"):
+            try:
+                age = now - os.path.getmtime(self.path("claimed", jobId))
+            except FileNotFoundError:
+                continue
+            if age < timeout:
+                continue
+            job = self.readJob("claimed", jobId)
+            if job is None:
+                continue
+            job['attempts'][-1].update(stale=True, returnCode=None)
+            state = "failed" if len(job['attempts']) >= job['maxAttempts'] else "pending"
+            if state == "failed":
+                job['status'] = "failed"
+            if self._move(job, "claimed", state):
+                requeued.append(jobId)
+        return requeued
+
+    def retryFailed(self):
+        """ Put all the failed jobs back in pending/, with a fresh
+        attempt budget
+
+        Returns
+        -------
+        jobIds : `list` [`str`]
+            IDs of the requeued jobs
+        """
+        requeued = []
+        for jobId in self.listJobs("failed"):
+            job = self.readJob("failed", jobId)
+            if job is None:
+                continue
+            job.pop('status', None)
+            job['maxAttempts'] += len(job['attempts'])
+            if self._move(job, "failed", "pending"):
+                requeued.append(jobId)
+        return requeued
+
+    def isFinished(self):
+        """ Return True if all the jobs are done or failed """
+        for state in ("pending", "claimed"):
+            # Including the jobs being moved out of that state
+            fileNames = os.listdir(os.path.join(self._queueDir, state))
+            if self.listJobs(state) or any(fileName.endswith(MOVING_SUFFIX) for fileName in fileNames):
+                return False
+        return True
+
+    @staticmethod
+    def makeCommand(job):
+        """ Return the command of the current attempt of a claimed job,
+        with the retry arguments after the first attempt """
+        command = list(job['command'])
+        if len(job['attempts']) > 1:
+            command += job.get('retryArgs', [])
+        return command
+
+    def runJob(self, job, heartbeat=10.):
+        """ Run the command of a claimed job and record its outcome
+
+        Parameters
+        ----------
+        job : `dict`
+            The job, as returned by `claim`
+        heartbeat : `float`
+            Interval at which the claim file is touched, in seconds
+
+        Returns
+        -------
+        state : `str` or `None`
+            The new state of the job, see `complete`
+        """
+        logPath = os.path.join(self._queueDir, LOG_DIR_NAME,
+                               "%s.%i.log" % (job['jobId'], len(job['attempts'])))
+        claimPath = self.path("claimed", job['jobId'])
+        command = self.makeCommand(job)
+        job['attempts'][-1]['command'] = command
+        stop = threading.Event()
+
+        def touchClaim():
+            while not stop.wait(heartbeat):
+                # Do not keep alive the claim of another worker
+                if not self.ownsClaim(job):
+                    return
+                try:
+                    os.utime(claimPath)
+                except FileNotFoundError:
+                    return
+
+        toucher = threading.Thread(target=touchClaim, name="eoWorkQueueHeartbeat", daemon=True)
+        toucher.start()
+        tStart = time.time()
+        try:
+            with open(logPath, "w") as fout:
+                returnCode = subprocess.call(command, stdout=fout, stderr=subprocess.STDOUT)
+        except OSError as err:
+            with open(logPath, "a") as fout:
+                fout.write("Failed to run %s: %s\n" % (command, err))
+            returnCode = -1
+        finally:
+            stop.set()
+            toucher.join()
+        return self.complete(job, returnCode, tStart, time.time(), logPath)
+
+    def runWorker(self, workerId=None, pollInterval=5., heartbeat=10., staleTimeout=None, maxJobs=None,
+                  log=None):
+        """ Claim and run jobs until all the jobs are done or failed
+
+        Parameters
+        ----------
+        workerId : `str`, optional
+            ID of the worker, default is unique to this process
+        pollInterval : `float`
+            Time to wait when no job can be run now, in seconds
+        heartbeat : `float`
+            Interval at which the claim file is touched, in seconds
+        staleTimeout : `float`, optional
+            Requeue the claims that were not touched for that long, in
+            seconds, default is never
+        maxJobs : `int`, optional
+            Stop after that many jobs
+        log : `Callable`, optional
+            Called with a message when a job is finished
+
+        Returns
+        -------
+        nJobs : `int`
+            Number of jobs run by this worker
+        """
+        workerId = workerId or makeWorkerId()
+        nJobs = 0
+        while maxJobs is None or nJobs < maxJobs:
+            if staleTimeout is not None:
+                self.requeueStale(staleTimeout)
+            job = self.claim(workerId)
+            if job is None:
+                if self.isFinished():
+                    break
+                time.sleep(pollInterval)
+                continue
+            state = self.runJob(job, heartbeat)
+            nJobs += 1
+            if log is not None:
+                log("%s: job %s attempt %i -> %s" % (workerId, job['jobId'], len(job['attempts']), state))
+        return nJobs
+
+    def summary(self):
+        """ Return the number of jobs in each state and the timing of the
+        successful attempts
+
+        Returns
+        -------
+        summary : `dict`
+            The 'counts' of jobs in each state, the 'nRetries' (attempts
+            beyond the first one of each job), and the total, median and
+            max 'duration' of the successful attempts, in seconds
+        """
+        counts = {state: len(self.listJobs(state)) for state in JOB_STATES}
+        durations = []
+        nRetries = 0
+        for state in JOB_STATES:
+            for jobId in self.listJobs(state):
+                job = self.readJob(state, jobId)
+                if job is None:
+                    continue
+                nRetries += max(len(job['attempts']) - 1, 0)
+                durations += [attempt['duration'] for attempt in job['attempts']
+                              if attempt.get('returnCode') == 0]
+        durations.sort()
+        return dict(counts=counts, nRetries=nRetries,
+                    duration=dict(total=sum(durations),
+                                  median=durations[len(durations)//2] if durations else 0.,
+                                  max=durations[-1] if durations else 0.))
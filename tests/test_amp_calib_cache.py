@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+
+from lsst.eotask_gen3 import EoAmpCalibCache
+
+
+class FakeMaskedImage:
+    """ Stands in for `lsst.afw.image.MaskedImage` """
+    def __init__(self, shape):
+        self.image = FakePlane(np.zeros(shape, dtype=np.float32))
+        self.mask = FakePlane(np.zeros(shape, dtype=np.int32))
+        self.variance = FakePlane(np.zeros(shape, dtype=np.float32))
+
+
+class FakePlane:
+    def __init__(self, array):
+        self.array = array
+
+
+class FakeExposure:
+    """ Stands in for `lsst.afw.image.Exposure` """
+    def __init__(self, shape):
+        self._maskedImage = FakeMaskedImage(shape)
+
+    def getMaskedImage(self):
+        return self._maskedImage
+
+
+SHAPE = (20, 10)
+NBYTES = 12*SHAPE[0]*SHAPE[1]
+
+
+class AmpCalibCacheTestCase(unittest.TestCase):
+
+    def testHitsAndMisses(self):
+        cache = EoAmpCalibCache(maxBytes=4*NBYTES)
+        first = cache.get(('bias', 'C00'), lambda: FakeExposure(SHAPE))
+        second = cache.get(('bias', 'C00'), lambda: FakeExposure(SHAPE))
+        self.assertIs(first, second)
+        self.assertEqual(cache.nHits, 1)
+        self.assertEqual(cache.nMisses, 1)
+        self.assertEqual(cache.nBytes, NBYTES)
+
+    def testEviction(self):
+        cache = EoAmpCalibCache(maxBytes=2*NBYTES)
+        for ampName in ['C00', 'C01', 'C02']:
+            cache.get(('bias', ampName), lambda: FakeExposure(SHAPE))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.nEvictions, 1)
+        self.assertLessEqual(cache.nBytes, cache.maxBytes)
+        cache.get(('bias', 'C00'), lambda: FakeExposure(SHAPE))
+        self.assertEqual(cache.nMisses, 4)
+        cache.resize(0)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.nBytes, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
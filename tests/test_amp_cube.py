@@ -0,0 +1,210 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+import lsst.geom as lsstGeom
+import lsst.afw.image as afwImage
+import lsst.afw.math as afwMath
+import lsst.pipe.base as pipeBase
+from lsst.afw.cameraGeom import Amplifier
+
+from lsst.eotask_gen3 import eoCalibBase
+from lsst.eotask_gen3 import EoBiasStabilityTask, EoPersistenceTask
+from lsst.eotask_gen3.eoAmpCube import EoAmpCube, makeAmpCube, cubeClippedStats, cubeMedian
+from lsst.eotask_gen3.eoGainStability import EoGainStabilityTask
+from lsst.eotask_gen3.eoMemory import EoMemoryPlan, CALIB_BYTES_PER_PIXEL
+from lsst.eotask_gen3.eoOverscan import EoOverscanTask
+
+AMP_NAMES = ['C%02i' % i for i in range(4)]
+NEXPOSURE = 5
+SHAPE = (30, 25)
+
+
+def makeAmp(name):
+    """ Build an amplifier with a small raw geometry """
+    builder = Amplifier.Builder()
+    builder.setName(name)
+    builder.setRawBBox(lsstGeom.Box2I(lsstGeom.Point2I(0, 0), lsstGeom.Extent2I(25, 30)))
+    builder.setRawDataBBox(lsstGeom.Box2I(lsstGeom.Point2I(3, 0), lsstGeom.Extent2I(17, 25)))
+    builder.setRawSerialOverscanBBox(lsstGeom.Box2I(lsstGeom.Point2I(20, 0), lsstGeom.Extent2I(5, 25)))
+    builder.setRawParallelOverscanBBox(lsstGeom.Box2I(lsstGeom.Point2I(3, 25), lsstGeom.Extent2I(17, 5)))
+    return builder.finish()
+
+
+def makeImageArray(rng, level):
+    """ Gaussian noise with a few outliers """
+    array = rng.normal(level, 5., size=SHAPE).astype(np.float32)
+    array[rng.integers(0, SHAPE[0], 10), rng.integers(0, SHAPE[1], 10)] += 500.
+    return array
+
+
+class FakeDetector:
+    """ Stands in for `lsst.afw.cameraGeom.Detector` """
+    def __init__(self, amps):
+        self._amps = amps
+
+    def getAmplifiers(self):
+        return self._amps
+
+    def getName(self):
+        return "R22_S11"
+
+    def getSerial(self):
+        return "FAKE-000"
+
+    def getId(self):
+        return 94
+
+
+class FakeExposure:
+    """ Stands in for `lsst.afw.image.Exposure` """
+    def __init__(self, array, amp):
+        self.image = afwImage.ImageF(array)
+        self._detector = FakeDetector([amp])
+
+    def getDetector(self):
+        return self._detector
+
+
+class FakeHandle:
+    """ Stands in for `lsst.daf.butler.DeferredDatasetHandle` """
+    def __init__(self, seed, amps):
+        rng = np.random.default_rng(seed)
+        self.dataId = dict(exposure=seed, detector=94)
+        self.amps = amps
+        self.arrays = [makeImageArray(rng, 1000. + 10.*seed) for _ in amps]
+
+    def get(self, parameters=None, component=None):
+        if component == 'detector':
+            return FakeDetector(self.amps)
+        if parameters is None:
+            return self
+        iamp = parameters['amp']
+        return FakeExposure(self.arrays[iamp].copy(), self.amps[iamp])
+
+
+def fakeExtractAmpImage(rawExp, amp):
+    iamp = rawExp.amps.index(amp)
+    return FakeExposure(rawExp.arrays[iamp].copy(), amp)
+
+
+class FakeIsr:
+    """ Stands in for `lsst.ip.isr.IsrTask` """
+    @staticmethod
+    def run(ampExposure, **kwargs):
+        return pipeBase.Struct(exposure=ampExposure)
+
+
+def assertCalibsClose(testCase, calib1, calib2, rtol):
+    """ Check that all the columns of two `EoCalib` are close """
+    for table1, table2 in zip(calib1.tables, calib2.tables):
+        testCase.assertEqual(table1.colnames, table2.colnames)
+        for colName in table1.colnames:
+            col1 = np.asarray(table1[colName])
+            col2 = np.asarray(table2[colName])
+            if col1.dtype.kind in 'fiu':
+                np.testing.assert_allclose(col1, col2, rtol=rtol, err_msg=colName)
+            else:
+                np.testing.assert_array_equal(col1, col2, err_msg=colName)
+
+
+class AmpCubeTestCase(unittest.TestCase):
+    """ Check the cube-based analysis against the per-exposure one """
+
+    def testMakeAmpCube(self):
+        inMemory = makeAmpCube(NEXPOSURE, SHAPE, maxBytes=1024**2)
+        self.assertNotIsInstance(inMemory, np.memmap)
+        mapped = makeAmpCube(NEXPOSURE, SHAPE, maxBytes=1024)
+        self.assertIsInstance(mapped, np.memmap)
+        self.assertEqual(mapped.shape, (NEXPOSURE, ) + SHAPE)
+        self.assertEqual(mapped.dtype, np.float32)
+
+        rng = np.random.default_rng(11)
+        cube = EoAmpCube(NEXPOSURE, maxBytes=1024)
+        self.assertIsNone(cube.array)
+        arrays = [makeImageArray(rng, 1000.) for _ in range(NEXPOSURE)]
+        for iExp, array in enumerate(arrays):
+            cube.fill(iExp, array)
+        np.testing.assert_array_equal(cube.array, np.array(arrays))
+
+    def testCubeStats(self):
+        rng = np.random.default_rng(12)
+        cube = np.array([makeImageArray(rng, 1000.) for _ in range(NEXPOSURE)])
+        statCtrl = afwMath.StatisticsControl()
+        mean, stdev = cubeClippedStats(cube, statCtrl.getNumSigmaClip(), statCtrl.getNumIter())
+        median = cubeMedian(cube)
+        for iExp, array in enumerate(cube):
+            stats = afwMath.makeStatistics(afwImage.ImageF(array),
+                                           afwMath.MEANCLIP | afwMath.STDEVCLIP | afwMath.MEDIAN, statCtrl)
+            self.assertAlmostEqual(mean[iExp], stats.getValue(afwMath.MEANCLIP), delta=1e-3)
+            self.assertAlmostEqual(stdev[iExp], stats.getValue(afwMath.STDEVCLIP), delta=1e-3)
+            self.assertAlmostEqual(median[iExp], stats.getValue(afwMath.MEDIAN), delta=1e-2)
+
+    def testMemoryPlan(self):
+        amps = [makeAmp(ampName) for ampName in AMP_NAMES]
+        config = EoOverscanTask.ConfigClass()
+        config.numThreads = 4
+        plan = EoMemoryPlan.forAmpLoops(config, amps, NEXPOSURE, nCubes=1)
+        self.assertEqual(plan.numThreads, 4)
+        self.assertFalse(plan.spill)
+        # room for two amps being processed, not for their cubes
+        config.memoryBudget = 0.03
+        plan = EoMemoryPlan.forAmpLoops(config, amps, NEXPOSURE, nCubes=1)
+        self.assertEqual(plan.numThreads, 2)
+        self.assertTrue(plan.spill)
+        self.assertLessEqual(plan.estimate, plan.budget)
+        # Looping over pairs first also holds the calibrated copies of all
+        # the amps of both exposures
+        config.memoryBudget = 0.
+        plans = [EoMemoryPlan.forAmpLoops(config, amps, 2*NEXPOSURE, nHeld=2, expMajor=True,
+                                          holdCalibrated=holdCalibrated) for holdCalibrated in (False, True)]
+        self.assertEqual(plans[1].estimate - plans[0].estimate,
+                         2*CALIB_BYTES_PER_PIXEL*sum(amp.getRawBBox().getArea() for amp in amps))
+        config.memoryBudget = 0.03
+        plan = EoMemoryPlan.forStack(config, amps, 100)
+        self.assertTrue(plan.spill)
+        self.assertGreater(plan.chunkRows, 0)
+        self.assertLess(plan.chunkRows, SHAPE[0])
+
+    def runTask(self, taskClass, **configKwds):
+        config = taskClass.ConfigClass()
+        for key, val in configKwds.items():
+            setattr(config, key, val)
+        task = taskClass(config=config)
+        task.isr = FakeIsr()
+        amps = [makeAmp(ampName) for ampName in AMP_NAMES]
+        inputExps = [FakeHandle(iExp, amps) for iExp in range(NEXPOSURE)]
+        det = FakeDetector(amps)
+        outputData = task.prepareOutputData(inputExps, det)
+        with patch.object(eoCalibBase, 'extractAmpImage', fakeExtractAmpImage):
+            task.runAmpLoops(inputExps, outputData, amps)
+        return outputData
+
+    def testAnalyzers(self):
+        for taskClass in (EoOverscanTask, EoGainStabilityTask, EoBiasStabilityTask, EoPersistenceTask):
+            with self.subTest(task=taskClass.__name__):
+                perExp = self.runTask(taskClass)
+                for configKwds in [dict(), dict(numThreads=2), dict(ampCubeSize=0.),
+                                   dict(iterationOrder="expMajor"), dict(numThreads=4, memoryBudget=0.03)]:
+                    cube = self.runTask(taskClass, useAmpCube=True, **configKwds)
+                    assertCalibsClose(self, perExp, cube, rtol=1e-4)
+
+    def testQuickLook(self):
+        full = self.runTask(EoBiasStabilityTask)
+        perExp = self.runTask(EoBiasStabilityTask, quickLook=True, quickLookFraction=0.25)
+        for configKwds in [dict(), dict(quickLookMode="blocks")]:
+            cube = self.runTask(EoBiasStabilityTask, useAmpCube=True, quickLook=True, quickLookFraction=0.25,
+                                **configKwds)
+            if not configKwds:
+                assertCalibsClose(self, perExp, cube, rtol=1e-4)
+            # The subsample gives the same answer, within the noise
+            for ampName in AMP_NAMES:
+                fullTable = full.ampExp["ampExp_%s" % ampName]
+                cubeTable = cube.ampExp["ampExp_%s" % ampName]
+                np.testing.assert_allclose(cubeTable.mean, fullTable.mean, atol=5.*5./np.sqrt(100.))
+                np.testing.assert_allclose(cubeTable.stdev, fullTable.stdev, rtol=0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,520 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+import lsst.geom as lsstGeom
+import lsst.afw.image as afwImage
+import lsst.pipe.base as pipeBase
+
+from lsst.eotask_gen3 import eoCalibBase
+from lsst.eotask_gen3.eoAmpMerge import mergeAmpResults, patchAmpResultsFits
+from lsst.eotask_gen3.eoCheckpoint import EoCheckpoint
+from lsst.eotask_gen3.eoStageTimer import EoStageTimer, getStageSummary
+from lsst.eotask_gen3 import (EoReadNoiseTask, EoReadNoiseTaskConfig, EoReadNoiseData,
+                              EoPtcTask, EoPtcTaskConfig, EoPtcData,
+                              EoFlatPairTask, EoFlatPairTaskConfig, EoFlatPairData,
+                              EoFusedCalibTask, EoFusedCalibTaskConfig)
+
+AMP_NAMES = ['C%02i' % i for i in range(16)]
+NEXPOSURE = 6
+NPAIR = 3
+NSAMPLE = 8
+SHAPE = (NSAMPLE, 10)
+
+
+class FakeAmp:
+    """ Stands in for `lsst.afw.cameraGeom.Amplifier` """
+    def __init__(self, name):
+        self._name = name
+
+    def getName(self):
+        return self._name
+
+    def getRawBBox(self):
+        return lsstGeom.Box2I(lsstGeom.Point2I(0, 0), lsstGeom.Extent2I(SHAPE[1], SHAPE[0]))
+
+    def getRawDataBBox(self):
+        return self.getRawBBox()
+
+
+class FakeDetector:
+    """ Stands in for `lsst.afw.cameraGeom.Detector` """
+    def __init__(self, amps):
+        self._amps = amps
+
+    def getAmplifiers(self):
+        return self._amps
+
+    def getName(self):
+        return "R22_S11"
+
+    def getSerial(self):
+        return "FAKE-000"
+
+    def getId(self):
+        return 94
+
+
+class FakeImage:
+    def __init__(self, array):
+        self.array = array
+
+
+class FakeExposure:
+    """ Stands in for `lsst.afw.image.Exposure` """
+    def __init__(self, arrays, amps):
+        self.arrays = arrays
+        self.image = FakeImage(arrays[0] if len(arrays) == 1 else np.concatenate(arrays))
+        self._detector = FakeDetector(amps)
+
+    def getDetector(self):
+        return self._detector
+
+
+class FakeHandle:
+    """ Stands in for `lsst.daf.butler.DeferredDatasetHandle` """
+    def __init__(self, seed, amps):
+        rng = np.random.default_rng(seed)
+        self.dataId = dict(exposure=seed, detector=94)
+        self.id = "raw-%i" % seed
+        self.amps = amps
+        self.arrays = [rng.normal(1000., 5. + iamp, size=SHAPE).astype(np.float32)
+                       for iamp in range(len(amps))]
+
+    def get(self, parameters=None, component=None):
+        if component == 'detector':
+            return FakeDetector(self.amps)
+        if parameters is None:
+            return FakeExposure(self.arrays, self.amps)
+        iamp = parameters['amp']
+        return FakeExposure([self.arrays[iamp].copy()], [self.amps[iamp]])
+
+
+class AfwExposure(FakeExposure):
+    """ FakeExposure whose image is a `lsst.afw.image.ImageF`, for the
+    analyzers that use afw statistics on sub-images """
+    def __init__(self, arrays, amps):
+        super().__init__(arrays, amps)
+        self._exposure = afwImage.ExposureF(afwImage.MaskedImageF(afwImage.ImageF(self.image.array,
+                                                                                  deep=False)))
+        self.image = self._exposure.image
+
+    def __getitem__(self, bbox):
+        return self._exposure[bbox]
+
+
+class FlatHandle(FakeHandle):
+    """ Flat, with a different level for each exposure, whose amps are
+    read as `AfwExposure` """
+    def __init__(self, seed, amps):
+        super().__init__(seed, amps)
+        rng = np.random.default_rng(seed)
+        level = 1000.*(1. + seed)
+        self.arrays = [rng.normal(level, np.sqrt(level), size=SHAPE).astype(np.float32)
+                       for iamp in range(len(amps))]
+
+    def get(self, parameters=None, component=None):
+        if parameters is None:
+            return super().get(component=component)
+        iamp = parameters['amp']
+        return AfwExposure([self.arrays[iamp].copy()], [self.amps[iamp]])
+
+
+class FakeIsr:
+    """ Stands in for `lsst.ip.isr.IsrTask` """
+    @staticmethod
+    def run(ampExposure, **kwargs):
+        return pipeBase.Struct(exposure=ampExposure)
+
+
+class FakeDataId(dict):
+    """ Stands in for an unexpanded `lsst.daf.butler.DataCoordinate` """
+    def __init__(self, expId):
+        super().__init__(instrument="LSSTCam", exposure=expId, detector=94)
+
+    def hasRecords(self):
+        return False
+
+
+class FakeRef:
+    """ Stands in for `lsst.daf.butler.DatasetRef` """
+    def __init__(self, expId):
+        self.dataId = FakeDataId(expId)
+
+
+class FakeRegistry:
+    """ Stands in for `lsst.daf.butler.Registry`, counting the queries """
+    def __init__(self, records):
+        self.records = records
+        self.nQuery = 0
+
+    def queryDimensionRecords(self, element, where, instrument):
+        self.nQuery += 1
+        return self.records
+
+
+def fakeExtractAmpImage(rawExp, amp):
+    iamp = rawExp.getDetector().getAmplifiers().index(amp)
+    return FakeExposure([rawExp.arrays[iamp].copy()], [amp])
+
+
+class AmpExpLoopTask(EoReadNoiseTask):
+    """ Read noise like task that does all the work with numpy """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.isr = FakeIsr()
+
+    def analyzeAmpExpData(self, calibExp, outputData, iamp, amp, iExp):
+        outTable = outputData.ampExp["ampExp_%s" % amp.getName()]
+        outTable.totalNoise[iExp] = np.std(calibExp.image.array, axis=1)
+
+    def analyzeAmpRunData(self, outputData, iamp, amp):
+        totalNoise = np.median(outputData.ampExp["ampExp_%s" % amp.getName()].totalNoise)
+        outputData.amps["amps"].totalNoise[iamp] = totalNoise
+        outputData.amps["amps"].readNoise[iamp] = totalNoise
+
+
+class CheckpointAmpExpLoopTask(AmpExpLoopTask):
+    """ Counts the amps that are actually processed, and fails on amp
+    `failAmp`, as if the job had been killed """
+
+    failAmp = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.nProcessed = 0
+
+    def analyzeAmpExpData(self, calibExp, outputData, iamp, amp, iExp):
+        if iamp == self.failAmp:
+            raise RuntimeError("Interrupted")
+        super().analyzeAmpExpData(calibExp, outputData, iamp, amp, iExp)
+
+    def analyzeAmpRunData(self, outputData, iamp, amp):
+        self.nProcessed += 1
+        super().analyzeAmpRunData(outputData, iamp, amp)
+
+
+class AmpPairLoopTask(EoPtcTask):
+    """ PTC like task that does all the work with numpy """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.isr = FakeIsr()
+
+    def analyzeAmpPairData(self, calibExp1, calibExp2, outputData, amp, iPair):
+        outTable = outputData.ampExp["ampExp_%s" % amp.getName()]
+        outTable.mean[iPair] = 0.5*(np.mean(calibExp1.image.array) + np.mean(calibExp2.image.array))
+        outTable.var[iPair] = np.var(calibExp1.image.array - calibExp2.image.array)/2.
+        outTable.discard[iPair] = 0
+
+    def analyzeAmpRunData(self, outputData, iamp, amp):
+        inTable = outputData.ampExp["ampExp_%s" % amp.getName()]
+        outputData.amps["amps"].ptcNoise[iamp] = np.sqrt(np.median(inTable.var))
+        outputData.amps["amps"].ptcTurnoff[iamp] = np.max(inTable.mean)
+
+
+class PtcPairTask(EoPtcTask):
+    """ EoPtcTask without ISR, nor the fit of the PTC curve """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.isr = FakeIsr()
+
+    def analyzeAmpRunData(self, outputData, iamp, amp):
+        pass
+
+
+class FlatPairPairTask(EoFlatPairTask):
+    """ EoFlatPairTask without ISR, nor the fit of the linearity """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.isr = FakeIsr()
+
+    def analyzeAmpRunData(self, outputData, iamp, amp):
+        pass
+
+
+def makeAmps():
+    return [FakeAmp(ampName) for ampName in AMP_NAMES]
+
+
+class AmpLoopsTestCase(unittest.TestCase):
+    """ Check that the different ways of running the amp loops
+    give identical results """
+
+    def runAmpExp(self, taskClass=AmpExpLoopTask, timer=None, **configKwds):
+        config = EoReadNoiseTaskConfig()
+        for key, val in configKwds.items():
+            setattr(config, key, val)
+        task = taskClass(config=config)
+        amps = makeAmps()
+        inputExps = [FakeHandle(iExp, amps) for iExp in range(NEXPOSURE)]
+        outputData = EoReadNoiseData(amps=AMP_NAMES, nAmp=len(amps), nExposure=NEXPOSURE, nSample=NSAMPLE)
+        checkpoint = EoCheckpoint.fromTask(task, inputExps)
+        with patch.object(eoCalibBase, 'extractAmpImage', fakeExtractAmpImage):
+            task.runAmpLoops(inputExps, outputData, amps, checkpoint=checkpoint, timer=timer)
+        return outputData, task
+
+    def runAmpPair(self, **configKwds):
+        config = EoPtcTaskConfig()
+        for key, val in configKwds.items():
+            setattr(config, key, val)
+        task = AmpPairLoopTask(config=config)
+        amps = makeAmps()
+        inputPairs = [[(FakeHandle(2*iPair, amps), 2*iPair), (FakeHandle(2*iPair+1, amps), 2*iPair+1)]
+                      for iPair in range(NPAIR)]
+        outputData = EoPtcData(amps=AMP_NAMES, nAmp=len(amps), nPair=NPAIR)
+        with patch.object(eoCalibBase, 'extractAmpImage', fakeExtractAmpImage):
+            task.runAmpLoops(inputPairs, outputData, amps)
+        return outputData
+
+    def runFused(self, nExposure=NEXPOSURE, **configKwds):
+        config = EoFusedCalibTaskConfig()
+        config.analyzers = ["readNoise", "ptc"]
+        config.readNoise.retarget(AmpExpLoopTask)
+        config.readNoise.nsamp = NSAMPLE
+        config.ptc.retarget(AmpPairLoopTask)
+        for key, val in configKwds.items():
+            setattr(config, key, val)
+        task = EoFusedCalibTask(config=config)
+        task.isr = FakeIsr()
+        amps = makeAmps()
+        inputExps = [FakeHandle(iExp, amps) for iExp in range(nExposure)]
+        with patch.object(eoCalibBase, 'extractAmpImage', fakeExtractAmpImage):
+            return task.run(inputExps, camera=None)
+
+    def runRealPair(self, taskClass, configClass, dataClass):
+        """ Run the amp loops of a task with the real analyzeAmpPairData
+        on flats """
+        task = taskClass(config=configClass())
+        amps = makeAmps()
+        inputPairs = [[(FlatHandle(2*iPair, amps), 2*iPair), (FlatHandle(2*iPair+1, amps), 2*iPair+1)]
+                      for iPair in range(NPAIR)]
+        outputData = dataClass(amps=AMP_NAMES, nAmp=len(amps), nPair=NPAIR)
+        with patch.object(eoCalibBase, 'extractAmpImage', fakeExtractAmpImage):
+            task.runAmpLoops(inputPairs, outputData, amps)
+        return outputData
+
+    def testAmpExpThreads(self):
+        serial = self.runAmpExp(numThreads=1)[0]
+        threaded = self.runAmpExp(numThreads=4)[0]
+        self.assertTrue(serial == threaded)
+
+    def testAmpExpIterationOrder(self):
+        serial = self.runAmpExp(numThreads=1)[0]
+        expMajor = self.runAmpExp(numThreads=1, iterationOrder="expMajor")[0]
+        expMajorThreaded = self.runAmpExp(numThreads=4, iterationOrder="expMajor")[0]
+        self.assertTrue(serial == expMajor)
+        self.assertTrue(serial == expMajorThreaded)
+
+    def testAmpExpProcesses(self):
+        serial = self.runAmpExp(numThreads=1)[0]
+        forked = self.runAmpExp(numThreads=4, ampBackend="process")[0]
+        self.assertTrue(serial == forked)
+
+    def testCheckpoint(self):
+        serial = self.runAmpExp(numThreads=1)[0]
+        failAmp = len(AMP_NAMES)//2
+        with tempfile.TemporaryDirectory() as checkpointDir:
+            with patch.object(CheckpointAmpExpLoopTask, 'failAmp', failAmp):
+                with self.assertRaises(RuntimeError):
+                    self.runAmpExp(CheckpointAmpExpLoopTask, checkpointDir=checkpointDir)
+            # Settings that do not change the results do not change the key
+            resumed, task = self.runAmpExp(CheckpointAmpExpLoopTask, checkpointDir=checkpointDir,
+                                           numThreads=2)
+            self.assertTrue(serial == resumed)
+            self.assertEqual(task.nProcessed, len(AMP_NAMES) - failAmp)
+
+            # A different configuration must not reuse the checkpoints
+            _, task = self.runAmpExp(CheckpointAmpExpLoopTask, checkpointDir=checkpointDir,
+                                     dataSelection="anyBias")
+            self.assertEqual(task.nProcessed, len(AMP_NAMES))
+            self.assertEqual(len(os.listdir(checkpointDir)), 2)
+
+    def testStageTiming(self):
+        nAmps = len(AMP_NAMES)
+        for configKwds in [dict(numThreads=1), dict(numThreads=4, ampBackend="process"),
+                           dict(numThreads=4, iterationOrder="expMajor")]:
+            with self.subTest(**configKwds):
+                timer = EoStageTimer()
+                self.runAmpExp(timer=timer, **configKwds)
+                summary = timer.summary()
+                self.assertEqual(summary['isr']['n'], nAmps*NEXPOSURE)
+                self.assertEqual(summary['analyze']['n'], nAmps*NEXPOSURE)
+                self.assertEqual(summary['ampRun']['n'], nAmps)
+                self.assertEqual(summary['read']['pixels'], nAmps*NEXPOSURE*SHAPE[0]*SHAPE[1])
+                self.assertLessEqual(summary['read']['p50'], summary['read']['p95'])
+
+        fused = self.runFused(numThreads=4, ampBackend="process")
+        summary = getStageSummary(fused.outputPtc)
+        self.assertEqual(summary, getStageSummary(fused.outputReadNoise))
+        self.assertEqual(summary['readNoise']['n'], nAmps*NEXPOSURE)
+        self.assertEqual(summary['ptc']['n'], nAmps*NPAIR)
+        self.assertIsNone(getStageSummary(self.runAmpPair()))
+
+    def testAmpPairThreads(self):
+        serial = self.runAmpPair(numThreads=1)
+        threaded = self.runAmpPair(numThreads=4)
+        self.assertTrue(serial == threaded)
+
+    def testAmpPairProcesses(self):
+        serial = self.runAmpPair(numThreads=1)
+        forked = self.runAmpPair(numThreads=4, ampBackend="process")
+        self.assertTrue(serial == forked)
+
+    def testAmpPairIterationOrder(self):
+        serial = self.runAmpPair(numThreads=1)
+        get = FakeHandle.get
+        reads = []
+
+        def countReads(handle, parameters=None, component=None):
+            reads.append((handle.id, parameters))
+            return get(handle, parameters=parameters, component=component)
+
+        with patch.object(FakeHandle, 'get', countReads):
+            pairMajor = self.runAmpPair(numThreads=1, iterationOrder="pairMajor")
+        self.assertTrue(serial == pairMajor)
+        self.assertEqual(sorted(reads), sorted(("raw-%i" % iExp, None) for iExp in range(2*NPAIR)))
+        for configKwds in [dict(numThreads=4), dict(numThreads=4, pipelineDepth=2)]:
+            with self.subTest(**configKwds):
+                self.assertTrue(serial == self.runAmpPair(iterationOrder="pairMajor", **configKwds))
+        config = EoPtcTaskConfig()
+        config.iterationOrder = "pairMajor"
+        config.ampBackend = "process"
+        with self.assertRaises(ValueError):
+            config.validate()
+
+    def testFused(self):
+        serialExp = self.runAmpExp(numThreads=1)[0]
+        serialPair = self.runAmpPair(numThreads=1)
+        for configKwds in [dict(numThreads=1), dict(numThreads=4),
+                           dict(numThreads=4, ampBackend="process")]:
+            fused = self.runFused(**configKwds)
+            self.assertTrue(serialExp == fused.outputReadNoise)
+            self.assertTrue(serialPair == fused.outputPtc)
+        # The last flat of an odd number is not paired
+        self.assertTrue(serialPair == self.runFused(nExposure=NEXPOSURE + 1).outputPtc)
+        # The pre-scan is not applied to the exposures of the fused task
+        for configName in ["doPreScan", "ptc.doPreScan"]:
+            with self.subTest(configName=configName):
+                config = EoFusedCalibTaskConfig()
+                config.analyzers = ["readNoise", "ptc"]
+                if configName == "doPreScan":
+                    config.doPreScan = True
+                else:
+                    config.ptc.doPreScan = True
+                with self.assertRaises(ValueError):
+                    config.validate()
+
+    def testFusedSelectionRecords(self):
+        """ The exposure records of unexpanded dataIds are fetched once,
+        for the selection of the task and those of the analyzers """
+        kinds = [('bias', 'bias')]*2 + [('flat', 'flat')]*4
+        records = [pipeBase.Struct(id=100 + iExp, observation_type=obsType, observation_reason=obsReason,
+                                   exposure_time=1.) for iExp, (obsType, obsReason) in enumerate(kinds)]
+        registry = FakeRegistry(records)
+        config = EoFusedCalibTaskConfig()
+        config.analyzers = ["readNoise", "ptc"]
+        config.dataSelection = "any"
+        task = EoFusedCalibTask(config=config)
+        inputRefs = pipeBase.Struct(inputExps=[FakeRef(record.id) for record in records])
+        task.selectInputRefs(inputRefs, registry)
+        with patch.object(task, 'run', lambda **kwargs: kwargs):
+            selections = task.runWithInputs(inputRefs, {})['analyzerSelections']
+        self.assertEqual(selections, dict(readNoise=[0, 1], ptc=[2, 3, 4, 5]))
+        self.assertEqual(registry.nQuery, 1)
+
+    def testFusedRealAnalyzers(self):
+        """ The PTC and flat pair analyses get the same calibrated amps in
+        the fused task, their results must not depend on each other """
+        ptc = self.runRealPair(PtcPairTask, EoPtcTaskConfig, EoPtcData)
+        flatPair = self.runRealPair(FlatPairPairTask, EoFlatPairTaskConfig, EoFlatPairData)
+        for analyzers in (["ptc", "flatPair"], ["flatPair", "ptc"]):
+            with self.subTest(analyzers=analyzers):
+                config = EoFusedCalibTaskConfig()
+                config.analyzers = analyzers
+                config.ptc.retarget(PtcPairTask)
+                config.flatPair.retarget(FlatPairPairTask)
+                task = EoFusedCalibTask(config=config)
+                task.isr = FakeIsr()
+                amps = makeAmps()
+                inputExps = [FlatHandle(iExp, amps) for iExp in range(2*NPAIR)]
+                with patch.object(eoCalibBase, 'extractAmpImage', fakeExtractAmpImage):
+                    fused = task.run(inputExps, camera=None)
+                self.assertTrue(ptc == fused.outputPtc)
+                self.assertTrue(flatPair == fused.outputFlatPair)
+
+    def testPipelined(self):
+        serial = self.runAmpExp(numThreads=1)[0]
+        for configKwds in [dict(numThreads=1), dict(numThreads=4), dict(iterationOrder="expMajor"),
+                           dict(numThreads=4, iterationOrder="expMajor"),
+                           dict(numThreads=4, ampBackend="process")]:
+            with self.subTest(**configKwds):
+                timer = EoStageTimer()
+                pipelined = self.runAmpExp(timer=timer, pipelineDepth=2, **configKwds)[0]
+                self.assertTrue(serial == pipelined)
+                summary = timer.summary()
+                self.assertEqual(summary['isr']['n'], len(AMP_NAMES)*NEXPOSURE)
+                self.assertIn('readStall', summary)
+        self.assertTrue(self.runAmpPair() == self.runAmpPair(numThreads=4, pipelineDepth=2))
+        fused = self.runFused(numThreads=4, pipelineDepth=2)
+        self.assertTrue(serial == fused.outputReadNoise)
+
+    def testAmpSubset(self):
+        ampSubset = ["C03", "C10"]
+        amps = makeAmps()
+        full = self.runAmpExp(numThreads=1)[0]
+        for configKwds in [dict(numThreads=1), dict(numThreads=4, ampBackend="process"),
+                           dict(numThreads=4, iterationOrder="expMajor")]:
+            with self.subTest(**configKwds):
+                subset, task = self.runAmpExp(CheckpointAmpExpLoopTask, ampSubset=ampSubset, **configKwds)
+                if configKwds.get('ampBackend') != "process":
+                    self.assertEqual(task.nProcessed, len(ampSubset))
+                self.assertEqual(subset.amps["amps"].totalNoise[0], 0.)
+
+                # Patch an output where the amps have bad results
+                patched = self.runAmpExp(numThreads=1)[0]
+                for ampName in ampSubset:
+                    patched.ampExp["ampExp_%s" % ampName].totalNoise[:] = -1.
+                    patched.amps["amps"].totalNoise[AMP_NAMES.index(ampName)] = -1.
+                self.assertFalse(full == patched)
+                tableNames = mergeAmpResults(patched, subset, amps, ampSubset)
+                self.assertEqual(tableNames, ["ampExp_C03", "amps", "ampExp_C10"])
+                self.assertTrue(full == patched)
+
+        subset = self.runAmpPair(ampSubset=ampSubset)
+        patched = self.runAmpPair()
+        patched.amps["amps"].ptcNoise[3] = -1.
+        mergeAmpResults(patched, subset, amps, ampSubset)
+        self.assertTrue(self.runAmpPair() == patched)
+
+        with self.assertRaises(ValueError):
+            self.runAmpExp(ampSubset=["C99"])
+        with self.assertRaises(ValueError):
+            mergeAmpResults(full, self.runAmpPair(), amps, ampSubset)
+
+    def testPatchAmpResultsFits(self):
+        ampSubset = ["C05"]
+        amps = makeAmps()
+        full = self.runAmpExp(numThreads=1)[0]
+        subset = self.runAmpExp(ampSubset=ampSubset)[0]
+        with tempfile.TemporaryDirectory() as tempDir:
+            fileName = os.path.join(tempDir, "readNoise.fits")
+            bad = self.runAmpExp(numThreads=1)[0]
+            bad.ampExp["ampExp_C05"].totalNoise[:] = -1.
+            bad.amps["amps"].readNoise[5] = -1.
+            bad.writeFits(fileName)
+            fileSize = os.path.getsize(fileName)
+            tableNames = patchAmpResultsFits(fileName, subset, amps, ampSubset)
+            self.assertEqual(tableNames, ["ampExp_C05", "amps"])
+            self.assertEqual(os.path.getsize(fileName), fileSize)
+            self.assertTrue(full == EoReadNoiseData.readFits(fileName))
+
+
+if __name__ == '__main__':
+    unittest.main()
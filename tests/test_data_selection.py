@@ -0,0 +1,134 @@
+import re
+import unittest
+
+from lsst.eotask_gen3.eoDataSelection import (EoDataSelection, makeExposureTable, eoSelectAnyBias,
+                                              eoSelectBiasBias, eoSelectDarkDark, eoSelectFlatFlat,
+                                              eoSelectAnySuperFlat, eoSelectSuperFlatLow,
+                                              eoSelectSuperFlatHigh, eoSelectFe55Flat)
+
+# Registered selections and the per-ref functions they replace
+SELECTION_FUNCTIONS = dict(anyBias=eoSelectAnyBias, biasBias=eoSelectBiasBias, darkDark=eoSelectDarkDark,
+                           flatFlat=eoSelectFlatFlat, anySuperFlat=eoSelectAnySuperFlat,
+                           superFlatLow=eoSelectSuperFlatLow, superFlatHigh=eoSelectSuperFlatHigh,
+                           fe55Flat=eoSelectFe55Flat)
+
+# (observation_type, observation_reason, exposure_time) of the exposures
+EXPOSURE_KINDS = [('bias', 'bias', 0.), ('bias', 'fe55_flat', 0.), ('dark', 'dark', 100.),
+                  ('flat', 'flat', 2.), ('flat', 'sflat', 1.), ('flat', 'sflat', 60.),
+                  ('fe55_flat', 'fe55', 20.), ('dark', 'bot_persistence', 30.)]
+
+
+class FakeRecord:
+    """ Stands in for an exposure `lsst.daf.butler.DimensionRecord` """
+    def __init__(self, expId, observationType, observationReason, exposureTime):
+        self.id = expId
+        self.observation_type = observationType
+        self.observation_reason = observationReason
+        self.exposure_time = exposureTime
+
+
+class FakeDataId(dict):
+    """ Stands in for a `lsst.daf.butler.DataCoordinate` """
+    def __init__(self, record, detector, expanded=True):
+        super().__init__(instrument="LSSTCam", exposure=record.id, detector=detector)
+        self._record = record
+        self._expanded = expanded
+
+    def hasRecords(self):
+        return self._expanded
+
+    @property
+    def records(self):
+        return dict(exposure=self._record)
+
+
+class FakeRef:
+    """ Stands in for `lsst.daf.butler.DatasetRef` """
+    def __init__(self, dataId):
+        self.dataId = dataId
+
+
+class FakeRegistry:
+    """ Stands in for `lsst.daf.butler.Registry`, counting the queries """
+    def __init__(self, records):
+        self.records = {record.id: record for record in records}
+        self.nQuery = 0
+
+    def queryDimensionRecords(self, element, where, instrument):
+        self.nQuery += 1
+        return [self.records[int(expId)] for expId in re.findall(r"\d+", where) if int(expId) in self.records]
+
+
+def makeRecords(nRepeat=3):
+    return [FakeRecord(100 + iExp, *kind) for iExp, kind in enumerate(EXPOSURE_KINDS*nRepeat)]
+
+
+def makeRefs(records, nDetector=1, expanded=True):
+    return [FakeRef(FakeDataId(record, detector, expanded)) for record in records
+            for detector in range(nDetector)]
+
+
+class DataSelectionTestCase(unittest.TestCase):
+    """ Check that the column selections select the same data as the
+    per-ref functions, with or without expanded dataIds """
+
+    def testMatchesFunctions(self):
+        refs = makeRefs(makeRecords())
+        for key, selectionFunction in SELECTION_FUNCTIONS.items():
+            with self.subTest(key=key):
+                selection = EoDataSelection.getSelection(key)
+                selected = selection.selectData(refs)
+                self.assertTrue(selected)
+                self.assertEqual(selected, [ref for ref in refs if selectionFunction(ref)])
+                self.assertEqual([ref for ref in refs if selection.selectionFunction(ref)], selected)
+        self.assertEqual(EoDataSelection.getSelection("any").selectData(refs), refs)
+
+        # The bounds of the exposure time ranges are those of the functions
+        refs = makeRefs([FakeRecord(1 + iExp, 'flat', 'sflat', expTime)
+                         for iExp, expTime in enumerate([29.9, 30., 30.1])])
+        for key in ["superFlatLow", "superFlatHigh"]:
+            with self.subTest(key=key):
+                self.assertEqual(EoDataSelection.getSelection(key).selectData(refs),
+                                 [ref for ref in refs if SELECTION_FUNCTIONS[key](ref)])
+        self.assertEqual(EoDataSelection.getSelection("superFlatHigh").selectData(refs), refs[2:])
+        self.assertEqual(EoDataSelection.getSelection("superFlatLow").selectData(refs), refs[:1])
+
+    def testQueryStrings(self):
+        self.assertEqual(EoDataSelection.getSelection("any").queryString, "")
+        self.assertEqual(EoDataSelection.getSelection("biasBias").queryString,
+                         "exposure.observation_type = 'bias' AND exposure.observation_reason = 'bias'")
+        self.assertEqual(EoDataSelection.getSelection("superFlatHigh").queryString,
+                         "exposure.observation_type = 'flat' AND exposure.observation_reason = 'sflat' "
+                         "AND exposure.exposure_time > 30.0")
+
+    def testBulkFetch(self):
+        records = makeRecords()
+        expanded = makeRefs(records, nDetector=3)
+        refs = makeRefs(records, nDetector=3, expanded=False)
+        registry = FakeRegistry(records)
+        selection = EoDataSelection.getSelection("flatFlat")
+        selected = selection.selectData(refs, registry)
+        self.assertEqual(registry.nQuery, 1)
+        self.assertEqual([ref.dataId for ref in selected],
+                         [ref.dataId for ref in selection.selectData(expanded)])
+        table = makeExposureTable(refs, registry)
+        self.assertEqual(len(table['exposure']), len(refs))
+        self.assertEqual(list(table['observation_reason'][:4]), ['bias']*3 + ['fe55_flat'])
+
+        with self.assertRaises(ValueError):
+            selection.selectData(refs)
+        with self.assertRaises(ValueError):
+            selection.selectData(refs, FakeRegistry(records[1:]))
+        # Selecting everything does not need the records
+        self.assertEqual(EoDataSelection.getSelection("any").selectData(refs), refs)
+
+    def testFunctionSelection(self):
+        selection = EoDataSelection("Exposures with even IDs", "",
+                                    lambda ref: ref.dataId['exposure'] % 2 == 0)
+        refs = makeRefs(makeRecords(1), expanded=False)
+        self.assertEqual(selection.selectData(refs), refs[::2])
+        self.assertEqual(selection.columnCuts, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+import numpy as np
+
+import lsst.pipe.base as pipeBase
+
+from lsst.eotask_gen3 import EoDetExpCalibTask, EoGainStabilityData
+
+AMP_NAMES = ['C%02i' % i for i in range(16)]
+NEXPOSURE = 8
+SHAPE = (200, 100)
+
+
+class FakeExposure:
+    """ Stands in for `lsst.afw.image.Exposure` """
+    def __init__(self, array):
+        self.array = array
+
+
+class FakeHandle:
+    """ Stands in for `lsst.daf.butler.DeferredDatasetHandle` """
+    def __init__(self, seed):
+        self.dataId = dict(exposure=seed, detector=94)
+        self.seed = seed
+
+    def get(self, parameters=None, component=None):
+        rng = np.random.default_rng(self.seed)
+        return FakeExposure(rng.normal(1000. + self.seed, 5., size=SHAPE))
+
+
+class FakeIsr:
+    """ Stands in for `lsst.ip.isr.IsrTask` """
+    @staticmethod
+    def run(rawExposure, **kwargs):
+        return pipeBase.Struct(exposure=FakeExposure(rawExposure.array - 1000.))
+
+
+class FakeCamera:
+    """ Stands in for `lsst.afw.cameraGeom.Camera` """
+    def get(self, detId):
+        return detId
+
+
+class DetExpLoopTask(EoDetExpCalibTask):
+    """ Writes the mean and the index of each exposure, then the mean over
+    exposures """
+
+    def makeOutputData(self, nExposure, **kwargs):
+        return EoGainStabilityData(amps=AMP_NAMES, nExposure=nExposure)
+
+    def analyzeDetExpData(self, calibExp, outputData, iExp):
+        outTable = outputData.detExp['detExp']
+        outTable.flux[iExp] = np.mean(calibExp.array)
+        outTable.seqnum[iExp] = iExp
+
+    def analyzeDetRunData(self, outputData):
+        outTable = outputData.detExp['detExp']
+        outTable.mjd[:] = np.mean(outTable.flux)
+
+
+class DetExpTestCase(unittest.TestCase):
+    """ Check that processing the exposures in parallel gives the same
+    results as processing them one after another """
+
+    def runDetExp(self, numExpThreads):
+        config = DetExpLoopTask.ConfigClass()
+        config.numExpThreads = numExpThreads
+        task = DetExpLoopTask(config=config)
+        task.isr = FakeIsr()
+        inputExps = [FakeHandle(iExp) for iExp in range(NEXPOSURE)]
+        return task.run(inputExps, camera=FakeCamera()).outputData
+
+    def testExpThreads(self):
+        serial = self.runDetExp(1)
+        threaded = self.runDetExp(4)
+        self.assertTrue(serial == threaded)
+        np.testing.assert_array_equal(threaded.detExp['detExp'].seqnum, np.arange(NEXPOSURE))
+
+
+if __name__ == '__main__':
+    unittest.main()
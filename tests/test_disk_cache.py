@@ -0,0 +1,177 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+import lsst.geom as lsstGeom
+import lsst.afw.image as afwImage
+import lsst.pipe.base as pipeBase
+from lsst.afw.cameraGeom.testUtils import DetectorWrapper
+from lsst.ip.isr import IsrTaskConfig
+
+from lsst.eotask_gen3.eoCache import EoDiskCache, hashKey, EVICT_TARGET_FRACTION
+from lsst.eotask_gen3.eoCalibBase import getCalibAmp, isAmpCached
+from lsst.eotask_gen3.eoIsrCache import EoIsrCache
+
+AMP_SHAPE = (10, 20)
+
+
+def makeDetector(nAmp=2):
+    """ Build a detector whose amps are side by side in the raw images """
+    ny, nx = AMP_SHAPE
+
+    def setBBoxes(wrapper):
+        for iAmp, ampBuilder in enumerate(wrapper.ampList):
+            bbox = lsstGeom.Box2I(lsstGeom.Point2I(iAmp*nx, 0), lsstGeom.Extent2I(nx, ny))
+            ampBuilder.setBBox(bbox)
+            ampBuilder.setRawBBox(bbox)
+            ampBuilder.setRawDataBBox(bbox)
+
+    bbox = lsstGeom.Box2I(lsstGeom.Point2I(0, 0), lsstGeom.Extent2I(nAmp*nx, ny))
+    return DetectorWrapper(bbox=bbox, numAmps=nAmp, modFunc=setBBoxes).detector
+
+
+def makeAmpExposure(amp, seed):
+    """ Amp exposure with random image and variance planes and some
+    saturated pixels """
+    rng = np.random.default_rng(seed)
+    exposure = afwImage.ExposureF(amp.getRawBBox())
+    exposure.image.array[:] = rng.normal(1000., 30., size=AMP_SHAPE)
+    exposure.variance.array[:] = rng.uniform(900., 1100., size=AMP_SHAPE)
+    exposure.mask.array[::3, ::4] = exposure.mask.getPlaneBitMask("SAT")
+    return exposure
+
+
+class CountingIsr:
+    """ Stands in for the `isr` sub-task, counting the runs """
+    def __init__(self):
+        self.nRun = 0
+
+    def run(self, ampExposure, **kwargs):
+        self.nRun += 1
+        return pipeBase.Struct(exposure=ampExposure.clone())
+
+
+class RawHandle:
+    """ Stands in for the `lsst.daf.butler.DeferredDatasetHandle` of a raw,
+    counting the reads """
+    def __init__(self, datasetId, exposure):
+        self.ref = pipeBase.Struct(id=datasetId)
+        self.exposure = exposure
+        self.nRead = 0
+
+    def get(self, parameters=None, **kwargs):
+        self.nRead += 1
+        return self.exposure.clone()
+
+
+class DiskCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cacheDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cacheDir, ignore_errors=True)
+
+    def testRoundTrip(self):
+        cache = EoDiskCache(self.cacheDir, 1024**2)
+        key = hashKey("raw", "C10", "bias=1234")
+        self.assertEqual(cache.get(key), (None, None))
+        image = np.arange(200, dtype=np.float32).reshape(20, 10)
+        cache.put(key, dict(image=image), dict(x0=3, y0=4))
+        arrays, meta = cache.get(key)
+        np.testing.assert_array_equal(arrays['image'], image)
+        self.assertEqual(arrays['image'].dtype, np.float32)
+        self.assertEqual(meta, dict(x0=3, y0=4))
+        self.assertEqual(cache.nHits, 1)
+        self.assertEqual(cache.nMisses, 1)
+        # A new cache on the same directory sees the entry
+        self.assertTrue(EoDiskCache(self.cacheDir, 1024**2).has(key))
+
+    def testEviction(self):
+        image = np.zeros((100, 100), dtype=np.float32)
+        keys = [hashKey(i) for i in range(3)]
+        cache = EoDiskCache(self.cacheDir, 1024**3)
+        cache.put(keys[0], dict(image=image))
+        entrySize = os.path.getsize(cache.path(keys[0]))
+        cache = EoDiskCache(self.cacheDir, int(2.5*entrySize))
+        for key in keys[1:]:
+            time.sleep(0.01)
+            cache.put(key, dict(image=image))
+        self.assertEqual(cache.nEvictions, 1)
+        self.assertFalse(cache.has(keys[0]))
+        self.assertTrue(cache.has(keys[1]))
+        self.assertTrue(cache.has(keys[2]))
+        self.assertLessEqual(cache.nBytes, cache.maxBytes)
+
+    def testEvictionScans(self):
+        """ The directory is only scanned when the cache goes over budget,
+        and is then brought down to the eviction target """
+        image = np.zeros((10, 10), dtype=np.float32)
+        cache = EoDiskCache(self.cacheDir, 1024**3)
+        cache.put(hashKey(-1), dict(image=image))
+        entrySize = os.path.getsize(cache.path(hashKey(-1)))
+        cache = EoDiskCache(self.cacheDir, int(40.5*entrySize))
+        for i in range(39):
+            cache.put(hashKey(i), dict(image=image))
+        self.assertEqual(cache.nScans, 0)
+        for i in range(39, 99):
+            cache.put(hashKey(i), dict(image=image))
+            self.assertLessEqual(cache.nBytes, cache.maxBytes)
+        nKept = int(EVICT_TARGET_FRACTION*40.5)
+        self.assertEqual(cache.nScans, 1 + (99 - 41)//(41 - nKept))
+        self.assertEqual(cache.nEvictions + cache.nBytes//entrySize, 100)
+
+
+class IsrCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cacheDir = tempfile.mkdtemp()
+        self.detector = makeDetector()
+        self.amps = self.detector.getAmplifiers()
+
+    def tearDown(self):
+        shutil.rmtree(self.cacheDir, ignore_errors=True)
+
+    def assertExposureEqual(self, exposure, reference):
+        np.testing.assert_array_equal(exposure.image.array, reference.image.array)
+        np.testing.assert_array_equal(exposure.mask.array, reference.mask.array)
+        np.testing.assert_array_equal(exposure.variance.array, reference.variance.array)
+        self.assertEqual(exposure.getXY0(), reference.getXY0())
+        self.assertEqual(exposure.getBBox(), reference.getBBox())
+
+    def testRoundTrip(self):
+        cache = EoIsrCache(self.cacheDir, 1024**2, IsrTaskConfig())
+        amp = self.amps[1]
+        calibExp = makeAmpExposure(amp, 1)
+        self.assertNotEqual(calibExp.getXY0(), lsstGeom.Point2I(0, 0))
+        key = cache.makeKey("raw-id", amp.getName(), dict(bias="bias-id"))
+        self.assertNotEqual(key, cache.makeKey("raw-id", amp.getName(), dict(bias="other-bias-id")))
+        self.assertIsNone(cache.get(key, self.detector, amp))
+        cache.put(key, calibExp)
+        cached = cache.get(key, self.detector, amp)
+        self.assertExposureEqual(cached, calibExp)
+        self.assertEqual([cachedAmp.getName() for cachedAmp in cached.getDetector()], [amp.getName()])
+
+    def testHitSkipsIsr(self):
+        task = pipeBase.Struct(isr=CountingIsr(),
+                               isrCache=EoIsrCache(self.cacheDir, 1024**2, IsrTaskConfig()))
+        inputExp = RawHandle("raw-id", makeAmpExposure(self.amps[1], 2))
+        kwargs = dict(detector=self.detector, calibKeys={})
+        self.assertFalse(isAmpCached(task, inputExp, self.amps[1], **kwargs))
+        calibExp = getCalibAmp(task, inputExp, 1, self.amps, {}, **kwargs)
+        self.assertEqual((task.isr.nRun, inputExp.nRead), (1, 1))
+        self.assertTrue(isAmpCached(task, inputExp, self.amps[1], **kwargs))
+        cached = getCalibAmp(task, inputExp, 1, self.amps, {}, **kwargs)
+        self.assertEqual((task.isr.nRun, inputExp.nRead), (1, 1))
+        self.assertExposureEqual(cached, calibExp)
+        # The other amp is not cached
+        getCalibAmp(task, inputExp, 0, self.amps, {}, **kwargs)
+        self.assertEqual((task.isr.nRun, inputExp.nRead), (2, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
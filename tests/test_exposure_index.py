@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+
+from lsst.eotask_gen3.eoCalibBase import arrangeFlatsByExpId
+from lsst.eotask_gen3.eoDataSelection import EoDataSelection, makeExposureTable
+from lsst.eotask_gen3.eoExposureIndex import EoExposureIndex
+
+
+class FakeRecord:
+    """ Stands in for an exposure `lsst.daf.butler.DimensionRecord` """
+    def __init__(self, expId, observationType, observationReason, exposureTime):
+        self.id = expId
+        self.instrument = "LSSTCam"
+        self.observation_type = observationType
+        self.observation_reason = observationReason
+        self.exposure_time = exposureTime
+        self.day_obs = 20211231
+        self.seq_num = expId % 100000
+
+
+class FakeDataId(dict):
+    """ Stands in for an unexpanded `lsst.daf.butler.DataCoordinate` """
+    def __init__(self, expId, detector=0):
+        super().__init__(instrument="LSSTCam", exposure=expId, detector=detector)
+
+    def hasRecords(self):
+        return False
+
+
+class FakeRef:
+    """ Stands in for `lsst.daf.butler.DatasetRef` """
+    def __init__(self, dataId):
+        self.dataId = dataId
+
+
+class FakeRegistry:
+    """ Stands in for `lsst.daf.butler.Registry`, with one collection of
+    raws, counting the queries """
+    def __init__(self, records):
+        self.records = list(records)
+        self.nQuery = 0
+
+    def queryDimensionRecords(self, element, datasets=None, collections=None, **kwargs):
+        self.nQuery += 1
+        return list(self.records)
+
+    def queryDataIds(self, dimensions, datasets=None, collections=None, **kwargs):
+        self.nQuery += 1
+        return [dict(instrument=record.instrument, exposure=record.id) for record in self.records]
+
+
+def makeRecords():
+    kinds = [('bias', 'bias', 0.), ('flat', 'flat', 2.), ('flat', 'flat', 2.), ('flat', 'flat', 5.),
+             ('flat', 'flat', 10.), ('flat', 'flat', 10.), ('dark', 'dark', 30.)]
+    return [FakeRecord(2021123100001 + iExp, *kind) for iExp, kind in enumerate(kinds)]
+
+
+class ExposureIndexTestCase(unittest.TestCase):
+    """ Check the building, invalidation and use of the index """
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.indexDir = os.path.join(self.tmpDir.name, "index")
+        self.records = makeRecords()
+        self.registry = FakeRegistry(self.records)
+
+    def tearDown(self):
+        self.tmpDir.cleanup()
+
+    def testBuildAndInvalidate(self):
+        collection = "LSSTCam/raw/all"
+        self.assertIsNone(EoExposureIndex.load(self.indexDir, collection))
+        index = EoExposureIndex.load(self.indexDir, collection, self.registry)
+        self.assertEqual(len(index), len(self.records))
+        self.assertEqual(self.registry.nQuery, 1)
+        self.assertTrue(os.path.exists(EoExposureIndex.path(self.indexDir, collection)))
+
+        # Reading it back without a registry does not query anything
+        index = EoExposureIndex.load(self.indexDir, collection)
+        row = index.getRecord("LSSTCam", self.records[3].id)
+        self.assertEqual((row.observation_type, row.exposure_time, row.seq_num), ('flat', 5., 4))
+        self.assertIsNone(index.getRecord("LATISS", self.records[3].id))
+
+        # An up to date index only costs the fingerprint query
+        self.registry.nQuery = 0
+        self.assertTrue(index.isValid(self.registry))
+        EoExposureIndex.load(self.indexDir, collection, self.registry)
+        self.assertEqual(self.registry.nQuery, 2)
+
+        # Adding an exposure to the collection invalidates it
+        self.registry.records.append(FakeRecord(2021123100100, 'flat', 'sflat', 1.))
+        self.assertFalse(index.isValid(self.registry))
+        index = EoExposureIndex.load(self.indexDir, collection, self.registry)
+        self.assertEqual(len(index), len(self.records) + 1)
+        self.assertEqual(len(EoExposureIndex.load(self.indexDir, collection)), len(self.records) + 1)
+
+    def testSelection(self):
+        EoExposureIndex.load(self.indexDir, "LSSTCam/raw/all", self.registry)
+        index = EoExposureIndex.fromDirectory(self.indexDir)
+        refs = [FakeRef(FakeDataId(record.id, detector)) for record in self.records for detector in range(2)]
+
+        self.registry.nQuery = 0
+        selected = EoDataSelection.getSelection("flatFlat").selectData(refs, self.registry, index)
+        self.assertEqual(self.registry.nQuery, 0)
+        self.assertEqual(len(selected), 10)
+        table = makeExposureTable(refs, columns=['exposure_time'], exposureIndex=index)
+        self.assertEqual(list(table['exposure_time'][:4]), [0., 0., 2., 2.])
+        with self.assertRaises(ValueError):
+            makeExposureTable(refs + [FakeRef(FakeDataId(1))], exposureIndex=index)
+
+    def testPairing(self):
+        flats = self.records[1:6]
+        expIds = [record.id for record in flats][::-1]
+        exposures = ["exp%i" % expId for expId in expIds]
+        byId = arrangeFlatsByExpId(exposures[1:], expIds[1:])
+        self.assertEqual([[expId for _, expId in pair] for pair in byId.values()],
+                         [[flats[0].id, flats[1].id], [flats[2].id, flats[3].id]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+
+import numpy as np
+
+import lsst.geom as lsstGeom
+import lsst.afw.image as afwImage
+from lsst.afw.cameraGeom.testUtils import DetectorWrapper
+from lsst.ip.isr import IsrTask, IsrTaskConfig
+
+from lsst.eotask_gen3.eoFastIsr import EoFastIsrTask, EoFastIsrTaskConfig
+
+NROW = 30
+NPRESCAN, NDATA, NOVERSCAN = 3, 40, 10
+SATURATION = 30000.
+LEVEL = 20000.
+
+
+def makeDetector():
+    """ Build a single amp detector with prescan, data and serial
+    overscan regions """
+
+    def setBBoxes(wrapper):
+        ampBuilder = wrapper.ampList[0]
+        ampBuilder.setBBox(lsstGeom.Box2I(lsstGeom.Point2I(0, 0), lsstGeom.Extent2I(NDATA, NROW)))
+        ampBuilder.setRawBBox(lsstGeom.Box2I(lsstGeom.Point2I(0, 0),
+                                             lsstGeom.Extent2I(NPRESCAN + NDATA + NOVERSCAN, NROW)))
+        ampBuilder.setRawPrescanBBox(lsstGeom.Box2I(lsstGeom.Point2I(0, 0),
+                                                    lsstGeom.Extent2I(NPRESCAN, NROW)))
+        ampBuilder.setRawDataBBox(lsstGeom.Box2I(lsstGeom.Point2I(NPRESCAN, 0),
+                                                 lsstGeom.Extent2I(NDATA, NROW)))
+        ampBuilder.setRawSerialOverscanBBox(lsstGeom.Box2I(lsstGeom.Point2I(NPRESCAN + NDATA, 0),
+                                                           lsstGeom.Extent2I(NOVERSCAN, NROW)))
+        ampBuilder.setGain(1.5)
+        ampBuilder.setReadNoise(5.)
+        ampBuilder.setSaturation(SATURATION)
+
+    bbox = lsstGeom.Box2I(lsstGeom.Point2I(0, 0), lsstGeom.Extent2I(NDATA, NROW))
+    return DetectorWrapper(bbox=bbox, numAmps=1, modFunc=setBBoxes).detector
+
+
+def makeInputs(detector, seed):
+    """ Build a raw with a row dependent overscan level, saturated
+    pixels and deviant overscan pixels, and a matching bias and dark """
+    rng = np.random.default_rng(seed)
+    amp = detector.getAmplifiers()[0]
+    raw = afwImage.ExposureI(amp.getRawBBox())
+    raw.setDetector(detector)
+    raw.getInfo().setVisitInfo(afwImage.VisitInfo(exposureTime=30., darkTime=30.))
+    shape = raw.image.array.shape
+    rowLevel = LEVEL + 5.*np.sin(np.arange(NROW)/5.)[:, np.newaxis]
+    raw.image.array[:, :] = (rowLevel + rng.normal(0., 6., shape)).astype(np.int32)
+    raw.image.array[:, NPRESCAN:NPRESCAN + NDATA] += rng.poisson(1000., (NROW, NDATA)).astype(np.int32)
+    raw.image.array[5, NPRESCAN + 7] = 2*SATURATION
+    raw.image.array[17, NPRESCAN + 20:NPRESCAN + 23] = 2*SATURATION
+    raw.image.array[9, NPRESCAN + NDATA + 2] = 2*SATURATION
+    raw.image.array[21, NPRESCAN + NDATA + 4] = LEVEL + 3000.
+
+    bias = afwImage.ExposureF(amp.getRawBBox())
+    bias.setDetector(detector)
+    bias.image.array[:, :] = rng.normal(0., 1., shape)
+    bias.variance.array[:, :] = 1.
+    dark = afwImage.ExposureF(amp.getRawBBox())
+    dark.setDetector(detector)
+    dark.getInfo().setVisitInfo(afwImage.VisitInfo(exposureTime=1., darkTime=1.))
+    dark.image.array[:, :] = rng.exponential(0.002, shape)
+    dark.variance.array[:, :] = 0.002
+    return raw, bias, dark
+
+
+def makeIsrConfig(configClass, fitType):
+    """ Build the reduced ISR configuration used by the EO tasks, with
+    saturation masking, overscan, bias and dark """
+    config = configClass()
+    config.expectWcs = False
+    config.doSaturation = True
+    config.doSaturationInterpolation = False
+    config.doSetBadRegions = False
+    config.doAssembleCcd = False
+    config.doBias = True
+    config.doLinearize = False
+    config.doDefect = False
+    config.doNanMasking = False
+    config.doWidenSaturationTrails = False
+    config.doDark = True
+    config.doFlat = False
+    config.doFringe = False
+    config.doInterpolate = False
+    config.doWrite = False
+    if hasattr(config.overscan, 'fitType'):
+        config.overscan.fitType = fitType
+    else:
+        config.overscanFitType = fitType
+    return config
+
+
+class FastIsrTestCase(unittest.TestCase):
+    """ Check that the numpy implementation matches IsrTask """
+
+    def testMatchesIsrTask(self):
+        detector = makeDetector()
+        raw, bias, dark = makeInputs(detector, 1234)
+        for fitType in ('MEAN', 'MEDIAN', 'MEAN_PER_ROW', 'MEDIAN_PER_ROW'):
+            with self.subTest(fitType=fitType):
+                refTask = IsrTask(config=makeIsrConfig(IsrTaskConfig, fitType))
+                fastTask = EoFastIsrTask(config=makeIsrConfig(EoFastIsrTaskConfig, fitType))
+                self.assertEqual(fastTask.findUnsupported(), [])
+                self.assertTrue(fastTask.useFastPath(raw, bias, dark))
+                refExp = refTask.run(raw.clone(), bias=bias, dark=dark).exposure
+                fastExp = fastTask.run(raw.clone(), bias=bias, dark=dark).exposure
+
+                self.assertEqual(fastExp.getBBox(), refExp.getBBox())
+                np.testing.assert_allclose(fastExp.image.array, refExp.image.array, rtol=0., atol=1e-2)
+                np.testing.assert_allclose(fastExp.variance.array, refExp.variance.array, rtol=1e-5)
+                np.testing.assert_array_equal(fastExp.mask.array, refExp.mask.array)
+                satBit = fastExp.mask.getPlaneBitMask("SAT")
+                self.assertEqual(np.count_nonzero(fastExp.mask.array & satBit), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
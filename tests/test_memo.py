@@ -0,0 +1,105 @@
+import tempfile
+import unittest
+
+import lsst.pipe.base as pipeBase
+
+from lsst.eotask_gen3 import EoReadNoiseTask, EoReadNoiseTaskConfig, EoReadNoiseData
+from lsst.eotask_gen3.eoMemo import computeMemoized, getMemoKey, recordMemoOutputs, summarizeMemoLog
+
+AMP_NAMES = ['C%02i' % i for i in range(16)]
+NEXPOSURE = 3
+
+
+class FakeRef:
+    """ Stands in for `lsst.daf.butler.DatasetRef` """
+    def __init__(self, datasetId):
+        self.id = datasetId
+
+
+class Counter:
+    """ Computes a fake output, counting the calls """
+    def __init__(self):
+        self.nCalls = 0
+
+    def __call__(self):
+        self.nCalls += 1
+        outputData = EoReadNoiseData(amps=AMP_NAMES, nAmp=len(AMP_NAMES), nExposure=NEXPOSURE, nSample=4)
+        outputData.amps["amps"].readNoise[:] = 5.
+        return pipeBase.Struct(outputData=outputData)
+
+
+def makeInputRefs(expIds):
+    return pipeBase.Struct(camera=FakeRef("camera"), bias=FakeRef("bias-94"),
+                           inputExps=[FakeRef("raw-%i" % expId) for expId in expIds])
+
+
+class MemoTestCase(unittest.TestCase):
+    """ Check that the outputs of a quantum are reused only for the same
+    task, configuration and inputs """
+
+    def testMemoized(self):
+        with tempfile.TemporaryDirectory() as memoDir:
+            config = EoReadNoiseTaskConfig()
+            config.memoDir = memoDir
+            task = EoReadNoiseTask(config=config)
+            compute = Counter()
+            first = computeMemoized(task, makeInputRefs(range(NEXPOSURE)), compute)
+            second = computeMemoized(task, makeInputRefs(reversed(range(NEXPOSURE))), compute)
+            self.assertEqual(compute.nCalls, 1)
+            self.assertTrue(first.outputData == second.outputData)
+
+            # Different inputs or configuration
+            computeMemoized(task, makeInputRefs(range(NEXPOSURE + 1)), compute)
+            self.assertEqual(compute.nCalls, 2)
+            config = EoReadNoiseTaskConfig()
+            config.memoDir = memoDir
+            config.nsamp = 10
+            computeMemoized(EoReadNoiseTask(config=config), makeInputRefs(range(NEXPOSURE)), compute)
+            self.assertEqual(compute.nCalls, 3)
+
+            # Inputs that can not be identified are not memoized
+            inputRefs = makeInputRefs(range(NEXPOSURE))
+            inputRefs.bias = object()
+            computeMemoized(task, inputRefs, compute)
+            computeMemoized(task, inputRefs, compute)
+            self.assertEqual(compute.nCalls, 5)
+
+            counts = summarizeMemoLog(memoDir)
+            self.assertEqual(counts, {"lsst.eotask_gen3.eoReadNoise.EoReadNoiseTask": dict(hit=1, miss=3)})
+
+    def testUpstreamRegenerated(self):
+        """ Outputs of memoized quanta are identified by the key of the
+        quantum that produced them, not by their dataset ID """
+        with tempfile.TemporaryDirectory() as memoDir:
+            config = EoReadNoiseTaskConfig()
+            config.memoDir = memoDir
+            task = EoReadNoiseTask(config=config)
+            upstream = Counter()
+            downstream = Counter()
+
+            def runPipeline(outputId):
+                outputs = computeMemoized(task, makeInputRefs(range(NEXPOSURE)), upstream)
+                recordMemoOutputs(task, outputs, dict(outputData=FakeRef(outputId)))
+                inputRefs = pipeBase.Struct(inputData=[FakeRef(outputId)])
+                return outputs, computeMemoized(task, inputRefs, downstream)
+
+            outputs, _ = runPipeline("output-1")
+            self.assertIsNotNone(getMemoKey(outputs.outputData))
+            # The regenerated upstream output has a new dataset ID
+            runPipeline("output-2")
+            self.assertEqual((upstream.nCalls, downstream.nCalls), (1, 1))
+
+            # An input with an unknown producer is identified by its ID
+            computeMemoized(task, pipeBase.Struct(inputData=[FakeRef("output-3")]), downstream)
+            self.assertEqual(downstream.nCalls, 2)
+
+    def testDisabled(self):
+        task = EoReadNoiseTask(config=EoReadNoiseTaskConfig())
+        compute = Counter()
+        computeMemoized(task, makeInputRefs(range(NEXPOSURE)), compute)
+        computeMemoized(task, makeInputRefs(range(NEXPOSURE)), compute)
+        self.assertEqual(compute.nCalls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
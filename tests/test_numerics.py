@@ -0,0 +1,279 @@
+import unittest
+
+import numpy as np
+import astropy.stats as astats
+
+import lsst.geom as lsstGeom
+import lsst.afw.image as afwImage
+import lsst.afw.math as afwMath
+from lsst.afw.cameraGeom import Amplifier
+
+from lsst.eotask_gen3 import (EoPtcTask, EoFlatPairTask, EoReadNoiseTaskConfig, EoBiasStabilityTask,
+                              EoBrighterFatterTask)
+from lsst.eotask_gen3.eoMemory import EoMemoryPlan
+from lsst.eotask_gen3.eoNumerics import (FLOAT32_EPS, workingMean, workingVar, workingStd, workingMedian,
+                                         asWorkingArray)
+from lsst.eotask_gen3.eoOverscan import EoOverscanTask
+
+SHAPE = (200, 150)
+LEVEL = 5.e4
+SIGMA = np.sqrt(LEVEL)
+
+
+def makeAmp():
+    """ Build an amplifier whose data region is the whole image """
+    builder = Amplifier.Builder()
+    builder.setName("C00")
+    bbox = lsstGeom.Box2I(lsstGeom.Point2I(0, 0), lsstGeom.Extent2I(SHAPE[1], SHAPE[0]))
+    builder.setRawBBox(bbox)
+    builder.setRawDataBBox(bbox)
+    return builder.finish()
+
+
+def makeFlat(seed):
+    """ Shot-noise limited flat """
+    rng = np.random.default_rng(seed)
+    return rng.normal(LEVEL, SIGMA, size=SHAPE).astype(np.float32)
+
+
+def makeExposure(array):
+    return afwImage.ExposureF(afwImage.MaskedImageF(afwImage.ImageF(array.copy())))
+
+
+def makeOverscanAmp():
+    """ Build an amplifier with serial and parallel overscan regions """
+    builder = Amplifier.Builder()
+    builder.setName("C00")
+    builder.setRawBBox(lsstGeom.Box2I(lsstGeom.Point2I(0, 0), lsstGeom.Extent2I(SHAPE[1], SHAPE[0])))
+    builder.setRawDataBBox(lsstGeom.Box2I(lsstGeom.Point2I(3, 0), lsstGeom.Extent2I(130, 180)))
+    builder.setRawSerialOverscanBBox(lsstGeom.Box2I(lsstGeom.Point2I(133, 0), lsstGeom.Extent2I(17, 180)))
+    builder.setRawParallelOverscanBBox(lsstGeom.Box2I(lsstGeom.Point2I(3, 180), lsstGeom.Extent2I(130, 20)))
+    return builder.finish()
+
+
+def makeOverscanImage(seed):
+    """ Flat with a bias level and read noise in the overscan regions """
+    rng = np.random.default_rng(seed)
+    array = rng.normal(1000., 5., size=SHAPE).astype(np.float32)
+    array[:180, 3:133] = makeFlat(seed)[:180, 3:133]
+    return array
+
+
+def baselinePtcPairMean(calibExp1, calibExp2, amp, statCtrl):
+    """ EoPtcTask.pairMean before the precision option """
+    mean1 = afwMath.makeStatistics(calibExp1[amp.getRawDataBBox()].image,
+                                   afwMath.MEAN, statCtrl).getValue()
+    mean2 = afwMath.makeStatistics(calibExp2[amp.getRawDataBBox()].image,
+                                   afwMath.MEAN, statCtrl).getValue()
+    fmean = (mean1 + mean2)/2.
+    weight1 = mean2/fmean
+    weight2 = mean1/fmean
+    calibExp1.image.array *= weight1
+    calibExp2.image.array *= weight2
+
+    image1 = np.ravel(calibExp1.image.array)
+    image2 = np.ravel(calibExp2.image.array)
+    fdiff = image1 - image2
+    mad = astats.mad_std(fdiff)
+    keep = np.where((np.abs(fdiff) < (mad*14.826)))[0]
+
+    mean1 = np.mean(image1[keep], dtype=np.float64)
+    mean2 = np.mean(image2[keep], dtype=np.float64)
+    fmean = (mean1 + mean2)/2.
+    weight1 = mean2/fmean
+    weight2 = mean1/fmean
+    image1 *= weight1
+    image2 *= weight2
+
+    fmean = (mean1 + mean2)/2.
+    fvar = np.var(image1[keep] - image2[keep])/2.
+    discard = len(image1) - len(keep)
+    return fmean, fvar, discard
+
+
+def baselineRowMeanVariance(calibExp1, calibExp2, amp, statCtrl):
+    """ EoFlatPairTask.rowMeanVariance before the precision option """
+    miDiff = afwImage.MaskedImageF(calibExp1[amp.getRawDataBBox()].getMaskedImage(), deep=True)
+    miDiff -= calibExp2[amp.getRawDataBBox()].getMaskedImage()
+    rowMeans = np.mean(miDiff.getImage().array, axis=1)
+    return afwMath.makeStatistics(rowMeans, afwMath.VARIANCECLIP, statCtrl).getValue()
+
+
+def baselineOverscanStats(imarr, regions):
+    """ EoOverscanTask.analyzeAmpExpData before the precision option """
+    rows, cols, serialCols, parallelRows = regions
+    return dict(columnMean=np.mean(imarr[rows, serialCols], axis=0),
+                columnVariance=np.var(imarr[rows, serialCols], axis=0),
+                rowMean=np.mean(imarr[parallelRows, cols], axis=1),
+                rowVariance=np.var(imarr[parallelRows, cols], axis=1),
+                serialOverscanNoise=np.mean(np.std(imarr[rows, serialCols.start+3:], axis=1)),
+                parallenOverscanNoise=np.mean(np.std(imarr[parallelRows.start+3:, cols], axis=1)),
+                flatFieldSignal=np.mean(imarr[rows, cols]))
+
+
+def baselineCrossCorrelate(task, maskedimage1, maskedimage2):
+    """ EoBrighterFatterTask.crossCorrelate before the precision option """
+    config = task.config
+    sctrl = afwMath.StatisticsControl()
+    sctrl.setNumSigmaClip(config.nSigmaClip)
+    sctrl.setAndMask(maskedimage1.getMask().getPlaneBitMask("INTRP"))
+
+    diff = maskedimage1.clone()
+    diff.image.array -= maskedimage2.image.array
+    nx = diff.getWidth()//config.backgroundBinSize
+    ny = diff.getHeight()//config.backgroundBinSize
+    bctrl = afwMath.BackgroundControl(nx, ny, task.statCtrl, afwMath.MEDIAN)
+    bkgd = afwMath.makeBackground(diff.image, bctrl)
+    bgImg = bkgd.getImageF(afwMath.Interpolate.CUBIC_SPLINE, afwMath.REDUCE_INTERP_ORDER)
+    diff.image.array -= bgImg.array
+
+    x0, y0 = diff.getXY0()
+    width, height = diff.getDimensions()
+    bbox_extent = lsstGeom.Extent2I(width - config.maxLag, height - config.maxLag)
+    bbox = lsstGeom.Box2I(lsstGeom.Point2I(x0, y0), bbox_extent)
+    dim0 = diff[bbox].clone()
+    dim0.image.array -= afwMath.makeStatistics(dim0.image, afwMath.MEDIAN, sctrl).getValue()
+
+    xcorr = np.zeros((config.maxLag + 1, config.maxLag + 1), dtype=np.float64)
+    xcorr_err = np.zeros((config.maxLag + 1, config.maxLag + 1), dtype=np.float64)
+    for xlag in range(config.maxLag + 1):
+        for ylag in range(config.maxLag + 1):
+            bbox_lag = lsstGeom.Box2I(lsstGeom.Point2I(x0 + xlag, y0 + ylag), bbox_extent)
+            dim_xy = diff[bbox_lag].clone()
+            dim_xy.image.array -= afwMath.makeStatistics(dim_xy.image, afwMath.MEDIAN,
+                                                         task.statCtrl).getValue()
+            dim_xy.image.array *= dim0.image.array
+            xcorr[xlag, ylag] = afwMath.makeStatistics(dim_xy.image, afwMath.MEDIAN,
+                                                       task.statCtrl).getValue()
+            dim_xy_array = dim_xy.getImage().getArray().flatten()/xcorr[0][0]
+            N = len(dim_xy_array)
+            if xlag != 0 or ylag != 0:
+                f = (1+xcorr[xlag, ylag]/xcorr[0][0])/(1-xcorr[xlag, ylag]/xcorr[0][0])
+                xcorr_err[xlag, ylag] = (np.std(dim_xy_array)/np.sqrt(N))*np.sqrt(f)
+    return xcorr, xcorr_err
+
+
+class NumericsTestCase(unittest.TestCase):
+    """ Check the float32 working precision against the float64 reference,
+    with the bounds given in `lsst.eotask_gen3.eoNumerics` """
+
+    def assertRelClose(self, value, reference, bound):
+        self.assertLessEqual(np.max(np.abs(value - reference)/np.abs(reference)), bound)
+
+    def testHelpers(self):
+        array = makeFlat(1)
+        reference = array.astype(np.float64)
+        self.assertRelClose(workingMean(array), np.mean(reference), FLOAT32_EPS)
+        self.assertRelClose(workingMean(array, axis=1), np.mean(reference, axis=1), FLOAT32_EPS)
+        for axis in (None, 0, 1):
+            self.assertRelClose(workingVar(array, np.float32, axis=axis), np.var(reference, axis=axis),
+                                FLOAT32_EPS*LEVEL/SIGMA)
+            self.assertRelClose(workingStd(array, np.float32, axis=axis, ddof=1),
+                                np.std(reference, axis=axis, ddof=1), FLOAT32_EPS*LEVEL/SIGMA)
+        self.assertRelClose(workingMedian(array, np.float32, axis=0), np.median(reference, axis=0),
+                            FLOAT32_EPS)
+        self.assertEqual(workingMedian(array, np.dtype(np.float64)), np.median(reference))
+
+        # The working array is the input in float32, a copy in float64
+        self.assertIs(asWorkingArray(array, np.float32), array)
+        self.assertEqual(asWorkingArray(array, np.float64).dtype, np.float64)
+        copy = array.copy()
+        workingMedian(array, np.float64)
+        np.testing.assert_array_equal(array, copy)
+
+    def testPtcPairMean(self):
+        amp = makeAmp()
+        statCtrl = afwMath.StatisticsControl()
+        flat1, flat2 = makeFlat(2), makeFlat(3)
+        reference = EoPtcTask.pairMean(makeExposure(flat1), makeExposure(flat2), amp, statCtrl,
+                                       dtype=np.float64)
+        result = EoPtcTask.pairMean(makeExposure(flat1), makeExposure(flat2), amp, statCtrl,
+                                    dtype=np.float32)
+        self.assertRelClose(result[0], reference[0], FLOAT32_EPS)
+        self.assertRelClose(result[1], reference[1], FLOAT32_EPS*LEVEL/SIGMA)
+        self.assertLessEqual(abs(result[2] - reference[2]), 1)
+
+    def testFlatPairRowMeanVariance(self):
+        amp = makeAmp()
+        statCtrl = afwMath.StatisticsControl()
+        exp1, exp2 = makeExposure(makeFlat(4)), makeExposure(makeFlat(5))
+        reference = EoFlatPairTask.rowMeanVariance(exp1, exp2, amp, statCtrl, dtype=np.float64)
+        result = EoFlatPairTask.rowMeanVariance(exp1, exp2, amp, statCtrl, dtype=np.float32)
+        self.assertRelClose(result, reference, FLOAT32_EPS*LEVEL/SIGMA)
+
+    def testMemoryPlan(self):
+        amps = [makeAmp()]*16
+        config = EoReadNoiseTaskConfig()
+        config.ampCubeSize = 1.e4
+        plans = {}
+        for precision in ("float32", "float64"):
+            config.precision = precision
+            plans[precision] = EoMemoryPlan.forAmpLoops(config, amps, 10, nCubes=1, expMajor=True)
+        # The float64 cubes take twice the memory
+        fixedBytes = 4*16*SHAPE[0]*SHAPE[1] + 16*SHAPE[0]*SHAPE[1]
+        self.assertEqual(plans["float64"].estimate - fixedBytes, 2*(plans["float32"].estimate - fixedBytes))
+
+
+class BaselineTestCase(unittest.TestCase):
+    """ Check that the default float32 mode matches the implementations
+    from before the precision option, within the bounds given in
+    `lsst.eotask_gen3.eoNumerics` """
+
+    def assertRelClose(self, value, reference, bound):
+        self.assertLessEqual(np.max(np.abs(value - reference)/np.abs(reference)), bound)
+
+    def testPtcPairMean(self):
+        amp = makeAmp()
+        statCtrl = afwMath.StatisticsControl()
+        flat1, flat2 = makeFlat(2), makeFlat(3)
+        nPixel = flat1.size
+        baseline = baselinePtcPairMean(makeExposure(flat1), makeExposure(flat2), amp, statCtrl)
+        result = EoPtcTask.pairMean(makeExposure(flat1), makeExposure(flat2), amp, statCtrl)
+        self.assertRelClose(result[0], baseline[0], FLOAT32_EPS)
+        self.assertRelClose(result[1], baseline[1], FLOAT32_EPS*(np.log2(nPixel) + LEVEL/SIGMA))
+        self.assertLessEqual(abs(result[2] - baseline[2]), 1)
+
+    def testFlatPairRowMeanVariance(self):
+        amp = makeAmp()
+        statCtrl = afwMath.StatisticsControl()
+        exp1, exp2 = makeExposure(makeFlat(4)), makeExposure(makeFlat(5))
+        baseline = baselineRowMeanVariance(exp1, exp2, amp, statCtrl)
+        result = EoFlatPairTask.rowMeanVariance(exp1, exp2, amp, statCtrl)
+        self.assertRelClose(result, baseline, FLOAT32_EPS*(np.log2(SHAPE[1]) + LEVEL/SIGMA))
+
+    def testOverscan(self):
+        amp = makeOverscanAmp()
+        task = EoOverscanTask(config=EoOverscanTask.ConfigClass())
+        outputData = task.makeOutputData([amp], 1, 1)
+        array = makeOverscanImage(6)
+        task.analyzeAmpExpData(makeExposure(array), outputData, 0, amp, 0)
+        outTable = outputData.ampExp["ampExp_%s" % amp.getName()]
+        baseline = baselineOverscanStats(array, task.getRegions(amp))
+        bound = FLOAT32_EPS*np.log2(array.size)
+        for name, values in baseline.items():
+            with self.subTest(column=name):
+                self.assertRelClose(getattr(outTable, name)[0], values, bound)
+
+    def testBiasStabilityRowMedian(self):
+        amp = makeAmp()
+        task = EoBiasStabilityTask(config=EoBiasStabilityTask.ConfigClass())
+        outputData = task.makeOutputData([amp], 1)
+        array = makeFlat(7)
+        task.analyzeAmpExpData(makeExposure(array), outputData, 0, amp, 0)
+        outTable = outputData.ampExp["ampExp_%s" % amp.getName()]
+        np.testing.assert_array_equal(outTable.rowMedian[0], np.median(array, axis=0))
+
+    def testBrighterFatterCrossCorrelate(self):
+        task = EoBrighterFatterTask(config=EoBrighterFatterTask.ConfigClass())
+        exp1, exp2 = makeExposure(makeFlat(8)), makeExposure(makeFlat(9))
+        baseline = baselineCrossCorrelate(task, exp1, exp2)
+        result = task.crossCorrelate(exp1, exp2)
+        np.testing.assert_allclose(result[0], baseline[0], rtol=0.,
+                                   atol=FLOAT32_EPS*LEVEL/SIGMA*abs(baseline[0][0, 0]))
+        nPixel = (SHAPE[0] - task.config.maxLag)*(SHAPE[1] - task.config.maxLag)
+        np.testing.assert_allclose(result[1], baseline[1], atol=0.,
+                                   rtol=FLOAT32_EPS*(np.log2(nPixel) + LEVEL/SIGMA))
+
+
+if __name__ == '__main__':
+    unittest.main()
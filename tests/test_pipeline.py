@@ -0,0 +1,98 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from lsst.eotask_gen3.eoPipeline import EoPipeline
+from lsst.eotask_gen3.eoStageTimer import EoStageTimer
+
+NITEM = 20
+
+
+class InFlightCounter:
+    """ Counts the items read but not yet analyzed """
+
+    def __init__(self):
+        self.nInFlight = 0
+        self.maxInFlight = 0
+        self._lock = threading.Lock()
+
+    def read(self, item):
+        with self._lock:
+            self.nInFlight += 1
+            self.maxInFlight = max(self.maxInFlight, self.nInFlight)
+        return item
+
+    def done(self):
+        with self._lock:
+            self.nInFlight -= 1
+
+
+class PipelineTestCase(unittest.TestCase):
+    """ Check the ordering, the memory bound and the error handling of
+    the pipelined executor """
+
+    def testOrderAndBound(self):
+        rng = np.random.default_rng(1)
+        delays = rng.uniform(0., 0.005, size=NITEM)
+        for depth, numWorkers in [(1, 1), (2, 1), (3, 4)]:
+            with self.subTest(depth=depth, numWorkers=numWorkers):
+                counter = InFlightCounter()
+
+                def isr(item):
+                    time.sleep(delays[item])
+                    return 10*item
+
+                pipeline = EoPipeline(counter.read, isr, depth=depth, numWorkers=numWorkers)
+                results = []
+                for idx, result in pipeline.iterate(range(NITEM)):
+                    results.append((idx, result))
+                    time.sleep(0.001)
+                    counter.done()
+                self.assertEqual(results, [(idx, 10*idx) for idx in range(NITEM)])
+                self.assertLessEqual(counter.maxInFlight, pipeline.capacity)
+                summary = pipeline.summary()
+                self.assertLessEqual(summary['maxQueueDepth']['read'], pipeline.capacity)
+                self.assertLessEqual(summary['maxQueueDepth']['isr'], pipeline.capacity)
+
+    def testBackpressure(self):
+        # A slow analysis stalls the reader, a slow ISR stalls the analysis
+        pipeline = EoPipeline(lambda item: item, lambda item: item, depth=1)
+        for _ in pipeline.iterate(range(5)):
+            time.sleep(0.02)
+        self.assertGreater(pipeline.summary()['stalls']['read'], 0.03)
+
+        pipeline = EoPipeline(lambda item: item, lambda item: time.sleep(0.02), depth=1)
+        list(pipeline.iterate(range(5)))
+        self.assertGreater(pipeline.summary()['stalls']['analyze'], 0.05)
+        timer = EoStageTimer()
+        pipeline.record(timer)
+        self.assertEqual(set(timer.summary().keys()), {'readStall', 'isrStall', 'analyzeStall'})
+
+    def testErrors(self):
+        def failRead(item):
+            if item == 3:
+                raise IOError("Read failed")
+            return item
+
+        def failIsr(item):
+            if item == 5:
+                raise ValueError("ISR failed")
+            return item
+
+        with self.assertRaises(IOError):
+            list(EoPipeline(failRead, lambda item: item).iterate(range(NITEM)))
+        with self.assertRaises(ValueError):
+            list(EoPipeline(lambda item: item, failIsr, numWorkers=2).iterate(range(NITEM)))
+
+        # Leaving the loop early stops the reader and the workers
+        nThreads = threading.active_count()
+        for idx, _ in EoPipeline(lambda item: item, lambda item: item).iterate(range(NITEM)):
+            if idx == 2:
+                break
+        self.assertEqual(threading.active_count(), nThreads)
+
+
+if __name__ == '__main__':
+    unittest.main()
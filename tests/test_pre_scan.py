@@ -0,0 +1,181 @@
+import unittest
+
+import numpy as np
+
+import lsst.geom as lsstGeom
+
+from lsst.eotask_gen3 import EoPtcTaskConfig, EoReadNoiseData
+from lsst.eotask_gen3.eoPreScan import EoPreScan, getPreScanSummary, integratePdFlux
+
+AMP_SHAPE = (40, 20)
+NAMP_X = 4
+SATURATION = 1.e5
+
+
+class FakeLog:
+    def info(self, msg):
+        pass
+
+    def warn(self, msg):
+        pass
+
+
+class FakeTask:
+    log = FakeLog()
+
+
+class FakeAmp:
+    """ Stands in for `lsst.afw.cameraGeom.Amplifier`, with the amps in two
+    rows of NAMP_X, as in a raw """
+    def __init__(self, iamp):
+        self._iamp = iamp
+
+    def getName(self):
+        return "C%02i" % self._iamp
+
+    def getRawDataBBox(self):
+        corner = lsstGeom.Point2I((self._iamp % NAMP_X)*AMP_SHAPE[1], (self._iamp//NAMP_X)*AMP_SHAPE[0])
+        return lsstGeom.Box2I(corner, lsstGeom.Extent2I(AMP_SHAPE[1], AMP_SHAPE[0]))
+
+    @staticmethod
+    def getSaturation():
+        return SATURATION
+
+
+class FakeImage:
+    def __init__(self, array):
+        self.array = array
+
+
+class FakeExposure:
+    def __init__(self, array):
+        self.image = FakeImage(array)
+
+
+class FakeHandle:
+    """ Stands in for `lsst.daf.butler.DeferredDatasetHandle` of a raw,
+    counting the pixels read """
+    def __init__(self, expId, imageType="FLAT", shutTime=10., level=1000., constantAmps=(),
+                 saturatedAmps=(), broken=False):
+        rng = np.random.default_rng(expId)
+        self.dataId = dict(exposure=expId, detector=94)
+        self.metadata = dict(IMGTYPE=imageType, EXPTIME=10., SHUTTIME=shutTime)
+        self.array = rng.normal(level, 5., size=(2*AMP_SHAPE[0], NAMP_X*AMP_SHAPE[1]))
+        for iamp in constantAmps:
+            self.ampArray(iamp)[:] = 0.
+        for iamp in saturatedAmps:
+            self.ampArray(iamp)[:] += SATURATION
+        self.broken = broken
+        self.nPixelRead = 0
+
+    def ampArray(self, iamp):
+        bbox = FakeAmp(iamp).getRawDataBBox()
+        return self.array[bbox.getMinY():bbox.getMaxY() + 1, bbox.getMinX():bbox.getMaxX() + 1]
+
+    def get(self, parameters=None, component=None):
+        if self.broken:
+            raise OSError("Corrupted file")
+        if component == 'metadata':
+            return self.metadata
+        bbox = parameters['bbox']
+        array = self.array[bbox.getMinY():bbox.getMaxY() + 1, bbox.getMinX():bbox.getMaxX() + 1]
+        self.nPixelRead += array.size
+        return FakeExposure(array)
+
+
+class FakePdHandle:
+    """ Stands in for the handle of photodiode data """
+    def __init__(self, flux):
+        self.time = np.linspace(0., 12., 121)
+        self.current = np.where((self.time > 1.) & (self.time <= 11.), flux/10., 0.) + 1.e-3
+
+    def get(self):
+        return dict(Time=self.time, Current=self.current)
+
+
+class PreScanTestCase(unittest.TestCase):
+    """ Check that the pre-scan drops the unusable exposures and pairs,
+    and only those """
+
+    def setUp(self):
+        self.amps = [FakeAmp(iamp) for iamp in range(2*NAMP_X)]
+
+    def testFromConfig(self):
+        config = EoPtcTaskConfig()
+        self.assertIsNone(EoPreScan.fromConfig(config))
+        config.doPreScan = True
+        config.preScanRows = 2
+        preScan = EoPreScan.fromConfig(config)
+        self.assertEqual(preScan.nRows, 2)
+        self.assertEqual(preScan.maxPdFracDev, config.preScanMaxPdFracDev)
+
+    def testStrips(self):
+        strips = EoPreScan(nRows=4).getStrips(self.amps)
+        self.assertEqual(len(strips), 2)
+        stripBox, ampColumns = strips[1]
+        self.assertEqual((stripBox.getMinY(), stripBox.getHeight()), (AMP_SHAPE[0] + 18, 4))
+        self.assertEqual(stripBox.getWidth(), NAMP_X*AMP_SHAPE[1])
+        self.assertEqual(ampColumns[1], (NAMP_X + 1, AMP_SHAPE[1], 2*AMP_SHAPE[1]))
+
+    def testExposures(self):
+        # Amp 7 is dead in every exposure, that does not drop any of them
+        deadAmp = 7
+        inputExps = [FakeHandle(0, constantAmps=[deadAmp]),
+                     FakeHandle(1, shutTime=0., constantAmps=[deadAmp]),
+                     FakeHandle(2, imageType="DARK", shutTime=0., constantAmps=[deadAmp]),
+                     FakeHandle(3, constantAmps=[2, deadAmp]),
+                     FakeHandle(4, saturatedAmps=range(NAMP_X), constantAmps=[deadAmp]),
+                     FakeHandle(5, broken=True),
+                     FakeHandle(6, constantAmps=[deadAmp])]
+        pdData = [FakePdHandle(flux) for flux in [100., 100., 100., 100., 100., 100., 0.]]
+        kwargs = dict(photodiodeData=pdData, camera=None)
+        kept, kwargs, summary = EoPreScan().selectExposures(FakeTask(), inputExps, self.amps, kwargs)
+        self.assertEqual([handle.dataId['exposure'] for handle in kept], [0, 2])
+        self.assertEqual(kwargs['photodiodeData'], pdData[0:3:2])
+        self.assertEqual(summary['nInput'], 7)
+        self.assertEqual(summary['nRejected'], 5)
+        self.assertEqual([(item['exposures'], item['reasons']) for item in summary['rejected']],
+                         [([1], ["shutter"]), ([3], ["missingAmp"]), ([4], ["saturated"]),
+                          ([5], ["unreadable"]), ([6], ["noPdFlux"])])
+        # Only a few rows of each amp are read
+        self.assertEqual(inputExps[0].nPixelRead, 2*4*NAMP_X*AMP_SHAPE[1])
+
+    def testPairs(self):
+        inputPairs = [[(FakeHandle(2*iPair + iExp, shutTime=0. if iPair == 1 and iExp else 10.),
+                        2*iPair + iExp) for iExp in range(2)] for iPair in range(4)]
+        pdPairs = [[FakePdHandle(100.), FakePdHandle(flux2)] for flux2 in [101., 100., 120., 99.]]
+        kwargs = dict(photodiodePairs=pdPairs)
+        kept, kwargs, summary = EoPreScan().selectPairs(FakeTask(), inputPairs, self.amps, kwargs)
+        self.assertEqual(kept, inputPairs[0:4:3])
+        self.assertEqual(kwargs['photodiodePairs'], pdPairs[0:4:3])
+        self.assertEqual(summary['rejected'], [dict(exposures=[2, 3], reasons=["shutter"]),
+                                               dict(exposures=[4, 5], reasons=["pdMismatch"])])
+        self.assertEqual(summary['counts'], dict(shutter=1, pdMismatch=1))
+
+        # With an odd number of flats the last one is left alone
+        oddPairs = inputPairs + [[(FakeHandle(8), 8)]]
+        kwargs = dict(photodiodePairs=pdPairs + [[FakePdHandle(100.)]])
+        kept, kwargs, summary = EoPreScan().selectPairs(FakeTask(), oddPairs, self.amps, kwargs)
+        self.assertEqual(kept, oddPairs[0:4:3] + oddPairs[4:])
+        self.assertEqual(len(kwargs['photodiodePairs']), 3)
+        self.assertEqual((summary['nInput'], summary['nRejected']), (5, 2))
+        self.assertEqual(oddPairs[4][0][0].nPixelRead, 0)
+
+    def testPdFlux(self):
+        pdHandle = FakePdHandle(100.)
+        self.assertAlmostEqual(integratePdFlux(pdHandle.get()), 100., delta=1.)
+        # The table is not modified
+        self.assertEqual(pdHandle.current.min(), 1.e-3)
+        self.assertEqual(integratePdFlux(FakePdHandle(0.).get()), 0.)
+
+    def testRecord(self):
+        outputData = EoReadNoiseData(amps=["C00"], nAmp=1, nExposure=2, nSample=4)
+        self.assertIsNone(getPreScanSummary(outputData))
+        _, _, summary = EoPreScan().selectExposures(FakeTask(), [FakeHandle(0), FakeHandle(1, shutTime=0.)],
+                                                    self.amps, {})
+        EoPreScan.record(outputData, summary)
+        self.assertEqual(getPreScanSummary(outputData), summary)
+
+
+if __name__ == '__main__':
+    unittest.main()
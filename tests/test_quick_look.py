@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+
+import lsst.geom as lsstGeom
+
+from lsst.eotask_gen3 import EoReadNoiseTaskConfig
+from lsst.eotask_gen3.eoQuickLook import (EoQuickLook, sampleArray, getColumnBoxes, medianError,
+                                          quantileError, countEstimate)
+
+SHAPE = (200, 150)
+
+
+class QuickLookTestCase(unittest.TestCase):
+    """ Check the quick-look subsample and the error estimates """
+
+    def testFromConfig(self):
+        config = EoReadNoiseTaskConfig()
+        self.assertIsNone(EoQuickLook.fromConfig(config))
+        config.quickLook = True
+        config.quickLookFraction = 0.2
+        quickLook = EoQuickLook.fromConfig(config)
+        self.assertEqual(quickLook.pixelFraction, 0.2)
+        self.assertEqual(quickLook.maxExposures, config.quickLookExposures)
+
+    def testExposures(self):
+        quickLook = EoQuickLook(maxExposures=5)
+        indices = quickLook.selectExposureIndices(20)
+        self.assertEqual(len(indices), 5)
+        self.assertEqual((indices[0], indices[-1]), (0, 19))
+        self.assertEqual(quickLook.selectExposureIndices(3), [0, 1, 2])
+        self.assertEqual(quickLook.selectExposures(list("abcdefghij")), ['a', 'c', 'e', 'g', 'j'])
+        self.assertEqual(EoQuickLook(maxExposures=0).selectExposureIndices(20), list(range(20)))
+
+    def testSample(self):
+        array = np.arange(SHAPE[0]*SHAPE[1], dtype=np.float32).reshape(SHAPE)
+        self.assertIs(sampleArray(None, array), array)
+        for mode in ("strided", "blocks"):
+            with self.subTest(mode=mode):
+                quickLook = EoQuickLook(pixelFraction=0.1, mode=mode)
+                sampled = quickLook.sample(array)
+                self.assertAlmostEqual(sampled.size/array.size, quickLook.sampledFraction(SHAPE))
+                self.assertAlmostEqual(sampled.size/array.size, 0.1, delta=0.05)
+                # Deterministic, and the same for each image of a cube
+                np.testing.assert_array_equal(sampled, quickLook.sample(array))
+                cube = np.array([array, 2*array])
+                np.testing.assert_array_equal(quickLook.sample(cube)[1], 2*sampled)
+                rows = quickLook.sampleRows(array)
+                self.assertEqual(rows.shape[1], SHAPE[1])
+                self.assertTrue(0 < rows.shape[0] < SHAPE[0])
+        self.assertTrue(np.shares_memory(EoQuickLook(mode="strided").sample(array), array))
+
+    def testColumnBoxes(self):
+        bbox = lsstGeom.Box2I(lsstGeom.Point2I(10, 20), lsstGeom.Extent2I(512, 2002))
+        self.assertEqual(getColumnBoxes(None, bbox), [bbox])
+        for mode in ("strided", "blocks"):
+            quickLook = EoQuickLook(pixelFraction=0.25, mode=mode)
+            boxes = quickLook.columnBoxes(bbox)
+            for box in boxes:
+                self.assertTrue(bbox.contains(box))
+                self.assertEqual(box.getHeight(), bbox.getHeight())
+            self.assertAlmostEqual(quickLook.columnFraction(bbox), 0.25, delta=0.02)
+
+    def testErrors(self):
+        rng = np.random.default_rng(3)
+        values = rng.normal(0., 1., size=10000)
+        self.assertAlmostEqual(medianError(values), np.sqrt(np.pi/2./len(values)), delta=1e-3)
+        self.assertAlmostEqual(quantileError(values, 0.5), np.sqrt(np.pi/2./len(values)), delta=2e-3)
+        self.assertTrue(np.isnan(medianError([1.])))
+
+        # The errors cover the scatter of the estimates from independent
+        # subsamples of a large image
+        image = rng.normal(100., 10., size=(1000, 1000))
+        medians = []
+        for offset in range(9):
+            sampled = image[offset//3::3, offset % 3::3]
+            medians.append(np.median(sampled))
+        self.assertAlmostEqual(np.std(medians), medianError(sampled), delta=0.5*medianError(sampled))
+
+        estimate, error = countEstimate(10, 0.1)
+        self.assertEqual(estimate, 100)
+        self.assertAlmostEqual(error, np.sqrt(10)/0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
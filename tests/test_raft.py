@@ -0,0 +1,77 @@
+import unittest
+
+from lsst.eotask_gen3 import EoPtcTask, EoRaftCalibTaskConfig, groupInputsByDetector, groupDetectorsByRaft
+from lsst.eotask_gen3.eoRaft import EoRaftCalibTaskConnections
+
+DETECTORS = {0: "R01_S00", 1: "R01_S01", 9: "R02_S00"}
+NEXPOSURE = 3
+
+
+class FakeRef:
+    """ Stands in for `lsst.daf.butler.DatasetRef` """
+    def __init__(self, name, **dataId):
+        self.id = "%s-%s" % (name, "-".join(str(val) for val in dataId.values()))
+        self.dataId = dataId
+
+
+class FakeDetector:
+    def __init__(self, name):
+        self._name = name
+
+    def getName(self):
+        return self._name
+
+
+class FakeInputRefs:
+    """ Stands in for `lsst.pipe.base.connections.InputQuantizedConnection`
+    """
+    def __init__(self, **refs):
+        self._refs = refs
+
+    def __iter__(self):
+        return iter(self._refs.items())
+
+
+class RaftTestCase(unittest.TestCase):
+    """ Check how the inputs of a raft quantum are split by detector """
+
+    def testGroupInputs(self):
+        camera = {detId: FakeDetector(detName) for detId, detName in DETECTORS.items()}
+        inputRefs = FakeInputRefs(
+            camera=FakeRef("camera", instrument="LSSTCam"),
+            bias=[FakeRef("bias", detector=detId) for detId in DETECTORS],
+            inputExps=[FakeRef("raw", exposure=iExp, detector=detId)
+                       for iExp in range(NEXPOSURE) for detId in DETECTORS],
+            photodiodeData=[FakeRef("photodiode", exposure=iExp) for iExp in range(NEXPOSURE)])
+        inputs = {name: (refs.id if isinstance(refs, FakeRef) else [ref.id for ref in refs])
+                  for name, refs in inputRefs}
+        inputs['camera'] = camera
+
+        detInputs = groupInputsByDetector(inputRefs, inputs)
+        self.assertEqual(list(detInputs.keys()), sorted(DETECTORS.keys()))
+        for detId, (detRefs, detValues) in detInputs.items():
+            self.assertIs(detValues['camera'], camera)
+            self.assertEqual(len(detRefs['inputExps']), NEXPOSURE)
+            self.assertEqual(len(detRefs['photodiodeData']), NEXPOSURE)
+            self.assertEqual(len(detRefs['bias']), 1)
+            for name in ("bias", "inputExps", "photodiodeData"):
+                self.assertEqual([ref.id for ref in detRefs[name]], detValues[name])
+            for ref in detRefs['inputExps']:
+                self.assertEqual(ref.dataId['detector'], detId)
+
+        rafts = groupDetectorsByRaft(camera, detInputs.keys())
+        self.assertEqual(rafts, {"R01": [0, 1], "R02": [9]})
+
+    def testConnections(self):
+        config = EoRaftCalibTaskConfig()
+        connections = EoRaftCalibTaskConnections(config=config)
+        self.assertNotIn("photodiodeData", connections.inputs)
+        config.calib.retarget(EoPtcTask)
+        config.connections.outputData = "eoPtc"
+        config.validate()
+        connections = EoRaftCalibTaskConnections(config=config)
+        self.assertIn("photodiodeData", connections.inputs)
+
+
+if __name__ == '__main__':
+    unittest.main()
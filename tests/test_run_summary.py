@@ -0,0 +1,103 @@
+import tracemalloc
+import unittest
+
+import numpy as np
+
+from lsst.eotask_gen3 import EoReadNoiseData, EoRunSummaryTask, EoRunSummaryTaskConfig
+
+AMP_NAMES = ['C%02i' % i for i in range(16)]
+NEXPOSURE = 20
+NSAMPLE = 200
+
+
+class FakeDetector:
+    """ Stands in for `lsst.afw.cameraGeom.Detector` """
+    def __init__(self, ampNames=AMP_NAMES):
+        self.ampNames = ampNames
+
+    def getAmplifiers(self):
+        return self.ampNames
+
+
+class FakeHandle:
+    """ Stands in for `lsst.daf.butler.DeferredDatasetHandle`, builds a
+    new output each time it is read """
+    def __init__(self, detId, ampNames=AMP_NAMES):
+        self.dataId = dict(instrument="LSSTCam", detector=detId)
+        self.ampNames = ampNames
+
+    def get(self):
+        calib = EoReadNoiseData(amps=self.ampNames, nAmp=len(self.ampNames), nExposure=NEXPOSURE,
+                                nSample=NSAMPLE)
+        ampTable = calib.amps["amps"]
+        ampTable.readNoise[:] = self.dataId['detector'] + np.arange(len(self.ampNames))
+        ampTable.totalNoise[:] = 2.*ampTable.readNoise
+        for ampName in self.ampNames:
+            calib.ampExp["ampExp_%s" % ampName].totalNoise[:] = 1.
+        return calib
+
+
+class RunSummaryTestCase(unittest.TestCase):
+    """ Check the camera-wide summary, and that its memory does not grow
+    with the number of detectors """
+
+    def runSummary(self, nDet, **configKwds):
+        config = EoRunSummaryTaskConfig()
+        for key, val in configKwds.items():
+            setattr(config, key, val)
+        config.validate()
+        task = EoRunSummaryTask(config=config)
+        inputData = [FakeHandle(detId) for detId in range(nDet)]
+        return task.run(inputData, camera={detId: FakeDetector() for detId in range(nDet)}).outputData
+
+    def testSummary(self):
+        nDet = 5
+        outputData = self.runSummary(nDet, columns=["amps.READ_NOISE", "amps.TOTAL_NOISE", "amps.MISSING"])
+        self.assertEqual(outputData.getColumnNames(), ["amps.READ_NOISE", "amps.TOTAL_NOISE", "amps.MISSING"])
+        detTable = outputData.detectors['detectors']
+        np.testing.assert_array_equal(detTable.detector, np.arange(nDet))
+        expected = np.arange(nDet)[:, np.newaxis] + np.arange(len(AMP_NAMES))
+        np.testing.assert_array_equal(detTable.values[:, 0], expected)
+        np.testing.assert_array_equal(detTable.values[:, 1], 2.*expected)
+        self.assertTrue(np.all(np.isnan(detTable.values[:, 2])))
+        colTable = outputData.columns['columns']
+        np.testing.assert_array_equal(colTable.nGood, [nDet*len(AMP_NAMES), nDet*len(AMP_NAMES), 0])
+        self.assertAlmostEqual(colTable.mean[0], np.mean(expected))
+        self.assertAlmostEqual(colTable.median[1], 2.*np.median(expected))
+        self.assertEqual(colTable.maximum[0], np.max(expected))
+        self.assertTrue(np.isnan(colTable.mean[2]))
+
+        with self.assertRaises(ValueError):
+            self.runSummary(nDet, columns=["READ_NOISE"])
+
+    def testFewerAmps(self):
+        """ A detector with half the amps, first in the inputs """
+        nDet = 3
+        ampNames = [AMP_NAMES[:len(AMP_NAMES)//2]] + [AMP_NAMES]*(nDet - 1)
+        config = EoRunSummaryTaskConfig()
+        config.columns = ["amps.READ_NOISE"]
+        task = EoRunSummaryTask(config=config)
+        inputData = [FakeHandle(detId, ampNames[detId]) for detId in range(nDet)]
+        camera = {detId: FakeDetector(ampNames[detId]) for detId in range(nDet)}
+        outputData = task.run(inputData, camera=camera).outputData
+        values = outputData.detectors['detectors'].values[:, 0]
+        self.assertEqual(values.shape, (nDet, len(AMP_NAMES)))
+        np.testing.assert_array_equal(values[0, :len(AMP_NAMES)//2], np.arange(len(AMP_NAMES)//2))
+        self.assertTrue(np.all(np.isnan(values[0, len(AMP_NAMES)//2:])))
+        expected = np.arange(1, nDet)[:, np.newaxis] + np.arange(len(AMP_NAMES))
+        np.testing.assert_array_equal(values[1:], expected)
+        self.assertEqual(outputData.columns['columns'].nGood[0], (nDet - 0.5)*len(AMP_NAMES))
+
+    def testFlatMemory(self):
+        calibBytes = len(AMP_NAMES)*NEXPOSURE*NSAMPLE*8
+        peaks = []
+        for nDet in (4, 32):
+            tracemalloc.start()
+            self.runSummary(nDet)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        self.assertLess(peaks[1] - peaks[0], calibBytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from lsst.eotask_gen3.eoWorkQueue import EoWorkQueue
+
+NJOB = 12
+NWORKER = 3
+
+# Appends the job name to a file, fails if a marker file is given and
+# does not exist yet, creating it
+JOB_SCRIPT = """
+import os, sys
+name, outPath, marker, fail = sys.argv[1:]
+if fail == "always":
+    sys.exit(1)
+if marker and not os.path.exists(marker):
+    open(marker, "w").close()
+    sys.exit(2)
+with open(outPath, "a") as fout:
+    fout.write(name + "\\n")
+"""
+
+
+def makeCommand(name, outPath, marker="", fail="never"):
+    return [sys.executable, "-c", JOB_SCRIPT, name, outPath, marker, fail]
+
+
+def runWorker(queueDir, workerId):
+    """ Stands in for a worker on another node """
+    EoWorkQueue(queueDir).runWorker(workerId, pollInterval=0.05, heartbeat=0.1, staleTimeout=5.)
+
+
+class WorkQueueTestCase(unittest.TestCase):
+    """ Run jobs with several worker processes, check that each job runs
+    once and that failures are retried """
+
+    def testWorkers(self):
+        with tempfile.TemporaryDirectory() as queueDir:
+            outPath = os.path.join(queueDir, "runs.txt")
+            queue = EoWorkQueue(queueDir)
+            for iJob in range(NJOB):
+                self.assertTrue(queue.submit("job%02i" % iJob, makeCommand("job%02i" % iJob, outPath)))
+            self.assertFalse(queue.submit("job00", makeCommand("job00", outPath)))
+            queue.submit("flaky", makeCommand("flaky", outPath, os.path.join(queueDir, "marker")))
+            queue.submit("broken", makeCommand("broken", outPath, fail="always"), maxAttempts=2)
+            queue.submit("afterFlaky", makeCommand("afterFlaky", outPath), dependsOn=["flaky"])
+            queue.submit("afterBroken", makeCommand("afterBroken", outPath), dependsOn=["broken"])
+            with self.assertRaises(ValueError):
+                queue.submit("orphan", makeCommand("orphan", outPath), dependsOn=["missing"])
+
+            workers = [multiprocessing.Process(target=runWorker, args=(queueDir, "node%i" % iWorker))
+                       for iWorker in range(NWORKER)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join(60.)
+                self.assertEqual(worker.exitcode, 0)
+
+            with open(outPath) as fin:
+                runs = sorted(fin.read().split())
+            expected = ["job%02i" % iJob for iJob in range(NJOB)] + ["flaky", "afterFlaky"]
+            self.assertEqual(runs, sorted(expected))
+            self.assertEqual(queue.listJobs("failed"), ["afterBroken", "broken"])
+            self.assertEqual(queue.readJob("failed", "afterBroken")['status'], "dependencyFailed")
+            flaky = queue.readJob("done", "flaky")
+            self.assertEqual([attempt['returnCode'] for attempt in flaky['attempts']], [2, 0])
+            summary = queue.summary()
+            self.assertEqual(summary['counts'], dict(pending=0, claimed=0, done=NJOB + 2, failed=2))
+            self.assertEqual(summary['nRetries'], 2)
+            self.assertGreater(summary['duration']['total'], 0.)
+
+            self.assertEqual(queue.retryFailed(), ["afterBroken", "broken"])
+            self.assertEqual(queue.readJob("pending", "broken")['maxAttempts'], 4)
+
+    def testStaleClaim(self):
+        with tempfile.TemporaryDirectory() as queueDir:
+            outPath = os.path.join(queueDir, "runs.txt")
+            queue = EoWorkQueue(queueDir)
+            queue.submit("job", makeCommand("job", outPath))
+            job = queue.claim("deadNode")
+            self.assertEqual(job['jobId'], "job")
+            self.assertIsNone(queue.claim("otherNode"))
+            self.assertEqual(queue.requeueStale(60.), [])
+            tOld = time.time() - 120.
+            os.utime(queue.path("claimed", "job"), (tOld, tOld))
+            self.assertEqual(queue.requeueStale(60.), ["job"])
+            self.assertEqual(queue.runWorker("otherNode", pollInterval=0.05), 1)
+            done = queue.readJob("done", "job")
+            self.assertTrue(done['attempts'][0]['stale'])
+            self.assertEqual(done['attempts'][1]['worker'], "otherNode")
+            # The dead node coming back can not complete the job
+            self.assertIsNone(queue.complete(job, 0, tOld, tOld + 1.))
+
+    def testReclaimedStaleClaim(self):
+        with tempfile.TemporaryDirectory() as queueDir:
+            outPath = os.path.join(queueDir, "runs.txt")
+            queue = EoWorkQueue(queueDir)
+            queue.submit("job", makeCommand("job", outPath))
+            staleJob = queue.claim("deadNode")
+            tOld = time.time() - 120.
+            os.utime(queue.path("claimed", "job"), (tOld, tOld))
+            self.assertEqual(queue.requeueStale(60.), ["job"])
+            job = queue.claim("otherNode")
+            self.assertTrue(queue.ownsClaim(job))
+            self.assertFalse(queue.ownsClaim(staleJob))
+            # The dead node coming back can not move the new claim
+            self.assertIsNone(queue.complete(staleJob, 1, tOld, tOld + 1.))
+            self.assertEqual(queue.listJobs("claimed"), ["job"])
+            self.assertEqual(queue.readJob("claimed", "job")['attempts'][-1]['worker'], "otherNode")
+            self.assertEqual(queue.complete(job, 0, tOld, tOld + 1.), "done")
+            self.assertEqual(queue.listJobs("pending"), [])
+            self.assertEqual(len(queue.readJob("done", "job")['attempts']), 2)
+
+    def testRetryArgs(self):
+        with tempfile.TemporaryDirectory() as queueDir:
+            queue = EoWorkQueue(queueDir)
+            # Fails unless run with the retry arguments
+            command = [sys.executable, "-c", "import sys; sys.exit(0 if sys.argv[-1] == 'retry' else 3)"]
+            queue.submit("job", command, retryArgs=["--again", "retry"])
+            self.assertEqual(queue.runWorker("node", pollInterval=0.05), 2)
+            attempts = queue.readJob("done", "job")['attempts']
+            self.assertEqual([attempt['returnCode'] for attempt in attempts], [3, 0])
+            self.assertEqual(attempts[0]['command'], command)
+            self.assertEqual(attempts[1]['command'], command + ["--again", "retry"])
+
+
+if __name__ == '__main__':
+    unittest.main()